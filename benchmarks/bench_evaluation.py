@@ -0,0 +1,50 @@
+"""
+Cross-validation benchmark
+==========================
+
+Times ``cross_validate`` with fitted state reused between folds against one
+stacked fit of every fold, for an increasing number of folds.
+
+Usage:
+    python benchmarks/bench_evaluation.py --series 10000 --model ar
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus.evaluation import cross_validate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--series', type=int, default=10000)
+    parser.add_argument('--length', type=int, default=730)
+    parser.add_argument('--horizon', type=int, default=14)
+    parser.add_argument('--folds', type=int, nargs='+', default=[2, 8, 24])
+    parser.add_argument('--model', default='ar')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    panel = np.cumsum(rng.normal(0.1, 1.0, size=(args.series, args.length)), axis=1)
+    print(f"model={args.model} series={args.series} length={args.length} horizon={args.horizon}")
+    for n_folds in args.folds:
+        timings = {}
+        for reuse_state in (True, False):
+            start = time.perf_counter()
+            cv = cross_validate(panel, model=args.model, horizon=args.horizon,
+                                n_folds=n_folds, reuse_state=reuse_state)
+            cv.evaluate()
+            timings[reuse_state] = time.perf_counter() - start
+        print(f"  folds={n_folds:3d}: reuse state {timings[True] * 1e3:9.1f} ms  "
+              f"stacked {timings[False] * 1e3:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Panel vs per-series benchmark
+=============================
+
+Compares fitting one :class:`~nostradamus.Predictor` on a whole panel against
+the naive approach of looping over the series with one predictor each.
+
+Usage:
+    python benchmarks/bench_panel.py --series 10000 --length 365 --model ar
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor
+
+
+def make_panel(n_series: int, length: int, seed: int = 0) -> np.ndarray:
+    """Random-walk-with-drift panel used by the benchmark."""
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.1, 0.05, size=(n_series, 1))
+    steps = drift + rng.normal(size=(n_series, length))
+    return 100 + np.cumsum(steps, axis=1)
+
+
+def run(n_series: int, length: int, model: str, periods: int, loop_series: int) -> None:
+    """Time both strategies and print series throughput."""
+    panel = make_panel(n_series, length)
+
+    start = time.perf_counter()
+    Predictor(model=model).fit(panel).predict(periods)
+    batched = time.perf_counter() - start
+
+    subset = panel[:loop_series]
+    start = time.perf_counter()
+    for row in subset:
+        Predictor(model=model).fit(row).predict(periods)
+    looped = (time.perf_counter() - start) * n_series / len(subset)
+
+    print(f"model={model} series={n_series} length={length} periods={periods}")
+    print(f"  batched : {batched:8.3f}s  {n_series / batched:12,.0f} series/s")
+    print(f"  per-loop: {looped:8.3f}s  {n_series / looped:12,.0f} series/s "
+          f"(extrapolated from {len(subset)} series)")
+    print(f"  speedup : {looped / batched:8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--series', type=int, default=10000)
+    parser.add_argument('--length', type=int, default=365)
+    parser.add_argument('--periods', type=int, default=30)
+    parser.add_argument('--model', default='ar')
+    parser.add_argument('--loop-series', type=int, default=1000,
+                        help='series actually fitted in the per-series loop')
+    args = parser.parse_args()
+    run(args.series, args.length, args.model, args.periods, args.loop_series)
+
+
+if __name__ == '__main__':
+    main()
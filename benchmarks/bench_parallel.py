@@ -0,0 +1,51 @@
+"""
+Parallel fit scaling benchmark
+==============================
+
+Measures how ``Predictor.fit(n_jobs=...)`` scales for the per-series ARIMA
+backend as worker processes are added.
+
+Usage:
+    python benchmarks/bench_parallel.py --series 2000 --jobs 1 2 4 8 16 32
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--series', type=int, default=500)
+    parser.add_argument('--length', type=int, default=200)
+    parser.add_argument('--model', default='arima')
+    parser.add_argument('--jobs', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    panel = np.cumsum(rng.normal(0.1, 1.0, size=(args.series, args.length)), axis=1)
+
+    baseline = None
+    print(f"model={args.model} series={args.series} length={args.length} "
+          f"cores={os.cpu_count()}")
+    for n_jobs in args.jobs:
+        start = time.perf_counter()
+        Predictor(model=args.model).fit(panel, n_jobs=n_jobs)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        speedup = baseline / elapsed
+        print(f"  n_jobs={n_jobs:3d}: {elapsed:8.2f}s  speedup {speedup:5.1f}x  "
+              f"efficiency {speedup / n_jobs:5.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Model registry startup benchmark
+================================
+
+Registers ``--models`` small predictors, then measures what a service pays
+at startup: opening every registered model (manifest only) versus serving
+a forecast from a handful of them, which maps their arrays on first use.
+
+Usage:
+    python benchmarks/bench_registry.py --models 10000 --served 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import ModelRegistry, Predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--models', type=int, default=10000)
+    parser.add_argument('--served', type=int, default=100)
+    parser.add_argument('--series', type=int, default=10, help='series per model')
+    parser.add_argument('--model', default='ar')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(root)
+        start = time.perf_counter()
+        for k in range(args.models):
+            panel = np.cumsum(rng.normal(size=(args.series, 100)), axis=1)
+            registry.register(f'model-{k}', Predictor(model=args.model).fit(panel))
+        print(f"register {args.models} models: {time.perf_counter() - start:8.2f} s")
+
+        registry = ModelRegistry(root)
+        start = time.perf_counter()
+        names = registry.names()
+        for name in names:
+            registry.get(name)
+        print(f"open     {len(names)} models: {time.perf_counter() - start:8.2f} s")
+
+        start = time.perf_counter()
+        for name in names[:args.served]:
+            registry.get(name).predict(30)
+        elapsed = time.perf_counter() - start
+        print(f"serve    {args.served} models: {elapsed:8.2f} s "
+              f"({elapsed / max(args.served, 1) * 1e3:.2f} ms first forecast)")
+
+
+if __name__ == '__main__':
+    main()
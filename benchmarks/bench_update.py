@@ -0,0 +1,56 @@
+"""
+Incremental update benchmark
+============================
+
+Compares ``Predictor.update`` with a full refit when a few new points
+arrive for every series, for histories of increasing length. Update latency
+is averaged over ``--rounds`` consecutive updates, as in a streaming job.
+
+Usage:
+    python benchmarks/bench_update.py --series 10000 --new 4 --model linear
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--series', type=int, default=10000)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[250, 1000, 4000])
+    parser.add_argument('--new', type=int, default=4, help='new points per series')
+    parser.add_argument('--model', default='ar')
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"model={args.model} series={args.series} new points={args.new}")
+    for length in args.lengths:
+        total = length + args.new * args.rounds
+        panel = np.cumsum(rng.normal(0.1, 1.0, size=(args.series, total)), axis=1)
+
+        predictor = Predictor(model=args.model).fit(panel[:, :length])
+        start = time.perf_counter()
+        for end in range(length, total, args.new):
+            predictor.update(panel[:, end:end + args.new])
+        update = (time.perf_counter() - start) / args.rounds
+
+        start = time.perf_counter()
+        Predictor(model=args.model).fit(panel)
+        refit = time.perf_counter() - start
+
+        print(f"  history={length:6d}: update {update * 1e3:9.2f} ms  "
+              f"refit {refit * 1e3:9.2f} ms  ({refit / update:6.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
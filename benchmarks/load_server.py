@@ -0,0 +1,129 @@
+"""
+REST server load test
+=====================
+
+Fires ``--concurrency`` clients at ``POST /api/predict``, each sending
+``--requests`` requests over one keep-alive connection, and reports the
+latency percentiles and throughput. Requests draw from ``--distinct``
+different panels, so identical requests overlap and exercise coalescing
+and the forecast cache.
+
+By default a server is started in-process on a free port; pass ``--url`` to
+load an already running one.
+
+Usage:
+    python benchmarks/load_server.py --concurrency 300 --requests 5
+    python benchmarks/load_server.py --url http://localhost:5000/api
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus.server import PredictionServer
+
+
+async def read_response(reader):
+    """Read one response (chunked or with Content-Length) and return its status."""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int(await reader.readline(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status
+
+
+async def client(host, port, path, bodies, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            writer.write(
+                f'POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+            )
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    rng = np.random.default_rng(0)
+    panels = [
+        json.dumps({
+            'periods': args.periods,
+            'model': args.model,
+            'data': np.cumsum(rng.normal(size=(args.series, args.length)), axis=1).round(3).tolist(),
+        }).encode()
+        for _ in range(args.distinct)
+    ]
+    plan = rng.integers(args.distinct, size=(args.concurrency, args.requests))
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port, prefix = url.hostname, url.port or 80, url.path.rstrip('/')
+    else:
+        server = PredictionServer(port=0, workers=args.workers)
+        await server.start()
+        host, port, prefix = server.host, server.port, server.prefix
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            client(host, port, f'{prefix}/predict', [panels[k] for k in row], latencies, errors)
+            for row in plan
+        ))
+    finally:
+        if server is not None:
+            await server.close()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1e3
+    print(f"{len(latencies)} requests from {args.concurrency} clients in {elapsed:.2f} s "
+          f"({len(latencies) / elapsed:.0f} req/s), {len(errors)} errors")
+    print(f"latency p50 {np.percentile(latencies, 50):8.1f} ms   "
+          f"p99 {np.percentile(latencies, 99):8.1f} ms   max {latencies.max():8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running server')
+    parser.add_argument('--concurrency', type=int, default=300)
+    parser.add_argument('--requests', type=int, default=5, help='requests per client')
+    parser.add_argument('--distinct', type=int, default=50, help='distinct request bodies')
+    parser.add_argument('--series', type=int, default=20)
+    parser.add_argument('--length', type=int, default=200)
+    parser.add_argument('--periods', type=int, default=30)
+    parser.add_argument('--model', default='ar')
+    parser.add_argument('--workers', type=int, help='worker processes of the in-process server')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
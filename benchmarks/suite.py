@@ -0,0 +1,403 @@
+"""
+Benchmark suite
+===============
+
+Times the whole forecasting path on synthetic panels (see
+``benchmarks/synthetic.py``) of increasing size and saves the results as
+JSON, one file per commit, so runs can be compared across changes.
+
+Benchmarks, for each size:
+
+- ``convert``: raw CSV to columnar store
+- ``load``: read every series from the store, chunk by chunk
+- ``preprocess``: impute, clip and scale the store into a new one
+- ``seasonality``: seasonal periods of the whole panel
+- ``fit`` and ``predict``: one :class:`~nostradamus.Predictor` on the panel
+- ``backtest``: rolling-origin cross-validation
+- ``serve``: ``POST /api/predict`` requests on datasets served by an
+  in-process :class:`~nostradamus.server.PredictionServer`
+
+Each benchmark runs once to warm up, then ``--repeat`` times, and the
+fastest run is kept; benchmarks quicker than :data:`MIN_RUN_SECONDS` are
+looped within each run and timed per call. The JSON also holds every run
+and, per benchmark, the mean time per call spent in the instrumented
+stages of the package (see :mod:`nostradamus.instrumentation`).
+
+Usage:
+    python benchmarks/suite.py run --sizes 1000 10000 100000
+    python benchmarks/suite.py run --sizes 1000000 --only fit predict --repeat 1
+    python benchmarks/suite.py compare benchmarks/results/1a2b3c4.json benchmarks/results/5d6e7f8.json
+
+``compare`` exits with status 1 when a benchmark got slower by more than
+``--threshold`` (10% by default).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import synthetic
+from nostradamus import Predictor, instrumentation
+from nostradamus.data import Clip, ColumnarStore, Impute, Pipeline, Scale, open_store
+from nostradamus.data.preprocessing import iter_store_chunks
+from nostradamus.evaluation import cross_validate
+from nostradamus.seasonality import detect_seasonality
+from nostradamus.server import PredictionServer
+
+FORMAT_VERSION = 1
+
+BENCHMARKS = ('convert', 'load', 'preprocess', 'seasonality', 'fit', 'predict', 'backtest', 'serve')
+
+# Quick benchmarks are looped until one run takes at least this long.
+MIN_RUN_SECONDS = 0.2
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class Context:
+    """Data shared by the benchmarks of one size."""
+
+    def __init__(self, args, n_series, workdir):
+        self.args = args
+        self.n_series = n_series
+        self.workdir = workdir
+        self.options = dict(gaps=args.gaps, ragged=args.ragged, seed=args.seed)
+        self.csv = os.path.join(workdir, 'raw', 'synthetic.csv')
+        self.store_path = os.path.join(workdir, 'processed', 'synthetic')
+        self._panel = None
+        self._predictor = None
+
+    @property
+    def panel(self):
+        if self._panel is None:
+            self._panel = synthetic.make_panel(self.n_series, self.args.length, **self.options)
+        return self._panel
+
+    @property
+    def store(self):
+        if not os.path.exists(self.csv):
+            synthetic.write_csv(self.csv, self.n_series, self.args.length, **self.options)
+        return open_store(self.csv, store_path=self.store_path)
+
+    @property
+    def predictor(self):
+        if self._predictor is None:
+            self._predictor = Predictor(model=self.args.model).fit(self.panel)
+        return self._predictor
+
+
+def bench_convert(ctx):
+    ctx.store  # write the CSV outside the timed runs
+
+    def run():
+        ColumnarStore.from_csv(ctx.csv, os.path.join(ctx.workdir, 'converted'))
+    return run
+
+
+def bench_load(ctx):
+    store = ctx.store
+
+    def run():
+        for _ in iter_store_chunks(store, columns=['y']):
+            pass
+    return run
+
+
+def bench_preprocess(ctx):
+    store = ctx.store
+    path = os.path.join(ctx.workdir, 'preprocessed')
+
+    def run():
+        Pipeline([Impute(), Clip(), Scale()]).run(store, path)
+    return run
+
+
+def bench_seasonality(ctx):
+    panel = ctx.panel
+
+    def run():
+        detect_seasonality(panel)
+    return run
+
+
+def bench_fit(ctx):
+    panel = ctx.panel
+
+    def run():
+        Predictor(model=ctx.args.model).fit(panel)
+    return run
+
+
+def bench_predict(ctx):
+    predictor = ctx.predictor
+
+    def run():
+        predictor.predict(ctx.args.horizon)
+    return run
+
+
+def bench_backtest(ctx):
+    panel = ctx.panel
+
+    def run():
+        cross_validate(panel, model=ctx.args.model, horizon=ctx.args.horizon, n_folds=ctx.args.folds)
+    return run
+
+
+def bench_serve(ctx):
+    ctx.store
+    batch = min(ctx.args.serve_batch, ctx.n_series)
+    n_requests = ctx.args.serve_requests
+    rng = np.random.default_rng(ctx.args.seed)
+    bodies = [
+        json.dumps({
+            'dataset': 'synthetic',
+            'series': synthetic.series_ids(int(first), batch).tolist(),
+            'model': ctx.args.model,
+            'periods': ctx.args.horizon,
+        }).encode()
+        for first in rng.integers(0, ctx.n_series - batch + 1, size=n_requests)
+    ]
+
+    async def post(server, body):
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        try:
+            writer.write(
+                f'POST /api/predict HTTP/1.1\r\nHost: {server.host}\r\nConnection: close\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body
+            )
+            response = await reader.read()
+        finally:
+            writer.close()
+        status = int(response.split(b' ', 2)[1])
+        if status != 200:
+            raise RuntimeError(f"POST /api/predict failed with status {status}")
+
+    async def serve():
+        async with PredictionServer(port=0, data_dir=ctx.workdir, workers=ctx.args.workers) as server:
+            await post(server, bodies[0])  # start the worker processes
+            server.cache.clear()
+            queue = asyncio.Queue()
+            for body in bodies:
+                queue.put_nowait(body)
+
+            async def client():
+                while not queue.empty():
+                    await post(server, queue.get_nowait())
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(ctx.args.concurrency)))
+            return time.perf_counter() - start
+
+    def run():
+        return asyncio.run(serve())
+    run.series = n_requests * batch
+    return run
+
+
+def measure(setup, ctx, repeat, memory):
+    """Run a benchmark ``repeat`` times; return its result record."""
+    run = setup(ctx)
+
+    def timed(number):
+        start = time.perf_counter()
+        total = 0.0
+        for _ in range(number):
+            elapsed = run()
+            total += elapsed if elapsed is not None else 0.0
+        return (total or time.perf_counter() - start) / number
+
+    # Untimed warm-up, which also sizes the loop of the quick benchmarks.
+    number = max(1, math.ceil(MIN_RUN_SECONDS / max(timed(1), 1e-9)))
+    runs = []
+    recorder = instrumentation.enable()
+    try:
+        for _ in range(repeat):
+            runs.append(timed(number))
+    finally:
+        instrumentation.disable()
+
+    result = {
+        'seconds': min(runs),
+        'median': statistics.median(runs),
+        'runs': runs,
+        'number': number,
+        'throughput': getattr(run, 'series', ctx.n_series) / min(runs),
+        'stages': {
+            row['stage'] + ''.join(f'[{k}={v}]' for k, v in sorted(row['labels'].items())):
+                row['wall'] / (repeat * number)
+            for row in recorder.summary()
+        },
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            run()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def git_revision():
+    """Short hash of HEAD and whether the tree has local changes."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def run_suite(args):
+    commit, dirty = git_revision()
+    selected = args.only or BENCHMARKS
+    report = {
+        'format_version': FORMAT_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'machine': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': {
+            'length': args.length,
+            'model': args.model,
+            'horizon': args.horizon,
+            'folds': args.folds,
+            'gaps': args.gaps,
+            'ragged': args.ragged,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': [],
+    }
+
+    for n_series in args.sizes:
+        with tempfile.TemporaryDirectory(prefix='nostradamus-bench-') as workdir:
+            ctx = Context(args, n_series, workdir)
+            for name in BENCHMARKS:
+                if name not in selected:
+                    continue
+                record = measure(globals()[f'bench_{name}'], ctx, args.repeat, args.memory)
+                record = {'name': name, 'series': n_series, **record}
+                report['results'].append(record)
+                print(f"{name:>10s} {n_series:>9,d} series: {record['seconds']:10.4f}s "
+                      f"{record['throughput']:14,.0f} series/s", flush=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}")
+
+
+def compare(base, new, threshold):
+    """
+    Compare two reports.
+
+    Returns:
+        One ``(name, series, base_seconds, new_seconds, ratio, verdict)`` row
+        per benchmark present in both, with ``verdict`` one of
+        ``'regression'``, ``'improvement'`` or ``''``
+    """
+    baseline = {(r['name'], r['series']): r['seconds'] for r in base['results']}
+    rows = []
+    for record in new['results']:
+        key = (record['name'], record['series'])
+        if key not in baseline:
+            continue
+        ratio = record['seconds'] / baseline[key]
+        verdict = ''
+        if ratio > 1 + threshold:
+            verdict = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            verdict = 'improvement'
+        rows.append((*key, baseline[key], record['seconds'], ratio, verdict))
+    return rows
+
+
+def compare_files(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f"base {base['commit']}{' (dirty)' if base['dirty'] else ''} -> "
+          f"new {new['commit']}{' (dirty)' if new['dirty'] else ''}")
+    if base['machine'] != new['machine']:
+        print("warning: the reports come from different machines or environments")
+    if base['config'] != new['config']:
+        print("warning: the reports were run with different settings")
+
+    rows = compare(base, new, args.threshold)
+    print(f"{'benchmark':>10s} {'series':>9s} {'base':>11s} {'new':>11s} {'change':>8s}")
+    for name, n_series, before, after, ratio, verdict in rows:
+        print(f"{name:>10s} {n_series:>9,d} {before:10.4f}s {after:10.4f}s {ratio - 1:+8.1%}  {verdict}")
+
+    regressions = sum(row[-1] == 'regression' for row in rows)
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmarks and save the results')
+    run.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    run.add_argument('--only', nargs='+', choices=BENCHMARKS)
+    run.add_argument('--length', type=int, default=365)
+    run.add_argument('--model', default='ar')
+    run.add_argument('--horizon', type=int, default=14)
+    run.add_argument('--folds', type=int, default=3)
+    run.add_argument('--gaps', type=float, default=0.02)
+    run.add_argument('--ragged', type=float, default=0.1)
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--memory', action='store_true',
+                     help='also record peak traced memory (one extra run per benchmark)')
+    run.add_argument('--serve-requests', type=int, default=50)
+    run.add_argument('--serve-batch', type=int, default=100, help='series per request')
+    run.add_argument('--concurrency', type=int, default=8)
+    run.add_argument('--workers', type=int, default=None, help='server worker processes')
+    run.add_argument('--output', help='JSON file (default: benchmarks/results/<commit>.json)')
+
+    diff = commands.add_parser('compare', help='compare two result files')
+    diff.add_argument('base')
+    diff.add_argument('new')
+    diff.add_argument('--threshold', type=float, default=0.1,
+                      help='relative slowdown reported as a regression')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_suite(args)
+    else:
+        compare_files(args)
+
+
+if __name__ == '__main__':
+    main()
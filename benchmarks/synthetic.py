@@ -0,0 +1,167 @@
+"""
+Synthetic panel generator
+=========================
+
+Deterministic panels of daily series for the benchmarks: a level, a linear
+trend, one seasonal cycle and Gaussian noise per series, with optional gaps
+and late-starting series.
+
+Series are generated in blocks of :data:`BLOCK` series, each with its own
+seed, so series ``i`` has the same values whatever the size of the panel:
+the first thousand series of a million-series panel are the thousand-series
+panel. Large panels can be streamed block by block to a CSV or a columnar
+store without ever being held in memory.
+
+Usage:
+    python benchmarks/synthetic.py --series 1000000 --output data/raw/synthetic.csv
+    python benchmarks/synthetic.py --series 1000000 --output data/processed/synthetic --store
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Iterator, Tuple
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+# Series generated from one seed.
+BLOCK = 10_000
+
+START = np.datetime64('2022-01-01')
+
+
+def iter_panel(
+    n_series: int,
+    length: int = 365,
+    trend: float = 0.05,
+    seasonality: float = 5.0,
+    season_length: int = 7,
+    noise: float = 1.0,
+    gaps: float = 0.0,
+    ragged: float = 0.0,
+    seed: int = 0,
+    dtype: type = np.float64,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Generate a panel block by block.
+
+    Args:
+        n_series: Number of series
+        length: Number of time steps
+        trend: Mean slope per step (slopes vary around it per series)
+        seasonality: Mean amplitude of the seasonal cycle
+        season_length: Period of the seasonal cycle, in steps
+        noise: Standard deviation of the noise
+        gaps: Fraction of observations replaced by ``NaN``
+        ragged: Fraction of series starting late, up to half-way through
+        seed: Random seed
+        dtype: Dtype of the values
+
+    Yields:
+        ``(first_series, values)`` with ``values`` of shape
+        ``(min(BLOCK, remaining), length)``
+    """
+    t = np.arange(length)
+    for first in range(0, n_series, BLOCK):
+        n = min(BLOCK, n_series - first)
+        # One stream per draw, each filled series by series, so that a
+        # smaller last block gets the first series of a full one.
+        params, shocks, holes = (np.random.default_rng([seed, first // BLOCK, k]) for k in range(3))
+        u = params.random((n, 6))
+        level = 50 + 100 * u[:, :1]
+        slope = trend * 2 * u[:, 1:2]
+        amplitude = seasonality * (0.5 + u[:, 2:3])
+        phase = 2 * np.pi * u[:, 3:4]
+        values = level + slope * t + amplitude * np.sin(2 * np.pi * t / season_length + phase)
+        values += noise * shocks.standard_normal((n, length))
+        if gaps:
+            values[holes.random((n, length)) < gaps] = np.nan
+        if ragged:
+            late = u[:, 4] < ragged
+            starts = 1 + (u[:, 5] * (max(2, length // 2) - 1)).astype(int)
+            values[late[:, None] & (t < starts[:, None])] = np.nan
+        yield first, values.astype(dtype, copy=False)
+
+
+def make_panel(n_series: int, length: int = 365, **options) -> np.ndarray:
+    """Generate a whole panel of shape ``(n_series, length)`` (see :func:`iter_panel`)."""
+    dtype = options.get('dtype', np.float64)
+    panel = np.empty((n_series, length), dtype=dtype)
+    for first, values in iter_panel(n_series, length, **options):
+        panel[first:first + len(values)] = values
+    return panel
+
+
+def series_ids(first: int, n: int) -> np.ndarray:
+    """Identifiers of series ``first`` to ``first + n - 1``."""
+    return np.char.add('series_', np.arange(first, first + n).astype(str))
+
+
+def _long(first: int, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Long-format ids, times and values of one block, without the gaps."""
+    n, length = values.shape
+    valid = np.isfinite(values)
+    counts = valid.sum(axis=1)
+    times = np.broadcast_to(START + np.arange(length), values.shape)
+    return series_ids(first, n), counts, times[valid], values[valid]
+
+
+def write_csv(path: str, n_series: int, length: int = 365, **options) -> str:
+    """Stream a panel to a long-format CSV with ``unique_id``, ``ds`` and ``y``."""
+    import pandas as pd
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for first, values in iter_panel(n_series, length, **options):
+            ids, counts, times, y = _long(first, values)
+            pd.DataFrame({
+                'unique_id': np.repeat(ids, counts),
+                'ds': times,
+                'y': y,
+            }).to_csv(f, index=False, header=first == 0, date_format='%Y-%m-%d')
+    return path
+
+
+def write_store(path: str, n_series: int, length: int = 365, **options):
+    """Stream a panel to a columnar store (see :class:`~nostradamus.data.StoreWriter`)."""
+    from nostradamus.data import StoreWriter
+
+    writer = StoreWriter(path, dtype=options.get('dtype', np.float64))
+    for first, values in iter_panel(n_series, length, **options):
+        ids, counts, times, y = _long(first, values)
+        writer.append(ids, counts, {'ds': times, 'y': y})
+    return writer.close(source='synthetic')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--series', type=int, default=1000)
+    parser.add_argument('--length', type=int, default=365)
+    parser.add_argument('--trend', type=float, default=0.05)
+    parser.add_argument('--seasonality', type=float, default=5.0)
+    parser.add_argument('--season-length', type=int, default=7)
+    parser.add_argument('--noise', type=float, default=1.0)
+    parser.add_argument('--gaps', type=float, default=0.0)
+    parser.add_argument('--ragged', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--store', action='store_true', help='write a columnar store instead of a CSV')
+    args = parser.parse_args()
+
+    options = dict(trend=args.trend, seasonality=args.seasonality, season_length=args.season_length,
+                   noise=args.noise, gaps=args.gaps, ragged=args.ragged, seed=args.seed)
+    start = time.perf_counter()
+    if args.store:
+        write_store(args.output, args.series, args.length, **options)
+    else:
+        write_csv(args.output, args.series, args.length, **options)
+    print(f"wrote {args.series} series x {args.length} steps to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -55,6 +55,11 @@ setup(
             'sphinx-rtd-theme>=1.0.0',
         ],
     },
+    entry_points={
+        'console_scripts': [
+            'nostradamus-forecast=nostradamus.jobs:main',
+        ],
+    },
     keywords='forecasting prediction time-series machine-learning data-science',
     include_package_data=True,
     zip_safe=False,
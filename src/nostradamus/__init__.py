@@ -25,16 +25,70 @@ __version__ = '0.1.0'
 __author__ = 'Federico Ronzi'
 __license__ = 'MIT'
 
-# Import main classes for convenient access
-# from .predictor import Predictor
-# from .data import load_data, load_sample_data
-# from .models import ARIMAModel, ProphetModel
+import importlib
+from typing import Any, List
+
+# Public names and the module defining them. Nothing below is imported by
+# ``import nostradamus`` itself: every module (and numpy, pandas or the
+# model backends behind it) is loaded on first attribute access, so
+# reading ``__version__`` or running a short CLI job stays cheap.
+_LAZY = {
+    'Predictor': 'predictor',
+    'ModelRegistry': 'registry',
+    'ForecastResult': 'results',
+    'ARIMAModel': 'models',
+    'ProphetModel': 'models',
+    'load_data': 'data',
+    'load_sample_data': 'data',
+}
+
+# Submodules reachable as attributes, e.g. ``nostradamus.evaluation``.
+_SUBMODULES = (
+    'cache',
+    'data',
+    'evaluation',
+    'hierarchy',
+    'instrumentation',
+    'jobs',
+    'models',
+    'parallel',
+    'persistence',
+    'plotting',
+    'predictor',
+    'registry',
+    'results',
+    'seasonality',
+    'serialization',
+    'server',
+    'simulation',
+)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        value = getattr(importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    # Cache it, so later lookups bypass this function.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
+
 
 __all__ = [
     '__version__',
     '__author__',
     '__license__',
-    # 'Predictor',
-    # 'load_data',
-    # 'load_sample_data',
+    'Predictor',
+    'ARIMAModel',
+    'ProphetModel',
+    'ModelRegistry',
+    'ForecastResult',
+    'load_data',
+    'load_sample_data',
 ]
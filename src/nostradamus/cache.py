@@ -0,0 +1,239 @@
+"""
+Forecast cache
+==============
+
+Services such as the Telegram bot and the REST API ask for the same series
+and horizon over and over. :class:`ForecastCache` stores forecasts keyed by
+a fingerprint of the input data, the model configuration and the horizon,
+so repeated requests skip fitting altogether.
+
+Forecasts are prefix-consistent (the first 30 steps of a 365-step forecast
+are the 30-step forecast), so only the longest horizon is kept per
+data/model pair and shorter requests are served as a prefix of it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .data.panel import to_panel
+
+# Fixed bookkeeping cost charged per entry on top of the array itself.
+ENTRY_OVERHEAD = 256
+
+
+def fingerprint(values: np.ndarray) -> str:
+    """
+    Fast content hash of an array (shape, dtype and bytes).
+
+    BLAKE2b runs at memory bandwidth, so hashing a panel is much cheaper
+    than fitting it.
+    """
+    values = np.ascontiguousarray(values)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{values.dtype.str}{values.shape}'.encode())
+    digest.update(memoryview(values).cast('B'))
+    return digest.hexdigest()
+
+
+def _index_key(index: Any) -> str:
+    """Fingerprint of a panel's time index, empty without one."""
+    if index is None:
+        return ''
+    values = np.asarray(index)
+    if values.dtype.kind in 'mM':
+        values = values.astype('datetime64[ns]' if values.dtype.kind == 'M' else 'timedelta64[ns]').view(np.int64)
+    elif values.dtype.kind not in 'biuf':
+        values = np.array([str(v) for v in values.tolist()])
+    return fingerprint(values)
+
+
+def model_key(model: Any, params: Optional[Dict[str, Any]] = None) -> str:
+    """Canonical string for a model name or instance and its hyperparameters."""
+    if not isinstance(model, str):
+        params = {**model.get_params(), **(params or {})}
+        model = type(model).__name__
+    return json.dumps([model, params or {}], sort_keys=True, default=repr)
+
+
+class ForecastCache:
+    """
+    Thread-safe LRU cache of forecasts with a memory bound and a TTL.
+
+    Args:
+        max_bytes: Memory budget of the in-memory tier; least recently used
+            entries are evicted beyond it
+        ttl: Seconds after which an entry expires (``None``: never)
+        directory: Optional directory for an on-disk tier. Every entry is
+            also written there, and memory misses fall back to it, so
+            forecasts survive restarts and evictions.
+        clock: Time source, in seconds
+
+    Attributes:
+        hits: Lookups answered from memory or disk
+        misses: Lookups that found nothing usable
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 ** 2,
+        ttl: Optional[float] = None,
+        directory: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = directory
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory currently charged to the in-memory tier."""
+        return self._bytes
+
+    def get(self, data_key: str, model: str, periods: int) -> Optional[np.ndarray]:
+        """
+        Look up a forecast of at least ``periods`` steps.
+
+        Args:
+            data_key: Fingerprint of the input data
+            model: Model key (see :func:`model_key`)
+            periods: Requested horizon
+
+        Returns:
+            Read-only forecast truncated to ``periods`` steps, or ``None``
+        """
+        key = (data_key, model)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1]):
+                self._discard(key)
+                entry = None
+            if entry is None:
+                entry = self._load(key)
+            if entry is None or entry[0].shape[-1] < periods:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0][..., :periods]
+
+    def put(self, data_key: str, model: str, forecast: np.ndarray) -> None:
+        """
+        Store a forecast, unless a longer one is already cached.
+
+        Args:
+            data_key: Fingerprint of the input data
+            model: Model key (see :func:`model_key`)
+            forecast: Array whose last axis is the horizon
+        """
+        key = (data_key, model)
+        forecast = np.array(forecast)
+        forecast.setflags(write=False)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and not self._expired(current[1]):
+                if current[0].shape[-1] >= forecast.shape[-1]:
+                    return
+            created = self.clock()
+            self._discard(key)
+            self._insert(key, forecast, created)
+            if self.directory:
+                self._save(key, forecast, created)
+
+    def forecast(self, data: Any, periods: int, model: Any = 'auto', **params: Any) -> np.ndarray:
+        """
+        Forecast ``data``, fitting a :class:`~nostradamus.Predictor` only on a miss.
+
+        Args:
+            data: Anything accepted by ``Predictor.fit``
+            periods: Forecast horizon
+            model: Model name or instance
+            **params: Model hyperparameters
+
+        Returns:
+            Forecast as returned by ``Predictor.predict``
+        """
+        from .predictor import Predictor
+
+        panel = to_panel(data)
+        # A single series and the same series as a 1-row panel give
+        # differently shaped forecasts, and the time index feeds calendar
+        # features, so both are part of the key.
+        data_key = f'{fingerprint(panel.values)}:{int(panel.squeeze)}:{_index_key(panel.index)}'
+        key = model_key(model, params)
+        cached = self.get(data_key, key, periods)
+        if cached is not None:
+            return cached
+
+        result = np.asarray(Predictor(model=model, **params).fit(panel).predict(periods))
+        self.put(data_key, key, result)
+        # Read-only like a cached forecast.
+        result = result.view()
+        result.setflags(write=False)
+        return result
+
+    def clear(self) -> None:
+        """Drop every in-memory entry (the disk tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and self.clock() - created > self.ttl
+
+    def _insert(self, key: Tuple[str, str], forecast: np.ndarray, created: float) -> None:
+        self._entries[key] = (forecast, created)
+        self._bytes += forecast.nbytes + ENTRY_OVERHEAD
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[0].nbytes + ENTRY_OVERHEAD
+
+    def _path(self, key: Tuple[str, str]) -> str:
+        name = hashlib.blake2b('\0'.join(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f'{name}.npy')
+
+    def _save(self, key: Tuple[str, str], forecast: np.ndarray, created: float) -> None:
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, forecast)
+        # The file's mtime records the creation time used for the TTL.
+        os.utime(tmp, (created, created))
+        os.replace(tmp, path)
+
+    def _load(self, key: Tuple[str, str]) -> Optional[Tuple[np.ndarray, float]]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            created = os.path.getmtime(path)
+            if self._expired(created):
+                os.remove(path)
+                return None
+            forecast = np.load(path)
+        except (OSError, ValueError):
+            return None
+        forecast.setflags(write=False)
+        self._insert(key, forecast, created)
+        return forecast, created
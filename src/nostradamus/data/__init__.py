@@ -0,0 +1,25 @@
+"""
+Data loading and preprocessing utilities for Nostradamus.
+"""
+
+from .loaders import load_data, load_sample_data, open_store
+from .panel import Panel, to_panel
+from .preprocessing import Clip, Deseasonalize, Difference, Impute, Pipeline, Resample, Scale
+from .store import ColumnarStore, StoreWriter
+
+__all__ = [
+    'Panel',
+    'to_panel',
+    'ColumnarStore',
+    'StoreWriter',
+    'Pipeline',
+    'Resample',
+    'Impute',
+    'Clip',
+    'Scale',
+    'Deseasonalize',
+    'Difference',
+    'open_store',
+    'load_data',
+    'load_sample_data',
+]
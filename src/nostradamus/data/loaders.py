@@ -0,0 +1,130 @@
+"""
+Data loaders
+============
+
+``load_data`` reads long-format histories. Raw CSV files are converted once
+into a :class:`~nostradamus.data.store.ColumnarStore` following the
+``data/raw`` -> ``data/processed`` layout; later calls memory-map the store
+and read only the requested series and dates.
+"""
+
+import os
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from .. import instrumentation
+from .store import META_FILE, ColumnarStore
+
+
+def default_store_path(csv_path: str) -> str:
+    """
+    Where the columnar store of a raw CSV lives.
+
+    ``<root>/raw/<name>.csv`` maps to ``<root>/processed/<name>``; any other
+    CSV gets a ``<name>.store`` directory next to it.
+    """
+    csv_path = os.path.abspath(csv_path)
+    folder, filename = os.path.split(csv_path)
+    stem = filename.split('.')[0]
+    if os.path.basename(folder) == 'raw':
+        return os.path.join(os.path.dirname(folder), 'processed', stem)
+    return os.path.join(folder, f'{stem}.store')
+
+
+def open_store(path: str, store_path: Optional[str] = None, **convert_kwargs: Any) -> ColumnarStore:
+    """
+    Open the columnar store for ``path``, converting a CSV if needed.
+
+    The store is rebuilt when the CSV is newer than the one it was built
+    from.
+
+    Args:
+        path: Store directory or raw CSV file
+        store_path: Store location for a CSV (see :func:`default_store_path`)
+        **convert_kwargs: Options for :meth:`ColumnarStore.from_csv`
+
+    Returns:
+        The opened store
+    """
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE)):
+        return ColumnarStore(path)
+
+    store_path = store_path or default_store_path(path)
+    if os.path.exists(os.path.join(store_path, META_FILE)):
+        store = ColumnarStore(store_path)
+        if store.meta.get('source_mtime', 0) >= os.path.getmtime(path):
+            return store
+    return ColumnarStore.from_csv(path, store_path, **convert_kwargs)
+
+
+@instrumentation.instrumented('data.load')
+def load_data(
+    path: str,
+    series: Optional[Sequence[Any]] = None,
+    start: Optional[Any] = None,
+    end: Optional[Any] = None,
+    columns: Optional[Sequence[str]] = None,
+    store_path: Optional[str] = None,
+    **convert_kwargs: Any,
+) -> Any:
+    """
+    Load a long-format history as a DataFrame.
+
+    Memory use depends only on the rows selected by ``series``, ``start``
+    and ``end``, not on the size of the dataset.
+
+    Example:
+        >>> frame = load_data('data/raw/sales.csv', series=['sku-1', 'sku-7'],
+        ...                   start='2023-01-01')
+        >>> Predictor().fit(frame)
+
+    Args:
+        path: Raw CSV file or columnar store directory
+        series: Series identifiers to load (all if ``None``)
+        start: First timestamp to include
+        end: Last timestamp to include
+        columns: Value columns to load (all if ``None``)
+        store_path: Store location for a CSV (see :func:`default_store_path`)
+        **convert_kwargs: Options for the one-off CSV conversion, e.g.
+            ``id_col``, ``time_col`` or ``dtype``
+
+    Returns:
+        ``pandas.DataFrame`` with the id, time and value columns
+    """
+    import pandas as pd
+
+    store = open_store(path, store_path=store_path, **convert_kwargs)
+    return pd.DataFrame(store.read(series=series, start=start, end=end, columns=columns))
+
+
+def load_sample_data(n_series: int = 3, periods: int = 730, seed: int = 0) -> Any:
+    """
+    Generate a small daily sample dataset in long format.
+
+    Each series combines a linear trend, weekly and yearly seasonality and
+    Gaussian noise.
+
+    Args:
+        n_series: Number of series
+        periods: Number of days per series
+        seed: Random seed
+
+    Returns:
+        ``pandas.DataFrame`` with ``unique_id``, ``ds`` and ``y`` columns
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(periods)
+    level = rng.uniform(50, 150, size=(n_series, 1))
+    slope = rng.normal(0.05, 0.02, size=(n_series, 1))
+    weekly = rng.uniform(2, 8, size=(n_series, 1)) * np.sin(2 * np.pi * t / 7)
+    yearly = rng.uniform(5, 15, size=(n_series, 1)) * np.sin(2 * np.pi * t / 365.25)
+    y = level + slope * t + weekly + yearly + rng.normal(0, 2, size=(n_series, periods))
+
+    return pd.DataFrame({
+        'unique_id': np.repeat([f'series_{i}' for i in range(n_series)], periods),
+        'ds': np.tile(pd.date_range('2022-01-01', periods=periods, freq='D'), n_series),
+        'y': y.ravel(),
+    })
@@ -0,0 +1,190 @@
+"""
+Panel data utilities
+====================
+
+Every model in Nostradamus works on a *panel*: a dense ``(n_series, n_time)``
+float array where ``NaN`` marks a missing observation. This module converts
+the inputs accepted by :class:`~nostradamus.Predictor` into that layout.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+
+@dataclass
+class Panel:
+    """
+    A collection of aligned time series stored as one 2-D array.
+
+    Attributes:
+        values: Array of shape ``(n_series, n_time)``, ``NaN`` for gaps
+        ids: Array of length ``n_series`` with the series identifiers
+        index: Optional time index (e.g. a ``pandas.DatetimeIndex``) of
+            length ``n_time``
+        squeeze: True if the panel was built from a single series, in which
+            case forecasts are returned as 1-D arrays
+    """
+
+    values: np.ndarray
+    ids: np.ndarray
+    index: Optional[Any] = None
+    squeeze: bool = False
+    _buffer: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+    @property
+    def n_series(self) -> int:
+        """Number of series in the panel."""
+        return self.values.shape[0]
+
+    @property
+    def n_time(self) -> int:
+        """Number of time steps in the panel."""
+        return self.values.shape[1]
+
+    def append(self, new_values: np.ndarray, new_index: Optional[Any] = None) -> None:
+        """
+        Append new time steps to every series.
+
+        Values live in a buffer whose capacity doubles when full, so
+        appending costs amortized O(new values) instead of a copy of the
+        whole panel; ``values`` is a view of the filled part.
+
+        Args:
+            new_values: Array of shape ``(n_series, n_new)``
+            new_index: Timestamps of the new steps; when omitted, a
+                ``DatetimeIndex`` with a known frequency is extended and any
+                other index is dropped
+        """
+        n_series, n_time = self.values.shape
+        n_new = new_values.shape[1]
+        if self._buffer is None or self._buffer.shape[1] < n_time + n_new:
+            buffer = np.empty((n_series, max(2 * (n_time + n_new), 16)))
+            buffer[:, :n_time] = self.values
+            self._buffer = buffer
+        self._buffer[:, n_time:n_time + n_new] = new_values
+        self.values = self._buffer[:, :n_time + n_new]
+        self.index = _extend_index(self.index, new_index, n_new)
+
+
+def _extend_index(index: Optional[Any], new_index: Optional[Any], n_new: int) -> Optional[Any]:
+    if index is None:
+        return None
+    if new_index is not None:
+        return index.append(new_index) if hasattr(index, 'append') else None
+    if _is_pandas(index, 'DatetimeIndex'):
+        import pandas as pd
+        freq = index.freq or (pd.infer_freq(index) if len(index) >= 3 else None)
+        if freq is not None:
+            future = pd.date_range(index[-1], periods=n_new + 1, freq=freq)[1:]
+            return index.append(future)
+    return None
+
+
+def _is_pandas(obj: Any, name: str) -> bool:
+    """Check for a pandas type without importing pandas."""
+    cls = type(obj)
+    return cls.__module__.startswith('pandas') and cls.__name__ == name
+
+
+def to_panel(
+    data: Any,
+    id_col: str = 'unique_id',
+    time_col: str = 'ds',
+    value_col: str = 'y',
+) -> Panel:
+    """
+    Convert supported inputs into a :class:`Panel`.
+
+    Accepted inputs:
+
+    - a 1-D array-like or ``pandas.Series``: a single series
+    - a 2-D array-like: one series per row, time along the columns
+    - a long-format ``DataFrame`` with ``id_col``, ``time_col`` and
+      ``value_col`` columns; series of different lengths are aligned on the
+      union of timestamps and padded with ``NaN``
+    - a ``DataFrame`` with only ``time_col`` and ``value_col``: a single series
+    - any other ``DataFrame``: wide format, one series per column
+
+    Args:
+        data: Input data
+        id_col: Name of the series identifier column in long format
+        time_col: Name of the timestamp column in long format
+        value_col: Name of the target column in long format
+
+    Returns:
+        Panel with a contiguous float64 ``values`` array
+
+    Raises:
+        ValueError: If the input has an unsupported shape
+    """
+    if isinstance(data, Panel):
+        return data
+
+    if _is_pandas(data, 'DataFrame'):
+        columns = set(data.columns)
+        if {id_col, time_col, value_col} <= columns:
+            return _from_long(data, id_col, time_col, value_col)
+        if {time_col, value_col} <= columns:
+            import pandas as pd
+            frame = data.sort_values(time_col)
+            values = frame[value_col].to_numpy(dtype=np.float64)
+            return Panel(
+                values=np.ascontiguousarray(values[None, :]),
+                ids=np.array([value_col], dtype=object),
+                index=pd.Index(frame[time_col]),
+                squeeze=True,
+            )
+        return Panel(
+            values=np.ascontiguousarray(data.to_numpy(dtype=np.float64).T),
+            ids=np.asarray(data.columns, dtype=object),
+            index=data.index,
+        )
+
+    if _is_pandas(data, 'Series'):
+        return Panel(
+            values=np.ascontiguousarray(data.to_numpy(dtype=np.float64)[None, :]),
+            ids=np.array([data.name if data.name is not None else 0], dtype=object),
+            index=data.index,
+            squeeze=True,
+        )
+
+    values = np.asarray(data, dtype=np.float64)
+    if values.ndim == 1:
+        return Panel(
+            values=np.ascontiguousarray(values[None, :]),
+            ids=np.arange(1),
+            squeeze=True,
+        )
+    if values.ndim == 2:
+        return Panel(
+            values=np.ascontiguousarray(values),
+            ids=np.arange(values.shape[0]),
+        )
+    raise ValueError(
+        f"Expected 1-D or 2-D data, got an array with {values.ndim} dimensions"
+    )
+
+
+def _from_long(frame: Any, id_col: str, time_col: str, value_col: str) -> Panel:
+    """
+    Scatter a long-format DataFrame into a dense panel.
+
+    Series and timestamps are factorized once and the values written with a
+    single fancy-indexing assignment, which is much cheaper than a pivot for
+    panels with many series. Duplicate ``(id, time)`` pairs keep the last row.
+    """
+    import pandas as pd
+
+    id_codes, ids = pd.factorize(frame[id_col], sort=True)
+    time_codes, times = pd.factorize(frame[time_col], sort=True)
+
+    values = np.full((len(ids), len(times)), np.nan)
+    values[id_codes, time_codes] = frame[value_col].to_numpy(dtype=np.float64)
+
+    return Panel(
+        values=values,
+        ids=np.asarray(ids, dtype=object),
+        index=pd.Index(times),
+    )
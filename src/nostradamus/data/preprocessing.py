@@ -0,0 +1,616 @@
+"""
+Preprocessing
+=============
+
+Streaming preprocessing pipeline from raw feeds to model-ready panels.
+
+A :class:`Pipeline` chains stages over chunks of whole series:
+
+- :class:`Resample` aggregates irregular observations onto a regular
+  frequency (gaps become ``NaN``);
+- :class:`Impute` fills the gaps inside every series;
+- :class:`Clip` caps outliers at a robust distance from the median;
+- :class:`Scale` standardizes every series;
+- :class:`Deseasonalize` removes the seasonal pattern of every series, at
+  the period detected for it;
+- :class:`Difference` takes (seasonal) differences.
+
+Chunks flow through the stages one at a time, from a generator, so memory
+is bounded by the chunk size whatever the size of the dataset. Every stage
+returns the per-series state it needs to undo itself, which the pipeline
+keeps so that forecasts made on the processed data can be mapped back to
+the original scale with :meth:`Pipeline.inverse_transform`::
+
+    >>> pipeline = Pipeline([Resample('D'), Impute(), Clip(), Scale(), Difference()])
+    >>> store = pipeline.run('data/raw/sales.csv', 'data/processed/sales_daily')
+    >>> predictor = Predictor('ar').fit(load_data(store.path))
+    >>> pipeline.inverse_transform(predictor.predict(30), series=predictor.ids)
+
+:meth:`Pipeline.run` writes the processed series straight into a
+:class:`~nostradamus.data.store.ColumnarStore` under ``processed/``, along
+with the pipeline state; :meth:`Pipeline.load` restores it.
+"""
+
+import json
+import os
+import warnings
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type, Union
+
+import numpy as np
+
+from .. import instrumentation
+from ..models._batch import ffill
+from .panel import Panel, _is_pandas
+from .store import ColumnarStore, StoreWriter
+
+# Sub-directory of a processed store holding the pipeline state.
+PIPELINE_DIR = 'pipeline'
+
+# Series read from the source store per chunk.
+DEFAULT_CHUNK_SERIES = 1000
+
+State = Dict[str, np.ndarray]
+
+
+class Stage:
+    """
+    One step of a :class:`Pipeline`.
+
+    :meth:`transform` processes a chunk and returns the per-series state
+    (arrays with one row per series) that :meth:`inverse_transform` needs to
+    map forecasts back through the stage. Stages that lose information
+    (resampling, imputation, clipping) leave forecasts unchanged.
+    """
+
+    name = 'stage'
+
+    def get_params(self) -> Dict[str, Any]:
+        """Return the stage parameters."""
+        return {}
+
+    def transform(self, panel: Panel) -> Tuple[Panel, State]:
+        """
+        Process one chunk of series.
+
+        Args:
+            panel: Chunk of whole series
+
+        Returns:
+            The processed chunk and the state of its series
+        """
+        raise NotImplementedError
+
+    def inverse_transform(self, values: np.ndarray, state: State) -> np.ndarray:
+        """
+        Map values of the processed series back through the stage.
+
+        Args:
+            values: Array of shape ``(n_series, horizon)`` following the end
+                of the processed series
+            state: State rows of the same series
+
+        Returns:
+            Array of the same shape
+        """
+        return values
+
+    def __repr__(self) -> str:
+        params = ', '.join(f'{k}={v!r}' for k, v in self.get_params().items())
+        return f'{type(self).__name__}({params})'
+
+
+class Resample(Stage):
+    """
+    Aggregate observations onto a regular time grid.
+
+    Timestamps are binned into periods of ``freq`` and the values of every
+    (series, period) pair aggregated with one ``bincount``, so irregular
+    feeds of any density cost a single pass. Periods without observations
+    become ``NaN``. It has to be the first stage, since it is the one reading
+    raw timestamps.
+
+    Args:
+        freq: Pandas period frequency (``'h'``, ``'D'``, ``'W'``, ``'M'``...)
+        how: ``'mean'``, ``'sum'`` or ``'last'``
+    """
+
+    name = 'resample'
+    HOW = ('mean', 'sum', 'last')
+
+    def __init__(self, freq: str = 'D', how: str = 'mean'):
+        if how not in self.HOW:
+            raise ValueError(f"Unknown aggregation '{how}'. Available: {', '.join(self.HOW)}")
+        self.freq = freq
+        self.how = how
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'freq': self.freq, 'how': self.how}
+
+    def resample(self, ids: np.ndarray, times: np.ndarray, values: np.ndarray) -> Panel:
+        """
+        Build a regular panel from long-format arrays.
+
+        Args:
+            ids: Series identifier of every row
+            times: Timestamp of every row
+            values: Observed value of every row (``NaN`` rows are ignored)
+        """
+        import pandas as pd
+
+        codes, uniques = pd.factorize(ids, sort=True)
+        ordinals = pd.DatetimeIndex(times).to_period(self.freq).asi8
+        valid = np.isfinite(values)
+        codes, ordinals, values = codes[valid], ordinals[valid], values[valid]
+
+        first = ordinals.min() if len(ordinals) else 0
+        n_time = int(ordinals.max() - first + 1) if len(ordinals) else 0
+        shape = (len(uniques), n_time)
+        cells = codes * n_time + (ordinals - first)
+        if self.how == 'last':
+            out = np.full(shape, np.nan)
+            # Rows are in time order, so the last write of a cell wins.
+            out.ravel()[cells] = values
+        else:
+            total = np.bincount(cells, weights=values, minlength=shape[0] * n_time)
+            count = np.bincount(cells, minlength=shape[0] * n_time)
+            if self.how == 'mean':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    total = total / count
+            out = np.where(count > 0, total, np.nan).reshape(shape)
+
+        index = pd.PeriodIndex.from_ordinals(np.arange(first, first + n_time), freq=self.freq).to_timestamp()
+        return Panel(out, np.asarray(uniques, dtype=object), index=index)
+
+    def transform(self, panel: Panel) -> Tuple[Panel, State]:
+        if panel.index is None:
+            raise ValueError("Resampling needs a time index")
+        n_series, n_time = panel.values.shape
+        return self.resample(
+            np.repeat(panel.ids, n_time),
+            np.tile(np.asarray(panel.index), n_series),
+            panel.values.ravel(),
+        ), {}
+
+
+class Impute(Stage):
+    """
+    Fill the gaps inside every series.
+
+    Leading and trailing gaps (before a series starts or after it ends)
+    are left alone.
+
+    Args:
+        method: ``'linear'`` interpolation between the neighbouring
+            observations, ``'ffill'`` (last observation carried forward) or
+            ``'zero'``
+        max_gap: Longest gap to fill; longer ones stay ``NaN``
+    """
+
+    name = 'impute'
+    METHODS = ('linear', 'ffill', 'zero')
+
+    def __init__(self, method: str = 'linear', max_gap: Optional[int] = None):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown imputation '{method}'. Available: {', '.join(self.METHODS)}")
+        self.method = method
+        self.max_gap = max_gap
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'method': self.method, 'max_gap': self.max_gap}
+
+    def transform(self, panel: Panel) -> Tuple[Panel, State]:
+        y = panel.values
+        n_series, n_time = y.shape
+        if n_time == 0:
+            return panel, {}
+        t = np.arange(n_time)
+        valid = np.isfinite(y)
+        # Position of the previous and the next observation of every cell.
+        prev = np.maximum.accumulate(np.where(valid, t, -1), axis=1)
+        following = np.minimum.accumulate(np.where(valid, t, n_time)[:, ::-1], axis=1)[:, ::-1]
+        gap = ~valid & (prev >= 0) & (following < n_time)
+        if self.max_gap is not None:
+            gap &= following - prev - 1 <= self.max_gap
+
+        rows = np.arange(n_series)[:, None]
+        if self.method == 'zero':
+            fill = np.zeros_like(y)
+        elif self.method == 'ffill':
+            fill = ffill(y)
+        else:
+            before = y[rows, np.maximum(prev, 0)]
+            after = y[rows, np.minimum(following, n_time - 1)]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                weight = (t - prev) / (following - prev)
+            fill = before + (after - before) * weight
+        return _replace(panel, np.where(gap, fill, y)), {}
+
+
+class Clip(Stage):
+    """
+    Cap outliers of every series.
+
+    Values further than ``threshold`` robust standard deviations (scaled
+    median absolute deviation) from the series median are clipped.
+
+    Args:
+        threshold: Number of robust standard deviations kept
+    """
+
+    name = 'clip'
+
+    def __init__(self, threshold: float = 3.5):
+        self.threshold = threshold
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'threshold': self.threshold}
+
+    def transform(self, panel: Panel) -> Tuple[Panel, State]:
+        y = panel.values
+        with warnings.catch_warnings():
+            # All-NaN series have no median; they stay NaN.
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = np.nanmedian(y, axis=1, keepdims=True)
+            spread = 1.4826 * np.nanmedian(np.abs(y - median), axis=1, keepdims=True)
+        radius = self.threshold * spread
+        lower, upper = median - radius, median + radius
+        return _replace(panel, np.clip(y, lower, upper)), {}
+
+
+class Scale(Stage):
+    """
+    Rescale every series.
+
+    Args:
+        method: ``'standard'`` (zero mean, unit variance) or ``'minmax'``
+            (values between 0 and 1)
+    """
+
+    name = 'scale'
+    METHODS = ('standard', 'minmax')
+
+    def __init__(self, method: str = 'standard'):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown scaling '{method}'. Available: {', '.join(self.METHODS)}")
+        self.method = method
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'method': self.method}
+
+    def transform(self, panel: Panel) -> Tuple[Panel, State]:
+        y = panel.values
+        valid = np.isfinite(y)
+        count = valid.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.method == 'standard':
+                loc = np.where(valid, y, 0.0).sum(axis=1) / count
+                scale = np.sqrt(np.where(valid, (y - loc[:, None]) ** 2, 0.0).sum(axis=1) / count)
+            else:
+                loc = np.where(valid, y, np.inf).min(axis=1)
+                scale = np.where(valid, y, -np.inf).max(axis=1) - loc
+        # Constant series are only shifted.
+        scale = np.where(np.isfinite(scale) & (scale > 0), scale, 1.0)
+        loc = np.where(count > 0, loc, np.nan)
+        return _replace(panel, (y - loc[:, None]) / scale[:, None]), {'loc': loc, 'scale': scale}
+
+    def inverse_transform(self, values: np.ndarray, state: State) -> np.ndarray:
+        return values * state['scale'][:, None] + state['loc'][:, None]
+
+
+class Deseasonalize(Stage):
+    """
+    Remove the additive seasonal pattern of every seasonal series.
+
+    The dominant period of every series is found with
+    :func:`~nostradamus.seasonality.detect_seasonality`, so series of one
+    chunk may have different periods (or none, in which case they are left
+    unchanged). The seasonal indices are averaged over complete cycles.
+
+    Args:
+        max_period: Longest period considered (default: a third of the
+            length of the chunk)
+        threshold: Smallest seasonal strength for a series to be adjusted
+    """
+
+    name = 'deseasonalize'
+
+    def __init__(self, max_period: Optional[int] = None, threshold: float = 0.3):
+        self.max_period = max_period
+        self.threshold = threshold
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'max_period': self.max_period, 'threshold': self.threshold}
+
+    def transform(self, panel: Panel) -> Tuple[Panel, State]:
+        from ..models.smoothing import seasonal_indices
+        from ..seasonality import detect_seasonality
+
+        y = panel.values
+        n_series, n_time = y.shape
+        period = detect_seasonality(y, max_period=self.max_period, threshold=self.threshold).period
+        # Indices of the steps following each series' own last observation,
+        # one period per row.
+        season = np.zeros((n_series, max(int(period.max(initial=0)), 1)))
+        last = n_time - 1 - np.argmax(np.isfinite(y[:, ::-1]), axis=1) if n_time else np.zeros(n_series, int)
+        out = y.copy()
+        t = np.arange(n_time)
+        for m in np.unique(period[period > 0]):
+            rows = np.flatnonzero(period == m)
+            indices = seasonal_indices(y[rows], int(m))
+            out[rows] -= indices[:, t % m]
+            phase = (last[rows, None] + 1 + np.arange(m)) % m
+            season[rows, :m] = np.take_along_axis(indices, phase, axis=1)
+        return _replace(panel, out), {'period': period, 'season': season}
+
+    def inverse_transform(self, values: np.ndarray, state: State) -> np.ndarray:
+        period = np.maximum(np.asarray(state['period']), 1)
+        steps = np.arange(values.shape[1]) % period[:, None]
+        return values + np.take_along_axis(np.asarray(state['season']), steps, axis=1)
+
+
+class Difference(Stage):
+    """
+    Difference every series, ``x_t - x_{t - lag}``.
+
+    The last ``lag`` observations of every series are kept, which is what
+    integrating forecasts of the differences back into levels needs.
+
+    Args:
+        lag: Differencing lag (``1`` for first differences, the season
+            length for seasonal ones)
+    """
+
+    name = 'difference'
+
+    def __init__(self, lag: int = 1):
+        if lag < 1:
+            raise ValueError("lag must be at least 1")
+        self.lag = lag
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'lag': self.lag}
+
+    def transform(self, panel: Panel) -> Tuple[Panel, State]:
+        y = panel.values
+        lag = self.lag
+        out = np.full_like(y, np.nan)
+        out[:, lag:] = y[:, lag:] - y[:, :-lag]
+
+        # The last ``lag`` steps up to each series' own last observation.
+        n_series, n_time = y.shape
+        last = n_time - 1 - np.argmax(np.isfinite(y[:, ::-1]), axis=1) if n_time else np.zeros(n_series, int)
+        steps = last[:, None] - np.arange(lag - 1, -1, -1)
+        padded = np.hstack([np.full((n_series, lag), np.nan), y])
+        tail = padded[np.arange(n_series)[:, None], steps + lag]
+        return _replace(panel, out), {'tail': tail}
+
+    def inverse_transform(self, values: np.ndarray, state: State) -> np.ndarray:
+        lag = self.lag
+        levels = np.hstack([state['tail'], np.empty_like(values)])
+        for h in range(values.shape[1]):
+            levels[:, lag + h] = levels[:, h] + values[:, h]
+        return levels[:, lag:]
+
+
+STAGES: Dict[str, Type[Stage]] = {
+    cls.name: cls for cls in (Resample, Impute, Clip, Scale, Deseasonalize, Difference)
+}
+
+
+class Pipeline:
+    """
+    Chain of preprocessing stages applied chunk by chunk.
+
+    Args:
+        stages: Stages in application order; a :class:`Resample` stage may
+            only come first
+
+    Attributes:
+        ids: Identifiers of the processed series, in processing order
+        states: Per-stage state, one row per series of :attr:`ids`
+    """
+
+    def __init__(self, stages: Sequence[Stage]):
+        self.stages = list(stages)
+        if any(isinstance(stage, Resample) for stage in self.stages[1:]):
+            raise ValueError("Resample must be the first stage")
+        self.ids: Optional[np.ndarray] = None
+        self.states: List[State] = [{} for _ in self.stages]
+        self._positions: Optional[Dict[Any, int]] = None
+
+    def transform(
+        self,
+        chunks: Iterable[Any],
+        id_col: str = 'unique_id',
+        time_col: str = 'ds',
+        value_col: str = 'y',
+    ) -> Iterator[Panel]:
+        """
+        Process chunks of whole series lazily.
+
+        The pipeline state is rebuilt from the processed chunks once the
+        generator is exhausted.
+
+        Args:
+            chunks: Long-format chunks (dicts of arrays or DataFrames with
+                ``id_col``, ``time_col`` and ``value_col``), every series
+                entirely inside one chunk
+            id_col: Series identifier column
+            time_col: Timestamp column
+            value_col: Column to process
+
+        Yields:
+            One processed :class:`~nostradamus.data.Panel` per chunk
+        """
+        ids: List[np.ndarray] = []
+        parts: List[List[State]] = [[] for _ in self.stages]
+        for chunk in chunks:
+            panel = self._ingest(chunk, id_col, time_col, value_col)
+            for k, stage in enumerate(self.stages):
+                with instrumentation.stage('data.preprocess', panel.n_series, step=stage.name):
+                    panel, state = stage.transform(panel)
+                parts[k].append(state)
+            ids.append(np.asarray(panel.ids))
+            yield panel
+        self._finish(ids, parts)
+
+    def _ingest(self, chunk: Any, id_col: str, time_col: str, value_col: str) -> Panel:
+        if _is_pandas(chunk, 'DataFrame'):
+            chunk = {name: chunk[name].to_numpy() for name in (id_col, time_col, value_col)}
+        values = np.asarray(chunk[value_col], dtype=np.float64)
+        if self.stages and isinstance(self.stages[0], Resample):
+            return self.stages[0].resample(chunk[id_col], chunk[time_col], values)
+        import pandas as pd
+
+        from .panel import _from_long
+        return _from_long(pd.DataFrame({'id': chunk[id_col], 't': chunk[time_col], 'y': values}), 'id', 't', 'y')
+
+    def _finish(self, ids: List[np.ndarray], parts: List[List[State]]) -> None:
+        self.ids = np.concatenate(ids) if ids else np.zeros(0, dtype=object)
+        self.states = [
+            {name: _stack_rows([p[name] for p in stage_parts]) for name in stage_parts[0]}
+            if stage_parts else {}
+            for stage_parts in parts
+        ]
+        self._positions = None
+
+    def fit_transform(self, data: Any, **columns: str) -> Panel:
+        """Process a whole long-format dataset held in memory as one chunk."""
+        (panel,) = self.transform([data], **columns)
+        return panel
+
+    def run(
+        self,
+        source: Union[str, ColumnarStore],
+        path: str,
+        chunk_series: int = DEFAULT_CHUNK_SERIES,
+        value_col: Optional[str] = None,
+    ) -> ColumnarStore:
+        """
+        Process a store chunk by chunk into a new store.
+
+        Only one chunk of ``chunk_series`` series is in memory at a time.
+        The processed store keeps the id, time and value column names of
+        the source, and the pipeline state is saved with it.
+
+        Args:
+            source: Raw CSV file or columnar store (see
+                :func:`~nostradamus.data.open_store`)
+            path: Destination store directory, e.g.
+                ``data/processed/<name>`` (replaced if it exists)
+            chunk_series: Series per chunk
+            value_col: Column to process (default: the first value column)
+
+        Returns:
+            The processed store
+        """
+        from .loaders import open_store
+
+        store = source if isinstance(source, ColumnarStore) else open_store(source)
+        value_col = value_col or store.value_cols[0]
+        writer = StoreWriter(path, store.id_col, store.time_col, [value_col])
+        chunks = iter_store_chunks(store, chunk_series, columns=[value_col])
+        for panel in self.transform(chunks, store.id_col, store.time_col, value_col):
+            writer.append_panel(panel, value_col)
+        self._save(path)
+        return writer.close(source=store.path)
+
+    def inverse_transform(self, values: np.ndarray, series: Optional[Sequence[Any]] = None) -> np.ndarray:
+        """
+        Map forecasts of the processed series back to the original scale.
+
+        Stages are undone in reverse order.
+
+        Args:
+            values: Forecasts following the end of the processed series, of
+                shape ``(n_series, horizon)`` (or ``(horizon,)`` for one)
+            series: Identifiers of the rows of ``values`` (default: all
+                processed series, in :attr:`ids` order)
+
+        Returns:
+            Array of the same shape
+
+        Raises:
+            RuntimeError: If the pipeline has not processed any data
+            KeyError: If a series was not processed by the pipeline
+        """
+        if self.ids is None:
+            raise RuntimeError("Pipeline has not processed any data yet")
+        squeeze = np.ndim(values) == 1
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        rows = slice(None) if series is None else self._locate(series)
+        for stage, state in zip(reversed(self.stages), reversed(self.states)):
+            values = stage.inverse_transform(values, {name: array[rows] for name, array in state.items()})
+        return values[0] if squeeze else values
+
+    def _locate(self, series: Sequence[Any]) -> np.ndarray:
+        if self._positions is None:
+            self._positions = {key: i for i, key in enumerate(self.ids)}
+        missing = [key for key in series if key not in self._positions]
+        if missing:
+            raise KeyError(f"Series not processed by the pipeline: {missing[:5]}")
+        return np.array([self._positions[key] for key in series], dtype=np.int64)
+
+    def _save(self, path: str) -> None:
+        folder = os.path.join(path, PIPELINE_DIR)
+        os.makedirs(folder, exist_ok=True)
+        spec = []
+        for k, (stage, state) in enumerate(zip(self.stages, self.states)):
+            for name, array in state.items():
+                np.save(os.path.join(folder, f'{k}_{name}.npy'), array)
+            spec.append({'stage': stage.name, 'params': stage.get_params(), 'state': sorted(state)})
+        np.save(os.path.join(folder, 'ids.npy'), np.asarray(self.ids, dtype=str))
+        with open(os.path.join(folder, 'pipeline.json'), 'w', encoding='utf-8') as f:
+            json.dump({'stages': spec}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'Pipeline':
+        """
+        Restore the pipeline saved with a processed store by :meth:`run`.
+
+        Raises:
+            FileNotFoundError: If ``path`` holds no pipeline
+        """
+        folder = os.path.join(path, PIPELINE_DIR)
+        spec_path = os.path.join(folder, 'pipeline.json')
+        if not os.path.exists(spec_path):
+            raise FileNotFoundError(f"No preprocessing pipeline found at '{path}'")
+        with open(spec_path, encoding='utf-8') as f:
+            spec = json.load(f)['stages']
+        pipeline = cls([STAGES[entry['stage']](**entry['params']) for entry in spec])
+        pipeline.states = [
+            {name: np.load(os.path.join(folder, f'{k}_{name}.npy'), mmap_mode='r') for name in entry['state']}
+            for k, entry in enumerate(spec)
+        ]
+        pipeline.ids = np.load(os.path.join(folder, 'ids.npy'))
+        return pipeline
+
+    def __repr__(self) -> str:
+        return f'Pipeline({self.stages!r})'
+
+
+def iter_store_chunks(
+    store: ColumnarStore,
+    chunk_series: int = DEFAULT_CHUNK_SERIES,
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Read a store ``chunk_series`` whole series at a time.
+
+    Yields:
+        Long-format chunks as returned by :meth:`ColumnarStore.read`
+    """
+    for start in range(0, store.n_series, chunk_series):
+        yield store.read(series=store.ids[start:start + chunk_series], columns=columns)
+
+
+def _stack_rows(parts: List[np.ndarray]) -> np.ndarray:
+    """Concatenate per-chunk states, zero-padding 2-D ones to the widest chunk."""
+    if parts[0].ndim == 2:
+        width = max(part.shape[1] for part in parts)
+        parts = [np.pad(part, ((0, 0), (0, width - part.shape[1]))) for part in parts]
+    return np.concatenate(parts)
+
+
+def _replace(panel: Panel, values: np.ndarray) -> Panel:
+    return Panel(values, panel.ids, index=panel.index, squeeze=panel.squeeze)
@@ -0,0 +1,440 @@
+"""
+Columnar store
+==============
+
+On-disk layout used for large histories. A raw long-format CSV is converted
+once into a directory holding one ``.npy`` file per column, with the rows
+grouped by series and sorted by time inside each series::
+
+    store/
+        meta.json       # columns, dtypes, row/series counts, source file
+        ids.npy         # series identifiers, in storage order
+        ids_sorted.npy  # the same identifiers sorted, for binary search
+        id_order.npy    # storage position of each entry of ids_sorted.npy
+        offsets.npy     # row offsets: series i spans offsets[i]:offsets[i+1]
+        ds.npy          # datetime64[ns] timestamps
+        y.npy           # one file per value column
+
+Every column is opened with ``mmap_mode='r'``, so reading a few series or a
+date range only pages in the rows that are actually requested.
+"""
+
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .. import instrumentation
+
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+
+# Size of the raw CSV handled by one partition during conversion.
+BUCKET_BYTES = 256 * 1024 ** 2
+
+
+class ColumnarStore:
+    """
+    Read access to a columnar store directory.
+
+    Args:
+        path: Store directory created by :meth:`from_csv`
+
+    Raises:
+        FileNotFoundError: If ``path`` is not a store
+    """
+
+    def __init__(self, path: str):
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No columnar store found at '{path}'")
+        with open(meta_path, encoding='utf-8') as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self.path = path
+        self.id_col: str = self.meta['id_col']
+        self.time_col: str = self.meta['time_col']
+        self.value_cols: List[str] = self.meta['value_cols']
+
+        self.ids = self._open('ids')
+        self.offsets = self._open('offsets')
+        self.columns = {name: self._open(name) for name in [self.time_col] + self.value_cols}
+        self._ids_sorted = self._open('ids_sorted')
+        self._id_order = self._open('id_order')
+
+    def _open(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+
+    @property
+    def n_series(self) -> int:
+        """Number of series in the store."""
+        return len(self.ids)
+
+    @property
+    def n_rows(self) -> int:
+        """Total number of observations in the store."""
+        return int(self.offsets[-1])
+
+    def locate(self, series: Sequence[Any]) -> np.ndarray:
+        """
+        Return the storage positions of the given series identifiers.
+
+        Raises:
+            KeyError: If an identifier is not in the store
+        """
+        keys = np.asarray([str(s) for s in series])
+        found = np.searchsorted(self._ids_sorted, keys)
+        found = np.minimum(found, len(self._ids_sorted) - 1)
+        missing = np.asarray(self._ids_sorted[found]) != keys
+        if missing.any():
+            raise KeyError(f"Series not in store: {list(keys[missing][:5])}")
+        return np.asarray(self._id_order[found])
+
+    def read(
+        self,
+        series: Optional[Sequence[Any]] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        columns: Optional[Sequence[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Read a subset of the store into memory.
+
+        Only the pages holding the selected rows are read from disk: each
+        series is a contiguous row range and timestamps are sorted within
+        it, so date bounds are found by binary search on the mapped column.
+
+        Args:
+            series: Identifiers to read (all series if ``None``)
+            start: First timestamp to include
+            end: Last timestamp to include
+            columns: Value columns to read (all if ``None``)
+            offset: Selected rows to skip, for reading a page at a time
+            limit: Largest number of rows to read (all if ``None``)
+
+        Returns:
+            Dict of 1-D arrays keyed by ``id_col``, ``time_col`` and the
+            value column names, in long format
+        """
+        columns = list(self.value_cols if columns is None else columns)
+        positions = np.arange(self.n_series) if series is None else self.locate(series)
+        with instrumentation.stage('data.read', len(positions)):
+            lo, hi = self._bounds(positions, start, end)
+            if offset or limit is not None:
+                # Clip every series' range to the requested window of the
+                # concatenated selection.
+                before = np.concatenate([[0], np.cumsum(hi - lo)[:-1]]).astype(np.int64)
+                stop = np.iinfo(np.int64).max if limit is None else offset + limit
+                first = np.clip(offset - before, 0, hi - lo)
+                last = np.clip(stop - before, 0, hi - lo)
+                lo, hi = lo + first, lo + last
+            return self._read(positions, lo, hi, columns)
+
+    def count(
+        self,
+        series: Optional[Sequence[Any]] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+    ) -> int:
+        """Number of rows :meth:`read` would return, without reading them."""
+        if series is None and start is None and end is None:
+            return self.n_rows
+        positions = np.arange(self.n_series) if series is None else self.locate(series)
+        lo, hi = self._bounds(positions, start, end)
+        return int((hi - lo).sum())
+
+    def _bounds(self, positions: np.ndarray, start: Optional[Any], end: Optional[Any]) -> Any:
+        """First and past-the-last row of every selected series."""
+        ds = self.columns[self.time_col]
+
+        lo = np.asarray(self.offsets[positions]).astype(np.int64)
+        hi = np.asarray(self.offsets[positions + 1]).astype(np.int64)
+        if start is not None or end is not None:
+            start = None if start is None else np.datetime64(start, 'ns')
+            end = None if end is None else np.datetime64(end, 'ns')
+            for k in range(len(positions)):
+                block = ds[lo[k]:hi[k]]
+                first = lo[k] + (0 if start is None else np.searchsorted(block, start, 'left'))
+                last = lo[k] + (len(block) if end is None else np.searchsorted(block, end, 'right'))
+                lo[k], hi[k] = first, last
+        return lo, hi
+
+    def _read(self, positions: np.ndarray, lo: np.ndarray, hi: np.ndarray, columns: List[str]) -> Dict[str, np.ndarray]:
+        counts = hi - lo
+        if len(positions) and (lo[1:] == hi[:-1]).all():
+            # One contiguous run: the whole store, or a page of it.
+            rows = slice(int(lo[0]), int(hi[-1]))
+        else:
+            rows = _ranges(lo, counts)
+
+        out = {self.id_col: np.repeat(np.asarray(self.ids[positions]), counts)}
+        for name in [self.time_col] + columns:
+            out[name] = np.asarray(self.columns[name][rows])
+        return out
+
+    @classmethod
+    @instrumentation.instrumented('data.convert')
+    def from_csv(
+        cls,
+        csv_path: str,
+        path: str,
+        id_col: str = 'unique_id',
+        time_col: str = 'ds',
+        value_cols: Optional[Sequence[str]] = None,
+        dtype: Any = np.float64,
+        chunksize: int = 1_000_000,
+        n_buckets: Optional[int] = None,
+        **read_csv_kwargs: Any,
+    ) -> 'ColumnarStore':
+        """
+        Convert a long-format CSV into a columnar store.
+
+        The CSV is streamed in chunks and rows are partitioned by series
+        into ``n_buckets`` temporary files; each bucket is then sorted on its
+        own and appended to the output columns. Peak memory is bounded by
+        the chunk size and the bucket size, not by the size of the CSV.
+
+        Args:
+            csv_path: Source CSV file
+            path: Destination directory (replaced if it exists)
+            id_col: Series identifier column
+            time_col: Timestamp column
+            value_cols: Value columns to keep (all other columns if ``None``)
+            dtype: Storage dtype of the value columns
+            chunksize: Rows read from the CSV at a time
+            n_buckets: Number of partitions (derived from the file size if
+                ``None``)
+            **read_csv_kwargs: Extra arguments for ``pandas.read_csv``
+
+        Returns:
+            The new store
+        """
+        import pandas as pd
+
+        if n_buckets is None:
+            n_buckets = max(1, -(-os.path.getsize(csv_path) // BUCKET_BYTES))
+        dtype = np.dtype(dtype)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        tmp = os.path.join(path, '.partitions')
+        os.makedirs(tmp)
+
+        # Pass 1: stream the CSV and spill rows into per-bucket files.
+        codes: Dict[Any, int] = {}
+        n_rows = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, **read_csv_kwargs):
+            if value_cols is None:
+                value_cols = [c for c in chunk.columns if c not in (id_col, time_col)]
+            inverse, uniques = pd.factorize(chunk[id_col].astype(str))
+            lookup = np.array([codes.setdefault(u, len(codes)) for u in uniques], dtype=np.int64)
+            row_codes = lookup[inverse]
+            bucket = row_codes % n_buckets
+            parts = {
+                'code': row_codes,
+                time_col: pd.to_datetime(chunk[time_col]).to_numpy('datetime64[ns]').view(np.int64),
+            }
+            for name in value_cols:
+                parts[name] = chunk[name].to_numpy(dtype=dtype)
+            for b in np.unique(bucket):
+                mask = bucket == b
+                for name, values in parts.items():
+                    with open(os.path.join(tmp, f'{b}_{name}.bin'), 'ab') as f:
+                        values[mask].tofile(f)
+            n_rows += len(chunk)
+
+        value_cols = list(value_cols or [])
+        dtypes = {'code': np.int64, time_col: np.int64, **{c: dtype for c in value_cols}}
+        out = {
+            time_col: np.lib.format.open_memmap(
+                os.path.join(path, f'{time_col}.npy'), mode='w+',
+                dtype='datetime64[ns]', shape=(n_rows,),
+            ),
+        }
+        for name in value_cols:
+            out[name] = np.lib.format.open_memmap(
+                os.path.join(path, f'{name}.npy'), mode='w+', dtype=dtype, shape=(n_rows,)
+            )
+
+        # Pass 2: sort each bucket by (series, time) and append it.
+        series_codes: List[np.ndarray] = []
+        counts: List[np.ndarray] = []
+        row = 0
+        for b in range(n_buckets):
+            code_file = os.path.join(tmp, f'{b}_code.bin')
+            if not os.path.exists(code_file):
+                continue
+            part = {
+                name: np.fromfile(os.path.join(tmp, f'{b}_{name}.bin'), dtype=dt)
+                for name, dt in dtypes.items()
+            }
+            order = np.lexsort((part[time_col], part['code']))
+            size = len(order)
+            out[time_col][row:row + size] = part[time_col][order].view('datetime64[ns]')
+            for name in value_cols:
+                out[name][row:row + size] = part[name][order]
+            unique, count = np.unique(part['code'], return_counts=True)
+            series_codes.append(unique)
+            counts.append(count)
+            row += size
+        shutil.rmtree(tmp)
+        for column in out.values():
+            column.flush()
+        del out
+
+        names = np.array(list(codes), dtype=str)
+        order = np.concatenate(series_codes) if series_codes else np.zeros(0, np.int64)
+        ids = names[order] if len(order) else np.zeros(0, dtype='<U1')
+        _write_index(path, ids, np.concatenate(counts) if counts else np.zeros(0, np.int64))
+        _write_meta(path, {
+            'id_col': id_col,
+            'time_col': time_col,
+            'value_cols': value_cols,
+            'n_rows': n_rows,
+            'n_series': len(ids),
+            'source': os.path.abspath(csv_path),
+            'source_mtime': os.path.getmtime(csv_path),
+        })
+        return cls(path)
+
+
+class StoreWriter:
+    """
+    Build a columnar store by appending blocks of whole series.
+
+    Rows are spilled to temporary files as blocks arrive and copied into the
+    final ``.npy`` columns by :meth:`close`, a slice at a time, so the
+    memory used is bounded by the largest block.
+
+    Args:
+        path: Destination directory (replaced if it exists)
+        id_col: Series identifier column
+        time_col: Timestamp column
+        value_cols: Value columns
+        dtype: Storage dtype of the value columns
+    """
+
+    # Rows copied at a time from the spill files into the columns.
+    COPY_ROWS = 1 << 22
+
+    def __init__(
+        self,
+        path: str,
+        id_col: str = 'unique_id',
+        time_col: str = 'ds',
+        value_cols: Sequence[str] = ('y',),
+        dtype: Any = np.float64,
+    ):
+        self.path = path
+        self.id_col = id_col
+        self.time_col = time_col
+        self.value_cols = list(value_cols)
+        self.dtypes = {time_col: np.dtype('datetime64[ns]'), **{c: np.dtype(dtype) for c in self.value_cols}}
+        self.n_rows = 0
+        self._ids: List[np.ndarray] = []
+        self._counts: List[np.ndarray] = []
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        self._tmp = os.path.join(path, '.partitions')
+        os.makedirs(self._tmp)
+
+    def append(self, ids: Sequence[Any], counts: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+        """
+        Append whole series in long format.
+
+        Args:
+            ids: Identifiers of the series in the block
+            counts: Number of rows of each series
+            columns: Time and value columns, rows grouped by series in the
+                order of ``ids`` and sorted by time within each series
+        """
+        for name, dtype in self.dtypes.items():
+            with open(os.path.join(self._tmp, f'{name}.bin'), 'ab') as f:
+                np.asarray(columns[name], dtype=dtype).tofile(f)
+        self._ids.append(np.asarray(ids).astype(str))
+        self._counts.append(np.asarray(counts, dtype=np.int64))
+        self.n_rows += int(np.sum(counts))
+
+    def append_panel(self, panel: Any, value_col: Optional[str] = None) -> None:
+        """
+        Append the series of a :class:`~nostradamus.data.Panel`.
+
+        Each series is stored from its first to its last observation; the
+        gaps in between are kept as ``NaN`` rows.
+        """
+        values = panel.values
+        valid = np.isfinite(values)
+        started = np.maximum.accumulate(valid, axis=1)
+        ongoing = np.maximum.accumulate(valid[:, ::-1], axis=1)[:, ::-1]
+        span = started & ongoing
+        times = np.broadcast_to(np.asarray(panel.index, dtype='datetime64[ns]'), values.shape)
+        self.append(panel.ids, span.sum(axis=1), {
+            self.time_col: times[span],
+            value_col or self.value_cols[0]: values[span],
+        })
+
+    def close(self, **meta: Any) -> ColumnarStore:
+        """
+        Write the columns and the series index, and open the store.
+
+        Args:
+            **meta: Extra entries for the store's ``meta.json``
+        """
+        for name, dtype in self.dtypes.items():
+            column = np.lib.format.open_memmap(
+                os.path.join(self.path, f'{name}.npy'), mode='w+', dtype=dtype, shape=(self.n_rows,)
+            )
+            spill = os.path.join(self._tmp, f'{name}.bin')
+            if self.n_rows:
+                source = np.memmap(spill, dtype=dtype, mode='r')
+                for start in range(0, self.n_rows, self.COPY_ROWS):
+                    column[start:start + self.COPY_ROWS] = source[start:start + self.COPY_ROWS]
+                del source
+            column.flush()
+            del column
+        shutil.rmtree(self._tmp)
+
+        ids = np.concatenate(self._ids) if self._ids else np.zeros(0, dtype='<U1')
+        _write_index(self.path, ids, np.concatenate(self._counts) if self._counts else np.zeros(0, np.int64))
+        _write_meta(self.path, {
+            'id_col': self.id_col,
+            'time_col': self.time_col,
+            'value_cols': self.value_cols,
+            'n_rows': self.n_rows,
+            'n_series': len(ids),
+            **meta,
+        })
+        return ColumnarStore(self.path)
+
+
+def _write_index(path: str, ids: np.ndarray, counts: np.ndarray) -> None:
+    """Save the series identifiers, their sorted lookup and the row offsets."""
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    np.save(os.path.join(path, 'ids.npy'), ids)
+    id_order = np.argsort(ids, kind='stable')
+    np.save(os.path.join(path, 'ids_sorted.npy'), ids[id_order])
+    np.save(os.path.join(path, 'id_order.npy'), id_order)
+    np.save(os.path.join(path, 'offsets.npy'), offsets)
+
+
+def _write_meta(path: str, meta: Dict[str, Any]) -> None:
+    with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'format_version': FORMAT_VERSION, **meta}, f, indent=2)
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenate ``arange(s, s + c)`` for every pair without a Python loop."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    ends = np.cumsum(counts)
+    steps = np.ones(total, dtype=np.int64)
+    nonempty = counts > 0
+    first = (ends - counts)[nonempty]
+    previous_last = np.concatenate([[0], (starts + counts - 1)[nonempty][:-1]])
+    steps[first] = starts[nonempty] - previous_last
+    return np.cumsum(steps)
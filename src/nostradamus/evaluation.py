@@ -0,0 +1,304 @@
+"""
+Evaluation
+==========
+
+Rolling-origin cross-validation and forecast accuracy metrics for whole
+panels of series.
+
+:func:`cross_validate` forecasts ``horizon`` steps from several origins
+and returns a :class:`CrossValidation` holding ``(n_folds, n_series,
+horizon)`` tensors of forecasts and actual values. Every metric is a NumPy
+reduction over that tensor, so scoring never loops over series or folds::
+
+    >>> cv = cross_validate(panel, model='ar', horizon=14, n_folds=5)
+    >>> cv.evaluate(['mae', 'mase'])             # per series
+    >>> cv.evaluate('smape', axis=(0, 1))        # per horizon step
+
+Models that support :meth:`~nostradamus.models.BaseModel.update` are fitted
+once at the first origin and then updated with the observations up to each
+following origin, so every additional fold only costs its new data. The
+others are fitted once on a stacked panel holding the training window of
+every fold.
+
+Missing actual values are ignored by every metric; a reduction with nothing
+to score gives ``NaN``.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import instrumentation
+from .data.panel import to_panel
+from .models import BaseModel, LocalModel, get_model
+from .models.auto import backtest_forecasts
+
+Axis = Optional[Union[int, Tuple[int, ...]]]
+
+
+def _nanmean(values: np.ndarray, axis: Axis = None) -> np.ndarray:
+    """Mean over finite entries, ``NaN`` (without a warning) where there are none."""
+    valid = np.isfinite(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def mae(actual: np.ndarray, forecast: np.ndarray, axis: Axis = None) -> np.ndarray:
+    """Mean absolute error."""
+    return _nanmean(np.abs(forecast - actual), axis)
+
+
+def rmse(actual: np.ndarray, forecast: np.ndarray, axis: Axis = None) -> np.ndarray:
+    """Root mean squared error."""
+    return np.sqrt(_nanmean((forecast - actual) ** 2, axis))
+
+
+def mape(actual: np.ndarray, forecast: np.ndarray, axis: Axis = None) -> np.ndarray:
+    """Mean absolute percentage error, in percent; zero actuals are skipped."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.abs((forecast - actual) / actual)
+    return 100 * _nanmean(ratio, axis)
+
+
+def smape(actual: np.ndarray, forecast: np.ndarray, axis: Axis = None) -> np.ndarray:
+    """Symmetric MAPE, in percent (0 to 200); steps where both are zero are skipped."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = 2 * np.abs(forecast - actual) / (np.abs(actual) + np.abs(forecast))
+    return 100 * _nanmean(ratio, axis)
+
+
+def mase(actual: np.ndarray, forecast: np.ndarray, scale: np.ndarray, axis: Axis = None) -> np.ndarray:
+    """
+    Mean absolute scaled error.
+
+    Args:
+        actual: Actual values
+        forecast: Forecasts
+        scale: In-sample MAE of the (seasonal) naive forecast, broadcastable
+            to ``actual`` (see :func:`naive_scale`)
+        axis: Axes to average over
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scaled = np.abs(forecast - actual) / np.where(scale > 0, scale, np.nan)
+    return _nanmean(scaled, axis)
+
+
+METRICS: Dict[str, Callable[..., np.ndarray]] = {
+    'mae': mae,
+    'rmse': rmse,
+    'mape': mape,
+    'smape': smape,
+    'mase': mase,
+}
+
+
+def naive_scale(y: np.ndarray, ends: Sequence[int], season: int = 1) -> np.ndarray:
+    """
+    In-sample MAE of the seasonal naive forecast on every training window.
+
+    Cumulative sums of the absolute seasonal differences give the scale of
+    all windows at once.
+
+    Args:
+        y: Panel of shape ``(n_series, n_time)``
+        ends: Training length of each fold
+        season: Seasonal period ``m`` of the naive forecast ``y[t - m]``
+
+    Returns:
+        Array of shape ``(n_folds, n_series)``, ``NaN`` where a window holds
+        no pair of observations ``season`` steps apart
+    """
+    diffs = np.abs(y[:, season:] - y[:, :-season])
+    valid = np.isfinite(diffs)
+    zero = np.zeros((y.shape[0], 1))
+    total = np.hstack([zero, np.cumsum(np.where(valid, diffs, 0.0), axis=1)])
+    count = np.hstack([zero, np.cumsum(valid, axis=1)])
+    last = np.clip(np.asarray(ends) - season, 0, diffs.shape[1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = total[:, last] / count[:, last]
+    return scale.T
+
+
+@dataclass
+class CrossValidation:
+    """
+    Forecasts and actual values of a rolling-origin cross-validation.
+
+    Attributes:
+        forecasts: Array of shape ``(n_folds, n_series, horizon)``
+        actuals: Array of the same shape, ``NaN`` for gaps
+        origins: Training length of each fold (the forecast origins)
+        ids: Series identifiers
+        scale: MASE scale of each fold and series, shape
+            ``(n_folds, n_series)``
+    """
+
+    forecasts: np.ndarray
+    actuals: np.ndarray
+    origins: np.ndarray
+    ids: np.ndarray
+    scale: np.ndarray
+
+    @property
+    def errors(self) -> np.ndarray:
+        """Forecast errors ``forecast - actual``, shape ``(n_folds, n_series, horizon)``."""
+        return self.forecasts - self.actuals
+
+    def evaluate(
+        self, metrics: Union[str, Sequence[str], None] = None, axis: Axis = (0, 2)
+    ) -> Union[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Compute accuracy metrics over the error tensor.
+
+        Args:
+            metrics: Metric name or names among ``'mae'``, ``'rmse'``,
+                ``'mape'``, ``'smape'`` and ``'mase'`` (default: all)
+            axis: Axes of ``(fold, series, horizon)`` to average over. The
+                default gives one value per series; ``(0, 1)`` gives one per
+                horizon step and ``None`` a single number.
+
+        Returns:
+            The metric values for a single name, otherwise a dict of them
+
+        Raises:
+            ValueError: If a metric name is unknown
+        """
+        names = [metrics] if isinstance(metrics, str) else list(metrics or METRICS)
+        unknown = [name for name in names if name not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metrics {unknown}. Available metrics: {', '.join(METRICS)}")
+
+        results = {}
+        for name in names:
+            if name == 'mase':
+                results[name] = mase(self.actuals, self.forecasts, self.scale[:, :, None], axis)
+            else:
+                results[name] = METRICS[name](self.actuals, self.forecasts, axis)
+        return results[names[0]] if isinstance(metrics, str) else results
+
+    def summary(self) -> Dict[str, float]:
+        """Every metric averaged over folds, series and horizon."""
+        return {name: float(value) for name, value in self.evaluate(axis=None).items()}
+
+
+def fold_origins(n_time: int, horizon: int, n_folds: int, step: Optional[int] = None) -> np.ndarray:
+    """
+    Training lengths of ``n_folds`` rolling origins, oldest first.
+
+    The last fold ends exactly at the end of the data; earlier origins are
+    ``step`` (default: ``horizon``) periods apart.
+
+    Raises:
+        ValueError: If the data is too short for the requested folds
+    """
+    step = horizon if step is None else step
+    if horizon <= 0 or n_folds <= 0 or step <= 0:
+        raise ValueError("horizon, n_folds and step must be positive")
+    origins = n_time - horizon - step * np.arange(n_folds - 1, -1, -1)
+    if origins[0] < 2:
+        raise ValueError(
+            f"{n_time} time steps are too few for {n_folds} folds of horizon {horizon} "
+            f"spaced {step} apart"
+        )
+    return origins
+
+
+def cross_validate(
+    data: Any,
+    model: Any = 'auto',
+    horizon: int = 7,
+    n_folds: int = 3,
+    step: Optional[int] = None,
+    reuse_state: bool = True,
+    season: int = 1,
+    n_jobs: Optional[int] = 1,
+    id_col: str = 'unique_id',
+    time_col: str = 'ds',
+    value_col: str = 'y',
+    **params: Any,
+) -> CrossValidation:
+    """
+    Rolling-origin cross-validation of a model on every series of ``data``.
+
+    Args:
+        data: Anything accepted by :meth:`Predictor.fit <nostradamus.Predictor.fit>`
+        model: Model name or :class:`~nostradamus.models.BaseModel` instance
+        horizon: Periods forecast from every origin
+        n_folds: Number of origins
+        step: Periods between consecutive origins (default: ``horizon``)
+        reuse_state: Fit once and update the fitted state between folds
+            when the model supports it; otherwise (or when ``False``) every
+            fold is fitted from scratch, all in one stacked fit
+        season: Seasonal period of the naive forecast scaling MASE
+        n_jobs: Worker processes for models fitted series by series
+        id_col: Series identifier column for long-format DataFrames
+        time_col: Timestamp column for long-format DataFrames
+        value_col: Target column for long-format DataFrames
+        **params: Hyperparameters forwarded to the model
+
+    Returns:
+        The cross-validation forecasts and actual values
+
+    Raises:
+        ValueError: If the data is too short for the requested folds
+    """
+    panel = to_panel(data, id_col=id_col, time_col=time_col, value_col=value_col)
+    y = panel.values
+    origins = fold_origins(panel.n_time, horizon, n_folds, step)
+
+    forecasts = None
+    estimator = _build(model, params, n_jobs)
+    with instrumentation.stage('evaluation.cross_validate', panel.n_series, model=estimator.name):
+        if reuse_state and _supports_update(estimator):
+            if panel.index is not None:
+                estimator.index = panel.index[:origins[0]]
+            forecasts = _updated_forecasts(estimator, y, origins, horizon)
+        if forecasts is None:
+            # Stacked windows are left-padded, so they share no time index.
+            estimator.index = None
+            forecasts, _ = backtest_forecasts(estimator, y, origins, horizon)
+
+    actuals = y[:, origins[:, None] + np.arange(horizon)].transpose(1, 0, 2)
+    return CrossValidation(
+        forecasts=forecasts,
+        actuals=actuals,
+        origins=origins,
+        ids=panel.ids,
+        scale=naive_scale(y, origins, season),
+    )
+
+
+def _build(model: Any, params: Dict[str, Any], n_jobs: Optional[int]) -> BaseModel:
+    model = get_model(model, **params)
+    model.n_jobs = n_jobs
+    return model
+
+
+def _supports_update(model: BaseModel) -> bool:
+    """Whether ``model`` overrides the incremental update hooks."""
+    cls = type(model)
+    if isinstance(model, LocalModel):
+        return cls.update_series is not LocalModel.update_series
+    return cls.update is not BaseModel.update
+
+
+def _updated_forecasts(
+    model: BaseModel, y: np.ndarray, origins: np.ndarray, horizon: int
+) -> Optional[np.ndarray]:
+    """
+    Fit at the first origin and update up to each following one.
+
+    Returns ``None`` if the model turns out not to support updates (e.g.
+    ``'auto'`` having selected such a model).
+    """
+    forecasts: List[np.ndarray] = [model.fit(y[:, :origins[0]]).predict(horizon)]
+    for start, end in zip(origins[:-1], origins[1:]):
+        try:
+            model.update(y[:, start:end])
+        except NotImplementedError:
+            return None
+        forecasts.append(model.predict(horizon))
+    return np.stack(forecasts)
@@ -0,0 +1,339 @@
+"""
+Instrumentation
+===============
+
+Per-stage timing of fits, forecasts, data loading and model backends.
+
+Instrumentation is off by default and every hook then costs one global
+lookup. Once enabled, each stage records its wall and CPU time, the
+number of series it handled and, optionally, the memory it allocated::
+
+    >>> from nostradamus import instrumentation
+    >>> recorder = instrumentation.enable(memory=True)
+    >>> Predictor('ar').fit(panel).predict(30)
+    >>> recorder.summary()[0]
+    {'stage': 'predictor.fit', 'labels': {'model': 'ar'}, 'calls': 1, ...}
+    >>> print(recorder.render_prometheus())
+
+Stages nest: every event names its parent stage, so the time of
+``predictor.fit`` can be broken down into ``data.to_panel`` and
+``model.fit``. Events are kept in a bounded buffer (:attr:`Recorder.events`)
+and passed to subscribers as they happen, for structured logs; totals per
+stage are exported in the Prometheus text format, which the REST server
+(``GET /api/metrics``) and the Telegram bot's metrics endpoint expose.
+
+CPU time is the CPU time of the whole process, so stages running
+concurrently in threads each see the others' work. Memory tracking uses
+:mod:`tracemalloc`, which slows allocations down noticeably; it is meant
+for profiling runs rather than production.
+"""
+
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Events kept by a recorder; older ones are dropped first.
+DEFAULT_MAX_EVENTS = 10_000
+
+Event = Dict[str, Any]
+
+# Totals kept per (stage, labels): calls, wall, cpu, series, allocated, peak.
+_CALLS, _WALL, _CPU, _SERIES, _ALLOCATED, _PEAK = range(6)
+
+# Shared no-op context returned by :func:`stage` while disabled.
+_DISABLED = contextlib.nullcontext()
+
+_recorder: Optional['Recorder'] = None
+# Whether :func:`enable` started tracemalloc, and so :func:`disable` stops it.
+_tracing = False
+_current: 'contextvars.ContextVar[Optional[_Stage]]' = contextvars.ContextVar('nostradamus_stage', default=None)
+
+
+class Recorder:
+    """
+    Collects stage events and their running totals.
+
+    Args:
+        memory: Also track memory allocated by every stage
+        max_events: Number of most recent events kept
+    """
+
+    def __init__(self, memory: bool = False, max_events: int = DEFAULT_MAX_EVENTS):
+        self.memory = memory
+        self.events: 'deque[Event]' = deque(maxlen=max_events)
+        self.totals: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+        self._subscribers: List[Callable[[Event], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Event], None]) -> None:
+        """Call ``callback(event)`` for every event recorded from now on."""
+        self._subscribers.append(callback)
+
+    def record(self, event: Event) -> None:
+        """Add one event (see :func:`stage` for its fields)."""
+        key = (event['stage'], tuple(sorted(event['labels'].items())))
+        with self._lock:
+            self.events.append(event)
+            totals = self.totals.get(key)
+            if totals is None:
+                totals = self.totals[key] = [0, 0.0, 0.0, 0, 0, 0]
+            totals[_CALLS] += 1
+            totals[_WALL] += event['wall']
+            totals[_CPU] += event['cpu']
+            totals[_SERIES] += event['series'] or 0
+            if event['allocated'] is not None:
+                totals[_ALLOCATED] += event['allocated']
+                totals[_PEAK] = max(totals[_PEAK], event['peak'])
+        for callback in self._subscribers:
+            callback(event)
+
+    def merge(self, events: List[Event]) -> None:
+        """Record events collected elsewhere, e.g. in a worker process."""
+        for event in events:
+            self.record(event)
+
+    def reset(self) -> None:
+        """Forget every event and total."""
+        with self._lock:
+            self.events.clear()
+            self.totals.clear()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Totals per stage and label set, slowest first.
+
+        Returns:
+            One dict per stage with ``stage``, ``labels``, ``calls``,
+            ``wall``, ``cpu``, ``series`` and, with memory tracking,
+            ``allocated`` and ``peak`` (bytes)
+        """
+        with self._lock:
+            items = [(key, list(totals)) for key, totals in self.totals.items()]
+        rows = []
+        for (name, labels), totals in items:
+            row = {
+                'stage': name,
+                'labels': dict(labels),
+                'calls': totals[_CALLS],
+                'wall': totals[_WALL],
+                'cpu': totals[_CPU],
+                'series': totals[_SERIES],
+            }
+            if self.memory:
+                row['allocated'] = totals[_ALLOCATED]
+                row['peak'] = totals[_PEAK]
+            rows.append(row)
+        return sorted(rows, key=lambda row: row['wall'], reverse=True)
+
+    def render_prometheus(self, prefix: str = 'nostradamus_stage') -> str:
+        """Return the stage totals in the Prometheus text exposition format."""
+        metrics = [
+            ('calls_total', 'counter', 'Times each stage ran.', _CALLS),
+            ('seconds_total', 'counter', 'Wall time spent in each stage.', _WALL),
+            ('cpu_seconds_total', 'counter', 'Process CPU time spent in each stage.', _CPU),
+            ('series_total', 'counter', 'Series handled by each stage.', _SERIES),
+        ]
+        if self.memory:
+            metrics += [
+                ('allocated_bytes_total', 'counter', 'Net memory allocated by each stage.', _ALLOCATED),
+                ('peak_bytes', 'gauge', 'Largest traced memory peak of each stage.', _PEAK),
+            ]
+        with self._lock:
+            items = sorted((key, list(totals)) for key, totals in self.totals.items())
+        lines = []
+        for suffix, kind, help_text, field in metrics:
+            name = f'{prefix}_{suffix}'
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for (stage_name, labels), totals in items:
+                pairs = (('stage', stage_name),) + labels
+                rendered = ','.join(f'{k}="{_escape(v)}"' for k, v in pairs)
+                lines.append(f'{name}{{{rendered}}} {totals[field]!r}')
+        return '\n'.join(lines) + '\n'
+
+
+class _Stage:
+    """Context manager timing one stage for a :class:`Recorder`."""
+
+    __slots__ = ('recorder', 'name', 'series', 'labels', 'parent', 'peak', '_token', '_start', '_wall', '_cpu', '_memory')
+
+    def __init__(self, recorder: Recorder, name: str, series: Optional[int], labels: Dict[str, Any]):
+        self.recorder = recorder
+        self.name = name
+        self.series = series
+        self.labels = {k: str(v) for k, v in labels.items()}
+
+    def __enter__(self) -> '_Stage':
+        self.parent = _current.get()
+        self._token = _current.set(self)
+        if self.recorder.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._nested():
+                # The peak so far belongs to the parent; restart it for us.
+                self.parent.peak = max(self.parent.peak, peak)
+            _reset_peak()
+            self._memory, self.peak = current, current
+        self._start = time.time()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        allocated = peak = None
+        if self.recorder.memory:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, traced_peak)
+            allocated, peak = current - self._memory, self.peak - self._memory
+            if self._nested():
+                self.parent.peak = max(self.parent.peak, self.peak)
+            _reset_peak()
+        _current.reset(self._token)
+        self.recorder.record({
+            'stage': self.name,
+            'parent': None if self.parent is None else self.parent.name,
+            'labels': self.labels,
+            'start': self._start,
+            'wall': wall,
+            'cpu': cpu,
+            'series': self.series,
+            'allocated': allocated,
+            'peak': peak,
+            'error': None if exc_info[0] is None else exc_info[0].__name__,
+        })
+
+    def _nested(self) -> bool:
+        return self.parent is not None and self.parent.recorder is self.recorder
+
+
+def stage(name: str, series: Optional[int] = None, **labels: Any) -> Any:
+    """
+    Context manager recording one stage.
+
+    Does nothing while instrumentation is disabled. The recorded event has
+    the fields ``stage``, ``parent`` (name of the enclosing stage),
+    ``labels``, ``start`` (Unix time), ``wall`` and ``cpu`` (seconds),
+    ``series``, ``allocated`` and ``peak`` (bytes, ``None`` without memory
+    tracking) and ``error`` (exception type name, if the stage raised).
+
+    Args:
+        name: Stage name, e.g. ``'model.fit'``
+        series: Number of series handled
+        **labels: Extra low-cardinality labels, e.g. ``model='ar'``
+    """
+    recorder = _recorder
+    if recorder is None:
+        return _DISABLED
+    return _Stage(recorder, name, series, labels)
+
+
+def instrumented(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator recording every call of a function as stage ``name``."""
+
+    def decorate(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with _Stage(_recorder, name, None, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def enable(memory: bool = False, max_events: int = DEFAULT_MAX_EVENTS) -> Recorder:
+    """
+    Start recording stages in this process, replacing any active recorder.
+
+    Args:
+        memory: Also track allocations (starts :mod:`tracemalloc`)
+        max_events: Number of most recent events kept
+
+    Returns:
+        The new recorder
+    """
+    global _recorder, _tracing
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracing = True
+    _recorder = Recorder(memory=memory, max_events=max_events)
+    return _recorder
+
+
+def disable() -> None:
+    """Stop recording; the last recorder keeps what it collected."""
+    global _recorder, _tracing
+    if _tracing:
+        tracemalloc.stop()
+        _tracing = False
+    _recorder = None
+
+
+def enabled() -> bool:
+    """Whether stages are being recorded in this process."""
+    return _recorder is not None
+
+
+def get_recorder() -> Optional[Recorder]:
+    """The active recorder, or ``None`` when disabled."""
+    return _recorder
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[List[Event]]:
+    """
+    Collect the events of a block, to hand them to another process.
+
+    Used by worker processes: the yielded list is filled with the events
+    recorded inside the block, to be merged into the parent's recorder with
+    :meth:`Recorder.merge`. When instrumentation is already enabled here
+    (e.g. the worker is a thread of the parent), events go to the active
+    recorder and the list stays empty.
+    """
+    events: List[Event] = []
+    if _recorder is not None:
+        yield events
+        return
+    recorder = enable()
+    try:
+        yield events
+    finally:
+        disable()
+        events.extend(recorder.events)
+
+
+def render_prometheus() -> str:
+    """Prometheus metrics of the active recorder (empty when disabled)."""
+    recorder = _recorder
+    return '' if recorder is None else recorder.render_prometheus()
+
+
+def _forget() -> None:
+    # Forked workers start without the parent's recorder: their events
+    # would be lost with the copy, so they are shipped with :func:`collect`.
+    global _recorder, _tracing
+    _recorder, _tracing = None, False
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget)
+
+
+def _reset_peak() -> None:
+    # tracemalloc.reset_peak is new in Python 3.9; without it peaks are
+    # upper bounds that include earlier allocations.
+    reset = getattr(tracemalloc, 'reset_peak', None)
+    if reset is not None:
+        reset()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
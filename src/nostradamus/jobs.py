@@ -0,0 +1,376 @@
+"""
+Batch forecasting jobs
+======================
+
+Runs load -> preprocess -> fit -> predict over a whole columnar store, for
+nightly jobs on stores too large to hold in memory at once.
+
+The series of the store are split into *shards* of contiguous series.
+Every shard is processed on its own, in a local process pool, and its
+forecasts are written to their own file in the output directory::
+
+    output/
+        _manifest.json          # job settings and finished shards
+        shard-00000.parquet     # one file per shard
+        shard-00001.parquet
+        ...
+
+A shard file is written under a temporary name and renamed when complete,
+and the manifest is rewritten atomically after every finished shard.
+Running the same job again on the same directory therefore resumes after
+the last finished shard instead of starting over. Parquet output needs
+``pyarrow``; the files of a finished job can be read together with
+``pandas.read_parquet(output)``. The ``binary`` format writes the
+:class:`~nostradamus.results.ForecastResult` wire format instead and has
+no extra dependency.
+
+Run it with ``nostradamus-forecast data/processed/sales forecasts/ --model ar``
+(or ``python -m nostradamus.jobs``).
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import instrumentation
+from .parallel import chunk_bounds, effective_n_jobs
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = '_manifest.json'
+FORMAT_VERSION = 1
+
+# File extension of each output format.
+FORMATS = {'parquet': '.parquet', 'binary': '.nstf'}
+
+DEFAULT_SHARD_SERIES = 10000
+
+
+class ForecastJob:
+    """
+    Sharded, resumable forecast of every series of a store.
+
+    Example:
+        >>> job = ForecastJob('data/processed/sales', 'forecasts/', model='ar',
+        ...                   periods=30, preprocess=['impute', 'clip'], n_jobs=-1)
+        >>> job.run()                      # resumes if interrupted
+
+    Forecasts are mapped back through the ``preprocess`` stages and, when
+    the source is a store processed by
+    :meth:`~nostradamus.data.Pipeline.run`, through the saved pipeline, so
+    they are always on the scale of the raw data.
+
+    Args:
+        source: Columnar store directory or raw CSV (see
+            :func:`~nostradamus.data.open_store`)
+        output: Output directory
+        model: Model name, as for :class:`~nostradamus.Predictor`
+        periods: Forecast horizon
+        quantiles: Probabilities of the forecast quantiles to write
+        preprocess: Stages (or stage names, e.g. ``'impute'``) applied to
+            every shard before fitting
+        shard_series: Series per shard
+        n_jobs: Worker processes (see
+            :func:`~nostradamus.parallel.effective_n_jobs`)
+        format: ``'parquet'`` or ``'binary'``
+        value_col: Column to forecast (default: the first value column)
+        n_samples: Paths simulated per series for the quantiles
+        seed: Seed of the simulation; shard ``i`` uses ``seed + i``, so a
+            resumed job writes the same intervals
+        **params: Hyperparameters forwarded to the model
+
+    Raises:
+        ValueError: If the format, ``periods`` or ``shard_series`` is invalid
+    """
+
+    def __init__(
+        self,
+        source: str,
+        output: str,
+        model: str = 'auto',
+        periods: int = 30,
+        quantiles: Optional[Sequence[float]] = None,
+        preprocess: Sequence[Any] = (),
+        shard_series: int = DEFAULT_SHARD_SERIES,
+        n_jobs: Optional[int] = 1,
+        format: str = 'parquet',
+        value_col: Optional[str] = None,
+        n_samples: int = 1000,
+        seed: Optional[int] = None,
+        **params: Any,
+    ):
+        from .data.preprocessing import STAGES
+
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format '{format}', expected one of {sorted(FORMATS)}")
+        if periods <= 0:
+            raise ValueError("periods must be positive")
+        if shard_series <= 0:
+            raise ValueError("shard_series must be positive")
+        self.source = source
+        self.output = output
+        self.model = model
+        self.periods = periods
+        self.quantiles = None if quantiles is None else [float(q) for q in quantiles]
+        self.preprocess = [STAGES[stage]() if isinstance(stage, str) else stage for stage in preprocess]
+        self.shard_series = shard_series
+        self.n_jobs = n_jobs
+        self.format = format
+        self.value_col = value_col
+        self.n_samples = n_samples
+        self.seed = seed
+        self.params = params
+
+    @property
+    def manifest_path(self) -> str:
+        """Path of the checkpoint manifest."""
+        return os.path.join(self.output, MANIFEST_FILE)
+
+    def settings(self, store: Any) -> Dict[str, Any]:
+        """
+        Everything that determines the output of the job.
+
+        A job only resumes from a manifest written with the same settings.
+        """
+        return {
+            'source': os.path.abspath(store.path),
+            'n_series': store.n_series,
+            'n_rows': store.n_rows,
+            'value_col': self.value_col or store.value_cols[0],
+            'model': self.model,
+            'params': self.params,
+            'periods': self.periods,
+            'quantiles': self.quantiles,
+            'preprocess': [{'stage': stage.name, 'params': stage.get_params()} for stage in self.preprocess],
+            'shard_series': self.shard_series,
+            'format': self.format,
+            'n_samples': self.n_samples,
+            'seed': self.seed,
+        }
+
+    def run(self, overwrite: bool = False) -> Dict[str, Any]:
+        """
+        Forecast every shard not finished yet.
+
+        Args:
+            overwrite: Discard the output of a previous run instead of
+                resuming it
+
+        Returns:
+            The final manifest
+
+        Raises:
+            ValueError: If the output directory holds a job with different
+                settings (and ``overwrite`` is False)
+        """
+        from .data.loaders import open_store
+
+        store = open_store(self.source)
+        settings = self.settings(store)
+        if overwrite:
+            self._clear()
+        manifest = self._open_manifest(settings)
+
+        bounds = chunk_bounds(store.n_series, 1, self.shard_series)
+        manifest['n_shards'] = len(bounds)
+        pending = [
+            (index, start, stop) for index, (start, stop) in enumerate(bounds)
+            if not self._finished(manifest, index)
+        ]
+        if len(pending) < len(bounds):
+            logger.info("Resuming: %d of %d shards already finished", len(bounds) - len(pending), len(bounds))
+
+        n_jobs = min(effective_n_jobs(self.n_jobs), max(len(pending), 1))
+        with instrumentation.stage('jobs.run', store.n_series, model=self.model, n_jobs=n_jobs):
+            if n_jobs == 1:
+                for index, start, stop in pending:
+                    self._record(manifest, self._run_shard(store.path, index, start, stop))
+            else:
+                self._run_pool(manifest, store.path, pending, n_jobs)
+
+        manifest['finished'] = len(manifest['shards']) == manifest['n_shards']
+        self._write_manifest(manifest)
+        return manifest
+
+    def _run_pool(self, manifest: Dict[str, Any], path: str, pending: List[Tuple[int, int, int]], n_jobs: int) -> None:
+        # Process pools are only set up here, so serial runs never import them.
+        from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = {pool.submit(self._run_shard, path, *shard) for shard in pending}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_EXCEPTION)
+                failed = None
+                for future in done:
+                    if future.exception() is None:
+                        self._record(manifest, future.result())
+                    else:
+                        failed = future.exception()
+                if failed is not None:
+                    # Keep the shards finished so far; the rest run on resume.
+                    for future in futures:
+                        future.cancel()
+                    raise failed
+
+    def _run_shard(self, path: str, index: int, start: int, stop: int) -> Dict[str, Any]:
+        """Forecast one shard and write its file; runs in a worker process."""
+        from .data.store import ColumnarStore
+
+        started = time.perf_counter()
+        store = ColumnarStore(path)
+        with instrumentation.stage('jobs.shard', stop - start, shard=index):
+            result = self._forecast(store, store.ids[start:stop], index)
+            name = f'shard-{index:05d}{FORMATS[self.format]}'
+            self._write(result, name)
+        return {
+            'index': index,
+            'start': start,
+            'stop': stop,
+            'file': name,
+            'n_series': result.n_series,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+    def _forecast(self, store: Any, series: np.ndarray, index: int) -> Any:
+        from .data.preprocessing import PIPELINE_DIR, Pipeline
+        from .predictor import Predictor
+        from .results import ForecastResult
+
+        value_col = self.value_col or store.value_cols[0]
+        chunk = store.read(series=series, columns=[value_col])
+        pipeline = Pipeline(self.preprocess)
+        panel = pipeline.fit_transform(chunk, id_col=store.id_col, time_col=store.time_col, value_col=value_col)
+
+        predictor = Predictor(self.model, **self.params).fit(panel)
+        if self.quantiles is None:
+            forecasts, bounds = predictor.predict(self.periods), None
+        else:
+            seed = None if self.seed is None else self.seed + index
+            forecasts, bounds = predictor.predict(
+                self.periods, quantiles=self.quantiles, n_samples=self.n_samples, seed=seed,
+            )
+
+        pipelines = [pipeline] if self.preprocess else []
+        if os.path.isdir(os.path.join(store.path, PIPELINE_DIR)):
+            pipelines.append(Pipeline.load(store.path))
+        for stage in pipelines:
+            forecasts = stage.inverse_transform(forecasts, series=panel.ids)
+            if bounds is not None:
+                bounds = np.stack([
+                    stage.inverse_transform(bounds[:, k], series=panel.ids) for k in range(bounds.shape[1])
+                ], axis=1)
+        return ForecastResult(
+            forecasts, bounds, self.quantiles or (), ids=panel.ids, model=predictor.model_.name,
+        )
+
+    def _write(self, result: Any, name: str) -> None:
+        """Write a shard file under a temporary name, then rename it."""
+        path = os.path.join(self.output, name)
+        tmp = os.path.join(self.output, f'.{name}.tmp')
+        if self.format == 'parquet':
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError(
+                    "Parquet output requires pyarrow. Install it with: pip install pyarrow "
+                    "(or use format='binary')"
+                ) from None
+            pq.write_table(result.to_arrow(), tmp)
+        else:
+            with open(tmp, 'wb') as f:
+                f.writelines(result.to_buffers())
+        os.replace(tmp, path)
+
+    def _clear(self) -> None:
+        """Remove the manifest and shard files of a previous run, and nothing else."""
+        if not os.path.isdir(self.output):
+            return
+        for name in os.listdir(self.output):
+            if name == MANIFEST_FILE or name.startswith(('shard-', '.shard-')):
+                os.remove(os.path.join(self.output, name))
+
+    def _finished(self, manifest: Dict[str, Any], index: int) -> bool:
+        entry = manifest['shards'].get(str(index))
+        return entry is not None and os.path.exists(os.path.join(self.output, entry['file']))
+
+    def _record(self, manifest: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        manifest['shards'][str(entry['index'])] = entry
+        self._write_manifest(manifest)
+        logger.info(
+            "Shard %d: %d series in %.1fs (%d/%d)",
+            entry['index'], entry['n_series'], entry['seconds'], len(manifest['shards']), manifest['n_shards'],
+        )
+
+    def _open_manifest(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        # Round-trip through JSON so the comparison sees what a manifest stores.
+        settings = json.loads(json.dumps(settings))
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('job') != settings:
+                raise ValueError(
+                    f"'{self.output}' holds the output of a different job; "
+                    "use another directory or overwrite=True"
+                )
+            return manifest
+        os.makedirs(self.output, exist_ok=True)
+        return {'format_version': FORMAT_VERSION, 'job': settings, 'n_shards': 0, 'shards': {}, 'finished': False}
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp = f'{self.manifest_path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def __repr__(self) -> str:
+        return f'ForecastJob(source={self.source!r}, output={self.output!r}, model={self.model!r})'
+
+
+def _parse_param(text: str) -> Tuple[str, Any]:
+    """Parse a ``name=value`` option; values are read as JSON when possible."""
+    name, sep, value = text.partition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected name=value, got '{text}'")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Forecast every series of a store, shard by shard")
+    parser.add_argument('source', help='columnar store directory or raw CSV')
+    parser.add_argument('output', help='output directory (resumed if it holds the same job)')
+    parser.add_argument('--model', default='auto')
+    parser.add_argument('--param', action='append', type=_parse_param, default=[], metavar='NAME=VALUE',
+                        help='model hyperparameter, e.g. --param order=3 (repeatable)')
+    parser.add_argument('--periods', type=int, default=30)
+    parser.add_argument('--quantiles', type=float, nargs='+')
+    parser.add_argument('--preprocess', nargs='+', default=[], metavar='STAGE',
+                        help='preprocessing stages, e.g. impute clip scale')
+    parser.add_argument('--shard-series', type=int, default=DEFAULT_SHARD_SERIES)
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (-1: every core)')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='parquet')
+    parser.add_argument('--column', help='value column to forecast')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--overwrite', action='store_true', help='discard a previous run instead of resuming')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    job = ForecastJob(
+        args.source, args.output, model=args.model, periods=args.periods, quantiles=args.quantiles,
+        preprocess=args.preprocess, shard_series=args.shard_series, n_jobs=args.workers,
+        format=args.format, value_col=args.column, seed=args.seed, **dict(args.param),
+    )
+    manifest = job.run(overwrite=args.overwrite)
+    logger.info("Done: %d shards in '%s'", manifest['n_shards'], args.output)
+
+
+if __name__ == '__main__':
+    main()
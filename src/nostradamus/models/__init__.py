@@ -0,0 +1,82 @@
+"""
+Forecasting models for Nostradamus.
+
+Models are looked up by name through :func:`get_model`, which is what
+``Predictor(model=...)`` uses under the hood.
+"""
+
+from typing import Any, Dict, Type
+
+from .arima import ARIMAModel
+from .auto import AutoModel
+from .autoregressive import ARModel
+from .base import BaseModel, LocalModel
+from .boosting import GradientBoostingModel
+from .linear import LinearTrendModel, NaiveModel
+from .prophet import ProphetModel
+from .smoothing import (
+    DampedTrendModel, ExponentialSmoothingModel, HoltModel, HoltWintersModel,
+    SimpleExponentialSmoothingModel, ThetaModel,
+)
+
+MODELS: Dict[str, Type[BaseModel]] = {
+    'auto': AutoModel,
+    'naive': NaiveModel,
+    'linear': LinearTrendModel,
+    'ses': SimpleExponentialSmoothingModel,
+    'holt': HoltModel,
+    'damped': DampedTrendModel,
+    'holt_winters': HoltWintersModel,
+    'ets': ExponentialSmoothingModel,
+    'theta': ThetaModel,
+    'ar': ARModel,
+    'arima': ARIMAModel,
+    'prophet': ProphetModel,
+    'gbm': GradientBoostingModel,
+}
+
+
+def get_model(model: Any, **params: Any) -> BaseModel:
+    """
+    Build a model from a registered name, or pass an instance through.
+
+    Args:
+        model: Model name (see ``MODELS``) or a :class:`BaseModel` instance
+        **params: Hyperparameters forwarded to the model constructor
+
+    Returns:
+        An unfitted model instance
+
+    Raises:
+        ValueError: If the model name is unknown
+    """
+    if isinstance(model, BaseModel):
+        return model
+    try:
+        cls = MODELS[model]
+    except KeyError:
+        raise ValueError(
+            f"Unknown model '{model}'. Available models: {', '.join(MODELS)}"
+        ) from None
+    return cls(**params)
+
+
+__all__ = [
+    'BaseModel',
+    'LocalModel',
+    'AutoModel',
+    'NaiveModel',
+    'LinearTrendModel',
+    'ExponentialSmoothingModel',
+    'SimpleExponentialSmoothingModel',
+    'HoltModel',
+    'DampedTrendModel',
+    'HoltWintersModel',
+    'ThetaModel',
+    'ARModel',
+    'ARIMAModel',
+    'ProphetModel',
+    'GradientBoostingModel',
+    'MODELS',
+    'get_model',
+]
@@ -0,0 +1,101 @@
+"""
+Batched linear algebra helpers shared by the vectorized models.
+
+All helpers operate on the whole panel at once: loops run over model
+parameters or forecast steps, never over series.
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+def normal_equations(
+    columns: Sequence[np.ndarray],
+    target: np.ndarray,
+    weights: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Accumulate the weighted normal equations of one regression per series.
+
+    The design matrix is given column by column so that shared regressors
+    (an intercept, a time trend) can be passed as 1-D arrays and broadcast
+    over the series axis instead of being copied for every series. The
+    returned sums are additive over observations, which is what lets models
+    absorb new data without revisiting the history.
+
+    Args:
+        columns: ``k`` regressors, each broadcastable to ``target``'s shape
+        target: Array of shape ``(n_series, n_obs)`` without ``NaN``
+        weights: Array of shape ``(n_series, n_obs)``; zero drops a row
+
+    Returns:
+        ``X'WX`` of shape ``(n_series, k, k)`` and ``X'Wy`` of shape
+        ``(n_series, k)``
+    """
+    k = len(columns)
+    n = target.shape[0]
+    xtx = np.empty((n, k, k))
+    xty = np.empty((n, k))
+
+    for a in range(k):
+        weighted = weights * columns[a]
+        xty[:, a] = np.sum(weighted * target, axis=1)
+        for b in range(a, k):
+            xtx[:, a, b] = xtx[:, b, a] = np.sum(weighted * columns[b], axis=1)
+    return xtx, xty
+
+
+def solve_normal(xtx: np.ndarray, xty: np.ndarray, ridge: float = 1e-8) -> np.ndarray:
+    """
+    Solve batched normal equations.
+
+    Args:
+        xtx: Array of shape ``(n_series, k, k)``
+        xty: Array of shape ``(n_series, k)``
+        ridge: Relative regularization added to the diagonal, keeping the
+            system solvable for short or constant series; all-zero columns
+            get a unit diagonal and a zero coefficient
+
+    Returns:
+        Coefficients of shape ``(n_series, k)``
+    """
+    xtx = xtx.copy()
+    diag = np.einsum('nkk->nk', xtx)
+    diag += np.where(diag > 0, ridge * diag, 1.0)
+    return np.linalg.solve(xtx, xty[..., None])[..., 0]
+
+
+def batched_lstsq(
+    columns: Sequence[np.ndarray],
+    target: np.ndarray,
+    weights: np.ndarray,
+    ridge: float = 1e-8,
+) -> np.ndarray:
+    """
+    Solve one weighted least-squares problem per series.
+
+    See :func:`normal_equations` and :func:`solve_normal`.
+
+    Returns:
+        Coefficients of shape ``(n_series, k)``
+    """
+    return solve_normal(*normal_equations(columns, target, weights), ridge=ridge)
+
+
+def ffill(values: np.ndarray) -> np.ndarray:
+    """
+    Forward-fill ``NaN`` along the time axis of a panel.
+
+    Leading gaps (before the first observation of a series) stay ``NaN``.
+    """
+    n, t = values.shape
+    idx = np.where(np.isnan(values), 0, np.arange(t))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = values[np.arange(n)[:, None], idx]
+    return filled
+
+
+def last_valid(values: np.ndarray) -> np.ndarray:
+    """Return the last non-``NaN`` value of every series (``NaN`` if none)."""
+    return ffill(values)[:, -1]
@@ -0,0 +1,125 @@
+"""
+ARIMA model backed by statsmodels.
+"""
+
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .base import LocalModel
+
+# Fitted state of one series: parameters, predicted state mean and
+# covariance after the last observation, and the number of observations.
+ARIMAState = Tuple[np.ndarray, np.ndarray, np.ndarray, int]
+
+
+class ARIMAModel(LocalModel):
+    """
+    ARIMA(p, d, q) fitted per series with ``statsmodels``.
+
+    Only plain arrays are kept per series: the estimated parameters and the
+    Kalman filter's predicted state (mean and covariance) after the last
+    observation. Forecasting propagates that state forward, and
+    :meth:`update` runs the filter over the new observations only, starting
+    from it, so neither touches the history.
+
+    Args:
+        order: ``(p, d, q)`` order of the model
+        trend: Trend specification passed to statsmodels (``None`` uses
+            statsmodels' default: a constant when ``d == 0``)
+    """
+
+    name = 'arima'
+
+    def __init__(self, order: Tuple[int, int, int] = (1, 1, 1), trend: Optional[str] = None):
+        self.order = tuple(order)
+        self.trend = trend
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'order': self.order, 'trend': self.trend}
+
+    def pack_states(self, states: List[Optional[ARIMAState]]) -> Dict[str, np.ndarray]:
+        valid = np.array([s is not None for s in states])
+        template = next((s for s in states if s is not None), None)
+        if template is None:
+            return {'valid': valid}
+        # Series without a state get NaN arrays and an observation count
+        # of -1, which no fitted series can have.
+        fill = tuple(np.full_like(np.asarray(part, dtype=np.float64), np.nan) for part in template[:3]) + (-1,)
+        rows = [s if s is not None else fill for s in states]
+        return {
+            'valid': valid,
+            'params': np.stack([r[0] for r in rows]),
+            'mean': np.stack([r[1] for r in rows]),
+            'cov': np.stack([r[2] for r in rows]),
+            'n_obs': np.array([r[3] for r in rows], dtype=np.int64),
+        }
+
+    def unpack_states(self, state: Dict[str, np.ndarray]) -> List[Optional[ARIMAState]]:
+        valid = state['valid']
+        if not valid.any():
+            return [None] * len(valid)
+        return [
+            (state['params'][i], state['mean'][i], state['cov'][i], int(state['n_obs'][i]))
+            if ok and state['n_obs'][i] >= 0 else None
+            for i, ok in enumerate(valid)
+        ]
+
+    def _build(self, y: np.ndarray, offset: int = 1) -> Any:
+        try:
+            from statsmodels.tsa.arima.model import ARIMA
+        except ImportError as e:
+            raise ImportError(
+                "ARIMAModel requires statsmodels: pip install statsmodels"
+            ) from e
+        return ARIMA(y, order=self.order, trend=self.trend, trend_offset=offset)
+
+    def _filter_from(self, y: np.ndarray, state: ARIMAState) -> Any:
+        """Run the Kalman filter over ``y`` starting from a fitted state."""
+        params, mean, cov, n_obs = state
+        model = self._build(y, offset=n_obs + 1)
+        model.initialize_known(mean, cov)
+        return model.filter(params)
+
+    def fit_series(self, y: np.ndarray) -> Optional[ARIMAState]:
+        # Drop leading gaps (e.g. left padding of a ragged panel) instead of
+        # letting the Kalman filter run over them.
+        y = y[np.argmax(np.isfinite(y)):]
+        if np.isfinite(y).sum() <= sum(self.order):
+            return None
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            try:
+                result = self._build(y).fit()
+            except (ValueError, np.linalg.LinAlgError):
+                return None
+        return (
+            np.asarray(result.params, dtype=np.float64),
+            result.predicted_state[:, -1].copy(),
+            result.predicted_state_cov[:, :, -1].copy(),
+            len(y),
+        )
+
+    def update_series(self, y_new: np.ndarray, state: Optional[ARIMAState]) -> Optional[ARIMAState]:
+        if state is None:
+            return None
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = self._filter_from(y_new, state)
+        return (
+            state[0],
+            result.predicted_state[:, -1].copy(),
+            result.predicted_state_cov[:, :, -1].copy(),
+            state[3] + len(y_new),
+        )
+
+    def forecast_series(self, state: Optional[ARIMAState], horizon: int) -> np.ndarray:
+        if state is None:
+            return np.full(horizon, np.nan)
+        # Filtering over missing values only propagates the state, so the
+        # one-step predictions are the multi-step mean forecast.
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = self._filter_from(np.full(horizon, np.nan), state)
+        return np.asarray(result.forecasts[0], dtype=np.float64)
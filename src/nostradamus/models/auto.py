@@ -0,0 +1,305 @@
+"""
+Automatic per-series model selection.
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import instrumentation
+from .base import BaseModel
+
+DEFAULT_CANDIDATES = ['naive', 'linear', 'ar', 'arima']
+
+# Model entered in the tournament for each seasonal period found in the panel.
+SEASONAL_CANDIDATE = 'holt_winters'
+
+
+class AutoModel(BaseModel):
+    """
+    Pick the best candidate model independently for every series.
+
+    Candidates compete in a successive-halving tournament over rolling-origin
+    backtest folds (the most recent ``holdout`` periods, then the ones before,
+    and so on). Each round scores the survivors on more folds and keeps the
+    best ``1 / eta`` of them, so expensive per-series models are only
+    backtested on a few folds before weak ones are dropped. Vectorized models
+    are cheap enough to be scored on every fold in a single call.
+
+    The surviving candidates are then compared series by series and each
+    model is refitted only on the series it won.
+
+    With the default candidates, the panel first goes through
+    :func:`~nostradamus.seasonality.detect_seasonality`, and a Holt-Winters
+    candidate is added for each period that dominates a sizeable share of
+    the series, so seasonal series are not left to non-seasonal models. An
+    explicit list of candidates is used as given.
+
+    Args:
+        candidates: Model names or instances, in any order; they are
+            evaluated from cheapest to most expensive (defaults to
+            ``['naive', 'linear', 'ar', 'arima']``)
+        holdout: Forecast horizon of each backtest fold
+        n_folds: Maximum number of rolling-origin folds
+        eta: Halving rate; each round keeps ``ceil(survivors / eta)``
+        time_budget: Seconds allowed for the tournament. Once exhausted,
+            candidates that still need scoring in the current round are
+            skipped and the selection is made among the others.
+        seasonality: Detect seasonal periods and add seasonal candidates
+            to the default ones
+
+    Attributes:
+        seasonality_: Detected :class:`~nostradamus.seasonality.Seasonality`
+            (``None`` if detection is off)
+        report_: One dict per candidate with its status (``'selected'``,
+            ``'eliminated'`` or ``'skipped'``), the folds it was scored on,
+            its last tournament score, the number of series it won and the
+            seconds spent backtesting and fitting it
+    """
+
+    name = 'auto'
+
+    def __init__(
+        self,
+        candidates: Optional[Sequence[Any]] = None,
+        holdout: int = 7,
+        n_folds: int = 4,
+        eta: int = 2,
+        time_budget: Optional[float] = None,
+        seasonality: bool = True,
+    ):
+        if eta < 2:
+            raise ValueError("eta must be at least 2")
+        self.candidates = list(candidates) if candidates else list(DEFAULT_CANDIDATES)
+        self.holdout = holdout
+        self.n_folds = n_folds
+        self.eta = eta
+        self.time_budget = time_budget
+        self.seasonality = seasonality
+
+    def get_params(self) -> Dict[str, Any]:
+        return {
+            'candidates': self.candidates,
+            'holdout': self.holdout,
+            'n_folds': self.n_folds,
+            'eta': self.eta,
+            'time_budget': self.time_budget,
+            'seasonality': self.seasonality,
+        }
+
+    def _build(self, y: np.ndarray) -> List[BaseModel]:
+        from . import get_model
+        models = [get_model(c) for c in self.candidates]
+        self.seasonality_ = None
+        if self.seasonality and self.candidates == DEFAULT_CANDIDATES:
+            from ..seasonality import detect_seasonality
+
+            self.seasonality_ = detect_seasonality(y)
+            known = {getattr(model, 'season_length', None) for model in models}
+            models += [
+                get_model(SEASONAL_CANDIDATE, season_length=period)
+                for period in self.seasonality_.common() if period not in known
+            ]
+        for model in models:
+            model.n_jobs, model.index = self.n_jobs, self.index
+        return sorted(models, key=lambda m: m.cost)
+
+    def _fold_ends(self, n_time: int) -> List[int]:
+        """Training lengths of the folds, most recent origin first."""
+        h = self.holdout
+        ends = [n_time - h * (k + 1) for k in range(self.n_folds)]
+        return [e for e in ends if e >= 2 * h] or [n_time - h]
+
+    def fit(self, y: np.ndarray) -> 'AutoModel':
+        start = time.perf_counter()
+        models = self._build(y)
+        ends = self._fold_ends(y.shape[1])
+        errors: List[Optional[np.ndarray]] = [None] * len(models)
+        seconds = [0.0] * len(models)
+        status = ['eliminated'] * len(models)
+        scores = [np.nan] * len(models)
+
+        alive = list(range(len(models)))
+        folds = 1
+        while True:
+            scored = []
+            for i in alive:
+                done = 0 if errors[i] is None else errors[i].shape[0]
+                if done < folds:
+                    over_budget = (
+                        self.time_budget is not None
+                        and time.perf_counter() - start > self.time_budget
+                    )
+                    if over_budget and scored:
+                        status[i] = 'skipped'
+                        continue
+                    # Vectorized models are scored on every fold at once.
+                    stop = len(ends) if models[i].vectorized else folds
+                    t0 = time.perf_counter()
+                    with instrumentation.stage('auto.backtest', y.shape[0], model=models[i].name):
+                        new = backtest(models[i], y, ends[done:stop], self.holdout)
+                    seconds[i] += time.perf_counter() - t0
+                    errors[i] = new if errors[i] is None else np.vstack([errors[i], new])
+                scored.append(i)
+
+            mean_errors = np.stack([errors[i][:folds].mean(axis=0) for i in scored])
+            round_scores = _relative_scores(mean_errors)
+            for i, score in zip(scored, round_scores):
+                scores[i] = float(score)
+
+            if len(scored) < len(alive) or folds >= len(ends) or len(scored) == 1:
+                break
+            keep = max(math.ceil(len(scored) / self.eta), 1)
+            alive = [scored[j] for j in np.argsort(round_scores, kind='stable')[:keep]]
+            folds = min(folds * self.eta, len(ends))
+
+        # Per-series winner among the finalists, on the folds of the last round.
+        best = np.argmin(mean_errors, axis=0)
+        self.models_: List[BaseModel] = []
+        self.rows_: List[np.ndarray] = []
+        won = {}
+        for j, i in enumerate(scored):
+            rows = np.flatnonzero(best == j)
+            won[i] = len(rows)
+            if len(rows):
+                status[i] = 'selected'
+                t0 = time.perf_counter()
+                with instrumentation.stage('auto.fit', len(rows), model=models[i].name):
+                    self.models_.append(models[i].fit(y[rows]))
+                seconds[i] += time.perf_counter() - t0
+                self.rows_.append(rows)
+
+        self.n_series_ = y.shape[0]
+        self.report_ = [
+            {
+                'model': repr(models[i]),
+                'status': status[i],
+                'folds': 0 if errors[i] is None else errors[i].shape[0],
+                'score': scores[i],
+                'series': won.get(i, 0),
+                'seconds': seconds[i],
+            }
+            for i in range(len(models))
+        ]
+        return self
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        state = {'n_series_': np.asarray(self.n_series_)}
+        for k, rows in enumerate(self.rows_):
+            state[f'rows_{k}'] = rows
+        return state
+
+    def set_state(self, state: Dict[str, np.ndarray], submodels: Sequence[BaseModel] = ()) -> 'AutoModel':
+        self.n_series_ = int(state['n_series_'])
+        self.models_ = list(submodels)
+        self.rows_ = [state[f'rows_{k}'] for k in range(len(self.models_))]
+        return self
+
+    def submodels(self) -> List[BaseModel]:
+        return list(self.models_)
+
+    def update(self, y_new: np.ndarray) -> 'AutoModel':
+        for model, rows in zip(self.models_, self.rows_):
+            model.update(y_new[rows])
+        return self
+
+    def predict(self, horizon: int) -> np.ndarray:
+        out = np.full((self.n_series_, horizon), np.nan)
+        for model, rows in zip(self.models_, self.rows_):
+            out[rows] = model.predict(horizon)
+        return out
+
+    def residuals(self, y: np.ndarray) -> np.ndarray:
+        out = np.full(y.shape, np.nan)
+        for model, rows in zip(self.models_, self.rows_):
+            out[rows] = model.residuals(y[rows])
+        return out
+
+    def simulate(self, forecasts: np.ndarray, shocks: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        out = np.full(shocks.shape, np.nan)
+        for model, selected in zip(self.models_, self.rows_):
+            mask = np.isin(rows, selected)
+            if mask.any():
+                # Positions of the simulated rows among the model's own series.
+                own = np.searchsorted(selected, rows[mask])
+                out[mask] = model.simulate(forecasts[mask], shocks[mask], own)
+        return out
+
+
+def backtest(model: BaseModel, y: np.ndarray, ends: Sequence[int], horizon: int) -> np.ndarray:
+    """
+    Score ``model`` on several forecast origins with a single fit.
+
+    Args:
+        model: Unfitted model
+        y: Panel of shape ``(n_series, n_time)``
+        ends: Training length of each fold
+        horizon: Periods forecast and scored after each origin
+
+    Returns:
+        Mean absolute errors of shape ``(n_folds, n_series)``
+    """
+    forecast, actual = backtest_forecasts(model, y, ends, horizon)
+    n_folds, n_series = forecast.shape[:2]
+    return _mae(forecast.reshape(-1, horizon), actual.reshape(-1, horizon)).reshape(n_folds, n_series)
+
+
+def backtest_forecasts(
+    model: BaseModel, y: np.ndarray, ends: Sequence[int], horizon: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Forecast from several origins with a single fit.
+
+    The training window of every fold is right-aligned into one stacked
+    panel of shape ``(n_folds * n_series, max(ends))``, padded on the left
+    with ``NaN``, so one ``fit``/``predict`` call covers all folds.
+
+    Args:
+        model: Unfitted model
+        y: Panel of shape ``(n_series, n_time)``
+        ends: Training length of each fold
+        horizon: Periods forecast after each origin
+
+    Returns:
+        Forecasts and actual values, both of shape
+        ``(n_folds, n_series, horizon)``; actuals past the end of ``y`` are
+        ``NaN``
+    """
+    n_series, n_time = y.shape
+    width = max(ends)
+    stacked = np.full((len(ends) * n_series, width), np.nan)
+    for k, end in enumerate(ends):
+        stacked[k * n_series:(k + 1) * n_series, width - end:] = y[:, :end]
+
+    steps = np.asarray(ends)[:, None] + np.arange(horizon)
+    padded = np.concatenate([y, np.full((n_series, 1), np.nan)], axis=1)
+    actual = padded[:, np.minimum(steps, n_time)].transpose(1, 0, 2)
+
+    forecast = model.fit(stacked).predict(horizon)
+    return forecast.reshape(len(ends), n_series, horizon), actual
+
+
+def _relative_scores(errors: np.ndarray) -> np.ndarray:
+    """
+    Scale-free tournament score of each candidate.
+
+    Errors are divided by the best error of each series, so that series of
+    different magnitude weigh the same, then averaged over the series.
+    """
+    best = errors.min(axis=0)
+    usable = np.isfinite(best) & (best > 0)
+    if not usable.any():
+        return np.where(np.isfinite(errors).any(axis=1), 1.0, np.inf)
+    relative = errors[:, usable] / best[usable]
+    return np.where(np.isfinite(relative), relative, 1e6).mean(axis=1)
+
+
+def _mae(forecast: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    """Per-series MAE ignoring gaps; ``inf`` where nothing can be scored."""
+    err = np.abs(forecast - actual)
+    valid = np.isfinite(err)
+    count = valid.sum(axis=1)
+    total = np.where(valid, err, 0.0).sum(axis=1)
+    return np.where(count > 0, total / np.maximum(count, 1), np.inf)
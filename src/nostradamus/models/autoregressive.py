@@ -0,0 +1,120 @@
+"""
+Autoregressive model fitted by batched least squares.
+"""
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from ._batch import ffill, normal_equations, solve_normal
+from .base import BaseModel
+
+
+class ARModel(BaseModel):
+    """
+    AR(p) model with intercept, ``y_t = c + sum_j phi_j * y_{t-j}``.
+
+    The lagged regressors are strided slices of the panel, so building the
+    design matrix costs no copies and the ``p + 1`` normal equations of every
+    series are accumulated together. Rows whose window contains a gap are
+    dropped from the fit.
+
+    The accumulated normal equations and the last ``p`` raw observations are
+    kept, so :meth:`update` only builds the rows ending in new points.
+
+    Args:
+        order: Number of lags ``p``
+    """
+
+    name = 'ar'
+    state_attrs = ('xtx_', 'xty_', 'count_', 'tail_', 'state_', 'coef_')
+
+    def __init__(self, order: int = 2):
+        if order < 1:
+            raise ValueError("order must be at least 1")
+        self.order = order
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'order': self.order}
+
+    def _normal_equations(self, window: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Normal equations of the rows whose target is past the first ``p`` columns."""
+        p = self.order
+        n_time = window.shape[1]
+        finite = np.isfinite(window)
+        values = np.nan_to_num(window)
+        weights = finite[:, p:].astype(np.float64)
+        columns = [np.ones(n_time - p)]
+        for j in range(1, p + 1):
+            columns.append(values[:, p - j:n_time - j])
+            weights *= finite[:, p - j:n_time - j]
+        xtx, xty = normal_equations(columns, values[:, p:], weights)
+        return xtx, xty, weights.sum(axis=1)
+
+    def fit(self, y: np.ndarray) -> 'ARModel':
+        p = self.order
+        if y.shape[1] <= p:
+            raise ValueError(
+                f"AR({p}) needs more than {p} time steps, got {y.shape[1]}"
+            )
+
+        self.xtx_, self.xty_, self.count_ = self._normal_equations(y)
+        self.tail_ = y[:, -p:].copy()
+        # Most recent value first, matching the column order of ``coef_``.
+        self.state_ = ffill(y)[:, :-p - 1:-1].copy()
+        self._solve()
+        return self
+
+    def update(self, y_new: np.ndarray) -> 'ARModel':
+        p = self.order
+        xtx, xty, count = self._normal_equations(np.hstack([self.tail_, y_new]))
+        self.xtx_ = self.xtx_ + xtx
+        self.xty_ = self.xty_ + xty
+        self.count_ = self.count_ + count
+        self.tail_ = np.hstack([self.tail_, y_new])[:, -p:]
+        self.state_ = ffill(np.hstack([self.state_[:, ::-1], y_new]))[:, :-p - 1:-1].copy()
+        self._solve()
+        return self
+
+    def _solve(self) -> None:
+        self.coef_ = solve_normal(self.xtx_, self.xty_)
+        self.coef_[self.count_ <= self.order] = np.nan
+
+    def predict(self, horizon: int) -> np.ndarray:
+        intercept = self.coef_[:, 0]
+        phi = self.coef_[:, 1:]
+        state = self.state_.copy()
+        out = np.empty((state.shape[0], horizon))
+
+        for h in range(horizon):
+            out[:, h] = intercept + np.einsum('ij,ij->i', phi, state)
+            state[:, 1:] = state[:, :-1]
+            state[:, 0] = out[:, h]
+        return out
+
+    def residuals(self, y: np.ndarray) -> np.ndarray:
+        p = self.order
+        n_time = y.shape[1]
+        out = np.full(y.shape, np.nan)
+        fitted = self.coef_[:, :1] + sum(
+            self.coef_[:, j:j + 1] * y[:, p - j:n_time - j] for j in range(1, p + 1)
+        )
+        out[:, p:] = y[:, p:] - fitted
+        return out
+
+    def simulate(self, forecasts: np.ndarray, shocks: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        # Same recursion as ``predict``, one path per (series, sample) pair.
+        # Steps are kept on the leading axis so each one is contiguous, and
+        # the lags are read back from the output instead of a shifted state.
+        p = self.order
+        coef = self.coef_[rows].astype(shocks.dtype)[:, :, None]
+        n_rows, n_paths, horizon = shocks.shape
+        out = np.empty((p + horizon, n_rows, n_paths), dtype=shocks.dtype)
+        out[:p] = self.state_[rows, ::-1].T[:, :, None]
+
+        for h in range(horizon):
+            step = out[p + h]
+            np.add(shocks[:, :, h], coef[:, 0], out=step)
+            for j in range(1, p + 1):
+                step += coef[:, j] * out[p + h - j]
+        return out[p:].transpose(1, 2, 0)
@@ -0,0 +1,263 @@
+"""
+Base classes for Nostradamus forecasting models.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..parallel import map_series
+from ._batch import ffill
+
+
+class BaseModel:
+    """
+    Base class for models fitted on a whole panel at once.
+
+    ``fit`` receives an array of shape ``(n_series, n_time)`` with ``NaN``
+    for missing observations and ``predict`` returns forecasts of shape
+    ``(n_series, horizon)``. Implementations must be vectorized across the
+    series axis.
+    """
+
+    name = 'base'
+
+    # Relative fitting cost, used to schedule cheap candidates first.
+    cost = 1
+
+    # True if one fit covers independent series at once, so that model
+    # selection can score every backtest fold in a single call.
+    vectorized = True
+
+    # Execution context, set by ``Predictor.fit`` before fitting.
+    n_jobs: Optional[int] = 1
+    index: Optional[Any] = None
+
+    # Fitted attributes making up the model state (see ``get_state``).
+    state_attrs: Sequence[str] = ()
+
+    def get_params(self) -> Dict[str, Any]:
+        """Return the model hyperparameters."""
+        return {}
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """
+        Return the fitted state as plain arrays, for persistence.
+
+        The default collects the attributes listed in ``state_attrs``;
+        scalars become 0-d arrays.
+        """
+        return {name: np.asarray(getattr(self, name)) for name in self.state_attrs}
+
+    def set_state(self, state: Dict[str, np.ndarray], submodels: Sequence['BaseModel'] = ()) -> 'BaseModel':
+        """
+        Restore a fitted state produced by :meth:`get_state`.
+
+        Arrays may be read-only or memory-mapped; models copy them before
+        modifying them in place. 0-d arrays are restored as Python scalars.
+
+        Args:
+            state: Arrays keyed by attribute name
+            submodels: Restored models returned by :meth:`submodels`
+
+        Returns:
+            The restored model
+        """
+        for name, value in state.items():
+            setattr(self, name, value.item() if value.ndim == 0 else value)
+        return self
+
+    def submodels(self) -> List['BaseModel']:
+        """Fitted models nested inside this one (persisted separately)."""
+        return []
+
+    def fit(self, y: np.ndarray) -> 'BaseModel':
+        """
+        Fit the model on every series of the panel.
+
+        Args:
+            y: Array of shape ``(n_series, n_time)``
+
+        Returns:
+            The fitted model
+        """
+        raise NotImplementedError
+
+    def update(self, y_new: np.ndarray) -> 'BaseModel':
+        """
+        Absorb new observations appended to the end of every series.
+
+        Implementations update their fitted state in time proportional to
+        the new data, without revisiting the history. Models that cannot do
+        so raise ``NotImplementedError`` and are refitted by the
+        :class:`~nostradamus.Predictor`.
+
+        Args:
+            y_new: Array of shape ``(n_series, n_new)``, ``NaN`` for gaps
+
+        Returns:
+            The updated model
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support incremental updates")
+
+    def predict(self, horizon: int) -> np.ndarray:
+        """
+        Forecast ``horizon`` steps past the end of the fitted panel.
+
+        Args:
+            horizon: Number of periods to forecast
+
+        Returns:
+            Array of shape ``(n_series, horizon)``
+        """
+        raise NotImplementedError
+
+    def residuals(self, y: np.ndarray) -> np.ndarray:
+        """
+        In-sample one-step forecast errors of the fitted model.
+
+        The default returns the errors of the naive forecast (the change
+        since the previous observation), a conservative stand-in for models
+        without a cheap in-sample fit.
+
+        Args:
+            y: The fitted panel, of shape ``(n_series, n_time)``
+
+        Returns:
+            Array of the same shape, ``NaN`` where no residual is available
+        """
+        out = np.full(y.shape, np.nan)
+        out[:, 1:] = y[:, 1:] - ffill(y)[:, :-1]
+        return out
+
+    def simulate(self, forecasts: np.ndarray, shocks: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        Sample paths of the series ``rows`` given one-step shocks.
+
+        The default accumulates the shocks on top of the point forecast, as
+        in a random walk, whose errors grow with the horizon; models whose
+        errors do not accumulate that way override it.
+
+        Args:
+            forecasts: Point forecasts of the rows, shape ``(n_rows, horizon)``
+            shocks: One-step shocks, shape ``(n_rows, n_paths, horizon)``
+            rows: Positions of the simulated series in the fitted panel
+
+        Returns:
+            Paths of shape ``(n_rows, n_paths, horizon)``, of the dtype of
+            ``shocks``
+        """
+        paths = np.cumsum(shocks, axis=2)
+        paths += forecasts[:, None, :]
+        return paths
+
+    def __repr__(self) -> str:
+        params = ', '.join(f'{k}={v!r}' for k, v in self.get_params().items())
+        return f'{type(self).__name__}({params})'
+
+
+class LocalModel(BaseModel):
+    """
+    Base class for models fitted independently on each series.
+
+    Wrappers around single-series libraries (statsmodels, prophet) cannot be
+    vectorized, so they implement :meth:`fit_series` and
+    :meth:`forecast_series` instead and the panel is dispatched through
+    :func:`~nostradamus.parallel.map_series`, in ``n_jobs`` worker processes.
+
+    The fitted state of each series is whatever :meth:`fit_series` returns;
+    keeping it to plain arrays keeps the results cheap to send back from the
+    workers. It must be enough to forecast on its own, so the history does
+    not have to be kept around.
+    """
+
+    cost = 100
+    vectorized = False
+
+    def pack_states(self, states: List[Any]) -> Dict[str, np.ndarray]:
+        """
+        Encode the per-series states as arrays.
+
+        The default handles ``bytes`` states (``None`` for failed fits) by
+        concatenating them into one ``uint8`` blob with row offsets.
+        """
+        blobs = [b'' if s is None else s for s in states]
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in blobs], out=offsets[1:])
+        return {
+            'blob': np.frombuffer(b''.join(blobs), dtype=np.uint8),
+            'offsets': offsets,
+            'valid': np.array([s is not None for s in states]),
+        }
+
+    def unpack_states(self, state: Dict[str, np.ndarray]) -> List[Any]:
+        """Inverse of :meth:`pack_states`."""
+        blob, offsets = state['blob'], state['offsets']
+        return [
+            bytes(blob[offsets[i]:offsets[i + 1]]) if ok else None
+            for i, ok in enumerate(state['valid'])
+        ]
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return self.pack_states(self.states_)
+
+    def set_state(self, state: Dict[str, np.ndarray], submodels: Sequence[BaseModel] = ()) -> 'LocalModel':
+        self.states_ = self.unpack_states(state)
+        return self
+
+    def fit_series(self, y: np.ndarray) -> Any:
+        """
+        Fit one series and return its fitted state.
+
+        Args:
+            y: 1-D array, ``NaN`` for missing observations
+        """
+        raise NotImplementedError
+
+    def forecast_series(self, state: Any, horizon: int) -> np.ndarray:
+        """
+        Forecast one series from the state returned by :meth:`fit_series`.
+
+        Args:
+            state: Fitted state of the series
+            horizon: Number of periods to forecast
+
+        Returns:
+            1-D array of length ``horizon``
+        """
+        raise NotImplementedError
+
+    def update_series(self, y_new: np.ndarray, state: Any) -> Any:
+        """
+        Return the state of one series after appending ``y_new`` to it.
+
+        Args:
+            y_new: 1-D array of new observations
+            state: Current fitted state of the series
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support incremental updates")
+
+    def _worker(self) -> 'LocalModel':
+        """Unfitted copy sent to worker processes instead of ``self``."""
+        worker = type(self)(**self.get_params())
+        worker.index = self.index
+        return worker
+
+    def fit(self, y: np.ndarray) -> 'LocalModel':
+        self.states_: List[Any] = map_series(
+            self._worker().fit_series, y, n_jobs=self.n_jobs
+        )
+        return self
+
+    def update(self, y_new: np.ndarray) -> 'LocalModel':
+        self.states_ = map_series(
+            self._worker().update_series, y_new, extra=self.states_, n_jobs=self.n_jobs
+        )
+        return self
+
+    def predict(self, horizon: int) -> np.ndarray:
+        forecasts = map_series(
+            self._worker().forecast_series, extra=self.states_,
+            args=(horizon,), n_jobs=self.n_jobs,
+        )
+        return np.asarray(forecasts, dtype=np.float64).reshape(len(forecasts), horizon)
@@ -0,0 +1,258 @@
+"""
+Global gradient-boosted trees over lag features.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from ..data.panel import _is_pandas
+from .base import BaseModel
+
+# Calendar features of a regular datetime index; without one, the position
+# in a cycle of ``season_length`` steps is used instead.
+CALENDAR = ('dayofweek', 'day', 'month')
+
+
+class GradientBoostingModel(BaseModel):
+    """
+    One histogram gradient boosting model shared by every series.
+
+    Unlike the local models, which fit each series on its own, a single
+    scikit-learn ``HistGradientBoostingRegressor`` is trained on rows drawn
+    from the whole panel. Series are divided by their mean absolute value so
+    they share one scale. Each row holds lagged values, rolling means and
+    standard deviations, calendar features and the series scale; all rows
+    are gathered in one vectorized pass into a single contiguous ``float32``
+    matrix, at most ``max_samples`` rows of it.
+
+    Forecasts are recursive: every step predicts the next value of all
+    series in one batch, and the predictions feed the lags of the next
+    step.
+
+    The fitted trees are kept as flat node arrays, which is what gets
+    saved; a loaded model walks them with numpy, while a freshly fitted one
+    uses the scikit-learn estimator directly.
+
+    Args:
+        lags: Lagged values used as features
+        windows: Lengths of the rolling means and standard deviations,
+            over the values preceding the target
+        season_length: Cycle length of the position feature used when the
+            panel has no datetime index
+        max_samples: Most training rows, drawn at random from the panel
+        seed: Seed of the row sampling and of the booster
+        **gbm_params: Keyword arguments forwarded to
+            ``HistGradientBoostingRegressor``, e.g. ``max_iter``
+    """
+
+    name = 'gbm'
+    cost = 20
+    # One model learns from all series, so stacked folds would leak later
+    # observations into earlier ones.
+    vectorized = False
+    state_attrs = (
+        'scale_', 'tail_', 'n_time_', 'next_time_', 'freq_',
+        'roots_', 'feature_', 'threshold_', 'missing_left_', 'leaf_', 'left_', 'right_', 'value_',
+        'baseline_',
+    )
+
+    _estimator: Any = None
+
+    def __init__(
+        self,
+        lags: Sequence[int] = (1, 2, 3, 4, 5, 6, 7, 14, 28),
+        windows: Sequence[int] = (7, 28),
+        season_length: int = 7,
+        max_samples: int = 1_000_000,
+        seed: int = 0,
+        **gbm_params: Any,
+    ):
+        if not lags or min(lags) < 1:
+            raise ValueError("lags must be positive")
+        if windows and min(windows) < 1:
+            raise ValueError("windows must be positive")
+        self.lags = tuple(int(lag) for lag in lags)
+        self.windows = tuple(int(w) for w in windows)
+        self.season_length = season_length
+        self.max_samples = max_samples
+        self.seed = seed
+        self.gbm_params = gbm_params
+
+    def get_params(self) -> Dict[str, Any]:
+        return {
+            'lags': self.lags,
+            'windows': self.windows,
+            'season_length': self.season_length,
+            'max_samples': self.max_samples,
+            'seed': self.seed,
+            **self.gbm_params,
+        }
+
+    @property
+    def lookback(self) -> int:
+        """Past values needed to build the features of one step."""
+        return max(max(self.lags), max(self.windows, default=0))
+
+    def feature_names(self, calendar: bool = False) -> List[str]:
+        """Names of the feature matrix columns, with or without a datetime index."""
+        names = [f'lag_{lag}' for lag in self.lags]
+        for w in self.windows:
+            names += [f'mean_{w}', f'std_{w}']
+        return names + (list(CALENDAR) if calendar else ['position']) + ['log_scale']
+
+    def fit(self, y: np.ndarray) -> 'GradientBoostingModel':
+        try:
+            from sklearn.ensemble import HistGradientBoostingRegressor
+        except ImportError as e:
+            raise ImportError("GradientBoostingModel requires scikit-learn: pip install scikit-learn") from e
+
+        n_series, n_time = y.shape
+        scale = np.nanmean(np.abs(y), axis=1)
+        self.scale_ = np.where(np.isfinite(scale) & (scale > 0), scale, 1.0)
+        z = y / self.scale_[:, None]
+
+        # Training rows: every (series, step) with an observed target and
+        # at least one observation before it, subsampled if needed.
+        target = np.isfinite(z)
+        target[:, 0] = False
+        rows = np.flatnonzero(target)
+        if len(rows) > self.max_samples:
+            rng = np.random.default_rng(self.seed)
+            rows = np.sort(rng.choice(rows, self.max_samples, replace=False))
+        series, steps = np.divmod(rows, n_time)
+
+        dates = self._dates(n_time)
+        X = self._features(z, series, steps, dates, np.arange(n_time))
+        params = {'random_state': self.seed, **self.gbm_params}
+        self._estimator = HistGradientBoostingRegressor(**params).fit(X, z[series, steps])
+        self._flatten(self._estimator)
+
+        self.tail_ = z[:, -self.lookback:].copy() if n_time >= self.lookback else np.hstack(
+            [np.full((n_series, self.lookback - n_time), np.nan), z]
+        )
+        self.n_time_ = n_time
+        if dates is None:
+            self.next_time_, self.freq_ = -1, ''
+        else:
+            import pandas as pd
+
+            self.freq_ = dates.freqstr
+            self.next_time_ = int(pd.date_range(dates[-1], periods=2, freq=self.freq_)[1].value)
+        return self
+
+    def _dates(self, n_time: int) -> Any:
+        """The panel's datetime index, if it has a regular frequency."""
+        if not _is_pandas(self.index, 'DatetimeIndex') or len(self.index) != n_time:
+            return None
+        index = self.index
+        if index.freq is None:
+            import pandas as pd
+
+            freq = pd.infer_freq(index) if n_time >= 3 else None
+            if freq is None:
+                return None
+            index = pd.DatetimeIndex(index, freq=freq)
+        return index
+
+    def _features(self, z: np.ndarray, series: np.ndarray, steps: np.ndarray, dates: Any, positions: np.ndarray) -> np.ndarray:
+        """
+        Feature rows of the targets ``z[series, steps]``.
+
+        Lags and rolling statistics only use values before each target;
+        ``dates`` and ``positions`` describe every column of ``z``.
+        """
+        n_series, n_time = z.shape
+        pad = self.lookback
+        padded = np.hstack([np.full((n_series, pad), np.nan), z])
+        X = np.empty((len(series), len(self.feature_names(dates is not None))), dtype=np.float32)
+        at = steps + pad
+        col = 0
+        for lag in self.lags:
+            X[:, col] = padded[series, at - lag]
+            col += 1
+
+        if self.windows:
+            # Prefix sums (with a leading zero) give every window in O(1).
+            finite = np.isfinite(padded)
+            values = np.where(finite, padded, 0.0)
+            zero = np.zeros((n_series, 1))
+            sums = np.hstack([zero, np.cumsum(values, axis=1)])
+            squares = np.hstack([zero, np.cumsum(values ** 2, axis=1)])
+            counts = np.hstack([zero, np.cumsum(finite, axis=1)])
+            for w in self.windows:
+                count = counts[series, at] - counts[series, at - w]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    mean = (sums[series, at] - sums[series, at - w]) / count
+                    second = (squares[series, at] - squares[series, at - w]) / count
+                X[:, col] = mean
+                X[:, col + 1] = np.sqrt(np.maximum(second - mean ** 2, 0.0))
+                col += 2
+
+        if dates is None:
+            X[:, col] = positions[steps] % self.season_length
+            col += 1
+        else:
+            for name in CALENDAR:
+                X[:, col] = np.asarray(getattr(dates, name))[steps]
+                col += 1
+        X[:, col] = np.log(self.scale_[series])
+        return X
+
+    def _flatten(self, estimator: Any) -> None:
+        """Store the fitted trees as flat node arrays."""
+        nodes = [tree.nodes for trees in estimator._predictors for tree in trees]
+        sizes = np.array([len(tree) for tree in nodes], dtype=np.int64)
+        self.roots_ = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        merged = np.concatenate(nodes)
+        offset = np.repeat(self.roots_, sizes)
+        self.feature_ = merged['feature_idx'].astype(np.int64)
+        self.threshold_ = merged['num_threshold'].astype(np.float64)
+        self.missing_left_ = merged['missing_go_to_left'].astype(bool)
+        self.leaf_ = merged['is_leaf'].astype(bool)
+        self.left_ = merged['left'].astype(np.int64) + offset
+        self.right_ = merged['right'].astype(np.int64) + offset
+        self.value_ = merged['value'].astype(np.float64)
+        self.baseline_ = float(np.ravel(estimator._baseline_prediction)[0])
+
+    def _predict_rows(self, X: np.ndarray) -> np.ndarray:
+        if self._estimator is not None:
+            return self._estimator.predict(X)
+        # Walk every tree at once, one level per iteration.
+        node = np.tile(self.roots_, (len(X), 1))
+        active = ~self.leaf_[node]
+        while active.any():
+            rows, trees = np.nonzero(active)
+            current = node[rows, trees]
+            x = X[rows, self.feature_[current]]
+            left = np.where(np.isnan(x), self.missing_left_[current], x <= self.threshold_[current])
+            current = np.where(left, self.left_[current], self.right_[current])
+            node[rows, trees] = current
+            active[rows, trees] = ~self.leaf_[current]
+        return self.baseline_ + self.value_[node].sum(axis=1)
+
+    def set_state(self, state: Dict[str, np.ndarray], submodels: Sequence[BaseModel] = ()) -> 'GradientBoostingModel':
+        self._estimator = None
+        return super().set_state(state, submodels)
+
+    def predict(self, horizon: int) -> np.ndarray:
+        n_series = len(self.scale_)
+        pad = self.lookback
+        z = np.hstack([self.tail_, np.full((n_series, horizon), np.nan)])
+        positions = np.arange(self.n_time_ - pad, self.n_time_ + horizon)
+        dates = None
+        if self.next_time_ >= 0:
+            import pandas as pd
+
+            future = pd.date_range(pd.Timestamp(self.next_time_), periods=horizon, freq=self.freq_)
+            # Only the forecast steps need calendar values.
+            dates = pd.DatetimeIndex(np.concatenate([np.full(pad, future[0].to_datetime64()), future.values]))
+
+        series = np.arange(n_series)
+        steps = np.full(n_series, pad)
+        for h in range(horizon):
+            # The features of step ``h`` only look at the ``pad`` values before it.
+            window = slice(h, h + pad + 1)
+            X = self._features(z[:, window], series, steps, None if dates is None else dates[window], positions[window])
+            z[:, pad + h] = self._predict_rows(X)
+        return z[:, pad:] * self.scale_[:, None]
@@ -0,0 +1,76 @@
+"""
+Baseline models: naive and linear trend.
+"""
+
+import numpy as np
+
+from ._batch import last_valid, normal_equations, solve_normal
+from .base import BaseModel
+
+
+class NaiveModel(BaseModel):
+    """Repeat the last observed value of every series."""
+
+    name = 'naive'
+    state_attrs = ('last_',)
+
+    def fit(self, y: np.ndarray) -> 'NaiveModel':
+        self.last_ = last_valid(y)
+        return self
+
+    def update(self, y_new: np.ndarray) -> 'NaiveModel':
+        latest = last_valid(y_new)
+        self.last_ = np.where(np.isnan(latest), self.last_, latest)
+        return self
+
+    def predict(self, horizon: int) -> np.ndarray:
+        return np.repeat(self.last_[:, None], horizon, axis=1)
+
+
+class LinearTrendModel(BaseModel):
+    """
+    Ordinary least-squares line ``y = a + b * t`` for every series.
+
+    The design matrix is shared by the whole panel, so fitting reduces to a
+    handful of weighted sums over the time axis. Those sums are kept, which
+    makes :meth:`update` a recursive least-squares step: new points are
+    added to the sums and the 2x2 systems solved again. Series with fewer
+    than two observations forecast ``NaN``.
+    """
+
+    name = 'linear'
+    state_attrs = ('xtx_', 'xty_', 'count_', 'n_time_', 'coef_')
+
+    def fit(self, y: np.ndarray) -> 'LinearTrendModel':
+        self.xtx_ = np.zeros((y.shape[0], 2, 2))
+        self.xty_ = np.zeros((y.shape[0], 2))
+        self.count_ = np.zeros(y.shape[0])
+        self.n_time_ = 0
+        return self.update(y)
+
+    def update(self, y_new: np.ndarray) -> 'LinearTrendModel':
+        n_new = y_new.shape[1]
+        weights = np.isfinite(y_new).astype(np.float64)
+        t = np.arange(self.n_time_, self.n_time_ + n_new, dtype=np.float64)
+
+        xtx, xty = normal_equations([np.ones(n_new), t], np.nan_to_num(y_new), weights)
+        self.xtx_ = self.xtx_ + xtx
+        self.xty_ = self.xty_ + xty
+        self.count_ = self.count_ + weights.sum(axis=1)
+        self.n_time_ += n_new
+
+        self.coef_ = solve_normal(self.xtx_, self.xty_)
+        self.coef_[self.count_ < 2] = np.nan
+        return self
+
+    def predict(self, horizon: int) -> np.ndarray:
+        t = np.arange(self.n_time_, self.n_time_ + horizon, dtype=np.float64)
+        return self.coef_[:, :1] + self.coef_[:, 1:] * t
+
+    def residuals(self, y: np.ndarray) -> np.ndarray:
+        t = np.arange(self.n_time_ - y.shape[1], self.n_time_, dtype=np.float64)
+        return y - (self.coef_[:, :1] + self.coef_[:, 1:] * t)
+
+    def simulate(self, forecasts: np.ndarray, shocks: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        # Errors around a fixed line do not accumulate.
+        return shocks + forecasts.astype(shocks.dtype)[:, None, :]
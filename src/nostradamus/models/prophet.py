@@ -0,0 +1,93 @@
+"""
+Prophet model wrapper.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .base import LocalModel
+
+
+class ProphetModel(LocalModel):
+    """
+    Facebook Prophet fitted per series.
+
+    Timestamps come from the panel index when the data had one; otherwise a
+    regular index with frequency ``freq`` is assumed. The fitted state of
+    each series is Prophet's own JSON serialization, stored as bytes so it
+    travels back from worker processes without pickling model objects.
+
+    Prophet has no recursive form, so :meth:`update` refits on the extended
+    history, warm-starting the optimizer from the previous parameters; this
+    typically converges in a fraction of the iterations of a cold fit.
+
+    Args:
+        freq: Pandas frequency of the series, used for the future dates
+        **prophet_params: Keyword arguments forwarded to ``Prophet``
+    """
+
+    name = 'prophet'
+    cost = 1000
+
+    def __init__(self, freq: str = 'D', **prophet_params: Any):
+        self.freq = freq
+        self.prophet_params = prophet_params
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'freq': self.freq, **self.prophet_params}
+
+    def _dates(self, n_time: int) -> Any:
+        import pandas as pd
+        if isinstance(self.index, pd.DatetimeIndex) and len(self.index) == n_time:
+            return self.index
+        return pd.date_range('2000-01-01', periods=n_time, freq=self.freq)
+
+    def _fit_frame(self, frame: Any, init: Optional[Dict[str, Any]] = None) -> Optional[bytes]:
+        try:
+            from prophet import Prophet
+            from prophet.serialize import model_to_json
+        except ImportError as e:
+            raise ImportError("ProphetModel requires prophet: pip install prophet") from e
+
+        logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+        frame = frame.dropna()
+        if len(frame) < 2:
+            return None
+        model = Prophet(**self.prophet_params)
+        if init is None:
+            model.fit(frame)
+        else:
+            model.fit(frame, init=init)
+        return model_to_json(model).encode('utf-8')
+
+    def fit_series(self, y: np.ndarray) -> Optional[bytes]:
+        import pandas as pd
+        return self._fit_frame(pd.DataFrame({'ds': self._dates(len(y)), 'y': y}))
+
+    def update_series(self, y_new: np.ndarray, state: Optional[bytes]) -> Optional[bytes]:
+        if state is None:
+            return None
+        import pandas as pd
+        from prophet.serialize import model_from_json
+
+        old = model_from_json(state.decode('utf-8'))
+        history = old.history[['ds', 'y']]
+        dates = pd.date_range(history['ds'].iloc[-1], periods=len(y_new) + 1, freq=self.freq)[1:]
+        frame = pd.concat([history, pd.DataFrame({'ds': dates, 'y': y_new})], ignore_index=True)
+        init = {
+            name: float(old.params[name][0][0]) if name in ('k', 'm', 'sigma_obs')
+            else old.params[name][0]
+            for name in ('k', 'm', 'sigma_obs', 'delta', 'beta')
+        }
+        return self._fit_frame(frame, init=init)
+
+    def forecast_series(self, state: Optional[bytes], horizon: int) -> np.ndarray:
+        if state is None:
+            return np.full(horizon, np.nan)
+        from prophet.serialize import model_from_json
+
+        model = model_from_json(state.decode('utf-8'))
+        future = model.make_future_dataframe(periods=horizon, freq=self.freq, include_history=False)
+        return model.predict(future)['yhat'].to_numpy(dtype=np.float64)
@@ -0,0 +1,634 @@
+"""
+Exponential smoothing (ETS) and Theta models fitted in batch.
+
+Every series gets its own smoothing parameters, but they are optimized for
+the whole panel at once: the smoothing recursion runs over time steps with
+the state of every series (and of several candidate parameter sets per
+series) held in arrays, so one pass over the history scores all of them.
+"""
+
+from itertools import product
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ._batch import normal_equations, solve_normal
+from .base import BaseModel
+
+# Series optimized together; bounds the memory of the candidate states.
+CHUNK_SERIES = 65536
+
+# The parameter search runs in single precision, which halves the memory
+# traffic of the recursion; the final pass with the chosen parameters runs
+# in double precision.
+SEARCH_DTYPE = np.float32
+
+# Search box of the smoothing parameters. The trend and seasonal rates are
+# searched as fractions of their admissible range (``beta <= alpha`` and
+# ``gamma <= 1 - alpha``).
+ALPHA_BOUNDS = (0.01, 0.99)
+FRACTION_BOUNDS = (0.01, 0.99)
+PHI_BOUNDS = (0.8, 0.98)
+
+
+class ExponentialSmoothingModel(BaseModel):
+    """
+    Additive exponential smoothing: simple, Holt, damped trend or Holt-Winters.
+
+    The model is written in its error-correction form, with one-step error
+    ``e_t = y_t - (l + phi * b + s_t)``::
+
+        l <- l + phi * b + alpha * e_t
+        b <- phi * b + beta * e_t
+        s_t <- s_t + gamma * e_t
+
+    Initial states come from the first observations (seasonal indices from
+    the complete cycles of the history). The parameters minimize the sum of
+    squared one-step errors, by a compass search run for all series at
+    once: every iteration evaluates the ``2 * n_params`` neighbours of each
+    series' current point in a single pass over the history, and series
+    whose step has shrunk below ``tol`` drop out of the batch. Gaps are
+    skipped by the recursion.
+
+    :meth:`update` runs the recursion over the new observations with the
+    fitted parameters, without optimizing them again.
+
+    Args:
+        trend: Include an additive trend
+        damped: Damp the trend by ``phi`` (optimized within
+            ``[0.8, 0.98]``)
+        season_length: Period of the additive seasonality; ``1`` for none
+        max_iter: Most compass search iterations
+        tol: Smallest search step, relative to the parameter ranges
+    """
+
+    name = 'ets'
+    cost = 5
+    state_attrs = ('alpha_', 'beta_', 'gamma_', 'phi_', 'level_', 'trend_', 'season_', 'n_time_')
+
+    # Constructor arguments fixed by a subclass, left out of ``get_params``.
+    _fixed: Dict[str, Any] = {}
+
+    def __init__(
+        self,
+        trend: bool = False,
+        damped: bool = False,
+        season_length: int = 1,
+        max_iter: int = 60,
+        tol: float = 1e-3,
+    ):
+        if season_length < 1:
+            raise ValueError("season_length must be at least 1")
+        if damped and not trend:
+            raise ValueError("a damped model needs a trend")
+        self.trend = trend
+        self.damped = damped
+        self.season_length = season_length
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def get_params(self) -> Dict[str, Any]:
+        params = {
+            'trend': self.trend,
+            'damped': self.damped,
+            'season_length': self.season_length,
+            'max_iter': self.max_iter,
+            'tol': self.tol,
+        }
+        return {k: v for k, v in params.items() if k not in self._fixed}
+
+    def _bounds(self) -> np.ndarray:
+        """Search box, one row per optimized parameter."""
+        bounds = [ALPHA_BOUNDS]
+        if self.trend:
+            bounds.append(FRACTION_BOUNDS)
+        if self.season_length > 1:
+            bounds.append(FRACTION_BOUNDS)
+        if self.damped:
+            bounds.append(PHI_BOUNDS)
+        return np.array(bounds)
+
+    def _parameters(self, x: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """``alpha, beta, gamma, phi`` from points of the search box (last axis)."""
+        alpha = x[..., 0]
+        k = 1
+        beta = gamma = np.zeros_like(alpha)
+        phi = np.ones_like(alpha)
+        if self.trend:
+            beta = alpha * x[..., k]
+            k += 1
+        if self.season_length > 1:
+            gamma = (1 - alpha) * x[..., k]
+            k += 1
+        if self.damped:
+            phi = x[..., k]
+        return alpha, beta, gamma, phi
+
+    def fit(self, y: np.ndarray) -> 'ExponentialSmoothingModel':
+        n_series, n_time = y.shape
+        m = self.season_length
+        self.alpha_, self.beta_, self.gamma_ = (np.empty(n_series) for _ in range(3))
+        self.phi_ = np.ones(n_series)
+        self.level_ = np.empty(n_series)
+        self.trend_ = np.zeros(n_series)
+        self.season_ = np.zeros((n_series, m))
+        self.n_time_ = n_time
+
+        bounds = self._bounds()
+        for start in range(0, n_series, CHUNK_SERIES):
+            rows = slice(start, start + CHUNK_SERIES)
+            block = y[rows]
+            values, observed = observations(block)
+            search = values.astype(SEARCH_DTYPE)
+            first, level, trend, season = initial_states(block, m, self.trend)
+
+            def sse(subset: np.ndarray, x: np.ndarray) -> np.ndarray:
+                if len(subset) == len(first):
+                    subset = slice(None)
+                states = _broadcast_states(level[subset], trend[subset] if self.trend else None,
+                                           season[:, subset], x.shape[1], SEARCH_DTYPE)
+                params = self._parameters(x.transpose(1, 0, 2))
+                return smooth(search[:, subset], observed[:, subset], first[subset], states, params)[0].T
+
+            x = minimize_box(sse, len(first), bounds, self.max_iter, self.tol)
+            params = self._parameters(x[None])
+            states = _broadcast_states(level, trend if self.trend else None, season, 1)
+            _, (level, trend, season) = smooth(values, observed, first, states, params)
+
+            for out, value in zip((self.alpha_, self.beta_, self.gamma_, self.phi_), params):
+                out[rows] = value[0]
+            self.level_[rows] = level[0]
+            self.trend_[rows] = trend[0]
+            self.season_[rows] = season[:, 0].T
+        return self
+
+    def _params(self, rows: Any = slice(None)) -> Tuple[np.ndarray, ...]:
+        return tuple(p[None, rows] for p in (self.alpha_, self.beta_, self.gamma_, self.phi_))
+
+    def update(self, y_new: np.ndarray) -> 'ExponentialSmoothingModel':
+        states = _broadcast_states(self.level_, self.trend_ if self.trend else None, self.season_.T, 1)
+        started = np.zeros(len(y_new), dtype=np.int64)
+        _, (level, trend, season) = smooth(
+            *observations(y_new), started, states, self._params(), t0=self.n_time_
+        )
+        self.level_, self.trend_ = level[0], trend[0]
+        self.season_ = np.ascontiguousarray(season[:, 0].T)
+        self.n_time_ += y_new.shape[1]
+        return self
+
+    def predict(self, horizon: int) -> np.ndarray:
+        steps = np.arange(1, horizon + 1)
+        # phi + phi^2 + ... + phi^h
+        damping = np.cumsum(self.phi_[:, None] ** steps, axis=1)
+        phases = (self.n_time_ + steps - 1) % self.season_length
+        return self.level_[:, None] + damping * self.trend_[:, None] + self.season_[:, phases]
+
+    def residuals(self, y: np.ndarray) -> np.ndarray:
+        out = np.empty(y.shape)
+        for start in range(0, len(y), CHUNK_SERIES):
+            rows = slice(start, start + CHUNK_SERIES)
+            first, level, trend, season = initial_states(y[rows], self.season_length, self.trend)
+            errors = np.empty((y.shape[1], len(first)))
+            states = _broadcast_states(level, trend if self.trend else None, season, 1)
+            smooth(*observations(y[rows]), first, states, self._params(rows), errors=errors)
+            out[rows] = errors.T
+        return out
+
+    def simulate(self, forecasts: np.ndarray, shocks: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        alpha, beta, gamma, phi = (
+            p[rows, None].astype(shocks.dtype) for p in (self.alpha_, self.beta_, self.gamma_, self.phi_)
+        )
+        return simulate_smoothing(
+            forecasts, shocks, alpha, beta, gamma, phi, self.season_length, self.n_time_
+        )
+
+
+class SimpleExponentialSmoothingModel(ExponentialSmoothingModel):
+    """Simple exponential smoothing: a level without trend or seasonality."""
+
+    name = 'ses'
+    cost = 2
+    _fixed = {'trend': False, 'damped': False, 'season_length': 1}
+
+    def __init__(self, max_iter: int = 60, tol: float = 1e-3):
+        super().__init__(**self._fixed, max_iter=max_iter, tol=tol)
+
+
+class HoltModel(ExponentialSmoothingModel):
+    """Holt's linear trend method, optionally damped."""
+
+    name = 'holt'
+    _fixed = {'trend': True, 'season_length': 1}
+
+    def __init__(self, damped: bool = False, max_iter: int = 60, tol: float = 1e-3):
+        super().__init__(**self._fixed, damped=damped, max_iter=max_iter, tol=tol)
+
+
+class DampedTrendModel(ExponentialSmoothingModel):
+    """Holt's method with a damped trend, flattening out over the horizon."""
+
+    name = 'damped'
+    _fixed = {'trend': True, 'damped': True}
+
+    def __init__(self, season_length: int = 1, max_iter: int = 60, tol: float = 1e-3):
+        super().__init__(**self._fixed, season_length=season_length, max_iter=max_iter, tol=tol)
+
+
+class HoltWintersModel(ExponentialSmoothingModel):
+    """Additive Holt-Winters: level, trend and a seasonal cycle."""
+
+    name = 'holt_winters'
+    _fixed = {'trend': True}
+
+    def __init__(self, season_length: int = 7, damped: bool = False, max_iter: int = 60, tol: float = 1e-3):
+        super().__init__(**self._fixed, damped=damped, season_length=season_length, max_iter=max_iter, tol=tol)
+
+
+class ThetaModel(BaseModel):
+    """
+    The Theta method, as simple exponential smoothing with drift.
+
+    Forecasts combine the simple exponential smoothing of the series with
+    half the slope ``b`` of its least-squares line (Hyndman & Billah,
+    2003)::
+
+        y_{T+h} = l_T + b / 2 * (h - 1 + 1 / alpha - (1 - alpha)^n / alpha)
+
+    With ``season_length > 1`` the series is first adjusted by additive
+    seasonal indices, added back to the forecasts. The smoothing parameter
+    is optimized for all series at once as in
+    :class:`ExponentialSmoothingModel`; the least-squares sums are kept, so
+    :meth:`update` only smooths the new observations.
+
+    Args:
+        season_length: Period of the seasonal adjustment; ``1`` for none
+        max_iter: Most search iterations for ``alpha``
+        tol: Smallest search step for ``alpha``
+    """
+
+    name = 'theta'
+    cost = 2
+    state_attrs = ('alpha_', 'level_', 'season_', 'xtx_', 'xty_', 'count_', 'n_time_')
+
+    def __init__(self, season_length: int = 1, max_iter: int = 60, tol: float = 1e-3):
+        if season_length < 1:
+            raise ValueError("season_length must be at least 1")
+        self.season_length = season_length
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'season_length': self.season_length, 'max_iter': self.max_iter, 'tol': self.tol}
+
+    def _adjusted(self, y: np.ndarray, t0: int = 0) -> np.ndarray:
+        phases = (t0 + np.arange(y.shape[1])) % self.season_length
+        return y - self.season_[:, phases]
+
+    def fit(self, y: np.ndarray) -> 'ThetaModel':
+        n_series, n_time = y.shape
+        self.season_ = seasonal_indices(y, self.season_length)
+        self.alpha_ = np.empty(n_series)
+        self.level_ = np.empty(n_series)
+        self.xtx_ = np.zeros((n_series, 2, 2))
+        self.xty_ = np.zeros((n_series, 2))
+        self.count_ = np.zeros(n_series)
+        self.n_time_ = 0
+
+        z = self._adjusted(y)
+        bounds = np.array([ALPHA_BOUNDS])
+        for start in range(0, n_series, CHUNK_SERIES):
+            rows = slice(start, start + CHUNK_SERIES)
+            values, observed = observations(z[rows])
+            search = values.astype(SEARCH_DTYPE)
+            first, level, _, _ = initial_states(z[rows], 1, False)
+
+            def sse(subset: np.ndarray, x: np.ndarray) -> np.ndarray:
+                if len(subset) == len(first):
+                    subset = slice(None)
+                states = _broadcast_states(level[subset], None, None, x.shape[1], SEARCH_DTYPE)
+                params = _ses(x[..., 0].T)
+                return smooth(search[:, subset], observed[:, subset], first[subset], states, params)[0].T
+
+            alpha = minimize_box(sse, len(first), bounds, self.max_iter, self.tol)[:, 0]
+            states = _broadcast_states(level, None, None, 1)
+            _, (level, _, _) = smooth(values, observed, first, states, _ses(alpha[None]))
+            self.alpha_[rows] = alpha
+            self.level_[rows] = level[0]
+        self._accumulate(z)
+        return self
+
+    def _accumulate(self, z: np.ndarray) -> None:
+        """Add the least-squares sums of the adjusted values ``z``."""
+        n_new = z.shape[1]
+        weights = np.isfinite(z).astype(np.float64)
+        t = np.arange(self.n_time_, self.n_time_ + n_new, dtype=np.float64)
+        xtx, xty = normal_equations([np.ones(n_new), t], np.nan_to_num(z), weights)
+        self.xtx_ = self.xtx_ + xtx
+        self.xty_ = self.xty_ + xty
+        self.count_ = self.count_ + weights.sum(axis=1)
+        self.n_time_ += n_new
+
+    def update(self, y_new: np.ndarray) -> 'ThetaModel':
+        z = self._adjusted(y_new, self.n_time_)
+        states = _broadcast_states(self.level_, None, None, 1)
+        started = np.zeros(len(z), dtype=np.int64)
+        _, (level, _, _) = smooth(*observations(z), started, states, _ses(self.alpha_[None]))
+        self.level_ = level[0]
+        self._accumulate(z)
+        return self
+
+    def predict(self, horizon: int) -> np.ndarray:
+        slope = solve_normal(self.xtx_, self.xty_)[:, 1]
+        slope[self.count_ < 2] = 0.0
+        alpha = self.alpha_[:, None]
+        steps = np.arange(1, horizon + 1)
+        drift = steps - 1 + (1 - (1 - alpha) ** self.count_[:, None]) / alpha
+        phases = (self.n_time_ + steps - 1) % self.season_length
+        return self.level_[:, None] + slope[:, None] / 2 * drift + self.season_[:, phases]
+
+    def residuals(self, y: np.ndarray) -> np.ndarray:
+        z = self._adjusted(y, self.n_time_ - y.shape[1])
+        first, level, _, _ = initial_states(z, 1, False)
+        errors = np.empty((y.shape[1], len(y)))
+        states = _broadcast_states(level, None, None, 1)
+        smooth(*observations(z), first, states, _ses(self.alpha_[None]), errors=errors)
+        return errors.T
+
+    def simulate(self, forecasts: np.ndarray, shocks: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        # The drift and seasonal adjustment are fixed; only the level moves.
+        alpha = self.alpha_[rows, None].astype(shocks.dtype)
+        zero = np.zeros_like(alpha)
+        return simulate_smoothing(forecasts, shocks, alpha, zero, zero, zero + 1, 1, self.n_time_)
+
+
+def _ses(alpha: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Smoothing parameters of simple exponential smoothing."""
+    zero = np.zeros_like(alpha)
+    return alpha, zero, zero, zero + 1
+
+
+def seasonal_indices(y: np.ndarray, m: int) -> np.ndarray:
+    """
+    Additive seasonal indices of every series, of shape ``(n_series, m)``.
+
+    Each complete cycle (aligned on the panel's time axis) is centred on
+    its mean and the deviations are averaged phase by phase; the indices
+    sum to zero. Series without a complete cycle get zeros.
+    """
+    n_series, n_time = y.shape
+    if m == 1:
+        return np.zeros((n_series, 1))
+    n_cycles = n_time // m
+    cycles = y[:, :n_cycles * m].reshape(n_series, n_cycles, m)
+    complete = np.isfinite(cycles).all(axis=2)
+    deviations = cycles - cycles.mean(axis=2, keepdims=True)
+    deviations[~complete] = 0.0
+    count = complete.sum(axis=1)[:, None]
+    indices = deviations.sum(axis=1) / np.maximum(count, 1)
+    return indices - indices.mean(axis=1, keepdims=True)
+
+
+def initial_states(y: np.ndarray, m: int, trend: bool) -> Tuple[np.ndarray, ...]:
+    """
+    Starting point of the smoothing recursion for every series.
+
+    The level and trend come from the means of the first two windows of
+    seasonally adjusted observations (of ``max(m, 4)`` steps with a trend,
+    ``m`` without), so that ``level + trend`` is the expected first
+    observation.
+
+    Returns:
+        Index of each series' first observation (``n_time`` if none), the
+        level, the trend (zeros without one) and the seasonal indices of
+        shape ``(m, n_series)``
+    """
+    n_series, n_time = y.shape
+    finite = np.isfinite(y)
+    first = np.where(finite.any(axis=1), finite.argmax(axis=1), n_time)
+    season = seasonal_indices(y, m)
+
+    w = max(m, 4) if trend else m
+    steps = first[:, None] + np.arange(2 * w)
+    inside = steps < n_time
+    steps = np.minimum(steps, n_time - 1)
+    window = np.take_along_axis(y, steps, axis=1) - season[np.arange(n_series)[:, None], steps % m]
+    window[~inside] = np.nan
+
+    def mean(values: np.ndarray) -> np.ndarray:
+        ok = np.isfinite(values)
+        return np.where(ok.any(axis=1), np.where(ok, values, 0).sum(axis=1) / np.maximum(ok.sum(axis=1), 1), np.nan)
+
+    head = mean(window[:, :w])
+    if not trend:
+        return first, head, np.zeros(n_series), season.T.copy()
+    slope = (mean(window[:, w:]) - head) / w
+    slope = np.where(np.isfinite(slope), slope, 0.0)
+    # ``head`` is the level at the middle of the first window.
+    level = head - slope * (w + 1) / 2
+    return first, level, slope, season.T.copy()
+
+
+def _broadcast_states(
+    level: np.ndarray, trend: Optional[np.ndarray], season: Optional[np.ndarray], k: int, dtype: Any = np.float64,
+) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Copies of the states for ``k`` candidate parameter sets per series.
+
+    Candidates come first, ``(k, n_series)``, so that every operation of
+    the recursion runs along the series axis.
+    """
+    level = np.repeat(level[None].astype(dtype), k, axis=0)
+    if trend is not None:
+        trend = np.repeat(trend[None].astype(dtype), k, axis=0)
+    if season is not None and len(season) > 1:
+        season = np.repeat(season[:, None].astype(dtype), k, axis=1)
+    else:
+        season = None
+    return level, trend, season
+
+
+def observations(y: np.ndarray, dtype: Any = np.float64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Values (zero for gaps) and observed mask of a panel, for :func:`smooth`.
+
+    Both are transposed to ``(n_time, n_series)``, so that every time step
+    is contiguous. The recursion runs in the dtype of the values.
+    """
+    observed = np.ascontiguousarray(np.isfinite(y).T)
+    return np.where(observed, y.T, 0.0).astype(dtype, copy=False), observed
+
+
+def smooth(
+    values: np.ndarray,
+    observed: np.ndarray,
+    first: np.ndarray,
+    states: Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]],
+    params: Sequence[np.ndarray],
+    t0: int = 0,
+    errors: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Run the smoothing recursion over time for every series and candidate.
+
+    Args:
+        values, observed: Observations and their mask (see
+            :func:`observations`)
+        first: Step of each series' first observation; the trend only
+            starts moving the level from there
+        states: Level and trend of shape ``(k, n_series)`` and seasonal
+            indices of shape ``(m, k, n_series)`` (``None`` when absent),
+            updated in place
+        params: ``alpha, beta, gamma, phi``, each broadcastable to
+            ``(k, n_series)``
+        t0: Time step of the first observations, giving the seasonal phase
+        errors: Optional ``(n_time, n_series)`` output for the one-step
+            errors of the first candidate (``NaN`` for gaps)
+
+    Returns:
+        Sum of squared one-step errors, shape ``(k, n_series)``, and the
+        final level, trend and seasonal states (zeros where absent)
+    """
+    level, trend, season = states
+    alpha, beta, gamma, phi = (np.asarray(p, dtype=values.dtype) for p in params)
+    m = 1 if season is None else len(season)
+    # Series never observed keep a NaN level, left out of the recursion.
+    empty = np.isnan(level[0])
+    level[:, empty] = 0.0
+    late = int(first.max(initial=0))
+
+    sse = np.zeros(level.shape, dtype=values.dtype)
+    e = np.empty(level.shape, dtype=values.dtype)
+    for t in range(len(values)):
+        forecast = level
+        if trend is not None:
+            damped = phi * trend
+            forecast = level + damped
+        if season is not None:
+            seasonal = season[(t0 + t) % m]
+            forecast = forecast + seasonal
+        np.subtract(values[t], forecast, out=e)
+        e *= observed[t]
+        if errors is not None:
+            errors[t] = np.where(observed[t], e[0], np.nan)
+        sse += e * e
+        if trend is None:
+            level = level + alpha * e
+        elif t < late:
+            # Before its first observation a series has no trend yet.
+            started = t >= first
+            level = np.where(started, level + damped + alpha * e, level)
+            trend = np.where(started, damped + beta * e, trend)
+        else:
+            level = level + damped + alpha * e
+            trend = damped + beta * e
+        if season is not None:
+            seasonal += gamma * e
+
+    level[:, empty] = np.nan
+    shape = level.shape
+    return sse, (
+        level,
+        np.zeros(shape) if trend is None else trend,
+        np.zeros((1,) + shape) if season is None else season,
+    )
+
+
+def minimize_box(
+    objective: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    n_series: int,
+    bounds: np.ndarray,
+    max_iter: int = 60,
+    tol: float = 1e-3,
+) -> np.ndarray:
+    """
+    Minimize one objective per series over a box, for all series at once.
+
+    A coarse grid picks each series' starting point, then a compass search
+    moves it to the best of its ``2 * d`` neighbours ``x +/- step`` along
+    each axis, or halves its step when none is better. Series stop once
+    their step is below ``tol``.
+
+    Args:
+        objective: ``objective(rows, x)`` returns the values of shape
+            ``(len(rows), k)`` of the series ``rows`` at the points ``x`` of
+            shape ``(len(rows), k, d)``
+        n_series: Number of series
+        bounds: ``(d, 2)`` lower and upper bounds
+        max_iter: Most search iterations
+        tol: Smallest step, relative to the width of the box
+
+    Returns:
+        Minimizers of shape ``(n_series, d)``
+    """
+    d = len(bounds)
+    lower, width = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+    levels = (0.1, 0.5, 0.9) if d <= 2 else (0.2, 0.8)
+    grid = np.array(list(product(levels, repeat=d)))
+    rows = np.arange(n_series)
+
+    values = objective(rows, np.broadcast_to(lower + width * grid, (n_series,) + grid.shape))
+    best = np.argmin(values, axis=1)
+    u = grid[best]
+    f = values[rows, best]
+
+    directions = np.vstack([np.eye(d), -np.eye(d)])
+    step = np.full(n_series, 0.25)
+    active = rows
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        candidates = np.clip(u[active, None, :] + step[active, None, None] * directions, 0.0, 1.0)
+        values = objective(active, lower + width * candidates)
+        j = np.argmin(values, axis=1)
+        value = values[np.arange(len(active)), j]
+        better = value < f[active] * (1 - 1e-10)
+        moved = active[better]
+        u[moved] = candidates[better, j[better]]
+        f[moved] = value[better]
+        step[active[~better]] /= 2
+        active = active[step[active] >= tol]
+    return lower + width * u
+
+
+def simulate_smoothing(
+    forecasts: np.ndarray,
+    shocks: np.ndarray,
+    alpha: np.ndarray,
+    beta: np.ndarray,
+    gamma: np.ndarray,
+    phi: np.ndarray,
+    m: int,
+    n_time: int,
+) -> np.ndarray:
+    """
+    Sample paths of an additive smoothing model around its point forecasts.
+
+    Each shock moves the level, trend and seasonal states of its path; as
+    the model is linear, only the deviations of the states from the point
+    forecast's need to be tracked.
+
+    Args:
+        forecasts: Point forecasts, shape ``(n_rows, horizon)``
+        shocks: One-step shocks, shape ``(n_rows, n_paths, horizon)``
+        alpha, beta, gamma, phi: Parameters of shape ``(n_rows, 1)``
+        m: Season length
+        n_time: Time step of the first forecast, giving the seasonal phase
+
+    Returns:
+        Paths of shape ``(n_rows, n_paths, horizon)``
+    """
+    n_rows, n_paths, horizon = shocks.shape
+    level = np.zeros((n_rows, n_paths), dtype=shocks.dtype)
+    trend = np.zeros_like(level)
+    season = np.zeros((m, n_rows, n_paths), dtype=shocks.dtype)
+    out = np.empty_like(shocks)
+    for h in range(horizon):
+        e = shocks[:, :, h]
+        seasonal = season[(n_time + h) % m]
+        damped = phi * trend
+        out[:, :, h] = forecasts[:, h, None] + level + damped + seasonal + e
+        level += damped + alpha * e
+        trend = damped + beta * e
+        if m > 1:
+            seasonal += gamma * e
+    return out
@@ -0,0 +1,168 @@
+"""
+Parallel execution
+==================
+
+Helpers to spread independent per-series work across a process pool.
+
+The panel is copied once into a :mod:`multiprocessing.shared_memory` block
+that workers attach to, so only row offsets travel through the pool's pipes.
+Series are grouped in chunks to amortize inter-process overhead; only the
+(small) per-series results are pickled back.
+"""
+
+import os
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import instrumentation
+
+# Chunks per worker: enough to balance uneven series, few enough to keep
+# the per-task overhead negligible.
+CHUNKS_PER_WORKER = 4
+
+
+def effective_n_jobs(n_jobs: Optional[int]) -> int:
+    """
+    Resolve an ``n_jobs`` setting to a number of worker processes.
+
+    ``None`` or ``1`` means serial execution, ``-1`` uses every core and
+    other negative values count back from the core count (``-2`` leaves one
+    core free).
+    """
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    cpus = os.cpu_count() or 1
+    if n_jobs < 0:
+        return max(cpus + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def chunk_bounds(n_items: int, n_jobs: int, chunksize: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split ``range(n_items)`` into contiguous ``(start, stop)`` chunks."""
+    if chunksize is None:
+        chunksize = -(-n_items // (n_jobs * CHUNKS_PER_WORKER))
+    chunksize = max(chunksize, 1)
+    return [(i, min(i + chunksize, n_items)) for i in range(0, n_items, chunksize)]
+
+
+def map_series(
+    func: Callable[..., Any],
+    values: Optional[np.ndarray] = None,
+    extra: Optional[Sequence[Any]] = None,
+    args: Tuple[Any, ...] = (),
+    n_jobs: Optional[int] = 1,
+    chunksize: Optional[int] = None,
+) -> List[Any]:
+    """
+    Apply ``func`` to every row of a panel, optionally in worker processes.
+
+    ``func`` is called as ``func(row)``, ``func(row, extra[i])`` or, without
+    ``values``, ``func(extra[i])``, followed by ``*args``. It must be
+    picklable (a module-level function or a method of a picklable object)
+    when ``n_jobs`` is greater than one.
+
+    Args:
+        func: Per-series function
+        values: Optional array of shape ``(n_series, n_time)`` shared with
+            workers
+        extra: Optional per-series values (e.g. fitted parameters), sliced
+            and pickled per chunk
+        args: Extra positional arguments passed to every call
+        n_jobs: Number of worker processes (see :func:`effective_n_jobs`)
+        chunksize: Series per task; defaults to a few chunks per worker
+
+    Returns:
+        List with one result per series, in row order
+    """
+    n_jobs = effective_n_jobs(n_jobs)
+    n_series = len(extra) if values is None else values.shape[0]
+    task = getattr(func, '__name__', type(func).__name__)
+    with instrumentation.stage('parallel.map_series', n_series, task=task, n_jobs=n_jobs):
+        if n_jobs == 1 or n_series <= 1:
+            return _apply(func, values, extra, args)
+        return _map_pool(func, values, extra, args, n_jobs, n_series, chunksize)
+
+
+def _map_pool(
+    func: Callable[..., Any],
+    values: Optional[np.ndarray],
+    extra: Optional[Sequence[Any]],
+    args: Tuple[Any, ...],
+    n_jobs: int,
+    n_series: int,
+    chunksize: Optional[int],
+) -> List[Any]:
+    """Run :func:`map_series` in a process pool."""
+    # Process pools are only set up here, so serial runs never import them.
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    bounds = chunk_bounds(n_series, n_jobs, chunksize)
+    if values is None:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(bounds))) as pool:
+            futures = [
+                pool.submit(_apply, func, None, extra[start:stop], args)
+                for start, stop in bounds
+            ]
+            return [result for future in futures for result in future.result()]
+
+    values = np.ascontiguousarray(values)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        shared = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)
+        shared[...] = values
+        del shared
+
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(bounds))) as pool:
+            futures = [
+                pool.submit(
+                    _run_chunk, func, shm.name, values.shape, values.dtype.str,
+                    start, stop,
+                    None if extra is None else extra[start:stop],
+                    args,
+                )
+                for start, stop in bounds
+            ]
+            results: List[Any] = []
+            for future in futures:
+                results.extend(future.result())
+        return results
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _apply(
+    func: Callable[..., Any],
+    values: Optional[np.ndarray],
+    extra: Optional[Sequence[Any]],
+    args: Tuple[Any, ...],
+) -> List[Any]:
+    if values is None:
+        return [func(item, *args) for item in extra]
+    if extra is None:
+        return [func(row, *args) for row in values]
+    return [func(row, item, *args) for row, item in zip(values, extra)]
+
+
+def _run_chunk(
+    func: Callable[..., Any],
+    shm_name: str,
+    shape: Tuple[int, ...],
+    dtype: str,
+    start: int,
+    stop: int,
+    extra: Optional[Sequence[Any]],
+    args: Tuple[Any, ...],
+) -> List[Any]:
+    """Worker entry point: attach to the shared panel and process one chunk."""
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        # Copy the chunk out so no view outlives the shared buffer.
+        return _apply(func, values[start:stop].copy(), extra, args)
+    finally:
+        shm.close()
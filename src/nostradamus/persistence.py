@@ -0,0 +1,177 @@
+"""
+Model persistence
+=================
+
+Fitted predictors are saved as a directory of raw ``.npy`` arrays plus a
+JSON manifest::
+
+    predictor/
+        manifest.json     # format version, model classes and parameters
+        ids.npy           # series identifiers
+        index.npy         # time index (optional)
+        values.npy        # training history (optional)
+        model/            # one directory per (sub)model
+            coef_.npy
+            ...
+            children/0/   # nested models, e.g. those selected by 'auto'
+
+No model objects are pickled: every model exposes its fitted state as plain
+arrays (see :meth:`~nostradamus.models.BaseModel.get_state`). Arrays are
+loaded with ``mmap_mode='r'``, so opening a model maps files without reading
+them and only the pages actually used are brought into memory.
+"""
+
+import importlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .models import BaseModel
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+
+def encode_params(value: Any) -> Any:
+    """Make hyperparameters JSON-serializable (tuples, nested models)."""
+    if isinstance(value, BaseModel):
+        return {'__model__': _class_path(type(value)), 'params': encode_params(value.get_params())}
+    if isinstance(value, dict):
+        return {k: encode_params(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_params(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def decode_params(value: Any) -> Any:
+    """Inverse of :func:`encode_params`."""
+    if isinstance(value, dict):
+        if '__model__' in value:
+            return _import_class(value['__model__'])(**decode_params(value['params']))
+        return {k: decode_params(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode_params(v) for v in value]
+    return value
+
+
+def save_model(model: BaseModel, path: str) -> Dict[str, Any]:
+    """
+    Write a fitted model's state under ``path``.
+
+    Args:
+        model: Fitted model
+        path: Destination directory (created)
+
+    Returns:
+        Manifest entry describing the model
+    """
+    os.makedirs(path, exist_ok=True)
+    state = model.get_state()
+    for name, array in state.items():
+        np.save(os.path.join(path, f'{name}.npy'), np.asarray(array), allow_pickle=False)
+    children = [
+        save_model(child, os.path.join(path, 'children', str(k)))
+        for k, child in enumerate(model.submodels())
+    ]
+    return {
+        'class': _class_path(type(model)),
+        'params': encode_params(model.get_params()),
+        'arrays': sorted(state),
+        'children': children,
+    }
+
+
+def load_model(path: str, entry: Dict[str, Any], mmap: bool = True) -> BaseModel:
+    """
+    Rebuild a model saved by :func:`save_model`.
+
+    Args:
+        path: Directory the model was saved to
+        entry: Manifest entry returned by :func:`save_model`
+        mmap: Memory-map the arrays instead of reading them
+
+    Returns:
+        The restored model
+    """
+    model = _import_class(entry['class'])(**decode_params(entry['params']))
+    children = [
+        load_model(os.path.join(path, 'children', str(k)), child, mmap=mmap)
+        for k, child in enumerate(entry['children'])
+    ]
+    state = {name: _load_array(path, name, mmap) for name in entry['arrays']}
+    return model.set_state(state, children)
+
+
+def write_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    """Write ``manifest.json`` with the format version."""
+    manifest = {'format_version': FORMAT_VERSION, **manifest}
+    with open(os.path.join(path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """
+    Read ``manifest.json`` and check its format version.
+
+    Raises:
+        FileNotFoundError: If ``path`` holds no saved model
+        ValueError: If the format version is not supported
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No saved model found at '{path}'")
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported model format version {manifest.get('format_version')} "
+            f"(expected {FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def save_array(path: str, name: str, array: Optional[np.ndarray]) -> bool:
+    """Save an optional array; object arrays are stored as strings."""
+    if array is None:
+        return False
+    array = np.asarray(array)
+    if array.dtype == object:
+        array = array.astype(str)
+    np.save(os.path.join(path, f'{name}.npy'), array, allow_pickle=False)
+    return True
+
+
+def _load_array(path: str, name: str, mmap: bool) -> np.ndarray:
+    return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+
+
+def _class_path(cls: type) -> str:
+    return f'{cls.__module__}:{cls.__qualname__}'
+
+
+def _import_class(path: str) -> type:
+    """
+    Resolve a class path written by :func:`_class_path`.
+
+    Manifests are data, so only model classes of :mod:`nostradamus.models`
+    are accepted; nothing else is imported.
+
+    Raises:
+        ValueError: If ``path`` does not name such a class
+    """
+    module, _, qualname = path.partition(':')
+    if module != 'nostradamus.models' and not module.startswith('nostradamus.models.'):
+        raise ValueError(f"Not a Nostradamus model class: '{path}'")
+    try:
+        obj: Any = importlib.import_module(module)
+        for part in qualname.split('.'):
+            obj = getattr(obj, part)
+    except (ImportError, AttributeError):
+        raise ValueError(f"Unknown model class: '{path}'") from None
+    if not (isinstance(obj, type) and issubclass(obj, BaseModel)):
+        raise ValueError(f"Not a Nostradamus model class: '{path}'")
+    return obj
@@ -0,0 +1,386 @@
+"""
+Plotting
+========
+
+PNG charts of forecasts, their prediction interval and the history they
+continue, fast enough to render on request (REST API, Telegram bot).
+
+A chart is never drawn with more points than it has pixels: ten years of
+daily history are first reduced to the plot width, either with
+Largest-Triangle-Three-Buckets (:func:`lttb`, keeps the visual shape of
+the line) or with the minimum and maximum of every bucket
+(:func:`minmax`, keeps every spike). Figures are rendered with the
+non-interactive Agg canvas directly, without :mod:`matplotlib.pyplot`, so
+no GUI backend is loaded and threads do not share any global figure
+state.
+
+Forecasts only depend on their data, so rendered charts are cached by a
+fingerprint of the arrays and the drawing options (:class:`ChartCache`)::
+
+    >>> cache = ChartCache()
+    >>> png = plot_forecast(result, history=panel[0], cache=cache)
+    >>> png = plot_forecast(result, history=panel[0], cache=cache)   # cached
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+from . import instrumentation
+from .cache import fingerprint
+from .results import ForecastResult
+
+DOWNSAMPLERS = ('lttb', 'minmax', 'none')
+
+HISTORY_COLOR = '#5f6b7a'
+FORECAST_COLOR = '#1f77b4'
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between
+    keeps the point forming the largest triangle with the point kept in the
+    previous bucket and the mean of the next one.
+
+    Args:
+        x: Increasing positions of the points
+        y: Values of the points (finite)
+        n_out: Points to keep
+
+    Returns:
+        Sorted indices into ``y``
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Means of every bucket from cumulative sums; the last bucket is
+    # followed by the last point.
+    sums_x = np.concatenate([[0.0], np.cumsum(x)])
+    sums_y = np.concatenate([[0.0], np.cumsum(y)])
+    counts = np.diff(edges)
+    mean_x = np.append((sums_x[edges[1:]] - sums_x[edges[:-1]]) / counts, x[-1])
+    mean_y = np.append((sums_y[edges[1:]] - sums_y[edges[:-1]]) / counts, y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area, up to sign.
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a]))
+        a = lo + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the minimum and maximum of ``n_out // 2`` equal buckets.
+
+    Args:
+        y: Values of the points (finite)
+        n_out: Points to keep (at most)
+
+    Returns:
+        Sorted, unique indices into ``y``
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    width = -(-n // (n_out // 2))
+    n_buckets = -(-n // width)
+    pad = n_buckets * width - n
+    low = np.pad(y, (0, pad), constant_values=np.inf).reshape(n_buckets, width)
+    high = np.pad(y, (0, pad), constant_values=-np.inf).reshape(n_buckets, width)
+    starts = np.arange(n_buckets) * width
+    return np.unique(np.concatenate([starts + low.argmin(axis=1), starts + high.argmax(axis=1)]))
+
+
+def downsample(x: np.ndarray, y: np.ndarray, n_out: int, method: str = 'lttb') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a line to at most about ``n_out`` points.
+
+    Missing (non-finite) values are dropped first.
+
+    Args:
+        x: Positions of the points
+        y: Values of the points
+        n_out: Points to keep
+        method: ``'lttb'``, ``'minmax'`` or ``'none'``
+
+    Returns:
+        The kept positions and values
+
+    Raises:
+        ValueError: If ``method`` is unknown
+    """
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown downsampling method {method!r}; expected one of {DOWNSAMPLERS}")
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    if method == 'lttb':
+        kept = lttb(x, y, n_out)
+    elif method == 'minmax':
+        kept = minmax(y, n_out)
+    else:
+        return x, y
+    return x[kept], y[kept]
+
+
+def envelope(x: np.ndarray, lower: np.ndarray, upper: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reduce a band to ``n_out`` buckets, keeping its outer edge.
+
+    Args:
+        x: Positions of the band
+        lower: Lower edge
+        upper: Upper edge
+        n_out: Buckets to keep
+
+    Returns:
+        The first position, lowest lower edge and highest upper edge of
+        every bucket
+    """
+    if len(x) <= n_out:
+        return x, lower, upper
+    starts = np.linspace(0, len(x), n_out, endpoint=False).astype(np.int64)
+    return x[starts], np.fmin.reduceat(lower, starts), np.fmax.reduceat(upper, starts)
+
+
+def chart_key(
+    result: ForecastResult,
+    history: Optional[np.ndarray] = None,
+    series: int = 0,
+    **options: Any,
+) -> str:
+    """
+    Cache key of a chart: fingerprints of the plotted arrays and the options.
+
+    Args:
+        result: Forecasts to plot
+        history: Observed values preceding the forecasts
+        series: Row of ``result`` to plot
+        **options: Drawing options of :func:`plot_forecast`
+    """
+    values, bounds = _row(result, series)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(fingerprint(values).encode())
+    if bounds is not None:
+        digest.update(fingerprint(bounds).encode())
+    if history is not None:
+        digest.update(fingerprint(np.asarray(history, dtype=np.float64)).encode())
+    digest.update(json.dumps([result.quantiles, options], sort_keys=True, default=repr).encode())
+    return digest.hexdigest()
+
+
+def plot_forecast(
+    result: ForecastResult,
+    history: Optional[np.ndarray] = None,
+    series: int = 0,
+    width: int = 800,
+    height: int = 400,
+    dpi: int = 100,
+    method: str = 'lttb',
+    title: Optional[str] = None,
+    cache: Optional['ChartCache'] = None,
+) -> bytes:
+    """
+    Render one series' forecast as a PNG.
+
+    The history is downsampled to the plot width before drawing; the
+    prediction interval is the band between the lowest and the highest
+    quantile of ``result``.
+
+    Args:
+        result: Forecasts, with or without quantiles
+        history: Observed values preceding the forecasts (``NaN`` for gaps)
+        series: Row of ``result`` to plot, for a multi-series result
+        width: Image width, in pixels
+        height: Image height, in pixels
+        dpi: Resolution used to size fonts and lines
+        method: Downsampling of the history, see :func:`downsample`
+        title: Optional chart title
+        cache: Cache of rendered charts, looked up before rendering
+
+    Returns:
+        The PNG image
+
+    Raises:
+        ImportError: If matplotlib is not installed
+        ValueError: If ``method`` is unknown
+    """
+    options = {'width': width, 'height': height, 'dpi': dpi, 'method': method, 'title': title}
+    key = None
+    if cache is not None:
+        key = chart_key(result, history, series, **options)
+        png = cache.get(key)
+        if png is not None:
+            return png
+
+    with instrumentation.stage('plotting.render', 1, method=method):
+        png = _render(result, history, series, **options)
+    if cache is not None:
+        cache.put(key, png)
+    return png
+
+
+def _render(
+    result: ForecastResult,
+    history: Optional[np.ndarray],
+    series: int,
+    width: int,
+    height: int,
+    dpi: int,
+    method: str,
+    title: Optional[str],
+) -> bytes:
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+    except ImportError as e:
+        raise ImportError("Charts require matplotlib: pip install matplotlib") from e
+
+    values, bounds = _row(result, series)
+    start = 0 if history is None else len(history)
+    steps = np.arange(start, start + len(values))
+
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    # About one point per horizontal pixel of the axes.
+    n_out = max(int(width * 0.85), 3)
+    if history is not None:
+        history = np.asarray(history, dtype=np.float64)
+        x, y = downsample(np.arange(len(history)), history, n_out, method)
+        ax.plot(x, y, color=HISTORY_COLOR, linewidth=1, label='history')
+    if bounds is not None and len(result.quantiles) >= 2:
+        low, high = int(np.argmin(result.quantiles)), int(np.argmax(result.quantiles))
+        x, lower, upper = envelope(steps, bounds[low], bounds[high], n_out)
+        coverage = (result.quantiles[high] - result.quantiles[low]) * 100
+        ax.fill_between(x, lower, upper, color=FORECAST_COLOR, alpha=0.2, linewidth=0,
+                        label=f'{coverage:.0f}% interval')
+    x, y = downsample(steps, values.astype(np.float64), n_out, method)
+    ax.plot(x, y, color=FORECAST_COLOR, linewidth=1.5, label='forecast')
+    if history is not None:
+        ax.axvline(start - 0.5, color='0.8', linewidth=1, linestyle='--')
+    if title:
+        ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    ax.legend(loc='upper left', frameon=False)
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def _row(result: ForecastResult, series: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Forecasts and quantiles of one series of ``result``."""
+    if result.values.ndim == 1:
+        return result.values, result.bounds
+    bounds = None if result.bounds is None else result.bounds[series]
+    return result.values[series], bounds
+
+
+class ChartCache:
+    """
+    Thread-safe LRU cache of rendered charts with a memory bound.
+
+    Keys are content fingerprints (see :func:`chart_key`), so entries never
+    go stale and need no expiry.
+
+    Args:
+        max_bytes: Memory budget; least recently used charts are evicted
+            beyond it
+        directory: Optional directory for an on-disk tier. Every chart is
+            also written there as ``<key>.png`` and memory misses fall back
+            to it, so charts survive restarts.
+
+    Attributes:
+        hits: Lookups answered from memory or disk
+        misses: Lookups that found nothing
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 ** 2, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the charts held in memory."""
+        return self._bytes
+
+    def get(self, key: str) -> Optional[bytes]:
+        """The chart stored under ``key``, or ``None``."""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                png = self._load(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key: str, png: bytes) -> None:
+        """Store a chart."""
+        with self._lock:
+            if key in self._entries:
+                return
+            self._insert(key, png)
+            if self.directory:
+                path = self._path(key)
+                tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp, 'wb') as f:
+                    f.write(png)
+                os.replace(tmp, path)
+
+    def clear(self) -> None:
+        """Drop every in-memory chart (the disk tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _insert(self, key: str, png: bytes) -> None:
+        self._entries[key] = png
+        self._bytes += len(png)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.png')
+
+    def _load(self, key: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                png = f.read()
+        except OSError:
+            return None
+        self._insert(key, png)
+        return png
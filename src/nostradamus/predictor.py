@@ -0,0 +1,424 @@
+"""
+Predictor
+=========
+
+High-level entry point of Nostradamus. A :class:`Predictor` wraps one model
+and fits it on a single series or on a whole panel of series in one
+vectorized pass.
+
+Fitted predictors can be saved to disk with :meth:`Predictor.save` and
+restored with :meth:`Predictor.load`; see :mod:`nostradamus.persistence`
+for the format.
+"""
+
+import os
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .data.panel import Panel, _is_pandas, to_panel
+from .models import BaseModel, get_model
+from .results import ForecastResult
+from .simulation import simulate_quantiles
+from . import instrumentation, persistence
+
+
+class Predictor:
+    """
+    Main class for creating and managing prediction models.
+
+    Example:
+        >>> predictor = Predictor(model='ar', order=3)
+        >>> predictor.fit(panel)              # (n_series, n_time) array
+        >>> forecasts = predictor.predict(periods=30)
+        >>> forecasts.shape
+        (n_series, 30)
+
+    Args:
+        model: Model name (``'auto'``, ``'naive'``, ``'linear'``, ``'ar'``,
+            ``'arima'``, ``'prophet'``) or a
+            :class:`~nostradamus.models.BaseModel` instance
+        **params: Hyperparameters forwarded to the model
+    """
+
+    def __init__(self, model: Any = 'auto', **params: Any):
+        self.model = model
+        self.params = params
+        self._model: Optional[BaseModel] = None
+        self._panel: Optional[Panel] = None
+        # Saved predictor directory and manifest, loaded on first use.
+        self._source: Optional[str] = None
+        self._manifest: Optional[Dict[str, Any]] = None
+        # In-sample residuals for simulated quantiles, computed on demand.
+        self._residuals: Optional[np.ndarray] = None
+
+    @property
+    def model_(self) -> Optional[BaseModel]:
+        """Fitted model (``None`` until fitted)."""
+        if self._model is None and self._source is not None:
+            self._model = persistence.load_model(
+                os.path.join(self._source, 'model'), self._manifest['model']
+            )
+        return self._model
+
+    @model_.setter
+    def model_(self, model: Optional[BaseModel]) -> None:
+        self._model = model
+
+    @property
+    def panel_(self) -> Optional[Panel]:
+        """
+        Fitted panel. A predictor loaded without its history starts from
+        an empty ``(n_series, 0)`` panel holding only later updates.
+        """
+        if self._panel is None and self._source is not None:
+            self._panel = self._load_panel()
+        return self._panel
+
+    @panel_.setter
+    def panel_(self, panel: Optional[Panel]) -> None:
+        self._panel = panel
+
+    def fit(
+        self,
+        data: Any,
+        id_col: str = 'unique_id',
+        time_col: str = 'ds',
+        value_col: str = 'y',
+        n_jobs: Optional[int] = 1,
+    ) -> 'Predictor':
+        """
+        Fit the model on every series in ``data``.
+
+        Args:
+            data: A single series, a 2-D ``(n_series, n_time)`` array or a
+                DataFrame (see :func:`~nostradamus.data.to_panel`)
+            id_col: Series identifier column for long-format DataFrames
+            time_col: Timestamp column for long-format DataFrames
+            value_col: Target column for long-format DataFrames
+            n_jobs: Worker processes for models fitted series by series
+                (ARIMA, Prophet); ``-1`` uses every core. Vectorized models
+                always run in-process.
+
+        Returns:
+            The fitted predictor
+        """
+        model = get_model(self.model, **self.params)
+        with instrumentation.stage('predictor.fit', model=model.name) as stage:
+            with instrumentation.stage('data.to_panel'):
+                self.panel_ = to_panel(data, id_col=id_col, time_col=time_col, value_col=value_col)
+            if stage is not None:
+                stage.series = self.panel_.n_series
+            self._residuals = None
+            model.n_jobs = n_jobs
+            model.index = self.panel_.index
+            with instrumentation.stage('model.fit', self.panel_.n_series, model=model.name):
+                self.model_ = model.fit(self.panel_.values)
+        return self
+
+    def update(
+        self,
+        new_observations: Any,
+        id_col: str = 'unique_id',
+        time_col: str = 'ds',
+        value_col: str = 'y',
+    ) -> 'Predictor':
+        """
+        Append new observations and update the fitted model incrementally.
+
+        Models that support it (naive, linear trend, AR, ARIMA, auto when
+        all its selected models do) update their state in time proportional
+        to the new data; the others are refitted on the extended history.
+
+        Args:
+            new_observations: Values following the fitted history. Arrays
+                are matched to series by row (``(n_series, n_new)``, or 1-D
+                for a single series); DataFrames are matched by series id
+                and series missing from them get ``NaN`` for the new steps.
+            id_col: Series identifier column for long-format DataFrames
+            time_col: Timestamp column for long-format DataFrames
+            value_col: Target column for long-format DataFrames
+
+        Returns:
+            The updated predictor
+
+        Raises:
+            RuntimeError: If the predictor has not been fitted, or must be
+                refitted but was saved without its history
+            ValueError: If the new data has the wrong number of series or
+                unknown series ids
+        """
+        self._check_fitted()
+        with instrumentation.stage('predictor.update', self.panel_.n_series, model=self.model_.name):
+            return self._update(new_observations, id_col, time_col, value_col)
+
+    def _update(self, new_observations: Any, id_col: str, time_col: str, value_col: str) -> 'Predictor':
+        self._residuals = None
+        new = to_panel(new_observations, id_col=id_col, time_col=time_col, value_col=value_col)
+        values = new.values
+        if _is_pandas(new_observations, 'DataFrame') and not self.panel_.squeeze:
+            values = self._align(new)
+        elif new.n_series != self.panel_.n_series:
+            raise ValueError(
+                f"Expected {self.panel_.n_series} series, got {new.n_series}"
+            )
+
+        try:
+            with instrumentation.stage('model.update', self.panel_.n_series, model=self.model_.name):
+                self.model_.update(values)
+            self.panel_.append(values, new_index=new.index)
+        except NotImplementedError:
+            if not self._has_history():
+                raise RuntimeError(
+                    f"{type(self.model_).__name__} cannot be updated incrementally "
+                    "and the predictor was saved without its history; "
+                    "save it with include_history=True"
+                ) from None
+            self.panel_.append(values, new_index=new.index)
+            self.model_.index = self.panel_.index
+            with instrumentation.stage('model.fit', self.panel_.n_series, model=self.model_.name):
+                self.model_ = self.model_.fit(self.panel_.values)
+        return self
+
+    def _align(self, new: Panel) -> np.ndarray:
+        """Reorder the rows of ``new`` to the fitted series order."""
+        position = {key: i for i, key in enumerate(self.panel_.ids)}
+        unknown = [key for key in new.ids if key not in position]
+        if unknown:
+            raise ValueError(f"Unknown series ids: {unknown[:5]}")
+        values = np.full((self.panel_.n_series, new.n_time), np.nan)
+        values[[position[key] for key in new.ids]] = new.values
+        return values
+
+    def predict(
+        self,
+        periods: int = 30,
+        quantiles: Optional[Sequence[float]] = None,
+        n_samples: int = 1000,
+        method: str = 'bootstrap',
+        seed: Optional[int] = None,
+    ) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Forecast ``periods`` steps for every fitted series.
+
+        With ``quantiles``, prediction intervals are estimated by simulating
+        ``n_samples`` future paths of every series from its in-sample
+        one-step residuals (see :mod:`nostradamus.simulation`).
+
+        Args:
+            periods: Forecast horizon
+            quantiles: Probabilities in ``[0, 1]`` of the forecast quantiles
+                to return, e.g. ``[0.05, 0.5, 0.95]``
+            n_samples: Paths simulated per series
+            method: ``'bootstrap'`` resamples the residuals, ``'normal'``
+                draws Gaussian shocks with their standard deviation
+            seed: Seed of the simulation, for reproducible intervals
+
+        Returns:
+            Array of shape ``(n_series, periods)``, or ``(periods,)`` when the
+            predictor was fitted on a single series. With ``quantiles``, a
+            tuple of that array and the quantiles, of shape
+            ``(n_series, len(quantiles), periods)`` (or
+            ``(len(quantiles), periods)``).
+
+        Raises:
+            RuntimeError: If the predictor has not been fitted, or quantiles
+                are requested from a predictor saved without its history
+            ValueError: If ``periods`` is not positive, or the quantiles,
+                ``n_samples`` or ``method`` are invalid
+        """
+        self._check_fitted()
+        if periods <= 0:
+            raise ValueError("periods must be positive")
+
+        model = self.model_
+        n_series = self.panel_.n_series
+        with instrumentation.stage('predictor.predict', n_series, model=model.name):
+            with instrumentation.stage('model.predict', n_series, model=model.name):
+                forecasts = model.predict(periods)
+            if quantiles is None:
+                return forecasts[0] if self.panel_.squeeze else forecasts
+
+            with instrumentation.stage('simulation.quantiles', n_series, model=model.name):
+                bounds = simulate_quantiles(
+                    model, forecasts, self._in_sample_residuals(), quantiles,
+                    n_samples=n_samples, method=method, seed=seed,
+                )
+        if self.panel_.squeeze:
+            return forecasts[0], bounds[0]
+        return forecasts, bounds
+
+    def forecast(self, periods: int = 30, quantiles: Optional[Sequence[float]] = None, **options: Any) -> ForecastResult:
+        """
+        Like :meth:`predict`, as a compact ``float32`` :class:`~nostradamus.results.ForecastResult`.
+
+        Args:
+            periods: Forecast horizon
+            quantiles: Probabilities of the forecast quantiles to include
+            **options: ``n_samples``, ``method`` and ``seed`` of :meth:`predict`
+        """
+        if quantiles is None:
+            forecasts, bounds = self.predict(periods), None
+        else:
+            forecasts, bounds = self.predict(periods, quantiles=quantiles, **options)
+        ids = None if self.panel_.squeeze else self.ids
+        return ForecastResult(forecasts, bounds, quantiles or (), ids=ids, model=self.model_.name)
+
+    def plot_predictions(
+        self,
+        periods: int = 30,
+        series: Any = 0,
+        quantiles: Optional[Sequence[float]] = (0.1, 0.9),
+        path: Optional[str] = None,
+        **options: Any,
+    ) -> bytes:
+        """
+        Chart one series' history and forecast as a PNG.
+
+        See :func:`~nostradamus.plotting.plot_forecast`; long histories are
+        downsampled to the image width before drawing.
+
+        Args:
+            periods: Forecast horizon
+            series: Position of the series, or its identifier
+            quantiles: Quantiles whose outer pair is drawn as a band
+                (``None``: forecasts only)
+            path: File the PNG is also written to
+            **options: ``width``, ``height``, ``dpi``, ``method``, ``title``
+                and ``cache`` of :func:`~nostradamus.plotting.plot_forecast`
+
+        Returns:
+            The PNG image
+        """
+        from .plotting import plot_forecast
+
+        self._check_fitted()
+        if not isinstance(series, (int, np.integer)):
+            matches = np.flatnonzero(self.ids == series)
+            if not len(matches):
+                raise KeyError(f"Unknown series {series!r}")
+            series = int(matches[0])
+        result = self.forecast(periods, quantiles=quantiles)
+        history = self.panel_.values[series] if self._has_history() else None
+        png = plot_forecast(result, history=history, series=series, **options)
+        if path is not None:
+            with open(path, 'wb') as f:
+                f.write(png)
+        return png
+
+    def _in_sample_residuals(self) -> np.ndarray:
+        """One-step residuals of the fitted history, computed once per fit."""
+        if self._residuals is None:
+            if not self._has_history():
+                raise RuntimeError(
+                    "Forecast quantiles need the training history; "
+                    "save the predictor with include_history=True"
+                )
+            self._residuals = self.model_.residuals(self.panel_.values)
+        return self._residuals
+
+    def save(self, path: str, include_history: bool = False) -> None:
+        """
+        Save the fitted predictor to the directory ``path``.
+
+        Model parameters and fitted state are written as raw ``.npy``
+        arrays, nothing is pickled. The training history is only needed to
+        refit models that cannot be updated incrementally (Prophet), so it
+        is left out by default.
+
+        Args:
+            path: Destination directory (created; existing files are
+                overwritten)
+            include_history: Also save the fitted panel values
+
+        Raises:
+            RuntimeError: If the predictor has not been fitted
+        """
+        self._check_fitted()
+        from . import __version__
+
+        os.makedirs(path, exist_ok=True)
+        panel = self.panel_
+        model = self.model_
+        has_history = include_history and self._has_history()
+        if has_history:
+            persistence.save_array(path, 'values', panel.values)
+        persistence.save_array(path, 'ids', panel.ids)
+        # The time index describes the history, so it is kept along with it.
+        has_index = has_history and _is_pandas(panel.index, 'DatetimeIndex')
+        if has_index:
+            persistence.save_array(path, 'index', panel.index.values)
+        persistence.write_manifest(path, {
+            'version': __version__,
+            'predictor': persistence.encode_params({'model': self.model, 'params': self.params}),
+            'model': persistence.save_model(model, os.path.join(path, 'model')),
+            'panel': {
+                'n_series': panel.n_series,
+                'squeeze': panel.squeeze,
+                'history': has_history,
+                'index': {
+                    'freq': panel.index.freqstr,
+                    'tz': str(panel.index.tz) if panel.index.tz else None,
+                } if has_index else None,
+            },
+        })
+
+    @classmethod
+    def load(cls, path: str) -> 'Predictor':
+        """
+        Load a predictor saved with :meth:`save`.
+
+        Only the manifest is read here; the model arrays are memory-mapped
+        when the predictor is first used, and pages are read from disk as
+        forecasts touch them. Opening many saved models is therefore cheap.
+
+        Args:
+            path: Directory passed to :meth:`save`
+
+        Returns:
+            The fitted predictor
+
+        Raises:
+            FileNotFoundError: If ``path`` holds no saved predictor
+            ValueError: If the format version is not supported
+        """
+        manifest = persistence.read_manifest(path)
+        spec = persistence.decode_params(manifest['predictor'])
+        predictor = cls(spec['model'], **spec['params'])
+        predictor._source = path
+        predictor._manifest = manifest
+        return predictor
+
+    def _load_panel(self) -> Panel:
+        meta = self._manifest['panel']
+        if meta['history']:
+            values = np.load(os.path.join(self._source, 'values.npy'), mmap_mode='c')
+        else:
+            values = np.empty((meta['n_series'], 0))
+        ids = np.load(os.path.join(self._source, 'ids.npy'))
+        index = None
+        if meta['index'] is not None:
+            import pandas as pd
+
+            index = pd.DatetimeIndex(np.load(os.path.join(self._source, 'index.npy')))
+            if meta['index']['tz']:
+                index = index.tz_localize('UTC').tz_convert(meta['index']['tz'])
+            if meta['index']['freq']:
+                index.freq = meta['index']['freq']
+        return Panel(values, ids, index=index, squeeze=meta['squeeze'])
+
+    def _has_history(self) -> bool:
+        return self._manifest is None or self._manifest['panel']['history']
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Identifiers of the fitted series, in forecast row order."""
+        self._check_fitted()
+        return self.panel_.ids
+
+    def _check_fitted(self) -> None:
+        if self._model is None and self._source is None:
+            raise RuntimeError("Predictor is not fitted yet; call fit() first")
+
+    def __repr__(self) -> str:
+        return f'Predictor(model={self.model!r})'
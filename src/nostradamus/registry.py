@@ -0,0 +1,174 @@
+"""
+Model registry
+==============
+
+A directory of named, versioned predictors, meant to sit behind the REST
+API and the Telegram bot::
+
+    registry/
+        sales/
+            LATEST        # latest version number
+            1/            # a predictor saved by Predictor.save
+            2/
+
+Versions are immutable: :meth:`ModelRegistry.register` writes to a temporary
+directory and renames it into place, so readers never see a partial model.
+Loading is lazy (see :meth:`Predictor.load <nostradamus.Predictor.load>`),
+so a service can open every registered model at startup and only page in
+the ones it actually serves.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .predictor import Predictor
+
+LATEST_FILE = 'LATEST'
+
+_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+class ModelRegistry:
+    """
+    Versioned store of fitted predictors on disk.
+
+    Example:
+        >>> registry = ModelRegistry('models/')
+        >>> registry.register('sales', predictor)
+        1
+        >>> registry.get('sales').predict(periods=30)
+
+    Args:
+        root: Registry directory (created if missing)
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._loaded: Dict[Tuple[str, int], Predictor] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, predictor: Predictor, include_history: bool = False) -> int:
+        """
+        Save ``predictor`` as the next version of ``name``.
+
+        Args:
+            name: Model name (letters, digits, ``_``, ``.`` and ``-``)
+            predictor: Fitted predictor
+            include_history: Also save the training history (see
+                :meth:`Predictor.save <nostradamus.Predictor.save>`)
+
+        Returns:
+            The new version number
+
+        Raises:
+            ValueError: If ``name`` is not a valid model name
+        """
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid model name '{name}'")
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=directory)
+        try:
+            predictor.save(tmp, include_history=include_history)
+            with self._lock:
+                version = max(self.versions(name), default=0) + 1
+                os.rename(tmp, os.path.join(directory, str(version)))
+                self._write_latest(directory, version)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return version
+
+    def load(self, name: str, version: Optional[int] = None) -> Predictor:
+        """
+        Open a registered predictor (lazily, see :meth:`Predictor.load`).
+
+        Args:
+            name: Model name
+            version: Version number (default: the latest)
+
+        Raises:
+            KeyError: If the model or version does not exist
+        """
+        _check_name(name)
+        version = self.latest(name) if version is None else version
+        path = os.path.join(self.root, name, str(version))
+        if not os.path.isdir(path):
+            raise KeyError(f"Model '{name}' has no version {version}")
+        return Predictor.load(path)
+
+    def get(self, name: str, version: Optional[int] = None) -> Predictor:
+        """
+        Like :meth:`load`, but reuse the predictor across calls.
+
+        Services should use this: each version is opened once per process,
+        and its arrays stay mapped for the following requests.
+        """
+        _check_name(name)
+        version = self.latest(name) if version is None else version
+        key = (name, version)
+        with self._lock:
+            predictor = self._loaded.get(key)
+        if predictor is None:
+            predictor = self.load(name, version)
+            with self._lock:
+                predictor = self._loaded.setdefault(key, predictor)
+        return predictor
+
+    def names(self) -> List[str]:
+        """Names of the registered models."""
+        return sorted(
+            entry for entry in os.listdir(self.root)
+            if _NAME.match(entry) and os.path.isdir(os.path.join(self.root, entry))
+        )
+
+    def versions(self, name: str) -> List[int]:
+        """
+        Registered versions of ``name``, oldest first.
+
+        Raises:
+            KeyError: If ``name`` is not a valid model name
+        """
+        _check_name(name)
+        directory = os.path.join(self.root, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(entry) for entry in os.listdir(directory) if entry.isdigit())
+
+    def latest(self, name: str) -> int:
+        """
+        Latest version of ``name``.
+
+        Raises:
+            KeyError: If no version of ``name`` is registered
+        """
+        _check_name(name)
+        try:
+            with open(os.path.join(self.root, name, LATEST_FILE), encoding='utf-8') as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            versions = self.versions(name)
+            if not versions:
+                raise KeyError(f"Unknown model '{name}'") from None
+            return versions[-1]
+
+    @staticmethod
+    def _write_latest(directory: str, version: int) -> None:
+        path = os.path.join(directory, LATEST_FILE)
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            f.write(str(version))
+        os.replace(f'{path}.tmp', path)
+
+    def __repr__(self) -> str:
+        return f'ModelRegistry(root={self.root!r})'
+
+
+def _check_name(name: str) -> None:
+    """Reject names that are not plain model names, e.g. ``'../x'``."""
+    if not isinstance(name, str) or not _NAME.match(name):
+        raise KeyError(f"Invalid model name '{name}'")
@@ -0,0 +1,284 @@
+"""
+Seasonality detection
+=====================
+
+Finds the seasonal periods of every series of a panel at once, so that
+model selection and preprocessing know which period to use without trying
+every candidate on every series.
+
+Each series is detrended with its least-squares line and zero-filled at the
+gaps. One batched real FFT per chunk of series then gives both:
+
+- the periodogram, whose local peaks propose candidate periods; and
+- the autocorrelation function (the inverse transform of the power
+  spectrum, computed as a type-I DCT since the spectrum is real and even),
+  which confirms them.
+
+Each candidate is snapped to the nearby lag whose multiples correlate best.
+Its *strength* is the rise of the autocorrelation from its lowest point
+within the period (half a period for a sinusoid) to the average over the
+period and its multiples, halved: about the share of variance the seasonal
+pattern explains for a sinusoidal pattern in noise, and close to zero for
+trends and random walks, whose autocorrelation only decays. Averaging over
+the multiples rejects the harmonics of non-sinusoidal patterns, and a
+multiple of a candidate is only preferred to it when clearly stronger.
+Series with gaps get a second transform of their observation mask, which
+corrects the autocorrelation for the missing pairs.
+
+Example:
+    >>> seasonality = detect_seasonality(panel)
+    >>> seasonality.period             # dominant period per series, 0 if none
+    >>> seasonality.common()           # e.g. [7, 365]
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from . import instrumentation
+
+# Series transformed at a time; keeps the FFT buffers to a few tens of MB.
+CHUNK_SERIES = 8192
+
+# Periodogram peaks checked against the autocorrelation, per series.
+N_CANDIDATES = 3
+
+# Cycles a period must repeat in the panel to be considered by default.
+# Random walks and slow trends often look periodic over two cycles.
+MIN_CYCLES = 3
+
+# Multiples of a candidate lag averaged when snapping it to a period and
+# when confirming it.
+HARMONICS = 3
+
+# Extra strength a multiple of a candidate period needs to be preferred to it.
+FUNDAMENTAL_MARGIN = 0.05
+
+
+@dataclass
+class Seasonality:
+    """
+    Seasonal periods detected in a panel.
+
+    Attributes:
+        periods: Array of shape ``(n_series, n_periods)`` with the detected
+            periods of every series, strongest first; ``0`` fills the slots
+            of series with fewer seasonal periods
+        strengths: Strength in ``[0, 1]`` of each entry of ``periods``
+    """
+
+    periods: np.ndarray
+    strengths: np.ndarray
+
+    @property
+    def period(self) -> np.ndarray:
+        """Dominant period of every series (``0`` if not seasonal)."""
+        return self.periods[:, 0]
+
+    @property
+    def strength(self) -> np.ndarray:
+        """Strength of the dominant period of every series."""
+        return self.strengths[:, 0]
+
+    def common(self, n: int = 2, min_share: float = 0.05) -> List[int]:
+        """
+        Most frequent dominant periods across the panel.
+
+        Args:
+            n: Maximum number of periods returned
+            min_share: Smallest fraction of all series a period must be
+                dominant in
+
+        Returns:
+            Periods, most frequent first
+        """
+        counts = Counter(self.period[self.period > 0].tolist())
+        floor = min_share * len(self.period)
+        return [int(p) for p, count in counts.most_common(n) if count >= floor]
+
+
+def detect_seasonality(
+    y: np.ndarray,
+    max_period: Optional[int] = None,
+    n_periods: int = 1,
+    threshold: float = 0.3,
+) -> Seasonality:
+    """
+    Detect the seasonal periods of every series.
+
+    Args:
+        y: Panel of shape ``(n_series, n_time)`` (``NaN`` for gaps) or a
+            single series
+        max_period: Longest period considered (default: a third of the
+            panel length, so that at least :data:`MIN_CYCLES` cycles are
+            observed; at most half of it). Series with fewer than two cycles
+            of a period are never seasonal at that period.
+        n_periods: Periods returned per series
+        threshold: Smallest strength for a period to be reported
+
+    Returns:
+        A :class:`Seasonality` with one row per series
+    """
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    n_series, n_time = y.shape
+    max_period = min(n_time // MIN_CYCLES if max_period is None else max_period, n_time // 2)
+    periods = np.zeros((n_series, n_periods), dtype=np.int64)
+    strengths = np.zeros((n_series, n_periods))
+    if max_period < 2:
+        return Seasonality(periods, strengths)
+
+    with instrumentation.stage('seasonality.detect', n_series):
+        for start in range(0, n_series, CHUNK_SERIES):
+            rows = slice(start, start + CHUNK_SERIES)
+            periods[rows], strengths[rows] = _detect(y[rows], max_period, n_periods, threshold)
+    return Seasonality(periods, strengths)
+
+
+def _detect(y: np.ndarray, max_period: int, n_periods: int, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Detect the periods of one chunk of series."""
+    import scipy.fft as fft
+
+    n_series, n_time = y.shape
+    rows = np.arange(n_series)[:, None]
+    # Zero padding to n_time + max_period + 1 keeps the lags the ACF needs
+    # free of circular wrap-around; an even length makes the DCT exact.
+    n_fft = 2 * fft.next_fast_len(-(-(n_time + max_period + 1) // 2), real=True)
+    x, observed, count = _detrend(y, n_fft)
+    power = _power(fft.rfft(x, axis=1))
+    acf = fft.dct(power, type=1, axis=1)
+    n_lags = acf.shape[1]
+
+    # Gaps leave fewer pairs at each lag: rescale those series' lags to the
+    # pair count of a gap-free series of the same length.
+    if observed is not None:
+        span = n_time - observed[:, ::-1].argmax(axis=1) - observed.argmax(axis=1)
+        gapped = np.flatnonzero(span > count)
+        if len(gapped):
+            mask = np.zeros((len(gapped), n_fft), dtype=np.float32)
+            mask[:, :n_time] = observed[gapped]
+            # The unnormalized DCT-I is n_fft times the circular correlation.
+            pairs = np.rint(fft.dct(_power(fft.rfft(mask, axis=1)), type=1, axis=1) / n_fft)
+            full = np.maximum(count[gapped, None] - np.arange(n_lags), 0)
+            acf[gapped] *= np.where(pairs > 0, full / np.maximum(pairs, 1), 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        acf /= acf[:, :1]
+    acf[~np.isfinite(acf[:, 0])] = 0.0
+
+    # Local peaks of the periodogram between periods 2 and max_period. A few
+    # passes of argmax beat a partial sort for so few candidates.
+    lo, hi = -(-n_fft // max_period), n_fft // 2
+    band = power[:, lo - 1:hi + 1]
+    slope = np.diff(band, axis=1)
+    peaks = band[:, 1:-1] * ((slope[:, :-1] >= 0) & (slope[:, 1:] <= 0))
+    k = min(N_CANDIDATES, peaks.shape[1])
+    top = np.empty((n_series, k), dtype=np.int64)
+    for j in range(k):
+        top[:, j] = peaks.argmax(axis=1)
+        found = peaks[rows[:, 0], top[:, j]]
+        peaks[rows[:, 0], top[:, j]] = -1.0
+        top[found <= 0, j] = -1
+    candidates = np.clip(np.rint(n_fft / (top + lo)).astype(np.int64), 2, max_period)
+
+    # The periodogram only locates a period to within a few lags; snap each
+    # candidate to the neighbouring lag whose multiples correlate best.
+    flat = acf.ravel()
+    base = rows[..., None] * n_lags
+    lags = np.clip(candidates[..., None] + np.arange(-1, 2), 2, max_period)
+    fit = flat[base + lags]
+    for h in range(2, HARMONICS + 1):
+        fit += np.where(h * lags <= max_period, flat[base + np.minimum(h * lags, max_period)], fit / (h - 1))
+    lag = np.take_along_axis(lags, fit.argmax(axis=2)[..., None], axis=2)[..., 0]
+
+    # A period must also correlate at its multiples: harmonics of a
+    # non-sinusoidal pattern (e.g. 3 for a weekly one) correlate at their
+    # own lag but not at twice or three times it.
+    base = base[..., 0]
+    # Multiples have fewer pairs; they are rescaled to the pair count of
+    # the period itself.
+    n_obs = count[:, None]
+    confirmed = np.zeros(lag.shape)
+    n_multiples = np.zeros(lag.shape)
+    for h in range(1, HARMONICS + 1):
+        usable = (h == 1) | (2 * h * lag <= n_obs)
+        value = flat[base + np.minimum(h * lag, n_lags - 1)] * (n_obs - lag) / np.maximum(n_obs - h * lag, 1)
+        confirmed += np.where(usable, value, 0.0)
+        n_multiples += usable
+    peak = confirmed / n_multiples
+
+    # Rise of the autocorrelation from its lowest point within the period
+    # (half a period for a sinusoid) to the period.
+    lowest = np.minimum.accumulate(acf[:, 1:max_period], axis=1).ravel()
+    trough = lowest[rows * (max_period - 1) + lag - 2]
+    strength = np.clip((peak - trough) / 2, 0.0, 1.0)
+    strength[(2 * lag > count[:, None]) | (top < 0)] = 0.0
+
+    # Prefer the fundamental: a multiple of another candidate only counts
+    # if it is clearly stronger.
+    for i in range(k):
+        for j in range(k):
+            multiple = (lag[:, j] > lag[:, i]) & (lag[:, j] % lag[:, i] == 0)
+            strength[multiple & (strength[:, j] < strength[:, i] + FUNDAMENTAL_MARGIN), j] = 0.0
+
+    # Strongest distinct periods first.
+    order = np.argsort(-strength, axis=1, kind='stable')
+    lag = np.take_along_axis(lag, order, axis=1)
+    strength = np.take_along_axis(strength, order, axis=1)
+    for j in range(1, k):
+        strength[(lag[:, :j] == lag[:, j:j + 1]).any(axis=1), j] = 0.0
+    order = np.argsort(-strength, axis=1, kind='stable')[:, :n_periods]
+    lag = np.take_along_axis(lag, order, axis=1)
+    strength = np.take_along_axis(strength, order, axis=1)
+
+    periods = np.where(strength >= threshold, lag, 0)
+    if k < n_periods:
+        pad = ((0, 0), (0, n_periods - k))
+        periods, strength = np.pad(periods, pad), np.pad(strength, pad)
+    return periods, strength
+
+
+def _detrend(y: np.ndarray, width: int) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+    """
+    Remove the least-squares line of every series and zero the gaps.
+
+    Returns:
+        The detrended values as ``float32``, zero-padded to ``width``
+        columns; the observation mask (``None`` if nothing is missing); and
+        the number of observations of every series
+    """
+    n_series, n_time = y.shape
+    t = np.arange(n_time, dtype=np.float64)
+    basis = np.stack([np.ones(n_time), t], axis=1)
+    # NaN propagates to the sums, so gaps are only looked for when present.
+    sy, sty = (y @ basis).T
+    if np.isfinite(sy).all():
+        observed, values = None, y
+        count = np.full(n_series, n_time)
+        st, stt = np.full(n_series, t.sum()), np.full(n_series, t @ t)
+    else:
+        observed = np.isfinite(y)
+        values = np.where(observed, y, 0.0)
+        count = observed.sum(axis=1)
+        st, stt = (observed.astype(np.float32) @ np.stack([t, t * t], axis=1).astype(np.float32)).T
+        sy, sty = (values @ basis).T
+    det = count * stt - st * st
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(det > 0, (count * sty - st * sy) / det, 0.0)
+        intercept = np.where(count > 0, (sy - slope * st) / np.maximum(count, 1), 0.0)
+
+    # The intercept is removed in double precision, before the cast.
+    x = np.zeros((n_series, width), dtype=np.float32)
+    head = x[:, :n_time]
+    np.subtract(values, intercept[:, None], out=head, casting='same_kind')
+    head -= np.multiply.outer(slope.astype(np.float32), t.astype(np.float32))
+    if observed is not None:
+        head[~observed] = 0.0
+    return x, observed, count
+
+
+def _power(spectrum: np.ndarray) -> np.ndarray:
+    """Squared magnitude of a complex spectrum."""
+    power = np.square(spectrum.real)
+    power += np.square(spectrum.imag)
+    return power
@@ -0,0 +1,343 @@
+"""
+Serialization
+=============
+
+Compact encodings of datasets and forecasts for the REST API, for clients
+such as the mobile app that pay for every byte they download.
+
+- :func:`negotiate` picks a media type from the ``Accept`` header and
+  falls back to JSON; :func:`negotiate_encoding` picks ``zstd`` (when the
+  ``zstandard`` package is installed) or ``gzip`` from ``Accept-Encoding``.
+- Datasets are sent as :data:`COLUMNS_TYPE` (:func:`encode_columns` /
+  :func:`decode_columns`), forecasts in the binary format of
+  :class:`~nostradamus.results.ForecastResult` (:data:`FORECAST_TYPE`).
+- Long datasets are paged with opaque cursors (:func:`encode_cursor`) that
+  name the dataset version they were issued for, so a client paging
+  through a dataset that changes meanwhile is told so instead of skipping
+  or repeating rows.
+- :func:`etag` builds weak entity tags, so clients can revalidate a
+  dataset with ``If-None-Match`` and get ``304 Not Modified``.
+
+Column format (little-endian)::
+
+    header    '<4sB3xII': b'NSTC', version, number of rows, metadata length
+    metadata  UTF-8 JSON: {"columns": [{"name": ..., "type": ...}, ...], ...}
+    padding   zeros up to a multiple of 8 bytes
+    columns   one block per column, each padded to a multiple of 8 bytes
+
+Every column is stored as integers: ``float32`` values as their bit
+patterns, ``datetime64[ms]`` timestamps as milliseconds since the epoch,
+strings (``category``) as ``int32`` codes into the column's
+``"categories"`` (``-1`` for missing). Each integer is replaced by its
+difference from the previous one, wrapping on overflow so that decoding is
+exact, and the bytes of the differences are grouped by significance (all
+lowest bytes first, then the next ones). Slowly changing series, regular
+timestamps and sorted ids thus turn into long runs of zero bytes, which
+gzip and zstd compress several times better than raw floats or JSON.
+"""
+
+import base64
+import hashlib
+import json
+import re
+import struct
+import zlib
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+JSON_TYPE = 'application/json'
+COLUMNS_TYPE = 'application/vnd.nostradamus.columns'
+FORECAST_TYPE = 'application/vnd.nostradamus.forecast'
+
+MAGIC = b'NSTC'
+VERSION = 1
+# Magic, version, number of rows, metadata length.
+_HEADER = struct.Struct('<4sB3xII')
+_ALIGN = 8
+
+# Storage integer of every column type.
+_STORAGE = {
+    'float32': np.dtype('<i4'),
+    'int64': np.dtype('<i8'),
+    'datetime64[ms]': np.dtype('<i8'),
+    'category': np.dtype('<i4'),
+}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_MEDIA_RANGE = re.compile(r'\s*([^;,\s]+)\s*((?:;[^,]*)?)')
+
+
+# -- Columns ----------------------------------------------------------------
+
+
+def encode_columns(columns: Mapping[str, Any], metadata: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """
+    Encode equally long columns in the :data:`COLUMNS_TYPE` format.
+
+    Floats are stored as ``float32``, integers and booleans as ``int64``,
+    timestamps with millisecond precision and anything else as strings.
+
+    Args:
+        columns: Column name to 1-D array (a DataFrame works too)
+        metadata: Extra JSON fields stored in the metadata block
+
+    Returns:
+        The encoded pieces, to be written one after the other
+
+    Raises:
+        ValueError: If the columns have different lengths
+    """
+    names = list(columns.keys())
+    arrays = [np.asarray(columns[name]) for name in names]
+    n_rows = len(arrays[0]) if arrays else 0
+    if any(len(array) != n_rows for array in arrays):
+        raise ValueError("Columns must have the same length")
+
+    specs: List[Dict[str, Any]] = []
+    blocks: List[Any] = []
+    for name, array in zip(names, arrays):
+        spec, integers = _to_storage(array)
+        specs.append({'name': str(name), **spec})
+        block = _shuffle(_delta(integers))
+        blocks += [block, b'\0' * (-len(block) % _ALIGN)]
+
+    meta = json.dumps({**(metadata or {}), 'columns': specs}).encode()
+    head = _HEADER.pack(MAGIC, VERSION, n_rows, len(meta)) + meta
+    return [head + b'\0' * (-len(head) % _ALIGN)] + blocks
+
+
+def decode_columns(data: Any) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Read the :data:`COLUMNS_TYPE` format.
+
+    Returns:
+        The columns (``float32``, ``int64``, ``datetime64[ms]`` or object
+        arrays of strings with ``None`` for missing) and the metadata
+
+    Raises:
+        ValueError: If ``data`` is not a column block in a known version
+    """
+    data = memoryview(data).cast('B')
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated column block")
+    magic, version, n_rows, n_meta = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a column block in a supported format")
+    offset = _HEADER.size
+    metadata = json.loads(bytes(data[offset:offset + n_meta]))
+    offset += n_meta
+    offset += -offset % _ALIGN
+
+    columns: Dict[str, np.ndarray] = {}
+    for spec in metadata.pop('columns'):
+        storage = _STORAGE.get(spec['type'])
+        if storage is None:
+            raise ValueError(f"Unknown column type {spec['type']!r}")
+        size = n_rows * storage.itemsize
+        if len(data) < offset + size:
+            raise ValueError("Truncated column block")
+        integers = np.cumsum(_unshuffle(data[offset:offset + size], storage, n_rows), dtype=storage)
+        columns[spec['name']] = _from_storage(spec, integers)
+        offset += size + (-size % _ALIGN)
+    return columns, metadata
+
+
+def _to_storage(array: np.ndarray) -> Tuple[Dict[str, Any], np.ndarray]:
+    """Type of a column and its values as storage integers."""
+    kind = array.dtype.kind
+    if kind == 'f':
+        return {'type': 'float32'}, array.astype('<f4').view('<i4')
+    if kind in 'iub':
+        return {'type': 'int64'}, array.astype('<i8')
+    if kind == 'M':
+        return {'type': 'datetime64[ms]'}, array.astype('datetime64[ms]').view('<i8')
+    missing = np.array([v is None or v != v for v in array.tolist()], dtype=bool)
+    text = array.astype(str)
+    categories = np.unique(text[~missing])
+    codes = np.where(missing, -1, np.searchsorted(categories, text)).astype('<i4')
+    return {'type': 'category', 'categories': categories.tolist()}, codes
+
+
+def _from_storage(spec: Dict[str, Any], integers: np.ndarray) -> np.ndarray:
+    kind = spec['type']
+    if kind == 'float32':
+        return integers.view('<f4')
+    if kind == 'datetime64[ms]':
+        return integers.view('datetime64[ms]')
+    if kind == 'category':
+        categories = np.array(list(spec['categories']) + [None], dtype=object)
+        return categories[integers]
+    return integers
+
+
+def _delta(integers: np.ndarray) -> np.ndarray:
+    """Differences from the previous value (the first value is kept)."""
+    out = np.empty_like(integers)
+    out[:1] = integers[:1]
+    # Integer subtraction wraps around, and the cumulative sum undoes it.
+    np.subtract(integers[1:], integers[:-1], out=out[1:])
+    return out
+
+
+def _shuffle(integers: np.ndarray) -> bytes:
+    """Bytes of ``integers`` grouped by significance, lowest first."""
+    planes = integers.view(np.uint8).reshape(len(integers), integers.itemsize)
+    return planes.T.tobytes()
+
+
+def _unshuffle(data: Any, dtype: np.dtype, n: int) -> np.ndarray:
+    planes = np.frombuffer(data, np.uint8).reshape(dtype.itemsize, n)
+    return np.ascontiguousarray(planes.T).view(dtype).reshape(n)
+
+
+# -- Negotiation ------------------------------------------------------------
+
+
+def negotiate(accept: Optional[str], offered: Sequence[str]) -> str:
+    """
+    Pick the media type of a response.
+
+    Args:
+        accept: ``Accept`` request header
+        offered: Media types the route can produce, preferred first
+
+    Returns:
+        The offered type with the highest quality in ``accept``, or the
+        first offered type (JSON) when the header is missing or accepts
+        none of them
+    """
+    if not accept:
+        return offered[0]
+    ranges = dict(_parse_header(accept))
+    best, best_q = offered[0], 0.0
+    for media_type in offered:
+        # The most specific matching range sets the quality.
+        kind = media_type.split('/')[0]
+        q = next((ranges[name] for name in (media_type, f'{kind}/*', '*/*') if name in ranges), 0.0)
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Content encodings the server can produce, preferred first."""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return ('gzip',)
+    return ('zstd', 'gzip')
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the content encoding of a response from ``Accept-Encoding``.
+
+    Returns:
+        ``'zstd'``, ``'gzip'`` or ``None`` for no compression
+    """
+    if not accept_encoding:
+        return None
+    ranges = dict(_parse_header(accept_encoding))
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = ranges.get(encoding, ranges.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _parse_header(value: str) -> List[Tuple[str, float]]:
+    """Names and quality values of a comma-separated ``Accept*`` header."""
+    entries = []
+    for name, params in _MEDIA_RANGE.findall(value):
+        q = 1.0
+        for param in params.split(';'):
+            key, _, number = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        entries.append((name.lower(), q))
+    return entries
+
+
+# -- Compression ------------------------------------------------------------
+
+
+def compressor(encoding: str) -> Any:
+    """
+    Streaming compressor for a content encoding.
+
+    Returns:
+        An object with ``compress(data)`` and ``flush()`` methods, both
+        returning the compressed bytes produced so far
+    """
+    if encoding == 'gzip':
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    if encoding == 'zstd':
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+
+def decompress(data: bytes, encoding: Optional[str]) -> bytes:
+    """Undo :func:`compressor` (``None`` returns ``data`` unchanged)."""
+    if encoding is None:
+        return data
+    if encoding == 'gzip':
+        return zlib.decompress(data, 31)
+    if encoding == 'zstd':
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+
+# -- Cursors and entity tags ------------------------------------------------
+
+
+def encode_cursor(offset: int, version: str) -> str:
+    """Opaque, URL-safe cursor for the rows from ``offset`` of a dataset version."""
+    token = json.dumps([offset, version], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """
+    Read a cursor made by :func:`encode_cursor`.
+
+    Returns:
+        The row offset and the dataset version the cursor was issued for
+
+    Raises:
+        ValueError: If ``cursor`` is malformed
+    """
+    try:
+        offset, version = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Malformed cursor") from None
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0 or not isinstance(version, str):
+        raise ValueError("Malformed cursor")
+    return offset, version
+
+
+def etag(*parts: Any) -> str:
+    """Weak entity tag of a response determined by ``parts``."""
+    digest = hashlib.blake2b(json.dumps(parts, default=repr).encode(), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``tag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = tag[2:] if tag.startswith('W/') else tag
+    candidates = (c.strip() for c in if_none_match.split(','))
+    return any((c[2:] if c.startswith('W/') else c) == opaque for c in candidates)
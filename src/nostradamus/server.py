@@ -0,0 +1,969 @@
+"""
+REST server
+===========
+
+Asyncio HTTP/1.1 server implementing the API used by the mobile app and the
+Telegram bot (``http://localhost:5000/api`` by default):
+
+==========================  ==============================================
+``GET  /api/info``          Version, author, license and status
+``GET  /api/models``        Available model types and registered models
+``POST /api/predict``       Forecast posted data, a dataset or a
+                            registered model
+``GET  /api/data/{id}``     Records of a dataset, a page at a time
+``GET  /api/metrics``       Stage timings in the Prometheus text format
+                            (with ``instrument=True``)
+==========================  ==============================================
+
+The event loop only parses requests and writes responses:
+
+- model fits run in a process pool, and reading datasets or serving saved
+  models in threads, so a long fit never blocks other clients;
+- identical requests arriving while a forecast is being computed share
+  its result instead of fitting again, and finished forecasts are kept in
+  a :class:`~nostradamus.cache.ForecastCache`;
+- response bodies are encoded incrementally and sent with chunked
+  transfer encoding, so large forecasts and datasets are never held in
+  memory as one JSON string.
+
+JSON is the default. Through the ``Accept`` header clients can ask for
+forecasts in the binary format of
+:class:`~nostradamus.results.ForecastResult` and for dataset pages as
+delta-encoded ``float32`` columns, and through ``Accept-Encoding`` for
+gzip or zstd compression (see :mod:`nostradamus.serialization`). Dataset
+pages carry an ``ETag``, so unchanged datasets are answered with
+``304 Not Modified``.
+
+Run it with ``python -m nostradamus.server --port 5000``.
+"""
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from . import instrumentation
+from .cache import ForecastCache, fingerprint, model_key
+from .models import MODELS, get_model
+from .results import ForecastResult
+from .serialization import (
+    COLUMNS_TYPE,
+    FORECAST_TYPE,
+    JSON_TYPE,
+    compressor,
+    decode_cursor,
+    encode_columns,
+    encode_cursor,
+    etag,
+    etag_matches,
+    negotiate,
+    negotiate_encoding,
+)
+
+logger = logging.getLogger(__name__)
+
+# Responses are flushed to the socket in chunks of about this size.
+CHUNK_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 ** 2
+MAX_HEADER_LINES = 100
+# Fixed-size bodies smaller than this are not worth compressing.
+MIN_COMPRESS_BYTES = 1024
+
+# Rows of a dataset page, by default and at most.
+DEFAULT_PAGE_ROWS = 50_000
+MAX_PAGE_ROWS = 1_000_000
+
+# Dataset served when a prediction request names no data.
+SAMPLE_DATASET = 'sample'
+
+# Seed of simulated prediction intervals, so repeated requests agree.
+INTERVAL_SEED = 0
+
+
+class HTTPError(Exception):
+    """Error answered with ``status`` and a JSON error body."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _fit_predict(
+    values: np.ndarray,
+    model: str,
+    params: Dict[str, Any],
+    periods: int,
+    quantiles: Optional[Tuple[float, ...]] = None,
+    instrument: bool = False,
+) -> Any:
+    """
+    Fit and forecast a panel (runs in a worker process).
+
+    With ``instrument``, returns the result and the stage events recorded
+    in the worker, for the server's recorder.
+    """
+    from .predictor import Predictor
+
+    if instrument:
+        with instrumentation.collect() as events:
+            result = _fit_predict(values, model, params, periods, quantiles)
+        return result, events
+    predictor = Predictor(model=model, **params).fit(values)
+    if quantiles is None:
+        return predictor.predict(periods)
+    return predictor.predict(periods, quantiles=quantiles, seed=INTERVAL_SEED)
+
+
+class PredictionServer:
+    """
+    Asyncio server for the Nostradamus REST API.
+
+    Example:
+        >>> server = PredictionServer(registry=ModelRegistry('models/'))
+        >>> asyncio.run(server.serve_forever())
+
+    Args:
+        host: Interface to listen on
+        port: TCP port (``0`` picks a free one, see :attr:`port`)
+        prefix: URL prefix of every route
+        registry: Optional :class:`~nostradamus.ModelRegistry` whose models
+            can be used by name
+        data_dir: Directory of datasets served by ``/data/{id}``: raw CSV
+            files (``<id>.csv`` or ``raw/<id>.csv``) or columnar stores
+            (``processed/<id>``)
+        workers: Worker processes for model fits (default: one per core)
+        executor: Executor for model fits, instead of a process pool
+        cache: Forecast cache (default: an in-memory one)
+        instrument: Record stage timings of requests and fits (see
+            :mod:`nostradamus.instrumentation`) and serve them on
+            ``/metrics``
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 5000,
+        prefix: str = '/api',
+        registry: Optional[Any] = None,
+        data_dir: Optional[str] = None,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        cache: Optional[ForecastCache] = None,
+        instrument: bool = False,
+    ):
+        self.host = host
+        self.port = port
+        self.prefix = prefix.rstrip('/')
+        self.registry = registry
+        self.data_dir = data_dir
+        self.workers = workers
+        self.cache = cache if cache is not None else ForecastCache()
+        self.instrument = instrument
+        self._own_recorder = False
+        self._executor = executor
+        self._own_executor = executor is None
+        self._inflight: Dict[Tuple[Any, ...], 'asyncio.Future[Any]'] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict['asyncio.Task[None]', asyncio.StreamWriter] = {}
+        self._routes: List[Tuple[str, str, Callable[..., Awaitable[Dict[str, Any]]]]] = [
+            ('GET', '/info', self.info),
+            ('GET', '/models', self.models),
+            ('POST', '/predict', self.predict),
+            ('GET', '/data/', self.data),
+            ('GET', '/metrics', self.metrics),
+        ]
+
+    async def start(self) -> None:
+        """Start listening; :attr:`port` holds the bound port afterwards."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_worker_context())
+        if self.instrument and not instrumentation.enabled():
+            instrumentation.enable()
+            self._own_recorder = True
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Serving on http://%s:%d%s", self.host, self.port, self.prefix)
+
+    async def close(self) -> None:
+        """Stop listening and shut the worker pool down."""
+        if self._server is not None:
+            self._server.close()
+            # Closing idle keep-alive connections ends their handlers.
+            for writer in self._connections.values():
+                writer.close()
+            if self._connections:
+                await asyncio.wait(list(self._connections))
+            await self._server.wait_closed()
+            self._server = None
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._own_recorder:
+            instrumentation.disable()
+            self._own_recorder = False
+
+    async def serve_forever(self) -> None:
+        """Start the server and run until cancelled."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def __aenter__(self) -> 'PredictionServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    # -- Routes -------------------------------------------------------------
+
+    async def info(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """``GET /info``"""
+        from . import __author__, __license__, __version__
+
+        return {
+            'version': __version__,
+            'author': __author__,
+            'license': __license__,
+            'status': 'active',
+        }
+
+    async def models(self, request: Dict[str, Any]) -> Any:
+        """``GET /models``: model types, then registered models."""
+        entries: List[Dict[str, Any]] = [
+            {
+                'id': name,
+                'name': cls.__name__[:-len('Model')] if cls.__name__.endswith('Model') else cls.__name__,
+                'description': (cls.__doc__ or '').strip().splitlines()[0],
+            }
+            for name, cls in MODELS.items()
+        ]
+        if self.registry is not None:
+            for name in await _to_thread(self.registry.names):
+                version = await _to_thread(self.registry.latest, name)
+                entries.append({
+                    'id': name,
+                    'name': name,
+                    'description': f'Registered model, version {version}',
+                    'version': version,
+                    'registered': True,
+                })
+        return entries
+
+    async def predict(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        ``POST /predict``
+
+        The JSON body may contain:
+
+        - ``periods``: forecast horizon (default 30)
+        - ``model`` and ``params``: model type and hyperparameters
+          (default ``'auto'``); or ``registered`` (and optionally
+          ``version``) to forecast with a model from the registry
+        - ``data``: one series as a list of numbers, or several as a list of
+          equally long lists (``null`` for gaps); or ``dataset`` (and
+          optionally ``series``) naming a dataset served by ``/data``.
+          Without either, the sample dataset is used.
+        - ``quantiles``: probabilities of prediction interval bounds, e.g.
+          ``[0.1, 0.9]``, answered under ``quantiles`` keyed by probability.
+          Intervals are simulated (see :mod:`nostradamus.simulation`) with
+          a fixed seed and are not cached.
+
+        With ``Accept: application/vnd.nostradamus.forecast`` the result is
+        sent in the binary format of
+        :class:`~nostradamus.results.ForecastResult` instead of JSON.
+        """
+        body = request['json']
+        periods = body.get('periods', 30)
+        if not isinstance(periods, int) or isinstance(periods, bool) or periods <= 0:
+            raise HTTPError(400, "'periods' must be a positive integer")
+        quantiles = _request_quantiles(body)
+
+        bounds = None
+        if 'registered' in body:
+            model_name = body['registered']
+            predictor = await self._registered(model_name, body.get('version'))
+            if quantiles is None:
+                forecasts = await _to_thread(predictor.predict, periods)
+            else:
+                try:
+                    forecasts, bounds = await _to_thread(
+                        predictor.predict, periods, quantiles=quantiles, seed=INTERVAL_SEED
+                    )
+                except RuntimeError as e:
+                    raise HTTPError(409, str(e)) from None
+            ids = predictor.ids
+        else:
+            model_name = body.get('model', 'auto')
+            params = body.get('params') or {}
+            if model_name not in MODELS or not isinstance(params, dict):
+                raise HTTPError(400, f"Unknown model '{model_name}'")
+            try:
+                get_model(model_name, **params)
+            except (TypeError, ValueError) as e:
+                raise HTTPError(400, f"Invalid parameters for model '{model_name}': {e}") from None
+            ids, values = await self._request_panel(body)
+            result = await self._forecast(values, model_name, params, periods, quantiles)
+            forecasts, bounds = result if quantiles is not None else (result, None)
+
+        result = ForecastResult(
+            forecasts, bounds, quantiles or (),
+            ids=None if forecasts.ndim == 1 else [_jsonable(i) for i in ids],
+            model=model_name,
+        )
+        if negotiate(request['headers'].get('accept'), (JSON_TYPE, FORECAST_TYPE)) == FORECAST_TYPE:
+            return _Binary(result.to_buffers(), FORECAST_TYPE)
+        return {**result.to_dict(), 'status': 'success'}
+
+    async def data(self, request: Dict[str, Any]) -> Any:
+        """
+        ``GET /data/{id}``: records of a dataset, a page at a time.
+
+        Query parameters:
+
+        - ``series``: series to return (repeatable; default all)
+        - ``limit``: rows per page (default :data:`DEFAULT_PAGE_ROWS`)
+        - ``cursor``: the ``nextCursor`` of the previous page. It is
+          ``null`` on the last page; a cursor issued before the dataset
+          changed is answered with 410.
+
+        JSON records are streamed row by row. With
+        ``Accept: application/vnd.nostradamus.columns`` the page is sent as
+        delta-encoded columns, with the other fields in the metadata (see
+        :mod:`nostradamus.serialization`). Every page carries an ``ETag``
+        derived from the dataset files, and ``If-None-Match`` is answered
+        with 304 without reading the dataset while they are unchanged.
+        """
+        dataset_id = request['path'][len('/data/'):]
+        query = request['query']
+        limit = _page_limit(query.get('limit'))
+        version = await _to_thread(self._dataset_version, dataset_id)
+        offset = 0
+        if 'cursor' in query:
+            try:
+                offset, issued = decode_cursor(str(query['cursor']))
+            except ValueError as e:
+                raise HTTPError(400, str(e)) from None
+            if issued != version:
+                raise HTTPError(410, "The dataset changed since the cursor was issued; start again without it")
+
+        media_type = negotiate(request['headers'].get('accept'), (JSON_TYPE, COLUMNS_TYPE))
+        request['etag'] = etag(version, query.get('series'), offset, limit, media_type)
+        if etag_matches(request['headers'].get('if-none-match'), request['etag']):
+            return _NOT_MODIFIED
+
+        page, total = await _to_thread(self._dataset_page, dataset_id, query.get('series'), offset, limit)
+        end = offset + len(page)
+        fields = {
+            'datasetId': dataset_id,
+            'nextCursor': encode_cursor(end, version) if end < total else None,
+            'total': total,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        }
+        if media_type == COLUMNS_TYPE:
+            return _Binary(await _to_thread(encode_columns, page, fields), COLUMNS_TYPE)
+        return {'datasetId': dataset_id, 'records': _Records(page), **fields}
+
+    async def metrics(self, request: Dict[str, Any]) -> '_Text':
+        """``GET /metrics``: stage totals in the Prometheus text format."""
+        recorder = instrumentation.get_recorder()
+        if recorder is None:
+            raise HTTPError(404, "Instrumentation is disabled")
+        return _Text(recorder.render_prometheus(), 'text/plain; version=0.0.4')
+
+    # -- Helpers ------------------------------------------------------------
+
+    async def _forecast(
+        self,
+        values: np.ndarray,
+        model: str,
+        params: Dict[str, Any],
+        periods: int,
+        quantiles: Optional[Tuple[float, ...]] = None,
+    ) -> Any:
+        """
+        Forecast through the cache, sharing in-flight fits of identical requests.
+
+        With ``quantiles``, returns the forecasts and their quantiles; those
+        are only shared between in-flight requests, not cached.
+        """
+        key = (fingerprint(values), model_key(model, params), periods, quantiles)
+        if quantiles is None:
+            cached = self.cache.get(key[0], key[1], periods)
+            if cached is not None:
+                return cached
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fit_in_worker(values, model, params, periods, quantiles))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            # Shielded: one client disconnecting must not cancel the fit
+            # other clients are waiting for.
+            result = await asyncio.shield(future)
+        except (TypeError, ValueError) as e:
+            raise HTTPError(400, str(e)) from None
+        if quantiles is None:
+            self.cache.put(key[0], key[1], result)
+        return result
+
+    async def _fit_in_worker(
+        self,
+        values: np.ndarray,
+        model: str,
+        params: Dict[str, Any],
+        periods: int,
+        quantiles: Optional[Tuple[float, ...]],
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        recorder = instrumentation.get_recorder()
+        if recorder is None:
+            return await loop.run_in_executor(
+                self._executor, _fit_predict, values, model, params, periods, quantiles
+            )
+        result, events = await loop.run_in_executor(
+            self._executor, _fit_predict, values, model, params, periods, quantiles, True
+        )
+        recorder.merge(events)
+        return result
+
+    async def _registered(self, name: Any, version: Any) -> Any:
+        if self.registry is None:
+            raise HTTPError(404, "No model registry configured")
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            raise HTTPError(400, "'version' must be an integer")
+        try:
+            return await _to_thread(self.registry.get, str(name), version)
+        except (KeyError, ValueError):
+            raise HTTPError(404, f"Unknown registered model '{name}'") from None
+
+    async def _request_panel(self, body: Dict[str, Any]) -> Tuple[List[Any], np.ndarray]:
+        """Series ids and values of a prediction request."""
+        if 'data' in body:
+            try:
+                values = np.array(body['data'], dtype=np.float64)
+            except (TypeError, ValueError):
+                raise HTTPError(400, "'data' must be a list of numbers or of equally long lists") from None
+            if values.ndim not in (1, 2) or values.size == 0:
+                raise HTTPError(400, "'data' must be a list of numbers or of equally long lists")
+            if values.ndim == 1:
+                return [0], values
+            return list(range(len(values))), values
+
+        from .data.panel import to_panel
+
+        frame = await self._dataset(body.get('dataset', SAMPLE_DATASET), body.get('series'))
+        panel = await _to_thread(to_panel, frame)
+        if panel.n_series == 0:
+            raise HTTPError(404, "No series found")
+        if panel.n_series == 1:
+            return list(panel.ids), panel.values[0]
+        return list(panel.ids), panel.values
+
+    async def _dataset(self, dataset_id: str, series: Any = None) -> Any:
+        if series is not None and not isinstance(series, list):
+            series = [series]
+        if dataset_id == SAMPLE_DATASET:
+            from .data import load_sample_data
+
+            frame = await _to_thread(load_sample_data, n_series=1)
+            return frame if series is None else frame[frame['unique_id'].isin(series)]
+
+        path = self._dataset_path(dataset_id)
+        if path is None:
+            raise HTTPError(404, f"Unknown dataset '{dataset_id}'")
+        from .data import load_data
+
+        try:
+            return await _to_thread(load_data, path, series=series)
+        except KeyError as e:
+            raise HTTPError(404, str(e.args[0])) from None
+
+    def _dataset_page(self, dataset_id: str, series: Any, offset: int, limit: int) -> Tuple[Any, int]:
+        """
+        Rows ``offset:offset + limit`` of a dataset and its total row count.
+
+        Only the page is read from the columnar store, so paging through a
+        long history costs one pass over it, not one per page.
+        """
+        import pandas as pd
+
+        if series is not None and not isinstance(series, list):
+            series = [series]
+        if dataset_id == SAMPLE_DATASET:
+            from .data import load_sample_data
+
+            frame = load_sample_data(n_series=1)
+            if series is not None:
+                frame = frame[frame['unique_id'].isin(series)]
+            return frame.iloc[offset:offset + limit], len(frame)
+
+        path = self._dataset_path(dataset_id)
+        if path is None:
+            raise HTTPError(404, f"Unknown dataset '{dataset_id}'")
+        from .data import open_store
+
+        store = open_store(path)
+        try:
+            total = store.count(series=series)
+            page = store.read(series=series, offset=offset, limit=limit)
+        except KeyError as e:
+            raise HTTPError(404, str(e.args[0])) from None
+        return pd.DataFrame(page), total
+
+    def _dataset_version(self, dataset_id: str) -> str:
+        """Version of a dataset, from the names, sizes and modification times of its files."""
+        if dataset_id == SAMPLE_DATASET:
+            from . import __version__
+
+            return f'{SAMPLE_DATASET}-{__version__}'
+        path = self._dataset_path(dataset_id)
+        if path is None:
+            raise HTTPError(404, f"Unknown dataset '{dataset_id}'")
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+        digest = hashlib.blake2b(digest_size=8)
+        for name in files:
+            stat = os.stat(name)
+            digest.update(f'{os.path.relpath(name, path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0'.encode())
+        return digest.hexdigest()
+
+    def _dataset_path(self, dataset_id: str) -> Optional[str]:
+        if not self.data_dir or not dataset_id or dataset_id != os.path.basename(dataset_id):
+            return None
+        # Raw files first: their converted store is reused while it is
+        # fresh, and the dataset version follows edits of the raw file.
+        candidates = [
+            os.path.join(self.data_dir, 'raw', f'{dataset_id}.csv'),
+            os.path.join(self.data_dir, f'{dataset_id}.csv'),
+            os.path.join(self.data_dir, 'processed', dataset_id),
+        ]
+        for path in candidates:
+            if os.path.exists(path):
+                return path
+        return None
+
+    # -- HTTP ---------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the requests of one connection (HTTP/1.1 keep-alive)."""
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._respond_error(writer, e, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                keep_alive = request['keep_alive']
+                try:
+                    handler = self._route(request)
+                    with instrumentation.stage('server.request', route=handler.__name__):
+                        if request['method'] == 'POST':
+                            request['json'] = _parse_json(request['body'])
+                        payload = await handler(request)
+                        await self._respond(writer, 200, payload, request)
+                except HTTPError as e:
+                    await self._respond_error(writer, e, keep_alive)
+                except Exception:
+                    logger.exception("Error handling %s %s", request['method'], request['path'])
+                    if request.get('sent'):
+                        # The status line is already out: drop the connection.
+                        break
+                    await self._respond_error(writer, HTTPError(500, "Internal server error"), keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def _route(self, request: Dict[str, Any]) -> Callable[..., Awaitable[Any]]:
+        path = request['path']
+        if not path.startswith(self.prefix + '/'):
+            raise HTTPError(404, f"Not found: {path}")
+        path = request['path'] = path[len(self.prefix):]
+        allowed = []
+        for method, route, handler in self._routes:
+            matches = path.startswith(route) and len(path) > len(route) if route.endswith('/') else path == route
+            if matches:
+                if method == request['method']:
+                    return handler
+                allowed.append(method)
+        if allowed:
+            raise HTTPError(405, f"Method {request['method']} not allowed")
+        raise HTTPError(404, f"Not found: {self.prefix}{path}")
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line") from None
+
+        headers: Dict[str, str] = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(431, "Too many headers")
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length") from None
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+
+        from urllib.parse import parse_qs, unquote, urlsplit
+
+        url = urlsplit(target)
+        query = {k: v if len(v) > 1 else v[0] for k, v in parse_qs(url.query).items()}
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        return {
+            'method': method.upper(),
+            'path': unquote(url.path),
+            'query': query,
+            'version': version,
+            'headers': headers,
+            'body': body,
+            'keep_alive': keep_alive,
+        }
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any, request: Dict[str, Any]) -> None:
+        head = [
+            f"Connection: {'keep-alive' if request['keep_alive'] else 'close'}",
+            'Vary: Accept, Accept-Encoding',
+        ]
+        if request.get('etag'):
+            head.append(f"ETag: {request['etag']}")
+        if payload is _NOT_MODIFIED:
+            _write_head(writer, 304, head)
+            request['sent'] = True
+            await writer.drain()
+            return
+
+        encoding = negotiate_encoding(request['headers'].get('accept-encoding'))
+        if isinstance(payload, (_Text, _Binary)):
+            pieces = [payload.text.encode()] if isinstance(payload, _Text) else payload.buffers
+            size = sum(len(piece) for piece in pieces)
+            if encoding is not None and size >= MIN_COMPRESS_BYTES:
+                stream = compressor(encoding)
+                pieces = [b''.join([stream.compress(piece) for piece in pieces] + [stream.flush()])]
+                size = len(pieces[0])
+                head.append(f'Content-Encoding: {encoding}')
+            head += [f'Content-Type: {payload.content_type}', f'Content-Length: {size}']
+            _write_head(writer, status, head)
+            writer.writelines(pieces)
+            request['sent'] = True
+            await writer.drain()
+            return
+
+        # JSON is compressed as it is encoded, chunk by chunk.
+        stream = None
+        head.append('Content-Type: application/json')
+        if encoding is not None:
+            stream = compressor(encoding)
+            head.append(f'Content-Encoding: {encoding}')
+        chunked = request['version'] == 'HTTP/1.1'
+        if chunked:
+            head.append('Transfer-Encoding: chunked')
+        else:
+            request['keep_alive'] = False
+        _write_head(writer, status, head)
+        request['sent'] = True
+
+        chunks = _buffered(iter_json(payload))
+        if stream is not None:
+            chunks = _compressed(chunks, stream)
+        for chunk in chunks:
+            writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+            await writer.drain()
+        if chunked:
+            writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def _respond_error(self, writer: asyncio.StreamWriter, error: HTTPError, keep_alive: bool) -> None:
+        body = json.dumps({'status': 'error', 'error': error.message}).encode()
+        head = (
+            f'HTTP/1.1 {error.status} {HTTPStatus(error.status).phrase}\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def _write_head(writer: asyncio.StreamWriter, status: int, headers: List[str]) -> None:
+    """Write the status line and ``headers`` of a response."""
+    lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}'] + headers
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+
+def _worker_context() -> Any:
+    """
+    Start method of fit workers.
+
+    Workers forked from the server would inherit the sockets of the
+    connections open at that moment and keep them open after the server
+    closes them, so clients reading to the end of a response never see it
+    end. Workers are forked from a clean server process instead, where
+    the platform has one.
+    """
+    import multiprocessing
+
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return None
+
+
+async def _to_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run blocking I/O in the loop's default thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+# -- JSON streaming ---------------------------------------------------------
+
+
+class _Rows:
+    """A 1-D or 2-D float array encoded lazily, one row at a time."""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+
+class _Text:
+    """A plain-text response body, sent as is."""
+
+    def __init__(self, text: str, content_type: str = 'text/plain'):
+        self.text = text
+        self.content_type = content_type
+
+
+class _Binary:
+    """A binary response body, written as the given buffers one after the other."""
+
+    def __init__(self, buffers: List[Any], content_type: str):
+        self.buffers = buffers
+        self.content_type = content_type
+
+
+# Returned by a route to answer ``304 Not Modified``.
+_NOT_MODIFIED = object()
+
+
+class _Records:
+    """Rows of a long-format DataFrame encoded lazily as JSON objects."""
+
+    def __init__(self, frame: Any, batch: int = 1024):
+        self.frame = frame
+        self.batch = batch
+
+
+def iter_json(obj: Any) -> Iterator[str]:
+    """
+    Encode ``obj`` as JSON piece by piece.
+
+    Besides plain JSON types this handles NumPy scalars and arrays and the
+    lazy :class:`_Rows` / :class:`_Records` wrappers. Non-finite floats
+    become ``null``.
+    """
+    if isinstance(obj, dict):
+        yield '{'
+        for k, (key, value) in enumerate(obj.items()):
+            yield f'{"," if k else ""}{json.dumps(str(key))}:'
+            yield from iter_json(value)
+        yield '}'
+    elif isinstance(obj, _Rows):
+        values = obj.values
+        if values.ndim == 1:
+            yield _float_list(values)
+        else:
+            yield '['
+            for k, row in enumerate(values):
+                yield (',' if k else '') + _float_list(row)
+            yield ']'
+    elif isinstance(obj, _Records):
+        frame, columns = obj.frame, list(obj.frame.columns)
+        yield '['
+        for start in range(0, len(frame), obj.batch):
+            part = frame.iloc[start:start + obj.batch]
+            arrays = [_column(part[col].to_numpy()) for col in columns]
+            rows = (
+                json.dumps(dict(zip(columns, values)), allow_nan=False)
+                for values in zip(*arrays)
+            )
+            yield (',' if start else '') + ','.join(rows)
+        yield ']'
+    elif isinstance(obj, (list, tuple)):
+        yield '['
+        for k, item in enumerate(obj):
+            if k:
+                yield ','
+            yield from iter_json(item)
+        yield ']'
+    elif isinstance(obj, np.ndarray):
+        yield from iter_json(_Rows(obj))
+    else:
+        yield json.dumps(_jsonable(obj), allow_nan=False)
+
+
+def _buffered(pieces: Iterator[str]) -> Iterator[bytes]:
+    """Join small JSON pieces into chunks of about :data:`CHUNK_BYTES`."""
+    buffer: List[str] = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _compressed(chunks: Iterator[bytes], stream: Any) -> Iterator[bytes]:
+    """Compress chunks as they come, skipping the empty outputs (an empty chunk ends the body)."""
+    for chunk in chunks:
+        out = stream.compress(chunk)
+        if out:
+            yield out
+    out = stream.flush()
+    if out:
+        yield out
+
+
+def _float_list(values: np.ndarray) -> str:
+    if values.dtype == np.float32:
+        # NumPy prints the shortest text that reads back as the same
+        # float32, about half as long as the float64 repr of its value.
+        text = values.astype('U16')
+        text[~np.isfinite(values)] = 'null'
+        return '[' + ','.join(text.tolist()) + ']'
+    return json.dumps(_column(values), allow_nan=False)
+
+
+def _column(values: np.ndarray) -> List[Any]:
+    """Column as JSON-ready Python values (``None`` for NaN/NaT)."""
+    if values.dtype.kind == 'f':
+        return [v if math.isfinite(v) else None for v in values.tolist()]
+    if values.dtype.kind == 'M':
+        return [None if np.isnat(v) else str(v) for v in values.astype('datetime64[s]')]
+    return [_jsonable(v) for v in values.tolist()]
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _page_limit(value: Any) -> int:
+    if value is None:
+        return DEFAULT_PAGE_ROWS
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        limit = 0
+    if not 0 < limit <= MAX_PAGE_ROWS:
+        raise HTTPError(400, f"'limit' must be an integer between 1 and {MAX_PAGE_ROWS}")
+    return limit
+
+
+def _request_quantiles(body: Dict[str, Any]) -> Optional[Tuple[float, ...]]:
+    quantiles = body.get('quantiles')
+    if quantiles is None:
+        return None
+    valid = (
+        isinstance(quantiles, list) and quantiles
+        and all(isinstance(q, (int, float)) and not isinstance(q, bool) and 0 <= q <= 1 for q in quantiles)
+    )
+    if not valid:
+        raise HTTPError(400, "'quantiles' must be a non-empty list of numbers in [0, 1]")
+    return tuple(float(q) for q in quantiles)
+
+
+def _parse_json(body: bytes) -> Dict[str, Any]:
+    if not body:
+        return {}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Request body is not valid JSON") from None
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Request body must be a JSON object")
+    return payload
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Nostradamus REST server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--prefix', default='/api')
+    parser.add_argument('--registry', help='model registry directory')
+    parser.add_argument('--data-dir', help='directory of datasets served by /data')
+    parser.add_argument('--workers', type=int, help='worker processes for model fits')
+    parser.add_argument('--metrics', action='store_true', help='record stage timings and serve /metrics')
+    args = parser.parse_args(argv)
+
+    registry = None
+    if args.registry:
+        from .registry import ModelRegistry
+
+        registry = ModelRegistry(args.registry)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = PredictionServer(
+        host=args.host,
+        port=args.port,
+        prefix=args.prefix,
+        registry=registry,
+        data_dir=args.data_dir,
+        workers=args.workers,
+        instrument=args.metrics,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
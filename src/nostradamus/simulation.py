@@ -0,0 +1,261 @@
+"""
+Simulation
+==========
+
+Probabilistic forecasts from simulated sample paths.
+
+Future paths are drawn for every series at once: shocks are resampled from
+each series' in-sample one-step residuals (``method='bootstrap'``) or drawn
+from a normal distribution with their standard deviation
+(``method='normal'``), and the model propagates them through its own
+dynamics with :meth:`~nostradamus.models.BaseModel.simulate`.
+
+Paths are never held all at once. They are generated in batches sized to
+a memory budget, over blocks of series when the panel is wide, and every
+batch only updates a :class:`StreamingQuantiles` estimate, so memory stays
+bounded whatever the number of samples::
+
+    >>> forecasts, bounds = predictor.predict(365, quantiles=[0.05, 0.5, 0.95],
+    ...                                       n_samples=10_000)
+    >>> bounds.shape
+    (n_series, 3, 365)
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models import BaseModel
+
+METHODS = ('bootstrap', 'normal')
+
+# Bytes of simulated paths (shocks, paths and draw indices) held at once.
+DEFAULT_MEMORY = 64 * 2 ** 20
+
+# Paths are transient, so they are simulated in single precision, which
+# halves the memory traffic of every batch.
+DTYPE = np.float32
+
+# Smallest batch of paths whose quantiles are merged; wide panels are
+# split into blocks of series rather than simulated in smaller batches.
+MIN_BATCH = 256
+
+# Uniform draws, draw indices, shocks, paths and their sorted copy.
+_BYTES_PER_VALUE = 20
+
+
+class StreamingQuantiles:
+    """
+    Quantile estimates updated batch by batch.
+
+    The exact quantiles of each batch of samples are folded into a running
+    average weighted by the batch size, so only one array of estimates is
+    kept however many samples are seen. The estimate converges to the true
+    quantiles as batches grow; a single batch gives exact sample quantiles.
+
+    Args:
+        quantiles: Probabilities in ``[0, 1]``
+    """
+
+    def __init__(self, quantiles: Sequence[float]):
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        self.count = 0
+        self.estimate: Optional[np.ndarray] = None
+
+    def push(self, samples: np.ndarray, axis: int = 0) -> None:
+        """
+        Fold a batch of samples into the estimate.
+
+        Args:
+            samples: Batch of samples; ``axis`` indexes the samples and the
+                other axes the quantities estimated
+            axis: Sample axis of ``samples``
+        """
+        n = samples.shape[axis]
+        if n == 0:
+            return
+        batch = sorted_quantiles(np.sort(np.moveaxis(samples, axis, -1)), self.quantiles)
+        self.count += n
+        if self.estimate is None:
+            self.estimate = batch.astype(np.float64)
+        else:
+            self.estimate += (batch - self.estimate) * (n / self.count)
+
+    @property
+    def result(self) -> np.ndarray:
+        """Current estimates, with the quantiles on the last axis."""
+        if self.estimate is None:
+            raise ValueError("No samples pushed yet")
+        return self.estimate
+
+
+def sorted_quantiles(ordered: np.ndarray, quantiles: np.ndarray) -> np.ndarray:
+    """
+    Quantiles of samples sorted along the last axis.
+
+    Same linear interpolation as ``np.quantile``, but sorting a contiguous
+    sample axis and gathering the order statistics is several times faster
+    than the partial sorts ``np.quantile`` runs on every cell. Cells holding
+    ``NaN`` (sorted last) give ``NaN``.
+
+    Returns:
+        Array of shape ``ordered.shape[:-1] + (len(quantiles),)``
+    """
+    n = ordered.shape[-1]
+    position = quantiles * (n - 1)
+    lower = np.floor(position).astype(np.intp)
+    upper = np.minimum(lower + 1, n - 1)
+    below = ordered[..., lower]
+    out = below + (ordered[..., upper] - below) * (position - lower)
+    out[np.isnan(ordered[..., -1])] = np.nan
+    return out
+
+
+def check_quantiles(quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Validate quantile probabilities.
+
+    Raises:
+        ValueError: If there are none or one lies outside ``[0, 1]``
+    """
+    q = np.asarray(quantiles, dtype=np.float64).ravel()
+    if q.size == 0 or not np.all((q >= 0) & (q <= 1)):
+        raise ValueError("quantiles must be a non-empty sequence of values in [0, 1]")
+    return q
+
+
+def residual_pool(residuals: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Prepare one-step residuals for resampling.
+
+    Residuals are centred per series, so resampling adds no drift the point
+    forecast does not already have, and sorted so that the observed values
+    of every row come first and ``NaN`` last.
+
+    Args:
+        residuals: Array of shape ``(n_series, n_time)``, ``NaN`` where no
+            residual is available
+
+    Returns:
+        The pool, the number of residuals of every series and their standard
+        deviation (``NaN`` for series without residuals)
+    """
+    valid = np.isfinite(residuals)
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, residuals, 0.0).sum(axis=1) / counts
+        centred = np.where(valid, residuals - mean[:, None], np.nan)
+        sigma = np.sqrt((np.where(valid, centred, 0.0) ** 2).sum(axis=1) / np.maximum(counts - 1, 1))
+    sigma[counts == 0] = np.nan
+    if centred.shape[1] == 0:
+        centred = np.full((centred.shape[0], 1), np.nan)
+    return np.sort(centred, axis=1), counts, sigma
+
+
+def draw_shocks(
+    pool: np.ndarray,
+    counts: np.ndarray,
+    sigma: np.ndarray,
+    n_paths: int,
+    horizon: int,
+    rng: np.random.Generator,
+    method: str = 'bootstrap',
+) -> np.ndarray:
+    """
+    Draw one-step shocks for ``n_paths`` paths of every series.
+
+    Args:
+        pool: Sorted residual pool from :func:`residual_pool`
+        counts: Number of residuals of every series
+        sigma: Residual standard deviation of every series
+        n_paths: Paths per series
+        horizon: Steps per path
+        rng: Random generator
+        method: ``'bootstrap'`` resamples the residuals, ``'normal'`` draws
+            Gaussian shocks with their standard deviation
+
+    Returns:
+        Array of shape ``(n_series, n_paths, horizon)`` and dtype
+        :data:`DTYPE`, ``NaN`` for series without residuals
+    """
+    n_series = pool.shape[0]
+    shape = (n_series, n_paths, horizon)
+    if method == 'normal':
+        shocks = rng.standard_normal(shape, dtype=DTYPE)
+        shocks *= sigma.astype(DTYPE)[:, None, None]
+        return shocks
+    # Uniform draws scaled by each row's count index its valid residuals;
+    # adding the row offsets turns them into indices of the flat pool.
+    uniform = rng.random(shape, dtype=DTYPE)
+    uniform *= counts.astype(DTYPE)[:, None, None]
+    index = uniform.astype(np.int32)
+    # float32 rounding may reach the count itself.
+    np.minimum(index, np.maximum(counts - 1, 0).astype(np.int32)[:, None, None], out=index)
+    index += (np.arange(n_series, dtype=np.int32) * pool.shape[1])[:, None, None]
+    return pool.astype(DTYPE, copy=False).ravel()[index]
+
+
+def simulate_quantiles(
+    model: BaseModel,
+    forecasts: np.ndarray,
+    residuals: np.ndarray,
+    quantiles: Sequence[float],
+    n_samples: int = 1000,
+    method: str = 'bootstrap',
+    seed: Optional[int] = None,
+    memory: int = DEFAULT_MEMORY,
+) -> np.ndarray:
+    """
+    Quantiles of simulated future paths of every series.
+
+    Args:
+        model: Fitted model propagating the shocks
+        forecasts: Point forecasts of shape ``(n_series, horizon)``
+        residuals: In-sample one-step residuals, shape ``(n_series, n_time)``
+            (see :meth:`~nostradamus.models.BaseModel.residuals`)
+        quantiles: Probabilities in ``[0, 1]``
+        n_samples: Paths simulated per series
+        method: ``'bootstrap'`` or ``'normal'`` (see :func:`draw_shocks`)
+        seed: Seed of the random generator
+        memory: Approximate bytes of paths held at once
+
+    Returns:
+        Array of shape ``(n_series, len(quantiles), horizon)``
+
+    Raises:
+        ValueError: If the quantiles, ``n_samples`` or ``method`` are invalid
+    """
+    q = check_quantiles(quantiles)
+    if n_samples <= 0:
+        raise ValueError("n_samples must be positive")
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Available methods: {', '.join(METHODS)}")
+
+    n_series, horizon = forecasts.shape
+    pool, counts, sigma = residual_pool(residuals)
+    pool = pool.astype(DTYPE)
+    rng = np.random.default_rng(seed)
+    block, batch = _chunks(n_series, horizon, n_samples, memory)
+
+    out = np.empty((n_series, q.size, horizon))
+    for start in range(0, n_series, block):
+        rows = np.arange(start, min(start + block, n_series))
+        block_pool, block_counts, block_sigma = pool[rows], counts[rows], sigma[rows]
+        estimator = StreamingQuantiles(q)
+        for done in range(0, n_samples, batch):
+            n_paths = min(batch, n_samples - done)
+            shocks = draw_shocks(block_pool, block_counts, block_sigma, n_paths, horizon, rng, method)
+            paths = model.simulate(forecasts[rows], shocks, rows)
+            estimator.push(paths, axis=1)
+        # (rows, horizon, quantiles) -> (rows, quantiles, horizon)
+        out[rows] = estimator.result.transpose(0, 2, 1)
+    return out
+
+
+def _chunks(n_series: int, horizon: int, n_samples: int, memory: int) -> Tuple[int, int]:
+    """Series per block and paths per batch fitting in ``memory`` bytes."""
+    per_path = _BYTES_PER_VALUE * horizon
+    min_batch = min(n_samples, MIN_BATCH)
+    block = int(np.clip(memory // (per_path * min_batch), 1, n_series))
+    batch = int(np.clip(memory // (per_path * block), min_batch, n_samples))
+    return block, batch
@@ -0,0 +1,257 @@
+"""
+HTTP client for the Nostradamus backend API
+Shared async client with connection pooling, retries and a circuit breaker
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: the backend is overloaded or restarting.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class APIError(Exception):
+    """Raised when the backend cannot answer a request."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(APIError):
+    """Raised without contacting the backend while the circuit is open."""
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing backend for a while.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail immediately. Once ``reset_timeout`` seconds have passed a
+    single trial call is let through (half-open): success closes the
+    circuit, failure opens it again.
+
+    Args:
+        failure_threshold: Consecutive failures opening the circuit
+        reset_timeout: Seconds before a trial call is allowed
+        clock: Time source, in seconds
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        """Current state: ``'closed'``, ``'open'`` or ``'half-open'``."""
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may go through.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with the
+                trial call already running
+        """
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._trial_running):
+            raise CircuitOpenError("Backend unavailable (circuit open)")
+        if state == self.HALF_OPEN:
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit at the threshold."""
+        self.failures += 1
+        if self._trial_running or self.failures >= self.failure_threshold:
+            logger.warning(f"Circuit aperto dopo {self.failures} errori consecutivi")
+            self.opened_at = self.clock()
+        self._trial_running = False
+
+    def release_trial(self) -> None:
+        """
+        End a call that neither succeeded nor failed, e.g. a cancelled one.
+
+        Nothing is counted, but an unfinished half-open trial opens the
+        circuit again, so a later call gets its own trial.
+        """
+        if self._trial_running:
+            self.opened_at = self.clock()
+            self._trial_running = False
+
+
+class NostradamusAPIClient:
+    """
+    Async client for the Nostradamus REST API, shared by all handlers.
+
+    One ``httpx.AsyncClient`` keeps connections alive between requests
+    (HTTP/2 when the ``h2`` package is installed), so a ``/predict`` does not
+    pay for a new TCP/TLS handshake. Connection errors, timeouts and
+    429/502/503/504 responses are retried with exponential backoff and full
+    jitter; a :class:`CircuitBreaker` stops hammering a backend that keeps
+    failing.
+
+    Args:
+        base_url: API base URL (``BotConfig.api_base_url``)
+        timeout: Request timeout in seconds (``BotConfig.api_timeout``)
+        max_retries: Retries after the first attempt
+        backoff: Base delay of the exponential backoff, in seconds
+        max_backoff: Upper bound of a single delay, in seconds
+        max_connections: Size of the connection pool
+        breaker: Circuit breaker (default: 5 failures, 30 s reset)
+        transport: Custom ``httpx`` transport (e.g. for tests)
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10,
+        max_retries: int = 3,
+        backoff: float = 0.2,
+        max_backoff: float = 5.0,
+        max_connections: int = 100,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.http2 = transport is None and _http2_available()
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60.0,
+            ),
+            http2=self.http2,
+            transport=transport,
+            headers={'Accept': 'application/json'},
+        )
+
+    async def __aenter__(self) -> 'NostradamusAPIClient':
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        await self._client.aclose()
+
+    async def get_info(self) -> Dict[str, Any]:
+        """``GET /info``"""
+        return await self.request('GET', '/info')
+
+    async def get_models(self) -> List[Dict[str, Any]]:
+        """``GET /models``"""
+        return await self.request('GET', '/models')
+
+    async def predict(self, periods: int, model: str = 'auto', **body: Any) -> Dict[str, Any]:
+        """``POST /predict``"""
+        return await self.request('POST', '/predict', json={'periods': periods, 'model': model, **body})
+
+    async def get_data(self, dataset_id: str) -> Dict[str, Any]:
+        """``GET /data/{id}``"""
+        return await self.request('GET', f'/data/{dataset_id}')
+
+    async def request(self, method: str, path: str, json: Optional[Any] = None) -> Any:
+        """
+        Send a request with retries and return the decoded JSON body.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            APIError: If the request still fails after the retries, or the
+                backend answers with a non-retryable error
+        """
+        self.breaker.before_call()
+        settled = False
+        try:
+            attempt = 0
+            while True:
+                retry_after: Optional[float] = None
+                try:
+                    response = await self._client.request(method, path, json=json)
+                except (httpx.TransportError, httpx.TimeoutException) as e:
+                    error = APIError(f"{method} {path} failed: {e!r}")
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        # Anything else is an answer: the backend is healthy.
+                        settled = True
+                        self.breaker.record_success()
+                        if response.is_error:
+                            raise APIError(
+                                f"{method} {path} returned {response.status_code}: {response.text[:200]}",
+                                status=response.status_code,
+                            )
+                        return response.json()
+                    error = APIError(f"{method} {path} returned {response.status_code}", status=response.status_code)
+                    retry_after = _retry_after(response)
+
+                if attempt >= self.max_retries:
+                    settled = True
+                    self.breaker.record_failure()
+                    raise error
+                delay = self._delay(attempt) if retry_after is None else min(retry_after, self.max_backoff)
+                logger.debug(f"{error}; nuovo tentativo tra {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled or unexpected errors say nothing about the backend,
+            # but must still release the half-open trial, or the circuit
+            # would never close again.
+            if not settled:
+                self.breaker.release_trial()
+            raise
+
+    def _delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return max(float(response.headers['Retry-After']), 0.0)
+    except (KeyError, ValueError):
+        return None
@@ -9,11 +9,13 @@ Autore: Federico Ronzi
 Licenza: MIT
 """
 
+import asyncio
 import os
 import sys
 import logging
-from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -28,6 +30,11 @@ from telegram.ext import (
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
 import nostradamus
+from nostradamus.results import ForecastResult
+
+from api_client import APIError, NostradamusAPIClient
+from config import BotConfig
+from pool import PoolBusyError, PredictionPool, UserLimitError
 
 # Configurazione logging
 logging.basicConfig(
@@ -36,19 +43,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Quantili dell'intervallo di previsione mostrato (intervallo all'80%)
+INTERVAL_QUANTILES = (0.1, 0.9)
+
 
 class NostradamusBot:
     """Classe principale per il bot Telegram di Nostradamus."""
     
-    def __init__(self, token: str):
+    def __init__(self, token: str, config: Optional[BotConfig] = None):
         """
         Inizializza il bot.
         
         Args:
             token: Token del bot Telegram fornito da BotFather
+            config: Configurazione del bot (default: valori predefiniti)
         """
         self.token = token
+        self.config = config or BotConfig(telegram_token=token)
         self.application = None
+        # Le predizioni girano in un pool limitato, fuori dall'event loop
+        self.pool = PredictionPool(
+            max_workers=self.config.prediction_workers,
+            max_queue=self.config.prediction_queue_size,
+            max_per_user=self.config.max_predictions_per_user,
+            use_processes=self.config.prediction_processes,
+        )
+        # Grafici PNG già disegnati, indicizzati per impronta della previsione
+        self.charts = None
+        if self.config.send_charts:
+            from nostradamus.plotting import ChartCache
+
+            self.charts = ChartCache(max_bytes=self.config.chart_cache_mb * 1024 ** 2)
+        # Client condiviso verso il backend: le connessioni restano aperte
+        # tra una richiesta e l'altra
+        self.api = None
+        if self.config.prediction_source == 'api':
+            self.api = NostradamusAPIClient(
+                self.config.api_base_url,
+                timeout=self.config.api_timeout,
+                max_retries=self.config.api_max_retries,
+            )
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -142,20 +176,59 @@ class NostradamusBot:
                 )
                 return
             
+            # Rifiuta subito se il pool è saturo, prima di inviare l'attesa
+            user_id = update.effective_user.id
+            self.pool.check(user_id)
+            
             # Invia messaggio di attesa
             processing_message = await update.message.reply_text(
                 f"⏳ Generazione predizione per {periods} periodi...\n"
                 f"Attendere prego..."
             )
             
-            # Genera la predizione (mock per dimostrazione)
-            prediction_result = self._generate_mock_prediction(periods)
-            
-            # Formatta e invia i risultati
-            result_text = self._format_prediction_result(prediction_result)
+            send_chart = self.charts is not None
+            if send_chart:
+                from nostradamus.plotting import chart_key
+            with nostradamus.instrumentation.stage('bot.predict', source=self.config.prediction_source):
+                if self.api is not None:
+                    # Predizione dal backend, formattata nel pool; anche la
+                    # chiamata al backend occupa un posto del pool, così i
+                    # limiti per utente e della coda valgono pure qui. Il
+                    # backend restituisce la stessa previsione finché i dati
+                    # non cambiano, quindi il grafico arriva spesso dalla cache
+                    async with self.pool.slot(user_id):
+                        result = self._to_forecast(
+                            await self.api.predict(periods, quantiles=list(INTERVAL_QUANTILES))
+                        )
+                        chart = self.charts.get(chart_key(result)) if send_chart else None
+                        result_text, rendered = await self.pool.execute(
+                            self._report, result, send_chart, send_chart and chart is None,
+                        )
+                else:
+                    # Genera, formatta e disegna la predizione nel pool (mock per dimostrazione)
+                    chart = None
+                    result, result_text, rendered = await self.pool.run(user_id, self._predict, periods, send_chart)
+                if rendered is not None:
+                    self.charts.put(chart_key(result), rendered)
+                    chart = rendered
             
             await processing_message.edit_text(result_text, parse_mode='Markdown')
+            if chart is not None:
+                await update.message.reply_photo(chart, caption=f"📈 Predizione per {periods} periodi")
             
+        except UserLimitError:
+            await update.message.reply_text(
+                "⏳ Hai già una predizione in corso, attendi che termini."
+            )
+        except PoolBusyError:
+            await update.message.reply_text(
+                "⏳ Il sistema è occupato, riprova tra poco."
+            )
+        except APIError as e:
+            logger.error(f"Backend error in predict_command: {e}")
+            await update.message.reply_text(
+                "❌ Il backend di Nostradamus non è raggiungibile, riprova più tardi."
+            )
         except ValueError:
             await update.message.reply_text(
                 "⚠️ Errore: inserisci un numero valido.\n"
@@ -242,7 +315,67 @@ class NostradamusBot:
                 "Non ho capito il comando. Usa /help per vedere i comandi disponibili."
             )
     
-    def _generate_mock_prediction(self, periods: int) -> Dict:
+    @staticmethod
+    def _predict(periods: int, chart: bool = False) -> Tuple[ForecastResult, str, Optional[bytes]]:
+        """
+        Genera, formatta e disegna una predizione (eseguito in un worker del pool).
+        
+        Args:
+            periods: Numero di periodi da predire
+            chart: Se disegnare anche il grafico
+            
+        Returns:
+            La predizione, il testo Markdown con i risultati e il grafico PNG
+            (``None`` se non richiesto)
+        """
+        result = NostradamusBot._generate_mock_prediction(periods)
+        return (result,) + NostradamusBot._report(result, chart, chart)
+    
+    @staticmethod
+    def _report(result: ForecastResult, chart: bool, render: bool) -> Tuple[str, Optional[bytes]]:
+        """
+        Formatta una predizione e, se richiesto, ne disegna il grafico.
+        
+        Args:
+            result: Predizione da mostrare
+            chart: Se la risposta includerà un grafico
+            render: Se disegnare il grafico (falso quando è già in cache)
+            
+        Returns:
+            Testo Markdown e grafico PNG (``None`` se non disegnato)
+        """
+        png = None
+        if render:
+            try:
+                from nostradamus.plotting import plot_forecast
+
+                png = plot_forecast(result)
+            except ImportError as e:
+                logger.warning(f"Grafici disabilitati: {e}")
+                chart = False
+        return NostradamusBot._format_prediction_result(result, chart=chart), png
+    
+    @staticmethod
+    def _to_forecast(result: Dict) -> ForecastResult:
+        """
+        Converte la risposta dell'API REST in un risultato compatto.
+        
+        Args:
+            result: Dizionario ricevuto dall'API REST
+            
+        Returns:
+            Risultato con i quantili in ordine crescente
+        """
+        quantiles = result.get('quantiles') or {}
+        levels = sorted(quantiles, key=float)
+        bounds = np.stack([quantiles[q] for q in levels]) if levels else None
+        return ForecastResult(
+            result['predictions'], bounds, [float(q) for q in levels],
+            model=result['model'], timestamp=result['timestamp'],
+        )
+    
+    @staticmethod
+    def _generate_mock_prediction(periods: int) -> ForecastResult:
         """
         Genera una predizione mock per dimostrazione.
         In produzione, questo chiamerebbe il vero backend di Nostradamus.
@@ -251,51 +384,51 @@ class NostradamusBot:
             periods: Numero di periodi da predire
             
         Returns:
-            Dizionario con i risultati della predizione
+            Risultato compatto (array float32, statistiche calcolate su richiesta)
         """
-        import random
+        # Genera valori mock in un'unica operazione vettoriale
+        rng = np.random.default_rng()
+        steps = np.arange(periods)
+        predictions = 100 + steps * 0.5 + (rng.random(periods) - 0.5) * 10
         
-        # Genera valori mock usando list comprehension per migliori performance
-        base = 100
-        predictions = [
-            base + (i * 0.5) + ((random.random() - 0.5) * 10)
-            for i in range(periods)
-        ]
+        # Intervallo che si allarga con la radice dell'orizzonte
+        spread = 4 * np.sqrt(steps + 1)
+        bounds = np.stack([predictions - spread, predictions + spread])
         
-        # Calcola statistiche
-        mean = sum(predictions) / len(predictions)
-        min_val = min(predictions)
-        max_val = max(predictions)
-        
-        return {
-            'model': 'auto',
-            'periods': periods,
-            'predictions': predictions,
-            'statistics': {
-                'mean': mean,
-                'min': min_val,
-                'max': max_val,
-            },
-            'timestamp': datetime.now().isoformat(),
-        }
+        return ForecastResult(predictions, bounds, INTERVAL_QUANTILES, model='auto')
     
-    def _format_prediction_result(self, result: Dict) -> str:
+    @staticmethod
+    def _format_prediction_result(result: Union[Dict, ForecastResult], chart: bool = False) -> str:
         """
         Formatta i risultati della predizione per Telegram.
         
         Args:
-            result: Dizionario con i risultati
+            result: Risultato locale o dizionario ricevuto dall'API REST
+            chart: Se la risposta è seguita dal grafico della predizione
             
         Returns:
             Stringa formattata in Markdown
         """
+        if isinstance(result, ForecastResult):
+            result = result.to_dict()
         predictions = result['predictions']
         stats = result['statistics']
         
+        # Intervallo di previsione: quantile più basso e più alto ricevuti
+        quantiles = result.get('quantiles') or {}
+        interval = None
+        if len(quantiles) >= 2:
+            lower, upper = min(quantiles, key=float), max(quantiles, key=float)
+            interval = (quantiles[lower], quantiles[upper])
+        
+        def line(i: int) -> str:
+            text = f"T+{i + 1}: `{predictions[i]:.2f}`"
+            if interval is not None:
+                text += f" (`{interval[0][i]:.2f}` – `{interval[1][i]:.2f}`)"
+            return text + "\n"
+        
         # Crea un campione dei primi e ultimi valori
         sample_size = min(5, len(predictions))
-        first_values = predictions[:sample_size]
-        last_values = predictions[-sample_size:] if len(predictions) > sample_size else []
         
         text = (
             f"✅ *Predizione Completata*\n\n"
@@ -305,27 +438,68 @@ class NostradamusBot:
             f"*📊 Statistiche:*\n"
             f"• Media: `{stats['mean']:.2f}`\n"
             f"• Minimo: `{stats['min']:.2f}`\n"
-            f"• Massimo: `{stats['max']:.2f}`\n\n"
-            f"*📈 Primi {sample_size} valori:*\n"
+            f"• Massimo: `{stats['max']:.2f}`\n"
         )
+        if interval is not None:
+            coverage = (float(upper) - float(lower)) * 100
+            text += f"• Intervallo di previsione: `{coverage:.0f}%`\n"
+        text += f"\n*📈 Primi {sample_size} valori:*\n"
         
-        for i, val in enumerate(first_values, 1):
-            text += f"T+{i}: `{val:.2f}`\n"
+        for i in range(sample_size):
+            text += line(i)
         
-        if last_values:
+        if len(predictions) > sample_size:
             text += f"\n*📈 Ultimi {sample_size} valori:*\n"
-            start_idx = len(predictions) - sample_size + 1
-            for i, val in enumerate(last_values, start_idx):
-                text += f"T+{i}: `{val:.2f}`\n"
+            for i in range(len(predictions) - sample_size, len(predictions)):
+                text += line(i)
         
-        text += "\n_Per vedere tutti i valori, integra con l'API REST._"
+        if chart:
+            text += "\n_Tutti i valori sono nel grafico qui sotto._"
+        else:
+            text += "\n_Per vedere tutti i valori, integra con l'API REST._"
         
         return text
     
-    def run(self):
-        """Avvia il bot."""
-        # Crea l'applicazione
-        self.application = Application.builder().token(self.token).build()
+    async def _post_init(self, application: Application) -> None:
+        """Avvia l'endpoint delle metriche Prometheus, se configurato."""
+        if self.config.instrumentation:
+            # Tempi per fase di Nostradamus, aggiunti alle metriche del pool
+            nostradamus.instrumentation.enable()
+        if self.config.metrics_port:
+            await self.pool.serve_metrics(
+                port=self.config.metrics_port,
+                extra=[nostradamus.instrumentation.render_prometheus],
+            )
+            logger.info(f"Metriche disponibili sulla porta {self.config.metrics_port}")
+    
+    async def _post_shutdown(self, application: Application) -> None:
+        """Chiude il pool delle predizioni e le connessioni al backend."""
+        self.pool.shutdown()
+        if self.api is not None:
+            await self.api.aclose()
+    
+    def build_application(self, base_url: Optional[str] = None) -> Application:
+        """
+        Crea l'applicazione e registra gli handler.
+        
+        Args:
+            base_url: URL alternativo delle Bot API (ad es. per i test)
+            
+        Returns:
+            L'applicazione configurata
+        """
+        builder = (
+            Application.builder()
+            .token(self.token)
+            # Gli update sono gestiti in parallelo: una predizione lenta
+            # non blocca le altre chat
+            .concurrent_updates(True)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+        )
+        if base_url:
+            builder = builder.base_url(base_url)
+        self.application = builder.build()
         
         # Registra gli handler
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -336,27 +510,46 @@ class NostradamusBot:
         self.application.add_handler(CommandHandler("about", self.about_command))
         self.application.add_handler(CallbackQueryHandler(self.button_callback))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text))
+        return self.application
+    
+    def run(self):
+        """Avvia il bot in modalità polling o webhook, secondo la configurazione."""
+        application = self.build_application()
         
-        # Avvia il bot
-        logger.info("Bot avviato!")
-        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        logger.info(f"Bot avviato in modalità {self.config.bot_mode}!")
+        if self.config.bot_mode == 'webhook':
+            from webhook import run_webhook
+
+            asyncio.run(run_webhook(
+                application,
+                url=self.config.webhook_url,
+                listen=self.config.webhook_listen,
+                port=self.config.webhook_port,
+                path=self.config.webhook_path,
+                secret_token=self.config.webhook_secret,
+                register=self.config.webhook_register,
+            ))
+        else:
+            from webhook import allowed_updates
+
+            self.application.run_polling(allowed_updates=allowed_updates(application))
 
 
 def main():
     """Funzione principale per avviare il bot."""
-    # Leggi il token dalle variabili d'ambiente
-    token = os.getenv('TELEGRAM_BOT_TOKEN')
-    
-    if not token:
+    # Leggi la configurazione dalle variabili d'ambiente
+    try:
+        config = BotConfig.from_env()
+        config.validate()
+    except ValueError as e:
         logger.error(
-            "ERRORE: TELEGRAM_BOT_TOKEN non trovato!\n"
-            "Configura la variabile d'ambiente con il token del tuo bot.\n"
+            f"ERRORE: configurazione non valida!\n{e}\n"
             "Esempio: export TELEGRAM_BOT_TOKEN='your-token-here'"
         )
         sys.exit(1)
     
     # Crea e avvia il bot
-    bot = NostradamusBot(token)
+    bot = NostradamusBot(config.telegram_token, config)
     
     try:
         bot.run()
@@ -22,11 +22,37 @@ class BotConfig:
     # Optional API settings
     api_base_url: str = 'http://localhost:5000/api'
     api_timeout: int = 10
+    api_max_retries: int = 3
+    
+    # Source of predictions: 'mock' (local demo data) or 'api' (backend)
+    prediction_source: str = 'mock'
     
     # Bot behavior settings
     max_prediction_periods: int = 365
     default_prediction_periods: int = 30
     
+    # Prediction pool settings
+    prediction_workers: int = 2
+    prediction_queue_size: int = 16
+    max_predictions_per_user: int = 1
+    prediction_processes: bool = False
+    metrics_port: Optional[int] = None
+    
+    # Chart replies to /predict, cached by forecast fingerprint
+    send_charts: bool = True
+    chart_cache_mb: int = 32
+    # Record Nostradamus stage timings and add them to the metrics
+    instrumentation: bool = False
+    
+    # Update delivery: 'polling' or 'webhook'
+    bot_mode: str = 'polling'
+    webhook_url: Optional[str] = None
+    webhook_listen: str = '0.0.0.0'
+    webhook_port: int = 8443
+    webhook_path: str = '/telegram'
+    webhook_secret: Optional[str] = None
+    webhook_register: bool = True
+    
     # Logging settings
     log_level: str = 'INFO'
     log_file: Optional[str] = 'bot.log'
@@ -54,8 +80,25 @@ class BotConfig:
             telegram_token=telegram_token,
             api_base_url=os.getenv('API_BASE_URL', 'http://localhost:5000/api'),
             api_timeout=int(os.getenv('API_TIMEOUT', '10')),
+            api_max_retries=int(os.getenv('API_MAX_RETRIES', '3')),
+            prediction_source=os.getenv('PREDICTION_SOURCE', 'mock').lower(),
             max_prediction_periods=int(os.getenv('MAX_PREDICTION_PERIODS', '365')),
             default_prediction_periods=int(os.getenv('DEFAULT_PREDICTION_PERIODS', '30')),
+            prediction_workers=int(os.getenv('PREDICTION_WORKERS', '2')),
+            prediction_queue_size=int(os.getenv('PREDICTION_QUEUE_SIZE', '16')),
+            max_predictions_per_user=int(os.getenv('MAX_PREDICTIONS_PER_USER', '1')),
+            prediction_processes=os.getenv('PREDICTION_PROCESSES', 'false').lower() in ('1', 'true', 'yes'),
+            metrics_port=int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None,
+            send_charts=os.getenv('SEND_CHARTS', 'true').lower() in ('1', 'true', 'yes'),
+            chart_cache_mb=int(os.getenv('CHART_CACHE_MB', '32')),
+            instrumentation=os.getenv('INSTRUMENTATION', 'false').lower() in ('1', 'true', 'yes'),
+            bot_mode=os.getenv('BOT_MODE', 'polling').lower(),
+            webhook_url=os.getenv('WEBHOOK_URL') or None,
+            webhook_listen=os.getenv('WEBHOOK_LISTEN', '0.0.0.0'),
+            webhook_port=int(os.getenv('WEBHOOK_PORT', '8443')),
+            webhook_path=os.getenv('WEBHOOK_PATH', '/telegram'),
+            webhook_secret=os.getenv('WEBHOOK_SECRET') or None,
+            webhook_register=os.getenv('WEBHOOK_REGISTER', 'true').lower() in ('1', 'true', 'yes'),
             log_level=os.getenv('LOG_LEVEL', 'INFO'),
             log_file=os.getenv('LOG_FILE', 'bot.log'),
         )
@@ -84,4 +127,28 @@ class BotConfig:
                 "default_prediction_periods cannot exceed max_prediction_periods"
             )
         
+        if self.prediction_workers <= 0:
+            raise ValueError("prediction_workers must be positive")
+        
+        if self.prediction_queue_size < 0:
+            raise ValueError("prediction_queue_size cannot be negative")
+        
+        if self.max_predictions_per_user <= 0:
+            raise ValueError("max_predictions_per_user must be positive")
+        
+        if self.chart_cache_mb < 0:
+            raise ValueError("chart_cache_mb cannot be negative")
+        
+        if self.prediction_source not in ('mock', 'api'):
+            raise ValueError("prediction_source must be 'mock' or 'api'")
+        
+        if self.api_timeout <= 0:
+            raise ValueError("api_timeout must be positive")
+        
+        if self.bot_mode not in ('polling', 'webhook'):
+            raise ValueError("bot_mode must be 'polling' or 'webhook'")
+        
+        if self.bot_mode == 'webhook' and not self.webhook_url:
+            raise ValueError("webhook_url is required in webhook mode")
+        
         return True
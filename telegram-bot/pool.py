@@ -0,0 +1,278 @@
+"""
+Bounded prediction pool for the Nostradamus Telegram Bot
+Runs CPU-bound prediction work off the event loop with backpressure
+"""
+
+import asyncio
+import contextlib
+import functools
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence, Tuple
+
+# Histogram buckets, in seconds, for queue wait and compute time.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolBusyError(Exception):
+    """Raised when the prediction queue is full."""
+
+
+class UserLimitError(PoolBusyError):
+    """Raised when a user already has the maximum number of predictions running."""
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> Tuple[Any, float, float]:
+    """Run ``func`` in a worker and return it with its start and end times."""
+    # time.monotonic is system-wide, so worker processes share the clock.
+    started = time.monotonic()
+    result = func(*args)
+    return result, started, time.monotonic()
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus format."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def render(self, name: str, help_text: str) -> str:
+        """Return the histogram in the Prometheus text exposition format."""
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum {self.sum}')
+        lines.append(f'{name}_count {self.count}')
+        return '\n'.join(lines)
+
+
+class PoolMetrics:
+    """
+    Counters and histograms of a :class:`PredictionPool`.
+
+    Queue wait (submission to start in a worker) and compute time (start to
+    end) are tracked separately, so saturation shows up as growing waits
+    while compute time stays flat.
+    """
+
+    def __init__(self):
+        self.queue_wait = Histogram()
+        self.compute = Histogram()
+        self.completed = 0
+        self.failed = 0
+        self.rejected_busy = 0
+        self.rejected_user = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current values as a plain dictionary."""
+        with self._lock:
+            return {
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected_busy': self.rejected_busy,
+                'rejected_user': self.rejected_user,
+                'queue_wait_avg': self.queue_wait.sum / self.queue_wait.count if self.queue_wait.count else 0.0,
+                'compute_avg': self.compute.sum / self.compute.count if self.compute.count else 0.0,
+            }
+
+
+class PredictionPool:
+    """
+    Bounded executor for prediction work with per-user limits.
+
+    Work is admitted only while fewer than ``max_queue`` tasks are waiting
+    for a worker and the user has fewer than ``max_per_user`` tasks in
+    flight; otherwise :class:`PoolBusyError` (or :class:`UserLimitError`)
+    is raised immediately, so latency never builds up behind a long queue.
+
+    Args:
+        max_workers: Number of worker threads or processes
+        max_queue: Maximum number of tasks waiting for a worker
+        max_per_user: Maximum number of tasks in flight per user
+        use_processes: Use a process pool instead of threads (the submitted
+            functions and arguments must then be picklable)
+        executor: Executor to use instead of creating one
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 16,
+        max_per_user: int = 1,
+        use_processes: bool = False,
+        executor: Optional[Executor] = None,
+    ):
+        if executor is None:
+            pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            executor = pool_class(max_workers=max_workers)
+        self.executor = executor
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.metrics = PoolMetrics()
+        self._in_flight = 0
+        self._per_user: Dict[Any, int] = defaultdict(int)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted tasks still waiting for a worker."""
+        # The executor is dedicated and FIFO: the first ``max_workers``
+        # tasks in flight are the running ones.
+        return max(self._in_flight - self.max_workers, 0)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of admitted tasks, waiting or running."""
+        return self._in_flight
+
+    def check(self, user_id: Any) -> None:
+        """
+        Raise if a task for ``user_id`` would be rejected right now.
+
+        Raises:
+            UserLimitError: If the user has too many tasks in flight
+            PoolBusyError: If the queue is full
+        """
+        running = self._per_user.get(user_id, 0)
+        if running >= self.max_per_user:
+            with self.metrics._lock:
+                self.metrics.rejected_user += 1
+            raise UserLimitError(f"User {user_id} has {running} predictions in flight")
+        if self._in_flight >= self.max_workers + self.max_queue:
+            with self.metrics._lock:
+                self.metrics.rejected_busy += 1
+            raise PoolBusyError(f"Prediction queue is full ({self.queue_depth} waiting)")
+
+    @contextlib.asynccontextmanager
+    async def slot(self, user_id: Any) -> AsyncIterator[None]:
+        """
+        Hold one of the pool's places for ``user_id`` while the block runs.
+
+        Work that does not run in the pool, such as a call to the backend,
+        then counts against the per-user limit and the queue cap like
+        :meth:`run`; :meth:`execute` runs functions inside the slot.
+
+        Raises:
+            UserLimitError: If the user has too many tasks in flight
+            PoolBusyError: If the queue is full
+        """
+        self.check(user_id)
+        self._in_flight += 1
+        self._per_user[user_id] += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._per_user[user_id] -= 1
+            if not self._per_user[user_id]:
+                del self._per_user[user_id]
+
+    async def run(self, user_id: Any, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run ``func(*args)`` in the pool and return its result.
+
+        Args:
+            user_id: Identifier used for the per-user limit
+            func: Function to run in a worker
+            *args: Arguments passed to ``func``
+
+        Raises:
+            UserLimitError: If the user has too many tasks in flight
+            PoolBusyError: If the queue is full
+        """
+        async with self.slot(user_id):
+            return await self.execute(func, *args)
+
+    async def execute(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func(*args)`` in a worker, within a :meth:`slot` already held."""
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        try:
+            result, started, finished = await loop.run_in_executor(
+                self.executor, functools.partial(_timed, func, *args)
+            )
+        except Exception:
+            with self.metrics._lock:
+                self.metrics.failed += 1
+            raise
+
+        with self.metrics._lock:
+            self.metrics.completed += 1
+            self.metrics.queue_wait.observe(max(started - submitted, 0.0))
+            self.metrics.compute.observe(finished - started)
+        return result
+
+    def render_prometheus(self, prefix: str = 'nostradamus_bot_prediction') -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        metrics = self.metrics
+        with metrics._lock:
+            parts = [
+                metrics.queue_wait.render(
+                    f'{prefix}_queue_wait_seconds', 'Time predictions wait for a worker.'),
+                metrics.compute.render(
+                    f'{prefix}_compute_seconds', 'Time spent computing predictions.'),
+            ]
+            counters = [
+                ('completed_total', 'Predictions completed.', metrics.completed),
+                ('failed_total', 'Predictions that raised an error.', metrics.failed),
+                ('rejected_busy_total', 'Predictions rejected because the queue was full.', metrics.rejected_busy),
+                ('rejected_user_total', 'Predictions rejected by the per-user limit.', metrics.rejected_user),
+            ]
+        for name, help_text, value in counters:
+            parts.append(f'# HELP {prefix}_{name} {help_text}\n# TYPE {prefix}_{name} counter\n{prefix}_{name} {value}')
+        parts.append(
+            f'# HELP {prefix}_queue_depth Predictions waiting for a worker.\n'
+            f'# TYPE {prefix}_queue_depth gauge\n{prefix}_queue_depth {self.queue_depth}'
+        )
+        return '\n'.join(parts) + '\n'
+
+    async def serve_metrics(
+        self,
+        host: str = '0.0.0.0',
+        port: int = 9100,
+        extra: Sequence[Callable[[], str]] = (),
+    ) -> asyncio.AbstractServer:
+        """
+        Serve :meth:`render_prometheus` over HTTP on ``host:port``.
+
+        Args:
+            host: Interface to listen on
+            port: TCP port
+            extra: Functions returning more metrics in the same format,
+                appended to the pool's own
+        """
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                await reader.readuntil(b'\r\n\r\n')
+                body = ''.join([self.render_prometheus()] + [render() for render in extra]).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                    b'Content-Length: %d\r\nConnection: close\r\n\r\n%s' % (len(body), body)
+                )
+                await writer.drain()
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+    def shutdown(self) -> None:
+        """Shut the executor down without waiting for running tasks."""
+        self.executor.shutdown(wait=False)
@@ -3,10 +3,14 @@ Test module for Nostradamus Telegram Bot
 Simple tests for configuration and bot functionality
 """
 
+import asyncio
+import json
 import os
 import sys
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import numpy as np
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -76,7 +80,630 @@ class TestBotFunctionality(unittest.TestCase):
         self.assertIn('model', result)
         self.assertIn('predictions', result)
         self.assertIn('statistics', result)
+    
+    def test_format_prediction_interval(self):
+        """Prediction intervals are shown next to every value."""
+        from bot import NostradamusBot
+        
+        forecast = NostradamusBot._generate_mock_prediction(12)
+        self.assertEqual(forecast.values.dtype, np.float32)
+        result = forecast.to_dict()
+        text = NostradamusBot._format_prediction_result(result)
+        self.assertEqual(NostradamusBot._format_prediction_result(forecast), text)
+        lower, upper = result['quantiles']['0.1'], result['quantiles']['0.9']
+        self.assertIn('Intervallo di previsione: `80%`', text)
+        self.assertIn(f"T+12: `{result['predictions'][11]:.2f}` (`{lower[11]:.2f}` – `{upper[11]:.2f}`)", text)
+        
+        del result['quantiles']
+        self.assertNotIn('Intervallo', NostradamusBot._format_prediction_result(result))
 
 
 if __name__ == '__main__':
     unittest.main()
+
+
+class TestPredictionPool(unittest.TestCase):
+    """Test cases for the bounded prediction pool."""
+    
+    def test_queue_cap_rejects_with_busy(self):
+        """Work beyond workers + queue size is rejected immediately."""
+        import threading
+        from pool import PoolBusyError, PredictionPool
+        
+        release = threading.Event()
+        pool = PredictionPool(max_workers=1, max_queue=1, max_per_user=10)
+        
+        async def scenario():
+            first = asyncio.ensure_future(pool.run('a', release.wait, 5))
+            second = asyncio.ensure_future(pool.run('b', release.wait, 5))
+            await asyncio.sleep(0.05)
+            self.assertEqual(pool.queue_depth, 1)
+            with self.assertRaises(PoolBusyError):
+                await pool.run('c', release.wait, 5)
+            release.set()
+            return await asyncio.gather(first, second)
+        
+        self.assertEqual(asyncio.run(scenario()), [True, True])
+        self.assertEqual(pool.metrics.rejected_busy, 1)
+        self.assertEqual(pool.metrics.completed, 2)
+        pool.shutdown()
+    
+    def test_per_user_limit(self):
+        """A user cannot exceed the configured number of predictions in flight."""
+        import threading
+        from pool import PredictionPool, UserLimitError
+        
+        release = threading.Event()
+        pool = PredictionPool(max_workers=2, max_queue=10, max_per_user=1)
+        
+        async def scenario():
+            running = asyncio.ensure_future(pool.run(42, release.wait, 5))
+            await asyncio.sleep(0.01)
+            with self.assertRaises(UserLimitError):
+                pool.check(42)
+            pool.check(7)
+            release.set()
+            await running
+            pool.check(42)
+        
+        asyncio.run(scenario())
+        self.assertEqual(pool.metrics.rejected_user, 1)
+        pool.shutdown()
+    
+    def test_metrics_separate_queue_wait_from_compute(self):
+        """Queue wait grows behind a busy worker while compute time does not."""
+        import time
+        from pool import PredictionPool
+        
+        pool = PredictionPool(max_workers=1, max_queue=5, max_per_user=5)
+        
+        async def scenario():
+            await asyncio.gather(*(pool.run('u', time.sleep, 0.05) for _ in range(3)))
+        
+        asyncio.run(scenario())
+        snapshot = pool.metrics.snapshot()
+        self.assertEqual(snapshot['completed'], 3)
+        self.assertGreaterEqual(snapshot['compute_avg'], 0.045)
+        self.assertGreaterEqual(pool.metrics.queue_wait.sum, 0.14)
+        
+        text = pool.render_prometheus()
+        self.assertIn('nostradamus_bot_prediction_queue_wait_seconds_count 3', text)
+        self.assertIn('nostradamus_bot_prediction_compute_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('nostradamus_bot_prediction_queue_depth 0', text)
+        pool.shutdown()
+    
+    def test_metrics_endpoint_includes_stage_timings(self):
+        """With instrumentation on, the bot's /metrics adds Nostradamus stage totals."""
+        from bot import NostradamusBot
+        import nostradamus
+        
+        bot = NostradamusBot('test-token', BotConfig(
+            telegram_token='test-token', metrics_port=None, instrumentation=True,
+        ))
+        update = MagicMock()
+        update.effective_user.id = 1
+        update.message.reply_text = AsyncMock(return_value=MagicMock(edit_text=AsyncMock()))
+        update.message.reply_photo = AsyncMock()
+        
+        async def scenario():
+            await bot._post_init(None)
+            await bot.predict_command(update, MagicMock(args=['5']))
+            server = await bot.pool.serve_metrics(
+                host='127.0.0.1', port=0, extra=[nostradamus.instrumentation.render_prometheus],
+            )
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            response = await reader.read()
+            writer.close()
+            server.close()
+            return response.decode()
+        
+        try:
+            text = asyncio.run(scenario())
+        finally:
+            nostradamus.instrumentation.disable()
+            bot.pool.shutdown()
+        self.assertIn('nostradamus_bot_prediction_completed_total 1', text)
+        self.assertIn('nostradamus_stage_calls_total{stage="bot.predict",source="mock"} 1', text)
+    
+    def test_predict_command_replies_busy(self):
+        """The /predict handler answers "busy" instead of queueing more work."""
+        from bot import NostradamusBot
+        
+        bot = NostradamusBot('test-token', BotConfig(
+            telegram_token='test-token', prediction_workers=1, prediction_queue_size=0,
+        ))
+        update = MagicMock()
+        update.effective_user.id = 1
+        update.message.reply_text = AsyncMock()
+        context = MagicMock(args=['10'])
+        
+        async def scenario():
+            bot.pool._in_flight = 1  # a prediction of another user is running
+            await bot.predict_command(update, context)
+            bot.pool._in_flight = 0
+        
+        asyncio.run(scenario())
+        update.message.reply_text.assert_awaited_once()
+        self.assertIn('occupato', update.message.reply_text.call_args[0][0])
+        bot.pool.shutdown()
+    
+    def test_predict_command_runs_in_pool(self):
+        """The prediction is computed in the pool and the result edited in."""
+        from bot import NostradamusBot
+        
+        bot = NostradamusBot('test-token')
+        update = MagicMock()
+        update.effective_user.id = 1
+        processing = MagicMock()
+        processing.edit_text = AsyncMock()
+        update.message.reply_text = AsyncMock(return_value=processing)
+        update.message.reply_photo = AsyncMock()
+        
+        asyncio.run(bot.predict_command(update, MagicMock(args=['10'])))
+        text = processing.edit_text.call_args[0][0]
+        self.assertIn('Predizione Completata', text)
+        self.assertIn('T+10', text)
+        self.assertIn('grafico', text)
+        self.assertEqual(bot.pool.metrics.completed, 1)
+        # Il grafico segue il testo
+        photo = update.message.reply_photo.call_args[0][0]
+        self.assertTrue(photo.startswith(b'\x89PNG'))
+        bot.pool.shutdown()
+    
+    def test_backend_charts_are_cached(self):
+        """The same backend forecast is rendered once and then sent from the cache."""
+        import nostradamus.plotting
+        from bot import NostradamusBot
+        
+        bot = NostradamusBot('test-token', BotConfig(telegram_token='test-token', prediction_source='api'))
+        forecast = NostradamusBot._generate_mock_prediction(30).to_dict()
+        bot.api = MagicMock(predict=AsyncMock(return_value=forecast))
+        update = MagicMock()
+        update.effective_user.id = 1
+        update.message.reply_text = AsyncMock(return_value=MagicMock(edit_text=AsyncMock()))
+        update.message.reply_photo = AsyncMock()
+        
+        async def scenario():
+            for _ in range(2):
+                await bot.predict_command(update, MagicMock(args=['30']))
+        
+        with patch.object(nostradamus.plotting, 'plot_forecast', wraps=nostradamus.plotting.plot_forecast) as render:
+            asyncio.run(scenario())
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual((bot.charts.hits, len(bot.charts)), (1, 1))
+        first, second = (call[0][0] for call in update.message.reply_photo.call_args_list)
+        self.assertEqual(first, second)
+        bot.pool.shutdown()
+    
+    def test_backend_calls_hold_a_pool_slot(self):
+        """In API mode the per-user limit also covers the backend call."""
+        from bot import NostradamusBot
+        
+        bot = NostradamusBot('test-token', BotConfig(
+            telegram_token='test-token', prediction_source='api', send_charts=False,
+        ))
+        forecast = NostradamusBot._generate_mock_prediction(10).to_dict()
+        
+        async def slow_predict(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return forecast
+        
+        bot.api = MagicMock(predict=slow_predict)
+        updates = []
+        for _ in range(2):
+            update = MagicMock()
+            update.effective_user.id = 1
+            update.message.reply_text = AsyncMock(return_value=MagicMock(edit_text=AsyncMock()))
+            updates.append(update)
+        
+        async def scenario():
+            first = asyncio.ensure_future(bot.predict_command(updates[0], MagicMock(args=['10'])))
+            await asyncio.sleep(0.01)
+            self.assertEqual(bot.pool.in_flight, 1)
+            await bot.predict_command(updates[1], MagicMock(args=['10']))
+            await first
+        
+        asyncio.run(scenario())
+        self.assertIn('già una predizione', updates[1].message.reply_text.call_args[0][0])
+        self.assertEqual((bot.pool.in_flight, bot.pool.metrics.rejected_user), (0, 1))
+        bot.pool.shutdown()
+    
+    def test_charts_can_be_disabled(self):
+        from bot import NostradamusBot
+        
+        bot = NostradamusBot('test-token', BotConfig(telegram_token='test-token', send_charts=False))
+        update = MagicMock()
+        update.effective_user.id = 1
+        processing = MagicMock(edit_text=AsyncMock())
+        update.message.reply_text = AsyncMock(return_value=processing)
+        update.message.reply_photo = AsyncMock()
+        
+        asyncio.run(bot.predict_command(update, MagicMock(args=['10'])))
+        update.message.reply_photo.assert_not_awaited()
+        self.assertIn('API REST', processing.edit_text.call_args[0][0])
+        bot.pool.shutdown()
+
+
+class FakeTelegram:
+    """Local stand-in for the Telegram Bot API, recording every call."""
+    
+    def __init__(self):
+        self.calls = []
+        self.runner = None
+        self.port = None
+    
+    async def start(self):
+        from aiohttp import web
+        
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', 0).start()
+        self.port = self.runner.addresses[0][1]
+    
+    async def stop(self):
+        await self.runner.cleanup()
+    
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}/bot'
+    
+    def methods(self):
+        return [method for method, _ in self.calls]
+    
+    async def handle(self, request):
+        import json
+        from aiohttp import web
+        
+        method = request.match_info['method']
+        if request.content_type == 'application/json':
+            params = await request.json()
+        else:
+            params = {k: v for k, v in (await request.post()).items()}
+        self.calls.append((method, params))
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Nostradamus', 'username': 'nostradamus_bot'}
+        elif method == 'sendMessage':
+            result = {
+                'message_id': len(self.calls), 'date': 0, 'text': params.get('text', ''),
+                'chat': {'id': int(params['chat_id']), 'type': 'private'},
+            }
+        else:
+            result = True
+        return web.Response(text=json.dumps({'ok': True, 'result': result}), content_type='application/json')
+
+
+def command_update(update_id, chat_id, command):
+    """Update payload of a user sending ``command``."""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': command,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Test'},
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}],
+        },
+    }
+
+
+class TestWebhookMode(unittest.TestCase):
+    """Test cases for webhook mode against a fake Telegram endpoint."""
+    
+    def test_allowed_updates_follow_handlers(self):
+        """Only the update types consumed by the handlers are requested."""
+        from bot import NostradamusBot
+        from webhook import allowed_updates
+        
+        bot = NostradamusBot('123:test')
+        application = bot.build_application()
+        self.assertEqual(allowed_updates(application), ['callback_query', 'message'])
+        bot.pool.shutdown()
+    
+    def test_import_skips_webhook_and_charts(self):
+        """Importing the bot loads neither aiohttp nor the plotting module."""
+        import subprocess
+        
+        script = (
+            'import json, sys\n'
+            'import bot, webhook\n'
+            "print(json.dumps([m for m in ('aiohttp', 'nostradamus.plotting', 'matplotlib') if m in sys.modules]))\n"
+        )
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self.assertEqual(json.loads(output), [])
+    
+    def test_config_requires_webhook_url(self):
+        config = BotConfig(telegram_token='test', bot_mode='webhook')
+        with self.assertRaises(ValueError):
+            config.validate()
+        config.webhook_url = 'https://bot.example.com/telegram'
+        self.assertTrue(config.validate())
+    
+    def test_replicas_serve_updates_behind_one_url(self):
+        """Two replicas register the same webhook and each answers what it receives."""
+        import aiohttp
+        from bot import NostradamusBot
+        from webhook import SECRET_HEADER, WebhookServer
+        
+        async def scenario():
+            telegram = FakeTelegram()
+            await telegram.start()
+            replicas = []
+            for _ in range(2):
+                bot = NostradamusBot('123:test')
+                application = bot.build_application(base_url=telegram.base_url)
+                await application.initialize()
+                await application.start()
+                server = WebhookServer(application, '127.0.0.1', 0, '/telegram', secret_token='s3cret')
+                await server.start()
+                await server.set_webhook('https://bot.example.com/telegram')
+                replicas.append((bot, application, server))
+            
+            statuses = []
+            async with aiohttp.ClientSession() as session:
+                for k, (_, _, server) in enumerate(replicas):
+                    url = f'http://127.0.0.1:{server.port}/telegram'
+                    async with session.post(url, json=command_update(k + 1, 100 + k, '/help'),
+                                            headers={SECRET_HEADER: 's3cret'}) as response:
+                        statuses.append(response.status)
+                    async with session.post(url, json=command_update(10 + k, 200, '/help'),
+                                            headers={SECRET_HEADER: 'wrong'}) as response:
+                        statuses.append(response.status)
+                    async with session.get(f'http://127.0.0.1:{server.port}/healthz') as response:
+                        statuses.append(response.status)
+            
+            for _ in range(100):
+                if telegram.methods().count('sendMessage') >= 2:
+                    break
+                await asyncio.sleep(0.02)
+            for bot, application, server in replicas:
+                await server.stop()
+                await application.stop()
+                await application.shutdown()
+                bot.pool.shutdown()
+            await telegram.stop()
+            return statuses, telegram.calls
+        
+        statuses, calls = asyncio.run(scenario())
+        self.assertEqual(statuses, [200, 403, 200, 200, 403, 200])
+        
+        webhooks = [params for method, params in calls if method == 'setWebhook']
+        self.assertEqual(len(webhooks), 2)
+        for params in webhooks:
+            self.assertEqual(params['url'], 'https://bot.example.com/telegram')
+            self.assertEqual(json.loads(params['allowed_updates']), ['callback_query', 'message'])
+            self.assertEqual(params['secret_token'], 's3cret')
+        
+        chats = sorted(int(params['chat_id']) for method, params in calls if method == 'sendMessage')
+        self.assertEqual(chats, [100, 101])
+    
+    def test_run_webhook_until_stopped(self):
+        """run_webhook registers the webhook, serves updates and stops cleanly."""
+        import socket
+        import aiohttp
+        from bot import NostradamusBot
+        from webhook import run_webhook
+        
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        
+        async def scenario():
+            telegram = FakeTelegram()
+            await telegram.start()
+            bot = NostradamusBot('123:test')
+            application = bot.build_application(base_url=telegram.base_url)
+            stop = asyncio.Event()
+            task = asyncio.ensure_future(run_webhook(
+                application, 'https://bot.example.com/telegram', '127.0.0.1', port, stop_event=stop,
+            ))
+            for _ in range(100):
+                if 'setWebhook' in telegram.methods():
+                    break
+                await asyncio.sleep(0.02)
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f'http://127.0.0.1:{port}/telegram',
+                                        json=command_update(1, 7, '/about')) as response:
+                    status = response.status
+            for _ in range(100):
+                if 'sendMessage' in telegram.methods():
+                    break
+                await asyncio.sleep(0.02)
+            stop.set()
+            await task
+            await telegram.stop()
+            return status, telegram.methods()
+        
+        status, methods = asyncio.run(scenario())
+        self.assertEqual(status, 200)
+        self.assertIn('setWebhook', methods)
+        self.assertIn('sendMessage', methods)
+        self.assertNotIn('deleteWebhook', methods)
+
+
+class StubBackend:
+    """Local backend stub that can fail on demand and counts connections."""
+    
+    def __init__(self, failures=0, status=503, delay=0.0):
+        self.failures = failures
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+        self.connections = set()
+    
+    async def start(self):
+        from aiohttp import web
+        
+        app = web.Application()
+        app.router.add_route('*', '/api/{tail:.*}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', 0).start()
+        self.url = f'http://127.0.0.1:{self.runner.addresses[0][1]}/api'
+    
+    async def stop(self):
+        await self.runner.cleanup()
+    
+    async def handle(self, request):
+        from aiohttp import web
+        
+        self.requests += 1
+        self.connections.add(id(request.transport))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures > 0:
+            self.failures -= 1
+            return web.json_response({'status': 'error'}, status=self.status)
+        body = await request.json() if request.can_read_body else {}
+        return web.json_response({'path': request.path, 'body': body})
+
+
+class TestAPIClient(unittest.TestCase):
+    """Test cases for the pooled backend client against a local stub."""
+    
+    def run_client(self, backend, scenario, **kwargs):
+        from api_client import NostradamusAPIClient
+        
+        async def main():
+            await backend.start()
+            try:
+                async with NostradamusAPIClient(backend.url, backoff=0.001, **kwargs) as client:
+                    return await scenario(client)
+            finally:
+                await backend.stop()
+        return asyncio.run(main())
+    
+    def test_connections_are_reused(self):
+        """Sequential requests share one keep-alive connection."""
+        backend = StubBackend()
+        
+        async def scenario(client):
+            return [await client.predict(10) for _ in range(20)]
+        
+        results = self.run_client(backend, scenario)
+        self.assertEqual(results[0], {'path': '/api/predict', 'body': {'periods': 10, 'model': 'auto'}})
+        self.assertEqual(backend.requests, 20)
+        self.assertEqual(len(backend.connections), 1)
+    
+    def test_transient_errors_are_retried(self):
+        backend = StubBackend(failures=2, status=503)
+        
+        async def scenario(client):
+            return await client.get_info()
+        
+        self.assertEqual(self.run_client(backend, scenario)['path'], '/api/info')
+        self.assertEqual(backend.requests, 3)
+    
+    def test_client_errors_are_not_retried(self):
+        from api_client import APIError
+        
+        backend = StubBackend(failures=1, status=400)
+        
+        async def scenario(client):
+            with self.assertRaises(APIError) as context:
+                await client.get_models()
+            return context.exception.status
+        
+        self.assertEqual(self.run_client(backend, scenario), 400)
+        self.assertEqual(backend.requests, 1)
+    
+    def test_timeouts_use_api_timeout(self):
+        from api_client import APIError
+        
+        backend = StubBackend(delay=0.5)
+        
+        async def scenario(client):
+            with self.assertRaises(APIError):
+                await client.get_info()
+        
+        self.run_client(backend, scenario, timeout=0.05, max_retries=1)
+        self.assertEqual(backend.requests, 2)
+    
+    def test_circuit_breaker_opens_and_recovers(self):
+        """After repeated failures calls fail fast, then a trial call closes the circuit."""
+        from api_client import APIError, CircuitBreaker, CircuitOpenError
+        
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        backend = StubBackend(failures=4, status=502)
+        
+        async def scenario(client):
+            for _ in range(2):
+                with self.assertRaises(APIError):
+                    await client.get_info()
+            self.assertEqual(breaker.state, 'open')
+            with self.assertRaises(CircuitOpenError):
+                await client.get_info()
+            self.assertEqual(backend.requests, 4)
+            
+            now[0] = 11.0
+            self.assertEqual(breaker.state, 'half-open')
+            result = await client.get_info()
+            self.assertEqual(breaker.state, 'closed')
+            return result
+        
+        self.run_client(backend, scenario, max_retries=1, breaker=breaker)
+        self.assertEqual(backend.requests, 5)
+    
+    def test_cancelled_trial_call_reopens_the_circuit(self):
+        """A cancelled half-open call releases the trial slot instead of blocking the circuit."""
+        from api_client import CircuitBreaker, CircuitOpenError
+        
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        backend = StubBackend(delay=0.2)
+        
+        async def scenario(client):
+            now[0] = 11.0
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.get_info(), 0.01)
+            self.assertEqual(breaker.state, 'open')
+            with self.assertRaises(CircuitOpenError):
+                await client.get_info()
+        
+            now[0] = 22.0
+            backend.delay = 0.0
+            result = await client.get_info()
+            self.assertEqual(breaker.state, 'closed')
+            return result
+        
+        self.assertEqual(self.run_client(backend, scenario, breaker=breaker)['path'], '/api/info')
+    
+    def test_cancelled_call_is_not_a_failure(self):
+        """Cancelling a call on a closed circuit counts nothing against the backend."""
+        from api_client import CircuitBreaker
+        
+        breaker = CircuitBreaker(failure_threshold=1)
+        backend = StubBackend(delay=0.2)
+        
+        async def scenario(client):
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.get_info(), 0.01)
+            return breaker.failures, breaker.state
+        
+        self.assertEqual(self.run_client(backend, scenario, breaker=breaker), (0, 'closed'))
+    
+    def test_against_nostradamus_server(self):
+        """The client speaks the REST server's contract."""
+        from concurrent.futures import ThreadPoolExecutor
+        from api_client import NostradamusAPIClient
+        from bot import NostradamusBot
+        from nostradamus.server import PredictionServer
+        
+        async def main():
+            async with PredictionServer(port=0, executor=ThreadPoolExecutor(1)) as server:
+                url = f'http://127.0.0.1:{server.port}/api'
+                async with NostradamusAPIClient(url) as client:
+                    return await client.get_info(), await client.predict(5, model='naive', quantiles=[0.1, 0.9])
+        
+        info, result = asyncio.run(main())
+        self.assertEqual(info['status'], 'active')
+        self.assertEqual(len(result['predictions']), 5)
+        self.assertEqual(len(result['quantiles']['0.9']), 5)
+        text = NostradamusBot._format_prediction_result(result)
+        self.assertIn('Predizione Completata', text)
+        self.assertIn('Intervallo di previsione', text)
@@ -0,0 +1,188 @@
+"""
+Webhook mode for the Nostradamus Telegram Bot
+Receives updates over HTTP instead of long polling, so several bot replicas
+can run behind a load balancer
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+from typing import TYPE_CHECKING, List, Optional
+
+from telegram import Update
+from telegram.ext import (
+    Application,
+    CallbackQueryHandler,
+    ChosenInlineResultHandler,
+    CommandHandler,
+    InlineQueryHandler,
+    MessageHandler,
+    PollAnswerHandler,
+    PreCheckoutQueryHandler,
+    ShippingQueryHandler,
+)
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Update type consumed by each handler class. Command and message handlers
+# only subscribe to new messages: the bot does not react to edits.
+HANDLER_UPDATE_TYPES = {
+    CommandHandler: Update.MESSAGE,
+    MessageHandler: Update.MESSAGE,
+    CallbackQueryHandler: Update.CALLBACK_QUERY,
+    InlineQueryHandler: Update.INLINE_QUERY,
+    ChosenInlineResultHandler: Update.CHOSEN_INLINE_RESULT,
+    PollAnswerHandler: Update.POLL_ANSWER,
+    PreCheckoutQueryHandler: Update.PRE_CHECKOUT_QUERY,
+    ShippingQueryHandler: Update.SHIPPING_QUERY,
+}
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def allowed_updates(application: Application) -> List[str]:
+    """
+    Return the update types consumed by the registered handlers.
+
+    Telegram then only delivers those, instead of every update type. If a
+    handler of an unknown kind is registered, every type is requested.
+    """
+    types = set()
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            update_type = HANDLER_UPDATE_TYPES.get(type(handler))
+            if update_type is None:
+                return list(Update.ALL_TYPES)
+            types.add(update_type)
+    return sorted(types)
+
+
+class WebhookServer:
+    """
+    Async HTTP listener feeding webhook updates to an application.
+
+    Every replica runs one listener behind the same public URL. Requests are
+    answered as soon as the update is queued, so a slow handler never makes
+    Telegram retry the delivery. Registering the webhook is idempotent, so
+    every replica may do it at startup; it is never deleted on shutdown,
+    since other replicas keep serving.
+
+    Args:
+        application: Initialized and started application
+        listen: Interface to listen on
+        port: TCP port (``0`` picks a free one)
+        path: URL path receiving the updates
+        secret_token: Secret Telegram sends in the
+            ``X-Telegram-Bot-Api-Secret-Token`` header; other requests are
+            rejected
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        listen: str = '0.0.0.0',
+        port: int = 8443,
+        path: str = '/telegram',
+        secret_token: Optional[str] = None,
+    ):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = '/' + path.lstrip('/')
+        self.secret_token = secret_token
+        self._runner: Optional['web.AppRunner'] = None
+
+    async def start(self) -> None:
+        """Start listening; :attr:`port` holds the bound port afterwards."""
+        # aiohttp is only needed in webhook mode, not by polling bots.
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post(self.path, self._handle_update)
+        app.router.add_get('/healthz', self._handle_health)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.listen, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Webhook in ascolto su {self.listen}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def set_webhook(self, url: str, drop_pending_updates: bool = False) -> None:
+        """Register ``url`` with Telegram, for the handled update types only."""
+        await self.application.bot.set_webhook(
+            url=url,
+            allowed_updates=allowed_updates(self.application),
+            secret_token=self.secret_token,
+            drop_pending_updates=drop_pending_updates,
+        )
+
+    async def _handle_update(self, request: 'web.Request') -> 'web.Response':
+        from aiohttp import web
+
+        if self.secret_token is not None:
+            received = request.headers.get(SECRET_HEADER, '')
+            if not hmac.compare_digest(received, self.secret_token):
+                return web.Response(status=403)
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except (ValueError, TypeError, KeyError, json.JSONDecodeError):
+            return web.Response(status=400)
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def _handle_health(self, request: 'web.Request') -> 'web.Response':
+        from aiohttp import web
+
+        return web.json_response({'status': 'ok', 'running': self.application.running})
+
+
+async def run_webhook(
+    application: Application,
+    url: str,
+    listen: str = '0.0.0.0',
+    port: int = 8443,
+    path: str = '/telegram',
+    secret_token: Optional[str] = None,
+    register: bool = True,
+    stop_event: Optional[asyncio.Event] = None,
+) -> None:
+    """
+    Run ``application`` in webhook mode until ``stop_event`` is set.
+
+    Args:
+        application: Application with its handlers registered
+        url: Public URL Telegram posts updates to (the load balancer's)
+        listen: Interface to listen on
+        port: TCP port
+        path: URL path receiving the updates
+        secret_token: Shared secret checked on every update
+        register: Register the webhook with Telegram at startup
+        stop_event: Event stopping the bot (default: run until cancelled)
+    """
+    stop_event = stop_event or asyncio.Event()
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        server = WebhookServer(application, listen, port, path, secret_token)
+        await server.start()
+        try:
+            if register:
+                await server.set_webhook(url)
+            await stop_event.wait()
+        finally:
+            await server.stop()
+            await application.stop()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
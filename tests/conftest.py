@@ -0,0 +1,14 @@
+"""
+Fixtures shared by the test modules.
+"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def make_panel():
+    """Factory of random-walk panels, ``(n_series, n_time)``, with optional drift and level."""
+    def make(n_series=5, n_time=80, seed=0, drift=0.0, level=0.0):
+        rng = np.random.default_rng(seed)
+        return level + np.cumsum(drift + rng.normal(size=(n_series, n_time)), axis=1)
+    return make
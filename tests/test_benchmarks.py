@@ -0,0 +1,55 @@
+"""
+Tests for the benchmark suite helpers.
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add benchmarks directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+
+import synthetic
+from suite import compare
+
+
+def test_synthetic_panels_are_deterministic_prefixes():
+    small = synthetic.make_panel(100, 60, gaps=0.1, ragged=0.5)
+    large = synthetic.make_panel(synthetic.BLOCK + 5, 60, gaps=0.1, ragged=0.5)
+    np.testing.assert_array_equal(small, large[:100])
+    np.testing.assert_array_equal(small, synthetic.make_panel(100, 60, gaps=0.1, ragged=0.5))
+    assert not np.array_equal(small, synthetic.make_panel(100, 60, gaps=0.1, ragged=0.5, seed=1))
+
+    missing = np.isnan(large)
+    assert 0.1 < missing.mean() < 0.3
+    assert np.isnan(large[:, 0]).mean() > 0.4
+
+
+def test_synthetic_components():
+    flat = synthetic.make_panel(50, 70, trend=0.0, seasonality=0.0, noise=0.0)
+    np.testing.assert_allclose(flat, flat[:, :1].repeat(70, axis=1))
+
+    seasonal = synthetic.make_panel(50, 70, trend=0.0, noise=0.0, season_length=7)
+    np.testing.assert_allclose(seasonal[:, 7:], seasonal[:, :-7])
+    assert synthetic.make_panel(10, 5, dtype=np.float32).dtype == np.float32
+
+
+def test_synthetic_store_round_trip(tmp_path):
+    store = synthetic.write_store(str(tmp_path / 'store'), 30, 20, gaps=0.2)
+    panel = synthetic.make_panel(30, 20, gaps=0.2)
+    assert store.n_series == 30
+    assert store.n_rows == np.isfinite(panel).sum()
+    rows = store.read(series=['series_7'])
+    np.testing.assert_array_equal(rows['y'], panel[7][np.isfinite(panel[7])])
+
+
+def test_compare_flags_regressions():
+    def report(*seconds):
+        return {'results': [
+            {'name': name, 'series': 1000, 'seconds': s}
+            for name, s in zip(['fit', 'predict', 'serve'], seconds)
+        ]}
+
+    rows = compare(report(1.0, 1.0, 1.0), report(1.05, 1.5, 0.5), threshold=0.1)
+    assert [row[-1] for row in rows] == ['', 'regression', 'improvement']
+    assert compare(report(1.0), report(1.0, 2.0), threshold=0.1)[0][4] == 1.0
@@ -0,0 +1,128 @@
+"""
+Tests for the forecast cache.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor
+from nostradamus.cache import ForecastCache, fingerprint, model_key
+
+PANEL = dict(n_series=4, n_time=50)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fingerprint_depends_on_content_and_shape(make_panel):
+    """Equal data hashes equal; any change in values or shape changes the key."""
+    panel = make_panel(**PANEL)
+    assert fingerprint(panel) == fingerprint(panel.copy())
+    changed = panel.copy()
+    changed[0, 0] += 1e-9
+    assert fingerprint(changed) != fingerprint(panel)
+    assert fingerprint(panel.reshape(2, 100)) != fingerprint(panel)
+
+
+def test_shorter_horizon_is_served_as_prefix(make_panel):
+    """A cached 365-step forecast answers a 30-step request without refitting."""
+    cache = ForecastCache()
+    panel = make_panel(**PANEL)
+    long = cache.forecast(panel, periods=365, model='ar')
+    short = cache.forecast(panel, periods=30, model='ar')
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(short, long[:, :30])
+    np.testing.assert_allclose(short, Predictor(model='ar').fit(panel).predict(30))
+
+    cache.forecast(panel, periods=400, model='ar')
+    assert cache.misses == 2
+
+
+def test_model_configuration_is_part_of_the_key(make_panel):
+    """Different hyperparameters never share an entry."""
+    assert model_key('ar', {'order': 2}) != model_key('ar', {'order': 3})
+    cache = ForecastCache()
+    panel = make_panel(**PANEL)
+    cache.forecast(panel, periods=5, model='ar', order=2)
+    cache.forecast(panel, periods=5, model='ar', order=3)
+    assert cache.misses == 2 and len(cache) == 2
+
+
+def test_lru_eviction_respects_memory_bound():
+    """The least recently used entries are evicted beyond max_bytes."""
+    cache = ForecastCache(max_bytes=3 * (800 + 256))
+    for key in 'abc':
+        cache.put(key, 'm', np.zeros(100))
+    cache.get('a', 'm', 10)
+    cache.put('d', 'm', np.zeros(100))
+
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.get('b', 'm', 10) is None
+    assert cache.get('a', 'm', 10) is not None
+
+
+def test_ttl_expires_entries_in_memory_and_on_disk(tmp_path):
+    """Expired entries are dropped from both tiers."""
+    clock = FakeClock()
+    cache = ForecastCache(ttl=60, directory=str(tmp_path), clock=clock)
+    cache.put('data', 'm', np.arange(10.0))
+    clock.now += 30
+    assert cache.get('data', 'm', 10) is not None
+    clock.now += 60
+    assert cache.get('data', 'm', 10) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    """A fresh cache pointed at the same directory serves stored forecasts."""
+    ForecastCache(directory=str(tmp_path)).put('data', 'm', np.arange(10.0))
+    cache = ForecastCache(directory=str(tmp_path))
+    np.testing.assert_array_equal(cache.get('data', 'm', 4), np.arange(4.0))
+    assert len(cache) == 1
+
+
+def test_cached_forecasts_are_read_only():
+    """Callers cannot corrupt a cached entry through the returned array."""
+    cache = ForecastCache()
+    cache.put('data', 'm', np.arange(5.0))
+    with pytest.raises(ValueError):
+        cache.get('data', 'm', 5)[0] = 1.0
+
+
+def test_shape_and_index_are_part_of_the_key(make_panel):
+    """A series, the same series as a 1-row panel and a re-dated series are separate entries."""
+    pd = pytest.importorskip('pandas')
+    y = make_panel(**PANEL)[0]
+    for first, second in [(y, y[None]), (y[None], y)]:
+        cache = ForecastCache()
+        assert cache.forecast(first, periods=5, model='naive').shape == np.shape(first)[:-1] + (5,)
+        assert cache.forecast(second, periods=5, model='naive').shape == np.shape(second)[:-1] + (5,)
+        assert cache.misses == 2
+
+    cache = ForecastCache()
+    daily = pd.Series(y, index=pd.date_range('2024-01-01', periods=50, freq='D'))
+    cache.forecast(daily, periods=5, model='naive')
+    cache.forecast(daily.copy(), periods=5, model='naive')
+    cache.forecast(pd.Series(y, index=pd.date_range('2024-03-01', periods=50, freq='D')), periods=5, model='naive')
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_misses_and_hits_return_read_only_arrays(make_panel):
+    """A freshly fitted forecast is returned like a cached one."""
+    cache = ForecastCache()
+    panel = make_panel(**PANEL)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.forecast(panel, periods=5, model='naive')[0, 0] = 1.0
+    assert (cache.hits, cache.misses) == (1, 1)
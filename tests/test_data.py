@@ -0,0 +1,95 @@
+"""
+Tests for the data loaders and the columnar store.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import load_data, load_sample_data
+from nostradamus.data import ColumnarStore, open_store
+
+pd = pytest.importorskip('pandas')
+
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    """A shuffled long-format CSV under a ``raw/`` folder."""
+    frame = load_sample_data(n_series=7, periods=60)
+    frame['price'] = np.arange(len(frame), dtype=float)
+    frame = frame.sample(frac=1.0, random_state=0)
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    path = raw / 'sales.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_sample_data_shape():
+    """The sample dataset has one row per series and day."""
+    frame = load_sample_data(n_series=2, periods=10)
+    assert list(frame.columns) == ['unique_id', 'ds', 'y']
+    assert len(frame) == 20
+
+
+def test_csv_round_trip_through_store(raw_csv, tmp_path):
+    """Converting in small chunks and buckets keeps every row, sorted per series."""
+    store = open_store(raw_csv, chunksize=50, n_buckets=3)
+    assert store.path == str(tmp_path / 'processed' / 'sales')
+    assert store.n_series == 7 and store.n_rows == 7 * 60
+    assert isinstance(store.columns['y'], np.memmap)
+
+    loaded = load_data(raw_csv)
+    expected = pd.read_csv(raw_csv, parse_dates=['ds'])
+    expected['unique_id'] = expected['unique_id'].astype(str)
+    expected = expected.sort_values(['unique_id', 'ds']).reset_index(drop=True)
+    loaded = loaded.sort_values(['unique_id', 'ds']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+
+
+def test_load_subset_of_series_and_dates(raw_csv):
+    """Only the requested series and date range are returned."""
+    open_store(raw_csv, chunksize=100, n_buckets=2)
+    frame = load_data(raw_csv, series=['series_5', 'series_2'],
+                      start='2022-01-10', end='2022-01-19', columns=['y'])
+    assert list(frame.columns) == ['unique_id', 'ds', 'y']
+    assert sorted(frame['unique_id'].unique()) == ['series_2', 'series_5']
+    assert len(frame) == 20
+    assert frame['ds'].min() == pd.Timestamp('2022-01-10')
+    assert frame['ds'].max() == pd.Timestamp('2022-01-19')
+
+
+def test_read_pages_of_the_selection(raw_csv):
+    """Pages read with offset and limit concatenate to the full selection."""
+    store = open_store(raw_csv, chunksize=100, n_buckets=2)
+    for series, start in [(None, None), (['series_5', 'series_2'], '2022-01-10')]:
+        full = store.read(series=series, start=start)
+        total = store.count(series=series, start=start)
+        assert total == len(full['y'])
+        pages = [store.read(series=series, start=start, offset=offset, limit=45) for offset in range(0, total + 1, 45)]
+        assert {len(page['y']) for page in pages[:-1]} == {45} and len(pages[-1]['y']) == total % 45
+        for name in full:
+            np.testing.assert_array_equal(np.concatenate([page[name] for page in pages]), full[name])
+
+
+def test_store_is_reused_until_csv_changes(raw_csv):
+    """A second load memory-maps the existing store instead of converting again."""
+    store = open_store(raw_csv)
+    meta_mtime = os.path.getmtime(os.path.join(store.path, 'meta.json'))
+    assert os.path.getmtime(os.path.join(open_store(raw_csv).path, 'meta.json')) == meta_mtime
+
+
+def test_unknown_series_raises(raw_csv):
+    """Asking for a missing series raises a KeyError."""
+    with pytest.raises(KeyError):
+        load_data(raw_csv, series=['nope'])
+
+
+def test_missing_store_raises(tmp_path):
+    """Opening a directory that is not a store fails clearly."""
+    with pytest.raises(FileNotFoundError):
+        ColumnarStore(str(tmp_path))
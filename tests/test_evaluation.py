@@ -0,0 +1,99 @@
+"""
+Tests for rolling-origin cross-validation and metrics.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor, load_sample_data
+from nostradamus.evaluation import (
+    CrossValidation, cross_validate, fold_origins, mae, mape, mase, naive_scale, rmse, smape,
+)
+
+# Random walks drifting up from 50.
+PANEL = dict(n_series=6, n_time=120, drift=0.2, level=50)
+
+
+def loop_cross_validate(panel, model, horizon, origins, **params):
+    """Reference: refit a predictor on every series and fold."""
+    out = np.empty((len(origins), panel.shape[0], horizon))
+    for k, end in enumerate(origins):
+        for i, series in enumerate(panel):
+            out[k, i] = Predictor(model=model, **params).fit(series[:end]).predict(horizon)
+    return out
+
+
+def test_fold_origins():
+    np.testing.assert_array_equal(fold_origins(100, 7, 3), [79, 86, 93])
+    np.testing.assert_array_equal(fold_origins(100, 7, 3, step=1), [91, 92, 93])
+    with pytest.raises(ValueError):
+        fold_origins(10, 7, 3)
+
+
+@pytest.mark.parametrize('model,params', [('naive', {}), ('linear', {}), ('ar', {'order': 2})])
+@pytest.mark.parametrize('reuse_state', [True, False])
+def test_forecasts_match_refitting_every_fold(model, params, reuse_state, make_panel):
+    """Updating fitted state between folds equals refitting from scratch."""
+    panel = make_panel(**PANEL)
+    panel[2, 40:45] = np.nan
+    cv = cross_validate(panel, model=model, horizon=5, n_folds=4, step=3, reuse_state=reuse_state, **params)
+
+    expected = loop_cross_validate(panel, model, 5, cv.origins, **params)
+    assert cv.forecasts.shape == (4, 6, 5)
+    np.testing.assert_allclose(cv.forecasts, expected, rtol=1e-6, atol=1e-6)
+    for k, end in enumerate(cv.origins):
+        np.testing.assert_array_equal(cv.actuals[k], panel[:, end:end + 5])
+
+
+def test_metrics_match_definitions():
+    actual = np.array([[1.0, 2.0, np.nan, 4.0]])
+    forecast = np.array([[2.0, 2.0, 5.0, 2.0]])
+    assert mae(actual, forecast) == pytest.approx(1.0)
+    assert rmse(actual, forecast) == pytest.approx(np.sqrt(5 / 3))
+    assert mape(actual, forecast) == pytest.approx(100 * (1 + 0 + 0.5) / 3)
+    assert smape(actual, forecast) == pytest.approx(100 * (2 / 3 + 0 + 2 * 2 / 6) / 3)
+    assert mase(actual, forecast, np.array([[2.0]])) == pytest.approx(0.5)
+    # Nothing to score gives NaN, not a warning.
+    assert np.isnan(mae(np.full(3, np.nan), np.ones(3)))
+
+
+def test_naive_scale_matches_loop(make_panel):
+    panel = make_panel(**dict(PANEL, n_time=60))
+    panel[1, 10:20] = np.nan
+    ends = [30, 45, 60]
+    scale = naive_scale(panel, ends, season=7)
+    for k, end in enumerate(ends):
+        for i in range(panel.shape[0]):
+            window = panel[i, :end]
+            expected = np.nanmean(np.abs(window[7:] - window[:-7]))
+            assert scale[k, i] == pytest.approx(expected)
+
+
+def test_evaluate_axes_and_summary(make_panel):
+    cv = cross_validate(make_panel(**PANEL), model='naive', horizon=4, n_folds=3)
+    per_series = cv.evaluate()
+    assert set(per_series) == {'mae', 'rmse', 'mape', 'smape', 'mase'}
+    assert per_series['mae'].shape == (6,)
+    assert cv.evaluate('rmse', axis=(0, 1)).shape == (4,)
+    np.testing.assert_allclose(
+        cv.evaluate('mae', axis=(1, 2)),
+        np.abs(cv.errors).mean(axis=(1, 2)),
+    )
+    summary = cv.summary()
+    assert summary['mae'] == pytest.approx(np.abs(cv.errors).mean())
+    with pytest.raises(ValueError):
+        cv.evaluate('r2')
+
+
+def test_long_dataframe_and_auto():
+    """Any Predictor input works; auto falls back to stacked fits when needed."""
+    df = load_sample_data(n_series=3, periods=120)
+    cv = cross_validate(df, model='auto', horizon=7, n_folds=2, candidates=['naive', 'linear'])
+    assert isinstance(cv, CrossValidation)
+    assert list(cv.ids) == ['series_0', 'series_1', 'series_2']
+    assert np.isfinite(cv.forecasts).all()
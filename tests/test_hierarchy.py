@@ -0,0 +1,167 @@
+"""
+Tests for hierarchical forecasting and reconciliation.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus.hierarchy import (
+    METHODS, HierarchicalPredictor, Hierarchy, _weights, reconcile, shrinkage_intensity,
+)
+
+
+def make_hierarchy(n=40):
+    region = np.where(np.arange(n) < 20, 'north', 'south')
+    region[35:] = 'east'
+    store = (np.arange(n) // 5).astype(str)
+    return Hierarchy({'region': region, 'store': store, 'sku': [f'sku-{i}' for i in range(n)]})
+
+
+def dense_mint(hierarchy, forecasts, W):
+    """Reference: S (S' W^-1 S)^-1 S' W^-1 y with dense matrices."""
+    S = hierarchy.summing_matrix.toarray()
+    Wi = np.linalg.inv(W)
+    return S @ np.linalg.solve(S.T @ Wi @ S, S.T @ Wi @ forecasts)
+
+
+def test_hierarchy_structure():
+    hierarchy = make_hierarchy()
+    assert hierarchy.levels == ['total', 'region', 'store', 'sku']
+    assert hierarchy.n_leaves == 40 and hierarchy.n_nodes == 1 + 3 + 8 + 40
+    assert list(hierarchy.ids[hierarchy.level_slices['region']]) == ['east', 'north', 'south']
+    assert hierarchy.ids[hierarchy.level_slices['store']][0] == 'east/7'
+    assert list(hierarchy.leaves[:2]) == ['sku-0', 'sku-1']
+
+    S = hierarchy.summing_matrix
+    assert sp.issparse(S) and S.shape == (52, 40)
+    counts = np.asarray(S.sum(axis=1)).ravel()
+    assert counts[0] == 40 and list(counts[1:4]) == [5, 20, 15]
+
+    with pytest.raises(ValueError):
+        Hierarchy({'store': ['a', 'a'], 'sku': ['x', 'x']})
+
+
+def test_same_label_under_different_parents():
+    hierarchy = Hierarchy(pd.DataFrame({
+        'region': ['n', 'n', 's', 's'],
+        'store': ['1', '2', '1', '1'],
+        'sku': ['a', 'b', 'c', 'd'],
+    }), total=None)
+    assert list(hierarchy.ids) == ['n', 's', 'n/1', 'n/2', 's/1', 'a', 'b', 'c', 'd']
+    rows, inverse = hierarchy.distinct_nodes()
+    # 's' has a single store and 'n/1', 'n/2' a single SKU each.
+    assert len(rows) == 6
+    assert list(hierarchy.ids[rows[inverse]]) == ['n', 's/1', 'a', 'b', 's/1', 'a', 'b', 'c', 'd']
+
+
+def test_aggregate_handles_gaps():
+    hierarchy = Hierarchy({'group': ['g', 'g', 'h'], 'leaf': ['a', 'b', 'c']})
+    values = np.array([[1.0, np.nan, np.nan], [2.0, 3.0, np.nan], [4.0, 5.0, 6.0]])
+    expected = np.array([
+        [7.0, 8.0, 6.0],
+        [3.0, 3.0, np.nan],
+        [4.0, 5.0, 6.0],
+    ])
+    np.testing.assert_array_equal(hierarchy.aggregate(values)[:3], expected)
+
+
+@pytest.mark.parametrize('method', ['ols', 'wls_struct', 'wls_var', 'mint_shrink'])
+def test_reconcile_matches_dense_projection(method):
+    hierarchy = make_hierarchy()
+    rng = np.random.default_rng(0)
+    forecasts = rng.normal(size=(hierarchy.n_nodes, 5)) * 10
+    common = rng.normal(size=(1, 60))
+    residuals = common * rng.uniform(0.5, 1, size=(hierarchy.n_nodes, 1)) + rng.normal(size=(hierarchy.n_nodes, 60))
+    residuals[:, :2] = np.nan
+
+    coherent = reconcile(forecasts, hierarchy, method, residuals)
+    variance, low_rank = _weights(hierarchy, method, residuals)
+    W = np.diag(variance) + (0 if low_rank is None else low_rank @ low_rank.T)
+    np.testing.assert_allclose(coherent, dense_mint(hierarchy, forecasts, W), atol=1e-8)
+    np.testing.assert_allclose(coherent, hierarchy.aggregate(coherent[-hierarchy.n_leaves:]), atol=1e-8)
+
+
+def test_reconcile_bottom_up_and_errors():
+    hierarchy = make_hierarchy()
+    leaves = np.random.default_rng(0).normal(size=(hierarchy.n_leaves, 3))
+    expected = hierarchy.summing_matrix @ leaves
+    np.testing.assert_allclose(reconcile(leaves, hierarchy, 'bottom_up'), expected)
+    np.testing.assert_allclose(reconcile(expected, hierarchy, 'ols'), expected)
+
+    with pytest.raises(ValueError):
+        reconcile(expected, hierarchy, 'top_down')
+    with pytest.raises(ValueError):
+        reconcile(expected, hierarchy, 'mint_shrink')
+    with pytest.raises(ValueError):
+        reconcile(leaves, hierarchy, 'ols')
+
+
+def test_shrinkage_intensity_matches_dense_formula():
+    rng = np.random.default_rng(1)
+    errors = rng.normal(size=(40, 1)) * rng.uniform(0.2, 1, 30) + 0.5 * rng.normal(size=(40, 30))
+
+    n = len(errors)
+    covariance = errors.T @ errors / n
+    scaled = errors / np.sqrt(np.diag(covariance))
+    v = ((scaled ** 2).T @ scaled ** 2 - (scaled.T @ scaled) ** 2 / n) / (n * (n - 1))
+    np.fill_diagonal(v, 0)
+    correlation = scaled.T @ scaled / n
+    np.fill_diagonal(correlation, 0)
+    expected = np.clip(v.sum() / (correlation ** 2).sum(), 0, 1)
+
+    assert 0 < expected < 1
+    assert shrinkage_intensity(errors) == pytest.approx(expected)
+
+
+def test_large_hierarchy_stays_sparse():
+    rng = np.random.default_rng(0)
+    n = 100_000
+    hierarchy = Hierarchy({
+        'region': rng.integers(0, 10, n),
+        'store': rng.integers(0, 200, n),
+        'sku': np.arange(n),
+    })
+    forecasts = rng.normal(size=(hierarchy.n_nodes, 4))
+    residuals = rng.normal(size=(hierarchy.n_nodes, 30))
+    coherent = reconcile(forecasts, hierarchy, 'mint_shrink', residuals)
+    agg = hierarchy.n_aggregated
+    np.testing.assert_allclose(coherent[:agg], hierarchy.aggregation @ coherent[agg:], atol=1e-6)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_hierarchical_predictor_is_coherent(method):
+    hierarchy = make_hierarchy()
+    panel = 100 + np.cumsum(np.random.default_rng(0).normal(size=(hierarchy.n_leaves, 80)), axis=1)
+    predictor = HierarchicalPredictor(hierarchy, model='ar', method=method).fit(panel)
+    forecasts = predictor.predict(7)
+
+    assert forecasts.shape == (hierarchy.n_nodes, 7)
+    np.testing.assert_allclose(forecasts, hierarchy.aggregate(forecasts[-hierarchy.n_leaves:]), atol=1e-8)
+    # Only the leaves for bottom-up; 'east' and 'east/7' share a series.
+    assert len(predictor.predictor.ids) == (40 if method == 'bottom_up' else 51)
+
+
+def test_hierarchical_predictor_long_frame():
+    hierarchy = make_hierarchy()
+    panel = 100 + np.cumsum(np.random.default_rng(0).normal(size=(hierarchy.n_leaves, 60)), axis=1)
+    frame = pd.DataFrame({
+        'unique_id': np.repeat(hierarchy.leaves, 60),
+        'ds': np.tile(pd.date_range('2024-01-01', periods=60), hierarchy.n_leaves),
+        'y': panel.ravel(),
+    }).sample(frac=1, random_state=0)
+
+    expected = HierarchicalPredictor(hierarchy, model='linear', method='ols').fit(panel).predict(5)
+    np.testing.assert_allclose(
+        HierarchicalPredictor(hierarchy, model='linear', method='ols').fit(frame).predict(5), expected
+    )
+    with pytest.raises(ValueError):
+        HierarchicalPredictor(hierarchy, model='linear').fit(frame[frame['unique_id'] != 'sku-3'])
+    with pytest.raises(RuntimeError):
+        HierarchicalPredictor(hierarchy).predict(5)
@@ -0,0 +1,130 @@
+"""
+Tests for the per-stage instrumentation.
+"""
+import pytest
+import sys
+import os
+import time
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor, instrumentation, load_data, load_sample_data
+
+
+@pytest.fixture
+def recorder():
+    recorder = instrumentation.enable()
+    yield recorder
+    instrumentation.disable()
+
+
+def random_walks(n_series=20, n_time=100):
+    return np.cumsum(np.random.default_rng(0).normal(size=(n_series, n_time)), axis=1)
+
+
+def test_disabled_hooks_record_nothing_and_cost_little():
+    assert not instrumentation.enabled()
+    assert instrumentation.stage('x') is instrumentation.stage('y')
+    assert instrumentation.render_prometheus() == ''
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        with instrumentation.stage('model.fit', 10, model='ar'):
+            pass
+    assert time.perf_counter() - start < 0.5
+
+
+def test_fit_and_predict_stages(recorder):
+    Predictor(model='ar', order=2).fit(random_walks()).predict(10, quantiles=[0.1, 0.9], n_samples=50)
+
+    events = {event['stage']: event for event in recorder.events}
+    assert set(events) == {
+        'data.to_panel', 'model.fit', 'predictor.fit',
+        'model.predict', 'simulation.quantiles', 'predictor.predict',
+    }
+    assert events['model.fit']['parent'] == 'predictor.fit'
+    assert events['simulation.quantiles']['parent'] == 'predictor.predict'
+    assert events['predictor.fit']['series'] == 20
+    assert events['model.fit']['labels'] == {'model': 'ar'}
+    # Nested stages take part of their parent's time.
+    assert events['model.fit']['wall'] <= events['predictor.fit']['wall']
+    assert all(event['cpu'] >= 0 and event['allocated'] is None for event in recorder.events)
+
+
+def test_auto_and_backend_stages(recorder):
+    Predictor(model='auto', candidates=['naive', 'linear'], holdout=5, n_folds=2).fit(random_walks())
+    stages = {(row['stage'], row['labels'].get('model')) for row in recorder.summary()}
+    assert {('auto.backtest', 'naive'), ('auto.backtest', 'linear'), ('model.fit', 'auto')} <= stages
+
+
+def test_loader_stages(recorder, tmp_path):
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    load_sample_data(n_series=4, periods=30).to_csv(raw / 'sales.csv', index=False)
+    load_data(str(raw / 'sales.csv'), series=['series_1', 'series_2'])
+
+    events = {event['stage']: event for event in recorder.events}
+    assert events['data.convert']['parent'] == 'data.load'
+    assert events['data.read']['series'] == 2
+
+
+def test_memory_tracking():
+    recorder = instrumentation.enable(memory=True)
+    try:
+        with instrumentation.stage('outer'):
+            with instrumentation.stage('inner'):
+                block = np.ones(2_000_000)
+            del block
+    finally:
+        instrumentation.disable()
+
+    events = {event['stage']: event for event in recorder.events}
+    assert events['inner']['allocated'] >= 16_000_000
+    # The block was freed before ``outer`` ended, but its peak includes it.
+    assert events['outer']['allocated'] < 1_000_000
+    assert events['outer']['peak'] >= 16_000_000
+    assert 'nostradamus_stage_peak_bytes{stage="inner"}' in recorder.render_prometheus()
+
+
+def test_errors_subscribers_and_bounded_events():
+    recorder = instrumentation.enable(max_events=3)
+    seen = []
+    recorder.subscribe(seen.append)
+    try:
+        with pytest.raises(ZeroDivisionError):
+            with instrumentation.stage('failing'):
+                1 / 0
+        for _ in range(5):
+            with instrumentation.stage('ok', 2, kind='a"b'):
+                pass
+    finally:
+        instrumentation.disable()
+
+    assert seen[0]['error'] == 'ZeroDivisionError' and len(seen) == 6
+    assert len(recorder.events) == 3
+    summary = {row['stage']: row for row in recorder.summary()}
+    assert summary['ok']['calls'] == 5 and summary['ok']['series'] == 10
+
+    text = recorder.render_prometheus()
+    assert '# TYPE nostradamus_stage_seconds_total counter' in text
+    assert 'nostradamus_stage_series_total{stage="ok",kind="a\\"b"} 10' in text
+
+
+def test_collect_ships_events_only_when_disabled():
+    with instrumentation.collect() as events:
+        with instrumentation.stage('worker'):
+            pass
+    assert [event['stage'] for event in events] == ['worker']
+    assert not instrumentation.enabled()
+
+    recorder = instrumentation.enable()
+    try:
+        with instrumentation.collect() as events:
+            with instrumentation.stage('worker'):
+                pass
+    finally:
+        instrumentation.disable()
+    assert events == [] and len(recorder.events) == 1
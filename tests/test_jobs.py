@@ -0,0 +1,115 @@
+"""
+Tests for sharded batch forecasting jobs.
+"""
+import pytest
+import sys
+import os
+import json
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import ForecastResult, Predictor
+from nostradamus.data import Panel, StoreWriter
+from nostradamus.jobs import MANIFEST_FILE, ForecastJob, main
+
+pd = pytest.importorskip('pandas')
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    values = 100 + np.cumsum(rng.normal(size=(25, 60)), axis=1)
+    values[3, 10:14] = np.nan
+    ids = np.array([f'sku-{i:02d}' for i in range(25)], dtype=object)
+    writer = StoreWriter(str(tmp_path / 'store'))
+    writer.append_panel(Panel(values, ids, index=pd.date_range('2024-01-01', periods=60, freq='D')))
+    return writer.close()
+
+
+def read_binary(output):
+    with open(os.path.join(output, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+    shards = sorted(manifest['shards'].values(), key=lambda entry: entry['index'])
+    results = []
+    for entry in shards:
+        with open(os.path.join(output, entry['file']), 'rb') as f:
+            results.append(ForecastResult.from_bytes(f.read()))
+    return manifest, results
+
+
+def test_job_forecasts_every_shard(store, tmp_path):
+    output = str(tmp_path / 'out')
+    job = ForecastJob(store.path, output, model='ar', periods=7, shard_series=10, n_jobs=2, format='binary')
+    manifest = job.run()
+    assert manifest['finished'] and manifest['n_shards'] == 3
+
+    _, results = read_binary(output)
+    assert [r.n_series for r in results] == [10, 10, 5]
+    ids = [i for r in results for i in r.ids]
+    assert ids == list(store.ids)
+
+    # Same forecasts as a predictor fitted on the whole store.
+    frame = pd.DataFrame(store.read())
+    expected = Predictor(model='ar').fit(frame).predict(7)
+    np.testing.assert_allclose(np.concatenate([r.values for r in results]), expected, rtol=1e-5)
+
+
+def test_job_resumes_after_a_crash(store, tmp_path, monkeypatch):
+    output = str(tmp_path / 'out')
+    job = ForecastJob(store.path, output, model='naive', periods=3, shard_series=10, format='binary')
+    original = ForecastJob._forecast
+
+    def crash_on_last(self, store, series, index):
+        if index == 2:
+            raise RuntimeError('worker died')
+        return original(self, store, series, index)
+
+    monkeypatch.setattr(ForecastJob, '_forecast', crash_on_last)
+    with pytest.raises(RuntimeError):
+        job.run()
+    manifest, _ = read_binary(output)
+    assert sorted(manifest['shards']) == ['0', '1'] and not manifest['finished']
+
+    # Finished shards are not computed again.
+    done = []
+
+    def record(self, store, series, index):
+        done.append(index)
+        return original(self, store, series, index)
+
+    monkeypatch.setattr(ForecastJob, '_forecast', record)
+    assert job.run()['finished'] and done == [2]
+
+    with pytest.raises(ValueError):
+        ForecastJob(store.path, output, model='ar', periods=3, shard_series=10, format='binary').run()
+    manifest = ForecastJob(store.path, output, model='ar', periods=3, shard_series=10, format='binary').run(overwrite=True)
+    assert manifest['finished'] and manifest['job']['model'] == 'ar'
+
+
+def test_job_preprocessing_and_parquet_cli(store, tmp_path):
+    pytest.importorskip('pyarrow')
+    output = str(tmp_path / 'out')
+    main([store.path, output, '--model', 'ar', '--param', 'order=2', '--periods', '5',
+          '--quantiles', '0.1', '0.9', '--preprocess', 'impute', 'scale', '--shard-series', '8', '--seed', '0'])
+
+    table = pd.read_parquet(output)
+    assert len(table) == 25 and list(table.columns) == ['unique_id', 'forecast', 'q_0.1', 'q_0.9']
+    forecasts = np.stack(table['forecast'].to_numpy())
+    # Forecasts are mapped back from the scaled series to the raw scale.
+    last = np.array([store.read(series=[i])['y'][-1] for i in table['unique_id']])
+    assert np.all(np.abs(forecasts[:, 0] - last) < 10)
+    assert np.all(np.stack(table['q_0.1'].to_numpy()) <= np.stack(table['q_0.9'].to_numpy()))
+
+    with open(os.path.join(output, MANIFEST_FILE), encoding='utf-8') as f:
+        job = json.load(f)['job']
+    assert job['params'] == {'order': 2} and [s['stage'] for s in job['preprocess']] == ['impute', 'scale']
+
+
+def test_invalid_job():
+    with pytest.raises(ValueError):
+        ForecastJob('store', 'out', format='csv')
+    with pytest.raises(ValueError):
+        ForecastJob('store', 'out', shard_series=0)
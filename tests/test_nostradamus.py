@@ -23,3 +23,55 @@ def test_package_metadata():
     assert hasattr(nostradamus, '__version__')
     assert hasattr(nostradamus, '__author__')
     assert hasattr(nostradamus, '__license__')
+
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+
+HEAVY_MODULES = ('numpy', 'pandas', 'statsmodels', 'prophet', 'matplotlib', 'sklearn', 'scipy')
+
+# Import budgets, as the number of modules an import may add to
+# ``sys.modules`` besides numpy's own. Module counts do not depend on how
+# loaded the machine is, and a new eager dependency blows through them.
+IMPORT_BUDGET = 5
+PREDICTOR_BUDGET = 120
+
+
+def cold_import(statement):
+    """Heavy modules loaded by ``statement`` in a fresh interpreter, and how many other modules it added."""
+    import json
+    import subprocess
+
+    script = (
+        'import json, sys\n'
+        f'sys.path.insert(0, {SRC!r})\n'
+        'before = set(sys.modules)\n'
+        f'{statement}\n'
+        "added = [m for m in set(sys.modules) - before if m.split('.')[0] != 'numpy']\n"
+        f'print(json.dumps([[m for m in {HEAVY_MODULES!r} if m in sys.modules], len(added)]))\n'
+    )
+    return json.loads(subprocess.run([sys.executable, '-c', script], capture_output=True,
+                                     text=True, check=True).stdout)
+
+
+def test_import_is_lazy():
+    """``import nostradamus`` loads no dependencies and stays within budget."""
+    loaded, added = cold_import('import nostradamus; nostradamus.__version__')
+    assert loaded == []
+    assert added <= IMPORT_BUDGET
+
+
+def test_predictor_import_skips_backends():
+    """Model backends are only imported when a model of theirs is fitted."""
+    loaded, added = cold_import('from nostradamus import Predictor, ARIMAModel, ProphetModel')
+    assert loaded == ['numpy']
+    assert added <= PREDICTOR_BUDGET
+
+
+def test_lazy_attributes():
+    import nostradamus
+    from nostradamus.predictor import Predictor
+    assert nostradamus.Predictor is Predictor
+    assert nostradamus.evaluation.__name__ == 'nostradamus.evaluation'
+    assert set(nostradamus.__all__) <= set(dir(nostradamus))
+    with pytest.raises(AttributeError):
+        nostradamus.missing
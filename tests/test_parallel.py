@@ -0,0 +1,53 @@
+"""
+Tests for process-pool execution of per-series models.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor
+from nostradamus.parallel import chunk_bounds, effective_n_jobs, map_series
+
+
+def _row_stats(row, offset):
+    return np.array([row.sum() + offset, row.max()])
+
+
+def test_chunk_bounds_cover_every_series():
+    """Chunks are contiguous and cover the whole range exactly once."""
+    bounds = chunk_bounds(103, n_jobs=4)
+    assert bounds[0][0] == 0 and bounds[-1][1] == 103
+    assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+    assert len(bounds) <= 4 * 4
+
+
+def test_effective_n_jobs():
+    """Negative values count back from the number of cores."""
+    assert effective_n_jobs(None) == 1
+    assert effective_n_jobs(3) == 3
+    assert effective_n_jobs(-1) == (os.cpu_count() or 1)
+
+
+def test_map_series_through_shared_memory_matches_serial():
+    """Workers read the panel from shared memory and keep row order."""
+    values = np.random.default_rng(0).normal(size=(50, 30))
+    serial = map_series(_row_stats, values, args=(1.0,), n_jobs=1)
+    parallel = map_series(_row_stats, values, args=(1.0,), n_jobs=2, chunksize=7)
+    np.testing.assert_allclose(np.stack(parallel), np.stack(serial))
+
+
+def test_arima_parallel_fit_matches_serial():
+    """ARIMA fitted with n_jobs=2 gives the same forecasts as a serial fit."""
+    pytest.importorskip('statsmodels')
+    rng = np.random.default_rng(0)
+    panel = np.cumsum(rng.normal(0.2, 1.0, size=(6, 80)), axis=1)
+
+    serial = Predictor(model='arima', order=(1, 1, 0)).fit(panel).predict(periods=5)
+    parallel = Predictor(model='arima', order=(1, 1, 0)).fit(panel, n_jobs=2).predict(periods=5)
+    assert parallel.shape == (6, 5)
+    np.testing.assert_allclose(parallel, serial, rtol=1e-6)
@@ -0,0 +1,168 @@
+"""
+Tests for saving, loading and registering predictors.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import ModelRegistry, Predictor, load_sample_data
+
+
+@pytest.mark.parametrize('model,params', [
+    ('naive', {}),
+    ('linear', {}),
+    ('ar', {'order': 3}),
+    ('auto', {'candidates': ['naive', 'linear', 'ar'], 'holdout': 5, 'n_folds': 2}),
+])
+def test_save_load_roundtrip(tmp_path, model, params, make_panel):
+    """A loaded predictor forecasts exactly like the saved one."""
+    panel = make_panel()
+    predictor = Predictor(model=model, **params).fit(panel)
+    predictor.save(str(tmp_path / 'model'))
+
+    loaded = Predictor.load(str(tmp_path / 'model'))
+    assert loaded.model == model and loaded.params == params
+    np.testing.assert_array_equal(loaded.predict(12), predictor.predict(12))
+
+
+def test_arima_roundtrip_without_pickle(tmp_path, make_panel):
+    """ARIMA state is stored as numeric arrays, not pickled statsmodels objects."""
+    pytest.importorskip('statsmodels')
+    panel = make_panel(n_series=3, n_time=60)
+    panel[1, :] = np.nan
+    predictor = Predictor(model='arima', order=(1, 1, 0)).fit(panel)
+    predictor.save(str(tmp_path / 'arima'))
+
+    for root, _, files in os.walk(tmp_path / 'arima'):
+        for name in files:
+            if name.endswith('.npy'):
+                assert np.load(os.path.join(root, name), allow_pickle=False).dtype != object
+
+    loaded = Predictor.load(str(tmp_path / 'arima'))
+    np.testing.assert_allclose(loaded.predict(7), predictor.predict(7))
+    assert np.isnan(loaded.predict(7)[1]).all()
+
+
+def test_arima_missing_states_use_an_integer_sentinel():
+    """Series without a state pack to -1 observations, without casting NaN to int."""
+    import warnings
+    from nostradamus.models import ARIMAModel
+
+    state = (np.zeros(2), np.zeros(1), np.eye(1), 60)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        packed = ARIMAModel().pack_states([state, None])
+    assert packed['n_obs'].tolist() == [60, -1]
+    unpacked = ARIMAModel().unpack_states({**packed, 'valid': np.array([True, True])})
+    assert unpacked[0][3] == 60 and unpacked[1] is None
+
+
+def test_load_is_lazy_and_memory_mapped(tmp_path, make_panel):
+    """Loading reads only the manifest; arrays are mapped on first use."""
+    predictor = Predictor(model='ar', order=2).fit(make_panel())
+    predictor.save(str(tmp_path / 'ar'))
+
+    loaded = Predictor.load(str(tmp_path / 'ar'))
+    assert loaded._model is None
+    loaded.predict(3)
+    assert isinstance(loaded.model_.coef_, np.memmap)
+
+
+def test_update_after_load(tmp_path, make_panel):
+    """Loaded state can be updated incrementally even though it is read-only on disk."""
+    panel = make_panel(n_time=100)
+    Predictor(model='ar', order=2).fit(panel[:, :80]).save(str(tmp_path / 'ar'))
+
+    loaded = Predictor.load(str(tmp_path / 'ar')).update(panel[:, 80:])
+    refit = Predictor(model='ar', order=2).fit(panel)
+    np.testing.assert_allclose(loaded.predict(5), refit.predict(5))
+    # The saved files are untouched.
+    np.testing.assert_array_equal(
+        Predictor.load(str(tmp_path / 'ar')).predict(5),
+        Predictor(model='ar', order=2).fit(panel[:, :80]).predict(5),
+    )
+
+
+def test_history_and_index_roundtrip(tmp_path):
+    """Series ids, the time index and optionally the history are restored."""
+    df = load_sample_data(n_series=2, periods=40)
+    predictor = Predictor(model='linear').fit(df)
+    predictor.save(str(tmp_path / 'full'), include_history=True)
+    predictor.save(str(tmp_path / 'light'))
+
+    full = Predictor.load(str(tmp_path / 'full'))
+    np.testing.assert_array_equal(full.ids, predictor.ids)
+    np.testing.assert_array_equal(full.panel_.values, predictor.panel_.values)
+    assert full.panel_.index.equals(predictor.panel_.index)
+
+    light = Predictor.load(str(tmp_path / 'light'))
+    np.testing.assert_array_equal(light.ids, predictor.ids)
+    assert light.panel_.n_time == 0
+    assert not os.path.exists(tmp_path / 'light' / 'values.npy')
+
+
+def test_save_unfitted_raises(tmp_path):
+    with pytest.raises(RuntimeError):
+        Predictor().save(str(tmp_path / 'x'))
+    with pytest.raises(FileNotFoundError):
+        Predictor.load(str(tmp_path / 'missing'))
+
+
+def test_registry_versions(tmp_path, make_panel):
+    """Versions are numbered, the latest is served by default, handles are reused."""
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    panel = make_panel()
+    first = Predictor(model='naive').fit(panel)
+    second = Predictor(model='linear').fit(panel)
+
+    assert registry.register('sales', first) == 1
+    assert registry.register('sales', second) == 2
+    assert registry.names() == ['sales']
+    assert registry.versions('sales') == [1, 2]
+    assert registry.latest('sales') == 2
+
+    np.testing.assert_array_equal(registry.get('sales').predict(4), second.predict(4))
+    np.testing.assert_array_equal(registry.get('sales', 1).predict(4), first.predict(4))
+    assert registry.get('sales') is registry.get('sales')
+
+    with pytest.raises(KeyError):
+        registry.load('missing')
+    with pytest.raises(ValueError):
+        registry.register('../escape', first)
+
+
+def test_registry_rejects_paths_outside_its_root(tmp_path, make_panel):
+    """Names cannot walk out of the registry, and manifests only name model classes."""
+    import json
+
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    outside = tmp_path / 'outside' / 'secret'
+    Predictor(model='naive').fit(make_panel()).save(str(outside / '1'))
+    for read in (registry.load, registry.get, registry.latest, registry.versions):
+        with pytest.raises(KeyError):
+            read('../outside/secret')
+
+    manifest = outside / '1' / 'manifest.json'
+    content = json.loads(manifest.read_text())
+    for path in ('os:system', 'nostradamus.models.base:np', 'nostradamus.predictor:Predictor'):
+        content['model']['class'] = path
+        manifest.write_text(json.dumps(content))
+        with pytest.raises(ValueError):
+            Predictor.load(str(outside / '1')).predict(2)
+
+
+def test_gbm_roundtrip_walks_saved_trees(tmp_path, make_panel):
+    """Boosted trees are saved as node arrays and walked with numpy once loaded."""
+    pytest.importorskip('sklearn')
+    panel = make_panel(n_series=20, n_time=100)
+    predictor = Predictor(model='gbm', max_iter=30).fit(panel)
+    predictor.save(str(tmp_path / 'gbm'))
+
+    loaded = Predictor.load(str(tmp_path / 'gbm'))
+    np.testing.assert_allclose(loaded.predict(10), predictor.predict(10), rtol=1e-10)
+    assert loaded.model_._estimator is None
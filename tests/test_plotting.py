@@ -0,0 +1,88 @@
+"""
+Tests for downsampled, cached chart rendering.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import ForecastResult, Predictor
+from nostradamus.plotting import ChartCache, chart_key, downsample, envelope, lttb, minmax, plot_forecast
+
+PNG = b'\x89PNG\r\n\x1a\n'
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[4321] = 50.0
+    kept = lttb(x, y, 500)
+    assert len(kept) == 500 and kept[0] == 0 and kept[-1] == len(y) - 1
+    assert (np.diff(kept) > 0).all()
+    assert 4321 in kept
+    np.testing.assert_array_equal(lttb(x[:100], y[:100], 500), np.arange(100))
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    y = np.random.default_rng(0).normal(size=3650)
+    kept = minmax(y, 200)
+    assert len(kept) <= 200 and (np.diff(kept) > 0).all()
+    assert y.argmin() in kept and y.argmax() in kept
+
+
+def test_downsample_drops_gaps():
+    y = np.arange(1000, dtype=float)
+    y[100:200] = np.nan
+    x, values = downsample(np.arange(1000), y, 50, method='minmax')
+    assert np.isfinite(values).all() and not ((x >= 100) & (x < 200)).any()
+    with pytest.raises(ValueError):
+        downsample(np.arange(3), y[:3], 2, method='average')
+
+    x, lower, upper = envelope(np.arange(10), np.arange(10.0), np.arange(10.0) + 1, 5)
+    np.testing.assert_array_equal(x, [0, 2, 4, 6, 8])
+    np.testing.assert_array_equal(lower, [0, 2, 4, 6, 8])
+    np.testing.assert_array_equal(upper, [2, 4, 6, 8, 10])
+
+
+def test_plot_predictions_and_cache(tmp_path):
+    pytest.importorskip('matplotlib')
+    rng = np.random.default_rng(1)
+    y = 100 + np.cumsum(rng.normal(size=(3, 3650)), axis=1)
+    predictor = Predictor(model='ar').fit(y)
+    path = str(tmp_path / 'chart.png')
+    png = predictor.plot_predictions(periods=60, series=2, path=path, width=400, height=200)
+    assert png.startswith(PNG)
+    with open(path, 'rb') as f:
+        assert f.read() == png
+    with pytest.raises(KeyError):
+        predictor.plot_predictions(series='missing')
+
+    result = predictor.forecast(30, quantiles=[0.1, 0.5, 0.9], seed=0)
+    cache = ChartCache(directory=str(tmp_path / 'charts'))
+    first = plot_forecast(result, history=y[1], series=1, cache=cache)
+    assert plot_forecast(result, history=y[1], series=1, cache=cache) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Another series, other options or other data are other charts.
+    key = chart_key(result, y[1], 1)
+    assert key != chart_key(result, y[1], 0)
+    assert key != chart_key(result, y[1], 1, width=400)
+    assert key != chart_key(ForecastResult(result.values + 1, result.bounds, result.quantiles), y[1], 1)
+
+    # The disk tier survives a restart.
+    restarted = ChartCache(directory=str(tmp_path / 'charts'))
+    assert plot_forecast(result, history=y[1], series=1, cache=restarted) == first
+    assert restarted.hits == 1
+
+
+def test_chart_cache_evicts_least_recently_used():
+    cache = ChartCache(max_bytes=10)
+    cache.put('a', b'12345')
+    cache.put('b', b'12345')
+    assert cache.get('a') == b'12345'
+    cache.put('c', b'12345')
+    assert cache.get('b') is None and cache.get('a') is not None
+    assert len(cache) == 2 and cache.nbytes == 10
@@ -0,0 +1,215 @@
+"""
+Tests for the Predictor and the vectorized panel models.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor, load_sample_data
+from nostradamus.data import to_panel
+
+# Random walks drifting up from 100.
+PANEL = dict(n_series=20, n_time=120, drift=0.1, level=100)
+
+
+@pytest.mark.parametrize('model', ['naive', 'linear', 'ar'])
+def test_panel_matches_per_series_fit(model, make_panel):
+    """Fitting the panel at once gives the same forecasts as one fit per series."""
+    panel = make_panel(**PANEL)
+    batched = Predictor(model=model).fit(panel).predict(periods=10)
+    looped = np.stack([Predictor(model=model).fit(row).predict(periods=10) for row in panel])
+    assert batched.shape == (20, 10)
+    np.testing.assert_allclose(batched, looped, rtol=1e-6)
+
+
+def test_linear_trend_is_recovered_exactly():
+    """A perfect line is extrapolated exactly, gaps included."""
+    y = 3.0 + 0.5 * np.arange(50)
+    y[[5, 17, 30]] = np.nan
+    forecast = Predictor(model='linear').fit(y).predict(periods=5)
+    np.testing.assert_allclose(forecast, 3.0 + 0.5 * np.arange(50, 55), rtol=1e-6)
+
+
+def test_ar_coefficients_are_recovered():
+    """Batched least squares recovers the AR(2) coefficients of a simulated panel."""
+    rng = np.random.default_rng(1)
+    y = np.zeros((200, 400))
+    for t in range(2, 400):
+        y[:, t] = 1.0 + 0.5 * y[:, t - 1] - 0.2 * y[:, t - 2] + rng.normal(size=200)
+    model = Predictor(model='ar', order=2).fit(y).model_
+    np.testing.assert_allclose(model.coef_.mean(axis=0), [1.0, 0.5, -0.2], atol=0.05)
+
+
+def test_long_dataframe_input():
+    """Ragged long-format data is aligned on the union of timestamps."""
+    pd = pytest.importorskip('pandas')
+    frame = pd.DataFrame({
+        'unique_id': ['b'] * 5 + ['a'] * 3,
+        'ds': list(pd.date_range('2024-01-01', periods=5)) * 1
+        + list(pd.date_range('2024-01-03', periods=3)),
+        'y': [1.0, 2.0, 3.0, 4.0, 5.0, 10.0, 20.0, 30.0],
+    })
+    panel = to_panel(frame)
+    assert list(panel.ids) == ['a', 'b']
+    assert np.isnan(panel.values[0, :2]).all()
+
+    predictor = Predictor(model='naive').fit(frame)
+    np.testing.assert_allclose(predictor.predict(periods=2), [[30.0, 30.0], [5.0, 5.0]])
+
+
+def test_predict_before_fit_raises():
+    """Predicting with an unfitted predictor raises a clear error."""
+    with pytest.raises(RuntimeError):
+        Predictor().predict(periods=5)
+
+
+def test_unknown_model_raises():
+    """Unknown model names are rejected."""
+    with pytest.raises(ValueError, match='Unknown model'):
+        Predictor(model='crystal-ball').fit(np.arange(10.0))
+
+
+def test_auto_tournament_picks_per_series_winner():
+    """Trending series go to the linear model, noisy random walks do not."""
+    rng = np.random.default_rng(0)
+    t = np.arange(100)
+    lines = 5.0 + 2.0 * t + rng.normal(scale=0.01, size=(10, 100))
+    walks = np.cumsum(rng.normal(size=(10, 100)), axis=1)
+    panel = np.vstack([lines, walks])
+
+    predictor = Predictor(model='auto', candidates=['naive', 'linear']).fit(panel)
+    forecast = predictor.predict(periods=3)
+    assert forecast.shape == (20, 3)
+    expected = np.broadcast_to(5.0 + 2.0 * np.arange(100, 103), (10, 3))
+    np.testing.assert_allclose(forecast[:10], expected, atol=0.1)
+
+    report = {r['model']: r for r in predictor.model_.report_}
+    assert report['LinearTrendModel()']['series'] >= 10
+    assert sum(r['series'] for r in report.values()) == 20
+    assert all(r['seconds'] >= 0 for r in report.values())
+
+
+def test_auto_time_budget_skips_expensive_candidates(make_panel):
+    """With no budget left, only the cheapest candidate is scored."""
+    panel = make_panel(**dict(PANEL, n_series=5, n_time=60))
+    model = Predictor(model='auto', time_budget=0.0).fit(panel).model_
+    statuses = {r['model']: r['status'] for r in model.report_}
+    assert statuses['NaiveModel()'] == 'selected'
+    assert statuses['ARIMAModel(order=(1, 1, 1), trend=None)'] == 'skipped'
+
+
+def test_auto_scores_vectorized_candidates_on_every_fold(make_panel):
+    """Batched smoothing models are scored on all folds, like naive, whatever their cost."""
+    from nostradamus.models import ARIMAModel, GradientBoostingModel, ThetaModel
+
+    assert ThetaModel.vectorized and not ARIMAModel.vectorized and not GradientBoostingModel.vectorized
+    panel = make_panel(**dict(PANEL, n_series=6, n_time=80))
+    model = Predictor(model='auto', candidates=['naive', 'ses', 'holt', 'theta'], n_folds=4, holdout=5).fit(panel).model_
+    assert [r['folds'] for r in model.report_] == [4, 4, 4, 4]
+
+
+@pytest.mark.parametrize('model', ['naive', 'linear', 'ar'])
+def test_update_matches_full_refit(model, make_panel):
+    """Incremental updates give the same forecasts as refitting on the full history."""
+    panel = make_panel(**dict(PANEL, n_series=8, n_time=130))
+    panel[2, 121] = np.nan
+
+    full = Predictor(model=model).fit(panel).predict(periods=6)
+    incremental = Predictor(model=model).fit(panel[:, :120])
+    incremental.update(panel[:, 120:125]).update(panel[:, 125:])
+
+    assert incremental.panel_.n_time == 130
+    np.testing.assert_allclose(incremental.predict(periods=6), full, rtol=1e-6)
+
+
+def test_update_auto_keeps_selection(make_panel):
+    """Auto updates each selected model on the series it won."""
+    panel = make_panel(**dict(PANEL, n_series=8, n_time=130))
+    predictor = Predictor(model='auto', candidates=['naive', 'linear', 'ar']).fit(panel[:, :120])
+
+    expected = np.empty((8, 6))
+    for model, rows in zip(predictor.model_.models_, predictor.model_.rows_):
+        expected[rows] = type(model)(**model.get_params()).fit(panel[rows]).predict(6)
+
+    predictor.update(panel[:, 120:])
+    np.testing.assert_allclose(predictor.predict(periods=6), expected, rtol=1e-6)
+
+
+def test_update_arima_uses_kalman_state():
+    """ARIMA updates match statsmodels' own append without refitting."""
+    pytest.importorskip('statsmodels')
+    from statsmodels.tsa.arima.model import ARIMA
+
+    y = np.cumsum(np.random.default_rng(2).normal(0.3, 1.0, size=150))
+    predictor = Predictor(model='arima', order=(1, 1, 1)).fit(y[:140])
+    predictor.update(y[140:])
+
+    expected = ARIMA(y[:140], order=(1, 1, 1)).fit().append(y[140:]).forecast(5)
+    np.testing.assert_allclose(predictor.predict(periods=5), expected, rtol=1e-6)
+
+
+def test_update_long_dataframe_aligns_by_id():
+    """New rows for a subset of series are matched by id; the others get gaps."""
+    pd = pytest.importorskip('pandas')
+    history = pd.DataFrame({
+        'unique_id': ['a'] * 3 + ['b'] * 3,
+        'ds': list(pd.date_range('2024-01-01', periods=3)) * 2,
+        'y': [1.0, 2.0, 3.0, 10.0, 20.0, 30.0],
+    })
+    new = pd.DataFrame({'unique_id': ['b'], 'ds': [pd.Timestamp('2024-01-04')], 'y': [40.0]})
+
+    predictor = Predictor(model='naive').fit(history).update(new)
+    np.testing.assert_allclose(predictor.predict(periods=1), [[3.0], [40.0]])
+    assert predictor.panel_.index[-1] == pd.Timestamp('2024-01-04')
+
+    with pytest.raises(ValueError, match='Unknown series'):
+        predictor.update(new.assign(unique_id='c'))
+
+
+def test_gbm_global_model_learns_shared_seasonality():
+    """One boosted model on all series beats the naive forecast on a weekly pattern."""
+    pytest.importorskip('sklearn')
+    rng = np.random.default_rng(0)
+    t = np.arange(150)
+    level = rng.uniform(10, 100, size=(60, 1))
+    panel = level * (1 + 0.3 * np.sin(2 * np.pi * t / 7)) + rng.normal(size=(60, 150))
+    train, test = panel[:, :-14], panel[:, -14:]
+
+    forecasts = Predictor(model='gbm', max_iter=100).fit(train).predict(periods=14)
+    naive = Predictor(model='naive').fit(train).predict(periods=14)
+    assert forecasts.shape == (60, 14)
+    assert np.mean(np.abs(forecasts - test)) < 0.5 * np.mean(np.abs(naive - test))
+
+
+def test_gbm_features_are_one_float32_matrix_without_lookahead():
+    pytest.importorskip('sklearn')
+    from nostradamus.models import GradientBoostingModel
+
+    model = GradientBoostingModel(lags=(1, 3), windows=(2,))
+    model.scale_ = np.ones(2)
+    z = np.array([[1.0, 2.0, np.nan, 4.0, 5.0], [10.0, 20.0, 30.0, 40.0, 50.0]])
+    X = model._features(z, np.array([0, 1]), np.array([4, 1]), None, np.arange(5))
+
+    assert X.dtype == np.float32 and X.flags['C_CONTIGUOUS']
+    assert model.feature_names() == ['lag_1', 'lag_3', 'mean_2', 'std_2', 'position', 'log_scale']
+    # Row 0 targets z[0, 4]: lags 4.0 and 2.0, window (nan, 4.0).
+    np.testing.assert_allclose(X[0], [4.0, 2.0, 4.0, 0.0, 4.0, 0.0])
+    np.testing.assert_allclose(X[1, :2], [10.0, np.nan])
+    np.testing.assert_allclose(X[1, 2:4], [10.0, 0.0])
+
+
+def test_gbm_calendar_features_and_refit_on_update():
+    pytest.importorskip('sklearn')
+    frame = load_sample_data(n_series=5, periods=120)
+    predictor = Predictor(model='gbm', max_iter=20).fit(frame[frame['ds'] < '2022-04-21'])
+    assert predictor.model_.freq_ == 'D'
+    assert 'dayofweek' in predictor.model_.feature_names(calendar=True)
+
+    predictor.update(frame[frame['ds'] >= '2022-04-21'])
+    assert predictor.panel_.n_time == 120 and predictor.model_.n_time_ == 120
+    assert np.isfinite(predictor.predict(periods=7)).all()
@@ -0,0 +1,163 @@
+"""
+Tests for the streaming preprocessing pipeline.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import load_data
+from nostradamus.data import Clip, Difference, Impute, Pipeline, Resample, Scale
+from nostradamus.data.panel import Panel
+
+pd = pytest.importorskip('pandas')
+
+
+def irregular_feed(n_series=6, days=20, seed=0):
+    """Observations at random minutes, a varying number per series and day."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(n_series):
+        n = rng.integers(3 * days, 10 * days)
+        minutes = np.sort(rng.choice(days * 24 * 60, size=n, replace=False))
+        frames.append(pd.DataFrame({
+            'unique_id': f'series_{i}',
+            'ds': pd.Timestamp('2024-01-01') + pd.to_timedelta(minutes, unit='min'),
+            'y': 100.0 * (i + 1) + rng.normal(size=n),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize('how', ['mean', 'sum', 'last'])
+def test_resample_matches_pandas(how):
+    feed = irregular_feed()
+    panel = Pipeline([Resample('D', how=how)]).fit_transform(feed)
+    expected = getattr(feed.groupby(['unique_id', pd.Grouper(key='ds', freq='D')])['y'], how)()
+    expected = expected.unstack().reindex(columns=panel.index)
+    assert list(panel.ids) == list(expected.index)
+    np.testing.assert_allclose(panel.values, expected.to_numpy(dtype=float))
+
+
+def test_impute_fills_interior_gaps_only():
+    nan = np.nan
+    y = np.array([[nan, 1.0, nan, nan, 4.0, nan],
+                  [0.0, nan, 2.0, nan, nan, nan]])
+    panel = Panel(y, np.array(['a', 'b'], dtype=object))
+
+    linear = Impute().transform(panel)[0].values
+    np.testing.assert_allclose(linear, [[nan, 1, 2, 3, 4, nan], [0, 1, 2, nan, nan, nan]])
+    ffilled = Impute('ffill').transform(panel)[0].values
+    np.testing.assert_allclose(ffilled, [[nan, 1, 1, 1, 4, nan], [0, 0, 2, nan, nan, nan]])
+    short = Impute(max_gap=1).transform(panel)[0].values
+    np.testing.assert_allclose(short, [[nan, 1, nan, nan, 4, nan], [0, 1, 2, nan, nan, nan]])
+
+
+def test_clip_caps_spikes():
+    y = np.random.default_rng(1).normal(size=(3, 200))
+    y[1, 50] = 1e6
+    clipped = Clip(threshold=4.0).transform(Panel(y, np.arange(3)))[0].values
+    assert clipped[1, 50] < 10
+    # Ordinary values are untouched.
+    assert np.mean(clipped == y) > 0.99
+
+
+@pytest.mark.parametrize('stages', [
+    [Scale()],
+    [Scale('minmax')],
+    [Difference()],
+    [Scale(), Difference(lag=7)],
+])
+def test_inverse_transform_recovers_the_future(stages):
+    """Processing the full series and undoing the future part gives it back."""
+    rng = np.random.default_rng(2)
+    y = 50 + np.cumsum(rng.normal(size=(4, 100)), axis=1)
+    history, horizon = 80, 20
+    ids = np.array(['a', 'b', 'c', 'd'], dtype=object)
+
+    pipeline = Pipeline(stages)
+    pipeline.states = []
+    panel = Panel(y[:, :history], ids)
+    for stage in stages:
+        panel, state = stage.transform(panel)
+        pipeline.states.append(state)
+    pipeline.ids = ids
+
+    # Future values of the processed series, with the fitted state.
+    future = y.copy()
+    for stage, state in zip(stages, pipeline.states):
+        if isinstance(stage, Scale):
+            future = (future - state['loc'][:, None]) / state['scale'][:, None]
+        else:
+            future = np.hstack([np.full((4, stage.lag), np.nan), future[:, stage.lag:] - future[:, :-stage.lag]])
+    restored = pipeline.inverse_transform(future[:, history:])
+    np.testing.assert_allclose(restored, y[:, history:])
+
+    subset = pipeline.inverse_transform(future[[2, 0], history:], series=['c', 'a'])
+    np.testing.assert_allclose(subset, y[[2, 0], history:])
+
+
+def test_transform_is_lazy():
+    """Chunks are pulled from the source one at a time."""
+    feed = irregular_feed(n_series=4)
+    pulled = []
+
+    def chunks():
+        for key, group in feed.groupby('unique_id'):
+            pulled.append(key)
+            yield group
+
+    stream = Pipeline([Resample('D'), Impute()]).transform(chunks())
+    next(stream)
+    assert len(pulled) == 1
+    assert sum(1 for _ in stream) == 3 and len(pulled) == 4
+
+
+def test_run_writes_processed_store(tmp_path):
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    feed = irregular_feed(n_series=9, days=30)
+    feed.sample(frac=1.0, random_state=0).to_csv(raw / 'feed.csv', index=False)
+
+    stages = [Resample('D'), Impute(), Clip(), Scale(), Difference()]
+    destination = str(tmp_path / 'processed' / 'feed_daily')
+    store = Pipeline(stages).run(str(raw / 'feed.csv'), destination, chunk_series=4)
+    assert store.n_series == 9
+
+    # Chunking does not change the result.
+    whole = Pipeline([Resample('D'), Impute(), Clip(), Scale(), Difference()])
+    expected = whole.fit_transform(feed)
+    frame = load_data(destination)
+    chunked = frame.pivot(index='unique_id', columns='ds', values='y').reindex(columns=expected.index)
+    np.testing.assert_allclose(chunked.to_numpy(dtype=float), expected.values)
+
+    loaded = Pipeline.load(destination)
+    assert [s.name for s in loaded.stages] == ['resample', 'impute', 'clip', 'scale', 'difference']
+    zeros = np.zeros((2, 3))
+    np.testing.assert_allclose(
+        loaded.inverse_transform(zeros, series=['series_8', 'series_1']),
+        whole.inverse_transform(zeros, series=['series_8', 'series_1']),
+    )
+    # A flat forecast of the differences stays at the last observed level.
+    levels = whole.stages[3].inverse_transform(whole.states[4]['tail'], whole.states[3])
+    np.testing.assert_allclose(whole.inverse_transform(np.zeros((9, 3)))[:, -1], levels[:, -1])
+
+
+def test_invalid_pipelines(tmp_path):
+    with pytest.raises(ValueError):
+        Pipeline([Impute(), Resample('D')])
+    with pytest.raises(ValueError):
+        Resample('D', how='median')
+    with pytest.raises(ValueError):
+        Difference(lag=0)
+    with pytest.raises(RuntimeError):
+        Pipeline([Scale()]).inverse_transform(np.zeros((1, 3)))
+    pipeline = Pipeline([Resample('D'), Scale()])
+    pipeline.fit_transform(irregular_feed(n_series=2))
+    with pytest.raises(KeyError):
+        pipeline.inverse_transform(np.zeros((1, 3)), series=['unknown'])
+    with pytest.raises(FileNotFoundError):
+        Pipeline.load(str(tmp_path))
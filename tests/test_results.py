@@ -0,0 +1,117 @@
+"""
+Tests for compact forecast results.
+"""
+import pytest
+import sys
+import os
+import json
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import ForecastResult, Predictor
+from nostradamus.server import iter_json
+
+
+def make_result(n_series=4, periods=6):
+    rng = np.random.default_rng(0)
+    values = rng.normal(100, 10, size=(n_series, periods))
+    values[1, 2] = np.nan
+    bounds = np.stack([values - 5, values + 5], axis=1)
+    return ForecastResult(values, bounds, [0.1, 0.9], ids=[f's{i}' for i in range(n_series)], model='ar')
+
+
+def test_result_is_compact_float32():
+    result = make_result()
+    assert result.values.dtype == np.float32 and result.values.flags['C_CONTIGUOUS']
+    assert result.nbytes == 4 * 6 * 4 * 3
+    assert not hasattr(result, '__dict__')
+    with pytest.raises(AttributeError):
+        result.extra = 1
+
+    assert (result.n_series, result.periods) == (4, 6)
+    np.testing.assert_array_equal(result.quantile(0.9), result.bounds[:, 1])
+    with pytest.raises(KeyError):
+        result.quantile(0.5)
+    with pytest.raises(ValueError):
+        ForecastResult(np.zeros((2, 3)), np.zeros((2, 3)), [0.5])
+    with pytest.raises(ValueError):
+        ForecastResult(np.zeros((2, 3)), ids=['a'])
+
+
+def test_statistics_are_computed_once():
+    result = make_result()
+    assert result._statistics is None
+    stats = result.statistics
+    finite = result.values[np.isfinite(result.values)]
+    assert stats['mean'] == pytest.approx(finite.mean(dtype=np.float64))
+    assert stats['min'] == finite.min() and stats['max'] == finite.max()
+    assert result.statistics is stats
+
+    assert ForecastResult(np.full(3, np.nan)).statistics == {'mean': None, 'min': None, 'max': None}
+
+
+def test_zero_copy_views():
+    result = make_result()
+    view = result.to_buffer()
+    assert view.format == 'f' and view.shape == (4, 6)
+    assert np.shares_memory(np.asarray(view), result.values)
+    assert np.asarray(result) is result.values
+
+
+def test_binary_roundtrip_reads_in_place():
+    result = make_result()
+    data = result.to_bytes()
+    assert data == b''.join(bytes(piece) for piece in result.to_buffers())
+
+    loaded = ForecastResult.from_bytes(data)
+    np.testing.assert_array_equal(loaded.values, result.values)
+    np.testing.assert_array_equal(loaded.bounds, result.bounds)
+    assert loaded.quantiles == (0.1, 0.9) and loaded.ids == result.ids
+    assert (loaded.model, loaded.timestamp) == (result.model, result.timestamp)
+    assert not loaded.values.flags['WRITEABLE']
+
+    single = ForecastResult.from_bytes(ForecastResult(np.arange(3.0)).to_bytes())
+    assert single.values.shape == (3,) and single.bounds is None and single.ids is None
+
+    with pytest.raises(ValueError):
+        ForecastResult.from_bytes(data[:-4])
+    with pytest.raises(ValueError):
+        ForecastResult.from_bytes(b'JSON' + data[4:])
+
+
+def test_arrow_export():
+    pa = pytest.importorskip('pyarrow')
+    result = make_result()
+    table = result.to_arrow()
+    assert table.column_names == ['unique_id', 'forecast', 'q_0.1', 'q_0.9']
+    assert table.schema.field('forecast').type == pa.list_(pa.float32(), 6)
+    assert table.schema.metadata[b'model'] == b'ar'
+    forecast = table.column('forecast').chunk(0).flatten().to_numpy(zero_copy_only=False)
+    np.testing.assert_array_equal(forecast, result.values.ravel())
+
+
+def test_json_keeps_the_response_shape():
+    result = make_result()
+    payload = json.loads(''.join(iter_json(result.to_dict())))
+    assert set(payload) == {'model', 'periods', 'ids', 'predictions', 'statistics', 'timestamp', 'quantiles'}
+    assert payload['predictions'][1][2] is None
+    predictions = np.array(payload['predictions'], dtype=np.float64)
+    # The shortest float32 text reads back as the same float32.
+    np.testing.assert_array_equal(predictions.astype(np.float32), result.values)
+    assert list(payload['quantiles']) == ['0.1', '0.9']
+
+
+def test_predictor_forecast():
+    panel = 100 + np.cumsum(np.random.default_rng(0).normal(size=(5, 60)), axis=1)
+    predictor = Predictor(model='ar').fit(panel)
+    result = predictor.forecast(periods=7, quantiles=[0.1, 0.9], seed=0)
+    forecasts, bounds = predictor.predict(periods=7, quantiles=[0.1, 0.9], seed=0)
+    np.testing.assert_allclose(result.values, forecasts, rtol=1e-6)
+    np.testing.assert_allclose(result.bounds, bounds, rtol=1e-6)
+    assert result.model == 'ar' and result.ids == list(predictor.ids)
+
+    single = Predictor(model='naive').fit(panel[0]).forecast(periods=3)
+    assert single.values.shape == (3,) and single.ids is None
@@ -0,0 +1,124 @@
+"""
+Tests for batched seasonality detection.
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor
+from nostradamus.data import Deseasonalize, Pipeline
+from nostradamus.data.panel import Panel
+from nostradamus.models import HoltWintersModel
+from nostradamus.seasonality import detect_seasonality
+
+
+def seasonal_panel(periods, n_time=240, amplitude=3.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_time)
+    periods = np.asarray(periods)
+    phase = rng.uniform(0, 2 * np.pi, size=(len(periods), 1))
+    season = np.where(periods[:, None] > 0, amplitude * np.sin(2 * np.pi * t / np.maximum(periods, 1)[:, None] + phase), 0)
+    return 50 + 0.1 * t + season + rng.normal(size=(len(periods), n_time))
+
+
+def test_detects_the_period_of_every_series():
+    periods = np.repeat([0, 7, 12, 30], 25)
+    y = seasonal_panel(periods)
+    y[:25] = np.cumsum(np.random.default_rng(1).normal(size=(25, 240)), axis=1)
+    result = detect_seasonality(y)
+    assert result.period.shape == (100,)
+    assert np.mean(result.period == periods) > 0.95
+    assert (result.strength[periods > 0] > 0.5).all() and (result.strength >= 0).all()
+    assert set(result.common(n=3)) == {7, 12, 30}
+
+
+def test_gaps_short_and_empty_series():
+    y = seasonal_panel([7, 7, 7, 7])
+    complete = detect_seasonality(y).strength
+    y[0, np.random.default_rng(2).random(240) < 0.2] = np.nan
+    y[1, :200] = np.nan            # 40 points: 5 cycles
+    y[2, :230] = np.nan            # 10 points: too short
+    y[3] = np.nan
+    result = detect_seasonality(y)
+    np.testing.assert_array_equal(result.period, [7, 7, 0, 0])
+    assert abs(result.strength[0] - complete[0]) < 0.1
+    assert detect_seasonality(np.ones((2, 50))).period.tolist() == [0, 0]
+    assert detect_seasonality(np.arange(3.0)).periods.shape == (1, 1)
+
+
+def test_several_periods_per_series():
+    t = np.arange(400)
+    y = 3 * np.sin(2 * np.pi * t / 7) + 3 * np.sin(2 * np.pi * t / 45)
+    y = y + np.random.default_rng(0).normal(size=400)
+    result = detect_seasonality(y, n_periods=2, threshold=0.2)
+    assert sorted(result.periods[0]) == [7, 45]
+    assert result.strengths.shape == (1, 2)
+
+
+def test_non_sinusoidal_patterns_report_the_fundamental():
+    rng = np.random.default_rng(3)
+    weekly = np.tile([0, 10, 0, -10, 5, 0, -5], 60) + rng.normal(size=(10, 420))
+    square = np.tile([5.0] * 3 + [0.0] * 9, 35) + rng.normal(size=(10, 420))
+    result = detect_seasonality(np.vstack([weekly, square]), n_periods=2)
+    np.testing.assert_array_equal(result.period, [7] * 10 + [12] * 10)
+    # Neither harmonics (3, 4, 6) nor multiples (14, 24) come second.
+    assert set(result.periods[:, 1].tolist()) <= {0}
+
+
+def test_deseasonalize_stage_round_trip():
+    y = seasonal_panel([7, 12, 0], n_time=160)
+    adjusted, state = Deseasonalize().transform(Panel(y, np.array(['a', 'b', 'c'], dtype=object)))
+    np.testing.assert_array_equal(state['period'], [7, 12, 0])
+    # The seasonal swing is gone, series without a period are untouched.
+    assert np.std(np.diff(adjusted.values[0])) < 0.6 * np.std(np.diff(y[0]))
+    np.testing.assert_array_equal(adjusted.values[2], y[2])
+
+    # Forecasts of the adjusted series get the season back, in phase.
+    forecasts = Deseasonalize().inverse_transform(np.zeros((3, 30)), state)
+    season = y - adjusted.values
+    np.testing.assert_allclose(forecasts[0], np.resize(season[0, -7:], 30))
+    np.testing.assert_allclose(forecasts[1], np.resize(season[1, -12:], 30))
+    np.testing.assert_array_equal(forecasts[2], 0)
+
+
+def test_deseasonalize_ragged_series_keep_their_phase():
+    y = seasonal_panel([7, 7], n_time=160)
+    y[1, -3:] = np.nan
+    adjusted, state = Deseasonalize().transform(Panel(y, np.array(['a', 'b'], dtype=object)))
+    forecasts = Deseasonalize().inverse_transform(np.zeros((2, 14)), state)
+    season = y - adjusted.values
+    # Series b continues from its own last observation, three steps earlier.
+    np.testing.assert_allclose(forecasts[0], np.resize(season[0, -7:], 14))
+    np.testing.assert_allclose(forecasts[1], np.resize(season[1, -10:-3], 14))
+
+
+def test_deseasonalize_chunks_with_different_periods():
+    weekly, yearly = seasonal_panel([7, 7], n_time=160), seasonal_panel([30, 0], n_time=160, seed=1)
+    chunks = [
+        {'unique_id': np.repeat([f'{name}{i}' for i in range(2)], 160), 'ds': np.tile(np.arange(160), 2), 'y': y.ravel()}
+        for name, y in [('w', weekly), ('m', yearly)]
+    ]
+    pipeline = Pipeline([Deseasonalize()])
+    processed = list(pipeline.transform(chunks))
+    np.testing.assert_array_equal(pipeline.states[0]['period'], [7, 7, 30, 0])
+    assert pipeline.states[0]['season'].shape == (4, 30)
+
+    forecasts = pipeline.inverse_transform(np.zeros((2, 10)), series=['m0', 'w1'])
+    np.testing.assert_allclose(forecasts[0], (yearly - processed[1].values)[0, -30:-20])
+    np.testing.assert_allclose(forecasts[1], np.resize((weekly - processed[0].values)[1, -7:], 10))
+
+
+def test_auto_adds_seasonal_candidates():
+    y = seasonal_panel(np.repeat([7, 0], [30, 10]), n_time=150)
+    auto = Predictor(model='auto', holdout=7, n_folds=2).fit(y).model_
+    assert auto.seasonality_.common() == [7]
+    seasonal = [r for r in auto.report_ if 'HoltWintersModel' in r['model']]
+    assert len(seasonal) == 1 and seasonal[0]['series'] > 0
+    assert any(isinstance(m, HoltWintersModel) and m.season_length == 7 for m in auto.models_)
+
+    # Explicit candidates are used as given.
+    assert Predictor(model='auto', candidates=['naive']).fit(y).model_.seasonality_ is None
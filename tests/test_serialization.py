@@ -0,0 +1,107 @@
+"""
+Tests for the compact API encodings.
+"""
+import pytest
+import sys
+import os
+import zlib
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus.serialization import (
+    COLUMNS_TYPE,
+    FORECAST_TYPE,
+    JSON_TYPE,
+    compressor,
+    decode_columns,
+    decode_cursor,
+    decompress,
+    encode_columns,
+    encode_cursor,
+    etag,
+    etag_matches,
+    negotiate,
+    negotiate_encoding,
+)
+
+
+def test_columns_round_trip_exactly():
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(size=1000)).astype(np.float32)
+    y[[3, 500]] = [np.nan, np.inf]
+    ds = np.arange('2020-01-01', 1000, dtype='datetime64[D]').astype('datetime64[ms]')
+    ds[10] = np.datetime64('NaT')
+    ids = np.repeat(np.array(['b', 'a', None, 'c'], dtype=object), 250)
+    counts = rng.integers(-2 ** 62, 2 ** 62, size=1000)
+
+    data = b''.join(encode_columns({'id': ids, 'ds': ds, 'y': y, 'n': counts}, {'page': 1}))
+    assert len(data) % 8 == 0
+    columns, metadata = decode_columns(data)
+    assert metadata == {'page': 1}
+    assert columns['id'].tolist() == ids.tolist()
+    np.testing.assert_array_equal(columns['ds'], ds)
+    np.testing.assert_array_equal(columns['y'].view(np.int32), y.view(np.int32))
+    np.testing.assert_array_equal(columns['n'], counts)
+
+    empty, _ = decode_columns(b''.join(encode_columns({'y': np.zeros(0)})))
+    assert empty['y'].shape == (0,)
+    with pytest.raises(ValueError):
+        encode_columns({'a': np.zeros(2), 'b': np.zeros(3)})
+    with pytest.raises(ValueError):
+        decode_columns(data[:40])
+    with pytest.raises(ValueError):
+        decode_columns(b'JUNK' + data[4:])
+
+
+def test_delta_columns_compress_better_than_raw_floats():
+    t = np.arange(100_000)
+    y = (100 + 0.01 * t + np.sin(2 * np.pi * t / 7)).astype(np.float32)
+    ds = np.arange(100_000).astype('datetime64[D]')
+    encoded = b''.join(encode_columns({'ds': ds, 'y': y}))
+    raw = ds.astype('datetime64[ms]').tobytes() + y.tobytes()
+    assert len(zlib.compress(encoded)) < 0.5 * len(zlib.compress(raw))
+
+
+def test_negotiation():
+    offered = (JSON_TYPE, COLUMNS_TYPE)
+    assert negotiate(None, offered) == JSON_TYPE
+    assert negotiate('*/*', offered) == JSON_TYPE
+    assert negotiate(f'{COLUMNS_TYPE}', offered) == COLUMNS_TYPE
+    assert negotiate(f'application/json;q=0.5, {COLUMNS_TYPE}', offered) == COLUMNS_TYPE
+    assert negotiate(f'application/*;q=0.9, {COLUMNS_TYPE};q=0', offered) == JSON_TYPE
+    # Nothing acceptable: JSON is the fallback.
+    assert negotiate('text/html', offered) == JSON_TYPE
+    assert negotiate(FORECAST_TYPE, offered) == JSON_TYPE
+
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding('gzip, deflate, br') == 'gzip'
+    assert negotiate_encoding('gzip;q=0, identity') is None
+    assert negotiate_encoding('br') is None
+
+
+def test_streaming_compression():
+    pieces = [b'{"values": [', b'1.0,' * 1000, b'2.0]}']
+    for encoding in ('gzip', 'zstd'):
+        if encoding == 'zstd':
+            pytest.importorskip('zstandard')
+        stream = compressor(encoding)
+        data = b''.join([stream.compress(piece) for piece in pieces] + [stream.flush()])
+        assert decompress(data, encoding) == b''.join(pieces)
+    with pytest.raises(ValueError):
+        compressor('br')
+
+
+def test_cursors_and_etags():
+    cursor = encode_cursor(50_000, 'v1')
+    assert '=' not in cursor and decode_cursor(cursor) == (50_000, 'v1')
+    for bad in ('', 'nonsense', encode_cursor(-1, 'v1')):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+    tag = etag('v1', None, 0, 100, JSON_TYPE)
+    assert tag.startswith('W/"') and tag != etag('v2', None, 0, 100, JSON_TYPE)
+    assert etag_matches(tag, tag) and etag_matches(f'"x", {tag[2:]}', tag) and etag_matches('*', tag)
+    assert not etag_matches(None, tag) and not etag_matches('"x"', tag)
@@ -0,0 +1,347 @@
+"""
+Tests for the REST server.
+"""
+import pytest
+import sys
+import os
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import ForecastResult, ModelRegistry, Predictor, __version__, instrumentation
+from nostradamus.serialization import COLUMNS_TYPE, FORECAST_TYPE, decode_columns, decompress
+from nostradamus.server import PredictionServer, iter_json, _Rows
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Thread pool recording how many fits were submitted."""
+
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.submitted = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+
+        def run():
+            self.release.wait(5)
+            return fn(*args, **kwargs)
+        return super().submit(run)
+
+
+async def request(port, method, path, body=None, version='HTTP/1.1', headers=None):
+    """Send one request and return (status, headers, decoded JSON, text or bytes body)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode() if body is not None else b''
+    extra = ''.join(f'{name}: {value}\r\n' for name, value in (headers or {}).items())
+    writer.write(
+        f'{method} {path} {version}\r\nHost: localhost\r\nConnection: close\r\n{extra}'
+        f'Content-Length: {len(data)}\r\n\r\n'.encode() + data
+    )
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b'\r\n\r\n')
+    lines = head.decode().split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {name.lower(): value for name, value in (line.split(': ', 1) for line in lines[1:])}
+    if headers.get('transfer-encoding') == 'chunked':
+        body, rest = b'', payload
+        while True:
+            size, _, rest = rest.partition(b'\r\n')
+            size = int(size, 16)
+            if size == 0:
+                break
+            body, rest = body + rest[:size], rest[size + 2:]
+        payload = body
+    payload = decompress(payload, headers.get('content-encoding'))
+    if status == 304:
+        return status, headers, payload
+    if headers.get('content-type', '').startswith('text/plain'):
+        return status, headers, payload.decode()
+    if headers.get('content-type', '').startswith('application/json'):
+        return status, headers, json.loads(payload)
+    return status, headers, payload
+
+
+def serve(test, **kwargs):
+    """Run ``test(server)`` against a server on a free port."""
+    async def main():
+        kwargs.setdefault('executor', ThreadPoolExecutor(max_workers=2))
+        async with PredictionServer(port=0, **kwargs) as server:
+            return await test(server)
+    return asyncio.run(main())
+
+
+def test_info_and_models():
+    async def test(server):
+        status, _, info = await request(server.port, 'GET', '/api/info')
+        assert status == 200
+        assert info['version'] == __version__ and info['status'] == 'active'
+
+        status, _, models = await request(server.port, 'GET', '/api/models')
+        assert status == 200
+        assert {'auto', 'arima', 'prophet'} <= {m['id'] for m in models}
+    serve(test)
+
+
+def test_predict_posted_panel_matches_predictor():
+    """Forecasts of posted data equal a local fit; NaN gaps map to null."""
+    panel = np.cumsum(np.random.default_rng(0).normal(size=(3, 60)), axis=1)
+    data = panel.tolist()
+    data[1][5] = None
+
+    async def test(server):
+        return await request(server.port, 'POST', '/api/predict',
+                             {'periods': 7, 'model': 'ar', 'params': {'order': 2}, 'data': data})
+    status, headers, result = serve(test)
+
+    expected = Predictor(model='ar', order=2).fit(np.array(data, dtype=float)).predict(7)
+    assert status == 200 and headers['transfer-encoding'] == 'chunked'
+    assert result['status'] == 'success' and result['ids'] == [0, 1, 2]
+    np.testing.assert_allclose(np.array(result['predictions']), expected)
+    assert result['statistics']['max'] == pytest.approx(expected.max())
+
+
+def test_predict_defaults_to_sample_series():
+    """The mobile app posts only ``periods``."""
+    async def test(server):
+        return await request(server.port, 'POST', '/api/predict', {'periods': 5, 'model': 'naive'})
+    status, _, result = serve(test)
+    assert status == 200
+    assert len(result['predictions']) == 5 and result['ids'] is None
+
+
+def test_identical_inflight_requests_are_coalesced():
+    """Concurrent identical requests trigger a single fit."""
+    executor = CountingExecutor()
+    executor.release.clear()
+    body = {'periods': 3, 'model': 'linear', 'data': list(range(20))}
+
+    async def test(server):
+        tasks = [asyncio.ensure_future(request(server.port, 'POST', '/api/predict', body)) for _ in range(8)]
+        await asyncio.sleep(0.2)
+        executor.release.set()
+        results = await asyncio.gather(*tasks)
+        # Once finished, the forecast is served from the cache.
+        results.append(await request(server.port, 'POST', '/api/predict', body))
+        return results
+    results = serve(test, executor=executor)
+
+    assert executor.submitted == 1
+    assert all(r[0] == 200 and r[2]['predictions'] == pytest.approx([20, 21, 22]) for r in results)
+
+
+def test_registered_model_and_dataset(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    panel = np.cumsum(np.random.default_rng(1).normal(size=(2, 30)), axis=1)
+    predictor = Predictor(model='linear').fit(panel)
+    registry.register('sales', predictor)
+    (tmp_path / 'raw').mkdir()
+    (tmp_path / 'raw' / 'shop.csv').write_text(
+        'unique_id,ds,y\na,2024-01-01,1.0\na,2024-01-02,\nb,2024-01-01,3.5\n'
+    )
+
+    async def test(server):
+        models = (await request(server.port, 'GET', '/api/models'))[2]
+        predicted = await request(server.port, 'POST', '/api/predict', {'periods': 4, 'registered': 'sales'})
+        data = await request(server.port, 'GET', '/api/data/shop')
+        missing = await request(server.port, 'POST', '/api/predict', {'dataset': 'shop', 'series': ['zzz']})
+        return models, predicted, data, missing
+    models, predicted, data, missing = serve(test, registry=registry, data_dir=str(tmp_path))
+
+    assert any(m['id'] == 'sales' and m.get('registered') for m in models)
+    np.testing.assert_allclose(np.array(predicted[2]['predictions']), predictor.predict(4))
+    assert data[0] == 200 and data[2]['datasetId'] == 'shop'
+    assert data[2]['records'] == [
+        {'unique_id': 'a', 'ds': '2024-01-01T00:00:00', 'y': 1.0},
+        {'unique_id': 'a', 'ds': '2024-01-02T00:00:00', 'y': None},
+        {'unique_id': 'b', 'ds': '2024-01-01T00:00:00', 'y': 3.5},
+    ]
+    assert missing[0] == 404
+
+
+def test_errors():
+    async def test(server):
+        return [
+            await request(server.port, 'GET', '/api/missing'),
+            await request(server.port, 'GET', '/api/predict'),
+            await request(server.port, 'POST', '/api/predict', {'periods': 0}),
+            await request(server.port, 'POST', '/api/predict', {'model': 'nope'}),
+            await request(server.port, 'POST', '/api/predict', {'params': {'bogus': 1}}),
+            await request(server.port, 'POST', '/api/predict', {'model': 'ar', 'params': {'order': 'x'}}),
+            await request(server.port, 'POST', '/api/predict', {'data': [[1, 2], [3]]}),
+            await request(server.port, 'POST', '/api/predict', {'registered': 'x'}),
+            await request(server.port, 'GET', '/api/data/../etc'),
+        ]
+    statuses = [status for status, _, body in serve(test)]
+    assert statuses == [404, 405, 400, 400, 400, 400, 400, 404, 404]
+
+
+def test_registered_names_stay_inside_the_registry(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    Predictor(model='naive').fit(np.arange(10.0)).save(str(tmp_path / 'outside' / 'secret' / '1'))
+
+    async def test(server):
+        return await request(server.port, 'POST', '/api/predict', {'registered': '../outside/secret'})
+    assert serve(test, registry=registry)[0] == 404
+
+
+def test_http10_client_gets_unchunked_body():
+    async def test(server):
+        return await request(server.port, 'GET', '/api/info', version='HTTP/1.0')
+    status, headers, info = serve(test)
+    assert status == 200 and 'transfer-encoding' not in headers
+
+
+def test_iter_json_streams_large_arrays():
+    values = np.arange(6.0).reshape(2, 3)
+    values[0, 1] = np.nan
+    pieces = list(iter_json({'a': _Rows(values), 'b': [np.float32(1.5), 'x']}))
+    assert len(pieces) > 3
+    assert json.loads(''.join(pieces)) == {'a': [[0.0, None, 2.0], [3.0, 4.0, 5.0]], 'b': [1.5, 'x']}
+
+
+def test_predict_with_quantiles():
+    """Interval bounds come keyed by probability, deterministic across requests."""
+    rng = np.random.default_rng(0)
+    data = np.cumsum(rng.normal(size=(3, 60)), axis=1).tolist()
+    body = {'periods': 6, 'model': 'naive', 'data': data, 'quantiles': [0.1, 0.9]}
+
+    async def test(server):
+        first = await request(server.port, 'POST', '/api/predict', body)
+        second = await request(server.port, 'POST', '/api/predict', body)
+        bad = await request(server.port, 'POST', '/api/predict', dict(body, quantiles=[2]))
+        return first, second, bad
+    first, second, bad = serve(test)
+
+    assert first[0] == 200 and bad[0] == 400
+    result = first[2]
+    assert set(result['quantiles']) == {'0.1', '0.9'}
+    lower, upper = np.array(result['quantiles']['0.1']), np.array(result['quantiles']['0.9'])
+    assert lower.shape == (3, 6)
+    assert (lower < np.array(result['predictions'])).all() and (upper > lower).all()
+    assert second[2]['quantiles'] == result['quantiles']
+
+
+def test_metrics_include_worker_stages():
+    """Stages recorded in fit worker processes reach the server's /metrics."""
+    body = {'periods': 4, 'model': 'ar', 'data': np.arange(40.0).reshape(2, 20).tolist()}
+
+    async def test(server):
+        await request(server.port, 'POST', '/api/predict', body)
+        return await request(server.port, 'GET', '/api/metrics')
+    status, headers, text = serve(test, executor=None, workers=1, instrument=True)
+
+    assert status == 200 and headers['content-type'].startswith('text/plain')
+    assert 'nostradamus_stage_series_total{stage="model.fit",model="ar"} 2' in text
+    assert 'nostradamus_stage_calls_total{stage="server.request",route="predict"} 1' in text
+    # The server turns instrumentation off again when it closes.
+    assert not instrumentation.enabled()
+
+    async def disabled(server):
+        return await request(server.port, 'GET', '/api/metrics')
+    assert serve(disabled)[0] == 404
+
+
+def test_dataset_pages_and_revalidation(tmp_path):
+    """Cursors page through a dataset; unchanged pages are answered with 304."""
+    pd = pytest.importorskip('pandas')
+    (tmp_path / 'raw').mkdir()
+    csv = tmp_path / 'raw' / 'shop.csv'
+    frame = pd.DataFrame({
+        'unique_id': np.repeat(['a', 'b', 'c'], 4),
+        'ds': np.tile(pd.date_range('2024-01-01', periods=4).strftime('%Y-%m-%d'), 3),
+        'y': np.arange(12.0),
+    })
+    frame.to_csv(csv, index=False)
+
+    async def test(server):
+        pages, path = [], '/api/data/shop?limit=5'
+        while path:
+            status, headers, page = await request(server.port, 'GET', path)
+            assert status == 200
+            pages.append((headers['etag'], page))
+            path = page['nextCursor'] and f"/api/data/shop?limit=5&cursor={page['nextCursor']}"
+        etag, first = pages[0]
+        cached = await request(server.port, 'GET', '/api/data/shop?limit=5', headers={'If-None-Match': etag})
+        other = await request(server.port, 'GET', '/api/data/shop?limit=4', headers={'If-None-Match': etag})
+
+        # Rewriting the dataset invalidates its tags and outstanding cursors.
+        frame.assign(y=frame['y'] + 1).to_csv(csv, index=False)
+        later = os.stat(csv).st_mtime_ns + 10 ** 9
+        os.utime(csv, ns=(later, later))
+        changed = await request(server.port, 'GET', '/api/data/shop?limit=5', headers={'If-None-Match': etag})
+        stale = await request(server.port, 'GET', f"/api/data/shop?limit=5&cursor={first['nextCursor']}")
+        bad = [
+            await request(server.port, 'GET', '/api/data/shop?cursor=nonsense'),
+            await request(server.port, 'GET', '/api/data/shop?limit=0'),
+            await request(server.port, 'GET', '/api/data/shop?series=z'),
+        ]
+        _, _, subset = await request(server.port, 'GET', '/api/data/shop?series=c&series=a&limit=3')
+        _, _, rest = await request(server.port, 'GET', f"/api/data/shop?series=c&series=a&limit=3&cursor={subset['nextCursor']}")
+        return pages, cached, other, changed, stale, bad, subset, rest
+    pages, cached, other, changed, stale, bad, subset, rest = serve(test, data_dir=str(tmp_path))
+
+    assert [len(page['records']) for _, page in pages] == [5, 5, 2]
+    assert all(page['total'] == 12 for _, page in pages) and pages[-1][1]['nextCursor'] is None
+    assert [r['y'] for _, page in pages for r in page['records']] == list(range(12))
+    assert len({etag for etag, _ in pages}) == 3
+    assert cached[0] == 304 and cached[2] == b'' and cached[1]['etag'] == pages[0][0]
+    assert other[0] == 200
+    assert changed[0] == 200 and changed[2]['records'][0]['y'] == 1.0
+    assert stale[0] == 410
+    assert [status for status, _, _ in bad] == [400, 400, 404]
+    # A page of a selection spans series boundaries, in the requested order.
+    assert subset['total'] == 8 and [r['unique_id'] for r in subset['records']] == ['c'] * 3
+    assert [(r['unique_id'], r['y']) for r in rest['records']] == [('c', 12.0), ('a', 1.0), ('a', 2.0)]
+
+
+def test_binary_and_compressed_payloads(tmp_path):
+    """Binary formats and compression are negotiated; JSON stays the default."""
+    pd = pytest.importorskip('pandas')
+    (tmp_path / 'raw').mkdir()
+    frame = pd.DataFrame({
+        'unique_id': np.repeat(['a', 'b'], 500),
+        'ds': np.tile(pd.date_range('2020-01-01', periods=500).strftime('%Y-%m-%d'), 2),
+        'y': np.cumsum(np.random.default_rng(3).normal(size=1000)),
+    })
+    frame.loc[7, 'y'] = np.nan
+    frame.to_csv(tmp_path / 'raw' / 'shop.csv', index=False)
+    body = {'periods': 5, 'model': 'naive', 'data': [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], 'quantiles': [0.1, 0.9]}
+    columns = {'Accept': f'{COLUMNS_TYPE}, application/json;q=0.5', 'Accept-Encoding': 'gzip'}
+
+    async def test(server):
+        return [
+            await request(server.port, 'GET', '/api/data/shop', headers=columns),
+            await request(server.port, 'GET', '/api/data/shop', headers={'Accept-Encoding': 'gzip'}),
+            await request(server.port, 'GET', '/api/data/shop', headers={'Accept': 'text/html'}),
+            await request(server.port, 'POST', '/api/predict', body, headers={'Accept': FORECAST_TYPE}),
+            await request(server.port, 'POST', '/api/predict', body),
+        ]
+    binary, gzipped, fallback, forecast, plain = serve(test, data_dir=str(tmp_path))
+
+    assert binary[1]['content-type'] == COLUMNS_TYPE and binary[1]['content-encoding'] == 'gzip'
+    assert 'Accept' in binary[1]['vary']
+    values, metadata = decode_columns(binary[2])
+    assert metadata['datasetId'] == 'shop' and metadata['nextCursor'] is None and metadata['total'] == 1000
+    assert list(values) == ['unique_id', 'ds', 'y']
+    np.testing.assert_array_equal(values['y'], frame['y'].to_numpy(dtype=np.float32))
+    assert values['ds'][-1] == np.datetime64('2021-05-14')
+
+    # JSON is compressed on the fly and falls back for unknown types.
+    assert gzipped[1]['content-encoding'] == 'gzip'
+    assert gzipped[2]['records'] == fallback[2]['records'] and fallback[1]['content-type'] == 'application/json'
+    assert binary[1]['etag'] != gzipped[1]['etag']
+
+    result = ForecastResult.from_bytes(forecast[2])
+    assert forecast[1]['content-type'] == FORECAST_TYPE
+    np.testing.assert_array_equal(result.values, np.array(plain[2]['predictions'], dtype=np.float32))
+    np.testing.assert_array_equal(result.quantile(0.9), np.array(plain[2]['quantiles']['0.9'], dtype=np.float32))
@@ -0,0 +1,133 @@
+"""
+Tests for simulated prediction intervals.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor
+from nostradamus.simulation import StreamingQuantiles, _chunks, simulate_quantiles
+
+
+def random_walks(n_series=200, n_time=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(size=(n_series, n_time)), axis=1)
+
+
+def ar1_panel(phi=0.5, n_series=100, n_time=500, seed=0):
+    rng = np.random.default_rng(seed)
+    y = np.zeros((n_series, n_time))
+    for t in range(1, n_time):
+        y[:, t] = phi * y[:, t - 1] + rng.normal(size=n_series)
+    return y
+
+
+def test_random_walk_intervals_widen_with_sqrt_horizon():
+    """Naive intervals of unit-variance random walks match the normal quantiles."""
+    forecasts, bounds = Predictor(model='naive').fit(random_walks()).predict(
+        50, quantiles=[0.05, 0.5, 0.95], n_samples=2000, seed=1
+    )
+    width = (bounds[:, 2] - bounds[:, 0]).mean(axis=0)
+    expected = 2 * 1.645 * np.sqrt(np.arange(1, 51))
+    np.testing.assert_allclose(width, expected, rtol=0.05)
+    # Residuals are centred, so medians stay on the point forecasts.
+    assert np.abs((bounds[:, 1] - forecasts).mean(axis=0)).max() < 0.1
+
+
+@pytest.mark.parametrize('method', ['bootstrap', 'normal'])
+def test_ar_intervals_reach_the_stationary_spread(method):
+    """AR paths run through the fitted recursion: long-run width is the stationary one."""
+    predictor = Predictor(model='ar', order=1).fit(ar1_panel())
+    _, bounds = predictor.predict(30, quantiles=[0.1, 0.9], n_samples=3000, method=method, seed=2)
+    stationary = 2 * 1.2816 / np.sqrt(1 - 0.5 ** 2)
+    assert (bounds[:, 1, -1] - bounds[:, 0, -1]).mean() == pytest.approx(stationary, rel=0.03)
+    assert (bounds[:, 1, 0] - bounds[:, 0, 0]).mean() == pytest.approx(2 * 1.2816, rel=0.03)
+
+
+@pytest.mark.parametrize('model,params', [('naive', {}), ('linear', {}), ('ar', {'order': 3})])
+def test_zero_shocks_reproduce_point_forecasts(model, params):
+    predictor = Predictor(model=model, **params).fit(random_walks(n_series=10))
+    forecasts = predictor.predict(20)
+    paths = predictor.model_.simulate(forecasts, np.zeros((10, 3, 20), dtype=np.float32), np.arange(10))
+    np.testing.assert_allclose(paths, np.repeat(forecasts[:, None], 3, axis=1), rtol=1e-5)
+
+
+def test_auto_routes_series_to_selected_models():
+    """Auto simulates every series with the model it selected for it."""
+    panel = random_walks(n_series=30)
+    auto = Predictor(model='auto', candidates=['linear'], holdout=5, n_folds=2).fit(panel)
+    linear = Predictor(model='linear').fit(panel)
+    _, from_auto = auto.predict(10, quantiles=[0.2, 0.8], n_samples=200, seed=3)
+    _, direct = linear.predict(10, quantiles=[0.2, 0.8], n_samples=200, seed=3)
+    np.testing.assert_allclose(from_auto, direct)
+
+
+def test_streaming_quantiles():
+    rng = np.random.default_rng(4)
+    samples = rng.normal(size=(6, 8, 4000))
+    q = [0.05, 0.5, 0.95]
+
+    single = StreamingQuantiles(q)
+    single.push(samples, axis=2)
+    np.testing.assert_allclose(single.result, np.moveaxis(np.quantile(samples, q, axis=2), 0, -1))
+
+    streamed = StreamingQuantiles(q)
+    for batch in np.split(samples, 8, axis=2):
+        streamed.push(batch, axis=2)
+    assert streamed.count == 4000
+    np.testing.assert_allclose(streamed.result, single.result, atol=0.05)
+
+
+def test_memory_budget_splits_series_and_paths():
+    """Small budgets simulate blocks of series in batches, with the same answer."""
+    block, batch = _chunks(n_series=1000, horizon=365, n_samples=10_000, memory=2 ** 20)
+    assert block == 1 and 256 <= batch < 10_000
+
+    predictor = Predictor(model='naive').fit(random_walks(n_series=20))
+    forecasts = predictor.predict(30)
+    residuals = predictor.model_.residuals(predictor.panel_.values)
+    kwargs = dict(quantiles=[0.1, 0.9], n_samples=4000, seed=5)
+    chunked = simulate_quantiles(predictor.model_, forecasts, residuals, memory=2 ** 20, **kwargs)
+    whole = simulate_quantiles(predictor.model_, forecasts, residuals, memory=2 ** 32, **kwargs)
+    np.testing.assert_allclose(
+        (chunked[:, 1] - chunked[:, 0]).mean(axis=0), (whole[:, 1] - whole[:, 0]).mean(axis=0), rtol=0.03
+    )
+
+
+def test_single_series_seed_and_gaps():
+    panel = random_walks(n_series=3)
+    panel[1] = np.nan
+    predictor = Predictor(model='linear').fit(panel)
+    first = predictor.predict(5, quantiles=[0.5], n_samples=100, seed=7)[1]
+    second = predictor.predict(5, quantiles=[0.5], n_samples=100, seed=7)[1]
+    np.testing.assert_array_equal(first, second)
+    assert np.isnan(first[1]).all() and np.isfinite(first[[0, 2]]).all()
+
+    forecast, bounds = Predictor(model='ar').fit(panel[0]).predict(5, quantiles=[0.1, 0.5, 0.9])
+    assert forecast.shape == (5,) and bounds.shape == (3, 5)
+
+
+def test_invalid_requests():
+    predictor = Predictor(model='naive').fit(random_walks(n_series=2))
+    with pytest.raises(ValueError):
+        predictor.predict(5, quantiles=[1.5])
+    with pytest.raises(ValueError):
+        predictor.predict(5, quantiles=[0.5], n_samples=0)
+    with pytest.raises(ValueError):
+        predictor.predict(5, quantiles=[0.5], method='jackknife')
+
+
+def test_quantiles_need_the_history(tmp_path):
+    predictor = Predictor(model='ar').fit(random_walks(n_series=4))
+    predictor.save(str(tmp_path / 'bare'))
+    predictor.save(str(tmp_path / 'full'), include_history=True)
+
+    with pytest.raises(RuntimeError):
+        Predictor.load(str(tmp_path / 'bare')).predict(5, quantiles=[0.5])
+    loaded = Predictor.load(str(tmp_path / 'full')).predict(5, quantiles=[0.1, 0.9], seed=0)[1]
+    np.testing.assert_allclose(loaded, predictor.predict(5, quantiles=[0.1, 0.9], seed=0)[1])
@@ -0,0 +1,143 @@
+"""
+Tests for the batch exponential smoothing and Theta models.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from nostradamus import Predictor
+from nostradamus.models import HoltWintersModel, SimpleExponentialSmoothingModel, ThetaModel
+from nostradamus.models.smoothing import minimize_box
+
+
+def make_seasonal(n_series=30, n_time=140, noise=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_time)
+    level = rng.uniform(20, 80, size=(n_series, 1))
+    slope = rng.uniform(-0.2, 0.2, size=(n_series, 1))
+    amplitude = rng.uniform(2, 6, size=(n_series, 1))
+    return level + slope * t + amplitude * np.sin(2 * np.pi * t / 7) + noise * rng.normal(size=(n_series, n_time))
+
+
+def ses_reference(y, alpha):
+    """Simple exponential smoothing of one series, skipping gaps."""
+    level = y[np.isfinite(y)][0]
+    for value in y:
+        if np.isfinite(value):
+            level += alpha * (value - level)
+    return level
+
+
+def test_ses_matches_scalar_recursion():
+    y = make_seasonal(n_series=5)
+    y[1, 10:20] = np.nan
+    y[2, :30] = np.nan
+    model = SimpleExponentialSmoothingModel().fit(y)
+    expected = [ses_reference(row, alpha) for row, alpha in zip(y, model.alpha_)]
+    np.testing.assert_allclose(model.level_, expected)
+    np.testing.assert_allclose(model.predict(3), np.repeat(np.array(expected)[:, None], 3, axis=1))
+
+
+def test_minimize_box_is_vectorized_over_series():
+    targets = np.random.default_rng(0).uniform(0.1, 0.9, size=(50, 2))
+    calls = []
+
+    def objective(rows, x):
+        calls.append(len(rows))
+        return ((x - targets[rows, None, :]) ** 2).sum(axis=2)
+
+    x = minimize_box(objective, 50, np.array([[0.0, 1.0], [0.0, 1.0]]), tol=1e-4)
+    np.testing.assert_allclose(x, targets, atol=1e-3)
+    # One call per iteration for all series, fewer as they converge.
+    assert len(calls) < 40 and calls[-1] < 50
+
+
+@pytest.mark.parametrize('model', ['ses', 'holt', 'damped', 'holt_winters', 'theta'])
+def test_smoothing_models_fit_the_whole_panel(model):
+    y = make_seasonal()
+    y[0, 5:9] = np.nan
+    y[1, :60] = np.nan
+    y[2] = np.nan
+    forecasts = Predictor(model=model).fit(y[:, :-14]).predict(14)
+    assert forecasts.shape == (30, 14)
+    assert np.isfinite(forecasts[np.arange(30) != 2]).all() and np.isnan(forecasts[2]).all()
+
+
+def test_holt_winters_tracks_seasonal_trend():
+    y = make_seasonal(noise=0.3)
+    train, test = y[:, :-14], y[:, -14:]
+    forecasts = Predictor(model='holt_winters').fit(train).predict(14)
+    naive = Predictor(model='naive').fit(train).predict(14)
+    assert np.mean(np.abs(forecasts - test)) < 0.3 * np.mean(np.abs(naive - test))
+
+    model = Predictor(model='holt_winters').fit(train).model_
+    assert (model.beta_ <= model.alpha_).all() and (model.gamma_ <= 1 - model.alpha_).all()
+
+
+def test_theta_forecast_formula():
+    y = make_seasonal(n_series=8, noise=1.0)
+    model = ThetaModel(season_length=7).fit(y)
+    t = np.arange(y.shape[1])
+    z = y - model.season_[:, t % 7]
+    slope = np.polyfit(t, z.T, 1)[0]
+    level = np.array([ses_reference(row, alpha) for row, alpha in zip(z, model.alpha_)])
+
+    h = np.arange(1, 6)
+    alpha = model.alpha_[:, None]
+    drift = h - 1 + (1 - (1 - alpha) ** y.shape[1]) / alpha
+    expected = level[:, None] + slope[:, None] / 2 * drift + model.season_[:, (y.shape[1] + h - 1) % 7]
+    np.testing.assert_allclose(model.predict(5), expected, atol=1e-6)
+
+
+def test_update_continues_the_recursion():
+    y = make_seasonal(n_series=6)
+    ses = Predictor(model='ses').fit(y[:, :100]).update(y[:, 100:]).model_
+    expected = [ses_reference(row, alpha) for row, alpha in zip(y, ses.alpha_)]
+    np.testing.assert_allclose(ses.level_, expected)
+
+    # Theta keeps its seasonal indices and adds the new points to its line.
+    theta = Predictor(model='theta', season_length=7).fit(y[:, :100]).update(y[:, 100:]).model_
+    t = np.arange(y.shape[1])
+    z = y - theta.season_[:, t % 7]
+    np.testing.assert_allclose(theta.level_, [ses_reference(row, a) for row, a in zip(z, theta.alpha_)])
+    slope = np.polyfit(t, z.T, 1)[0]
+    h = np.arange(1, 4)
+    drift = h - 1 + (1 - (1 - theta.alpha_[:, None]) ** y.shape[1]) / theta.alpha_[:, None]
+    expected = theta.level_[:, None] + slope[:, None] / 2 * drift + theta.season_[:, (y.shape[1] + h - 1) % 7]
+    np.testing.assert_allclose(theta.predict(3), expected, atol=1e-6)
+
+    hw = Predictor(model='holt_winters').fit(y[:, :100])
+    before = hw.predict(7)
+    hw.update(y[:, 100:])
+    assert hw.model_.n_time_ == y.shape[1] and not np.allclose(hw.predict(7), before)
+
+
+def test_smoothing_intervals_and_persistence(tmp_path):
+    y = make_seasonal(n_series=40)
+    train, test = y[:, :-14], y[:, -14:]
+    predictor = Predictor(model='holt_winters', damped=True).fit(train)
+    forecasts, bounds = predictor.predict(14, quantiles=[0.1, 0.9], seed=0)
+    coverage = np.mean((test > bounds[:, 0]) & (test < bounds[:, 1]))
+    assert 0.6 < coverage < 0.97
+
+    predictor.save(str(tmp_path / 'hw'))
+    loaded = Predictor.load(str(tmp_path / 'hw'))
+    assert isinstance(loaded.model_, HoltWintersModel)
+    assert loaded.model_.get_params() == {'damped': True, 'season_length': 7, 'max_iter': 60, 'tol': 1e-3}
+    np.testing.assert_array_equal(loaded.predict(14), forecasts)
+
+
+def test_invalid_smoothing_params():
+    from nostradamus.models import ExponentialSmoothingModel
+
+    with pytest.raises(ValueError):
+        ExponentialSmoothingModel(damped=True)
+    with pytest.raises(ValueError):
+        ThetaModel(season_length=0)
+    with pytest.raises(TypeError):
+        SimpleExponentialSmoothingModel(trend=True)